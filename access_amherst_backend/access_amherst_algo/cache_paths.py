@@ -0,0 +1,34 @@
+import os
+
+
+def default_cache_path(name):
+    """
+    Locate a runtime cache file or directory outside the source tree.
+
+    Caches live under the `ACCESS_AMHERST_CACHE_DIR` environment variable,
+    or `access_amherst` in the user's cache directory (`XDG_CACHE_HOME`,
+    by default `~/.cache`), so they neither depend on the working directory
+    nor end up in commits of the repository.
+
+    Parameters
+    ----------
+    name : str
+        File or directory name of the cache.
+
+    Returns
+    -------
+    str
+        The absolute path of the cache.
+
+    Examples
+    --------
+    >>> default_cache_path("page_cache")
+    '/home/runner/.cache/access_amherst/page_cache'
+    """
+    root = os.getenv("ACCESS_AMHERST_CACHE_DIR")
+    if not root:
+        user_cache = os.getenv("XDG_CACHE_HOME") or os.path.join(
+            os.path.expanduser("~"), ".cache"
+        )
+        root = os.path.join(user_cache, "access_amherst")
+    return os.path.abspath(os.path.join(root, name))
@@ -1,9 +1,17 @@
 import requests
 import json
 import os
+import re
 import logging
-from bs4 import BeautifulSoup
+from concurrent.futures import ThreadPoolExecutor
+from requests.adapters import HTTPAdapter
+from bs4 import BeautifulSoup, SoupStrainer
 from datetime import datetime
+from access_amherst_algo.datetime_parsing import parse_datetime_utc
+from access_amherst_algo.event_fingerprint import (
+    compute_content_hash,
+    load_known_hashes,
+)
 
 BASE_URL = "https://www.amherst.edu/news/events/calendar"
 headers = {
@@ -12,6 +20,16 @@ headers = {
     "Accept-Language": "en-US,en;q=0.9",
     "Connection": "keep-alive",
 }
+REQUEST_TIMEOUT = 30  # seconds
+
+# Number of pages fetched at once by `scrape_all_pages_concurrent`
+DEFAULT_WORKERS = 4
+
+# Page numbers linked from the calendar's pager, e.g. `?_page=12`
+PAGE_LINK_RE = re.compile(rb"[?&;]_page=(\d+)")
+
+# Only the event listings are built into a tree when parsing a page
+EVENT_ARTICLES = SoupStrainer("article", class_="mm-calendar-event")
 
 # Configure logging
 logging.basicConfig(
@@ -24,7 +42,37 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
-def fetch_page(url):
+def create_session(pool_size=DEFAULT_WORKERS):
+    """
+    Create a keep-alive session for fetching calendar pages.
+
+    The session carries the scraper's headers and a connection pool large
+    enough for `pool_size` concurrent requests, so pages fetched through it
+    reuse open connections instead of reconnecting each time.
+
+    Parameters
+    ----------
+    pool_size : int, optional
+        Maximum number of pooled connections per host.
+
+    Returns
+    -------
+    requests.Session
+        The configured session.
+
+    Examples
+    --------
+    >>> session = create_session(pool_size=8)
+    >>> html = fetch_page(f"{BASE_URL}?_page=0", session=session)
+    """
+    session = requests.Session()
+    session.headers.update(headers)
+    adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
+
+def fetch_page(url, session=None, cache=None):
     """
     Fetch the raw content of a webpage.
 
@@ -36,6 +84,13 @@ def fetch_page(url):
     ----------
     url : str
         The URL of the webpage to fetch.
+    session : requests.Session, optional
+        Session to send the request with, e.g. from `create_session()`. If not
+        given, a new session is used for this request only.
+    cache : PageCache, optional
+        Response cache. If given, the request is made conditional on the
+        cached validators, a `304 Not Modified` answer returns the cached
+        body, and new bodies are stored in the cache.
 
     Returns
     -------
@@ -51,10 +106,20 @@ def fetch_page(url):
     logger.info(f"Fetching URL: {url}")
     
     try:
-        session = requests.Session()
-        response = session.get(url, headers=headers)
+        if session is None:
+            session = requests.Session()
+        request_headers = headers
+        if cache is not None:
+            request_headers = {**headers, **cache.conditional_headers(url)}
+        response = session.get(url, headers=request_headers, timeout=REQUEST_TIMEOUT)
+        if cache is not None and response.status_code == 304:
+            logger.info(f"Page {url} not modified; using cached copy.")
+            cache.refresh_validators(url, response.headers)
+            return cache.load_body(url)
         if response.status_code != 200:
             return None
+        if cache is not None:
+            cache.store_response(url, response.headers, response.content)
         return response.content
     except (requests.exceptions.ConnectionError, requests.exceptions.Timeout) as e:
         logger.error(f"Error fetching {url}: {e}")
@@ -63,7 +128,131 @@ def fetch_page(url):
         logger.error(f"Unexpected error fetching {url}: {e}")
         return None
 
-def scrape_page(url):
+def has_captcha(html):
+    """
+    Check whether a calendar page is a CAPTCHA challenge.
+
+    A page is a challenge if its text mentions "captcha". Almost no page
+    contains the word anywhere, so the raw bytes are checked first and the
+    page is only parsed in full to confirm a match, e.g. one that is just a
+    reCAPTCHA script URL.
+
+    Parameters
+    ----------
+    html : bytes or str
+        Raw HTML of the page.
+
+    Returns
+    -------
+    bool
+        True if the page text mentions "captcha".
+
+    Examples
+    --------
+    >>> has_captcha(b"<html>Please complete the CAPTCHA</html>")
+    True
+    """
+    marker = b"captcha" if isinstance(html, bytes) else "captcha"
+    if marker not in html.lower():
+        return False
+    return "captcha" in BeautifulSoup(html, "html.parser").text.lower()
+
+def extract_event(article):
+    """
+    Extract the details of one event listing.
+
+    Parameters
+    ----------
+    article : bs4.Tag
+        An `article.mm-calendar-event` element.
+
+    Returns
+    -------
+    dict
+        The event's title, link, start and end times, location, description
+        and picture link; fields not found are None.
+
+    Examples
+    --------
+    >>> soup = BeautifulSoup(html, "html.parser", parse_only=EVENT_ARTICLES)
+    >>> extract_event(soup.find("article"))["title"]
+    'Literature Speaker Event'
+    """
+    event = {
+        "title": None,
+        "author_name": None,
+        "author_email": None,
+        "pub_date": None,
+        "host": None,
+        "link": None,
+        "picture_link": None,
+        "event_description": None,
+        "start_time": None,
+        "end_time": None,
+        "location": None
+    }
+
+    # Extract basic event information
+    title_tag = article.find("h2", class_="mm-event-listing-title").find("a")
+    if title_tag:
+        event["title"] = title_tag.text.strip()
+        event["link"] = title_tag["href"]
+
+    period_tag = article.find("h3", class_="mm-calendar-period")
+    if period_tag:
+        start_meta = period_tag.find("meta", itemprop="startDate")
+        if start_meta:
+            event["start_time"] = start_meta["content"]
+
+        end_meta = period_tag.find("meta", itemprop="endDate")
+        if end_meta:
+            event["end_time"] = end_meta["content"]
+
+    location_tag = article.find("p", class_="mm-event-listing-location")
+    if location_tag:
+        event["location"] = location_tag.get_text(strip=True)
+
+    description_tag = article.find("div", class_="mm-event-listing-description")
+    if description_tag:
+        event["event_description"] = description_tag.get_text(strip=True)
+
+    picture_tag = article.find("img", itemprop="image")
+    if picture_tag and "data-src" in picture_tag.attrs:
+        event["picture_link"] = "https://www.amherst.edu" + picture_tag.attrs["data-src"]
+
+    return event
+
+def parse_events(html):
+    """
+    Extract the event listings from a calendar page.
+
+    Only the `article.mm-calendar-event` elements are built into a tree (see
+    `EVENT_ARTICLES`); the rest of the page is tokenized and discarded. This
+    more than halves peak memory compared to building the whole document.
+
+    Parameters
+    ----------
+    html : bytes or str
+        Raw HTML of the page.
+
+    Returns
+    -------
+    list of dict
+        A list of dictionaries, each containing extracted event details.
+
+    Examples
+    --------
+    >>> events = parse_events(fetch_page(f"{BASE_URL}?_page=0"))
+    >>> print(events[0]["title"])
+    'Literature Speaker Event'
+    """
+    soup = BeautifulSoup(html, "html.parser", parse_only=EVENT_ARTICLES)
+    return [
+        extract_event(article)
+        for article in soup.find_all("article", class_="mm-calendar-event")
+    ]
+
+def scrape_page(url, session=None, html=None, cache=None):
     """
     Scrape event details from a specified webpage.
 
@@ -76,6 +265,14 @@ def scrape_page(url):
     ----------
     url : str
         The URL of the event listing page to scrape.
+    session : requests.Session, optional
+        Session passed on to `fetch_page()`.
+    html : bytes, optional
+        Already fetched content of `url`. If given, the page is not fetched
+        again.
+    cache : PageCache, optional
+        Response cache passed on to `fetch_page()`. Events parsed from a body
+        identical to the cached one are reused instead of parsing it again.
 
     Returns
     -------
@@ -91,64 +288,27 @@ def scrape_page(url):
     logger.info(f"Scraping page: {url}")
 
     try:
-        html = fetch_page(url)
+        if html is None:
+            html = fetch_page(url, session=session, cache=cache)
         if not html:
             logger.warning(f"Page {url} does not exist or failed to load.")
             return []
 
-        soup = BeautifulSoup(html, "html.parser")
+        if cache is not None:
+            cached_events = cache.load_events(url, html)
+            if cached_events is not None:
+                logger.info(f"Page {url} unchanged; reusing {len(cached_events)} parsed events")
+                return cached_events
 
-        if "captcha" in soup.text.lower():
+        if has_captcha(html):
             logger.warning("CAPTCHA detected. Unable to scrape this page.")
             return []
 
-        events = []
-        for article in soup.find_all("article", class_="mm-calendar-event"):
-            event = {
-                "title": None,
-                "author_name": None,
-                "author_email": None,
-                "pub_date": None,
-                "host": None,
-                "link": None,
-                "picture_link": None,
-                "event_description": None,
-                "start_time": None,
-                "end_time": None,
-                "location": None
-            }
-
-            # Extract basic event information
-            title_tag = article.find("h2", class_="mm-event-listing-title").find("a")
-            if title_tag:
-                event["title"] = title_tag.text.strip()
-                event["link"] = title_tag["href"]
-
-            period_tag = article.find("h3", class_="mm-calendar-period")
-            if period_tag:
-                start_meta = period_tag.find("meta", itemprop="startDate")
-                if start_meta:
-                    event["start_time"] = start_meta["content"]
-
-                end_meta = period_tag.find("meta", itemprop="endDate")
-                if end_meta:
-                    event["end_time"] = end_meta["content"]
-
-            location_tag = article.find("p", class_="mm-event-listing-location")
-            if location_tag:
-                event["location"] = location_tag.get_text(strip=True)
-
-            description_tag = article.find("div", class_="mm-event-listing-description")
-            if description_tag:
-                event["event_description"] = description_tag.get_text(strip=True)
-
-            picture_tag = article.find("img", itemprop="image")
-            if picture_tag and "data-src" in picture_tag.attrs:
-                event["picture_link"] = "https://www.amherst.edu" + picture_tag.attrs["data-src"]
-
-            events.append(event)
+        events = parse_events(html)
 
         logger.info(f"Scraped {len(events)} events from {url}")
+        if cache is not None:
+            cache.store_events(url, html, events)
     
     except Exception as e:
         logger.error(f"Error Scraping page {url}: {e}")
@@ -156,13 +316,103 @@ def scrape_page(url):
 
     return events
 
-def scrape_all_pages():
+def clean_event(event):
+    """
+    Drop the fields of a scraped event that were not found on the page.
+
+    This is the form in which events are saved to JSON, and therefore the
+    form the calendar saver fingerprints.
+
+    Parameters
+    ----------
+    event : dict
+        An event as returned by `scrape_page()`.
+
+    Returns
+    -------
+    dict
+        The event without its `None` fields.
+
+    Examples
+    --------
+    >>> clean_event({"title": "Literature Speaker Event", "host": None})
+    {'title': 'Literature Speaker Event'}
+    """
+    return {k: v for k, v in event.items() if v is not None}
+
+def should_stop_scrape(events, horizon=None, incremental=False):
+    """
+    Decide whether a page of events ends a bounded or incremental scrape.
+
+    Calendar pages are ordered by start time, so once every event on a page
+    starts after `horizon`, later pages are out of range too. In incremental
+    mode, a page whose events are all stored already with identical
+    fingerprints means the rest of the calendar has been seen before.
+
+    Parameters
+    ----------
+    events : list of dict
+        The events scraped from one page.
+    horizon : datetime, optional
+        Latest start time of interest. Events without a parseable start time
+        never count as past the horizon.
+    incremental : bool, optional
+        Whether to stop at a page of already stored events.
+
+    Returns
+    -------
+    bool
+        True if the page, and every page after it, should be skipped.
+
+    Examples
+    --------
+    >>> should_stop_scrape(events, horizon=timezone.now() + timedelta(days=30))
+    False
+    """
+    if not events:
+        return False
+
+    if horizon is not None:
+        start_times = []
+        for event in events:
+            try:
+                start_times.append(
+                    parse_datetime_utc(event.get("start_time"), "America/New_York")
+                )
+            except (TypeError, ValueError, OverflowError):
+                start_times.append(None)
+        if all(start and start > horizon for start in start_times):
+            logger.info(f"All events on page start after {horizon}. Stopping scrape.")
+            return True
+
+    if incremental:
+        content_hashes = [compute_content_hash(clean_event(event)) for event in events]
+        if set(content_hashes) <= load_known_hashes(content_hashes):
+            logger.info("All events on page are already stored. Stopping scrape.")
+            return True
+
+    return False
+
+def scrape_all_pages(base_url=BASE_URL, cache=None, horizon=None, incremental=False):
     """
     Scrape all event pages iteratively until no more events are found.
 
     This function starts scraping from the first page and continues incrementing 
     the page number until no more events are detected. It aggregates all scraped 
-    events into a single list.
+    events into a single list. All pages are fetched over one keep-alive session.
+    With `horizon` or `incremental`, scraping also ends at the first page for
+    which `should_stop_scrape()` is true; that page's events are not included.
+
+    Parameters
+    ----------
+    base_url : str, optional
+        URL of the calendar listing; `?_page=N` is appended for each page.
+    cache : PageCache, optional
+        Response cache passed on to `scrape_page()`.
+    horizon : datetime, optional
+        Stop at the first page whose events all start after this time.
+    incremental : bool, optional
+        Stop at the first page whose events are all stored already.
 
     Returns
     -------
@@ -177,14 +427,17 @@ def scrape_all_pages():
     logger.info("Starting scrape of all pages")
     page = 0
     all_events = []
+    session = create_session(pool_size=1)
 
     while True:
-        url = f"{BASE_URL}?_page={page}"
-        events = scrape_page(url)
+        url = f"{base_url}?_page={page}"
+        events = scrape_page(url, session=session, cache=cache)
 
         if not events:
             logger.info(f"No events found on page {page}. Stopping scrape.")
             break
+        if should_stop_scrape(events, horizon, incremental):
+            break
 
         all_events.extend(events)
         logger.info(f"Total events scraped so far: {len(all_events)}")
@@ -193,6 +446,108 @@ def scrape_all_pages():
     logger.info(f"Scraping completed. Total events scraped: {len(all_events)}")
     return all_events
 
+def find_last_page(html):
+    """
+    Find the highest page number linked from a calendar page's pager.
+
+    Parameters
+    ----------
+    html : bytes
+        Raw HTML of a calendar listing page.
+
+    Returns
+    -------
+    int
+        The highest `_page` number linked from the page, or 0 if the page has
+        no pager links.
+
+    Examples
+    --------
+    >>> find_last_page(b'<a href="?_page=12" title="Go to last page">')
+    12
+    """
+    pages = PAGE_LINK_RE.findall(html or b"")
+    return max((int(page) for page in pages), default=0)
+
+def scrape_all_pages_concurrent(
+    workers=DEFAULT_WORKERS, base_url=BASE_URL, cache=None, horizon=None, incremental=False
+):
+    """
+    Scrape all event pages, fetching several pages at a time.
+
+    The first page is fetched on its own to find the last page number from
+    its pager. The remaining pages are then fetched in parallel by a bounded
+    thread pool sharing one keep-alive session. Because the pager may not
+    link every page, pages after the last known one are probed in batches
+    of `workers` until an empty page is found.
+
+    The result is the same as `scrape_all_pages()`: events are returned in
+    page order, and nothing from the first page without events, or the first
+    page ending a bounded or incremental scrape, onwards is kept.
+
+    Parameters
+    ----------
+    workers : int, optional
+        Maximum number of pages fetched at once.
+    base_url : str, optional
+        URL of the calendar listing; `?_page=N` is appended for each page.
+    cache : PageCache, optional
+        Response cache passed on to `scrape_page()`.
+    horizon : datetime, optional
+        Stop at the first page whose events all start after this time.
+    incremental : bool, optional
+        Stop at the first page whose events are all stored already.
+
+    Returns
+    -------
+    list of dict
+        A list of all scraped events across multiple pages.
+
+    Examples
+    --------
+    >>> all_events = scrape_all_pages_concurrent(workers=8)
+    >>> print(f"Total events scraped: {len(all_events)}")
+    """
+    workers = max(1, workers or 1)
+    logger.info(f"Starting concurrent scrape of all pages with {workers} workers")
+    session = create_session(pool_size=workers)
+
+    first_url = f"{base_url}?_page=0"
+    html = fetch_page(first_url, session=session, cache=cache)
+    all_events = scrape_page(first_url, session=session, html=html or b"", cache=cache)
+    if not all_events:
+        logger.info("No events found on page 0. Stopping scrape.")
+        return all_events
+    if should_stop_scrape(all_events, horizon, incremental):
+        return []
+
+    def scrape(page):
+        return scrape_page(f"{base_url}?_page={page}", session=session, cache=cache)
+
+    # Fetch every page the pager links plus the one after it, which should
+    # be empty; without a pager, probe `workers` pages at a time
+    last_page = find_last_page(html)
+    next_page = 1
+    batch_end = last_page + 2 if last_page else workers + 1
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        while True:
+            pages = range(next_page, batch_end)
+            futures = [executor.submit(scrape, page) for page in pages]
+            for page, future in zip(pages, futures):
+                events = future.result()
+                if not events or should_stop_scrape(events, horizon, incremental):
+                    for pending in futures:
+                        pending.cancel()
+                    if not events:
+                        logger.info(f"No events found on page {page}. Stopping scrape.")
+                    logger.info(
+                        f"Scraping completed. Total events scraped: {len(all_events)}"
+                    )
+                    return all_events
+                all_events.extend(events)
+            logger.info(f"Total events scraped so far: {len(all_events)}")
+            next_page, batch_end = batch_end, batch_end + workers
+
 def save_to_json(events):
     """
     Save scraped event data to a JSON file.
@@ -230,7 +585,7 @@ def save_to_json(events):
             logger.info(f"JSON file for today already exists: {file_name}. Skipping save.")
             return
 
-        cleaned_events = [{k: v for k, v in event.items() if v is not None} for event in events]
+        cleaned_events = [clean_event(event) for event in events]
 
         with open(file_name, "w", encoding="utf-8") as file:
             json.dump(cleaned_events, file, indent=4, ensure_ascii=False)
@@ -1,128 +1,32 @@
 from datetime import datetime
+from collections import Counter
 from django.utils import timezone
-from dateutil import parser
 import json
 import os
-import difflib
 import logging
 from access_amherst_algo.models import Event
-from django.db.models import Q
-import pytz
-from sklearn.feature_extraction.text import TfidfVectorizer
-from sklearn.metrics.pairwise import cosine_similarity
-import numpy as np
-import random
-import re
-
-# Define location buckets with keywords as keys and dictionaries containing full names, latitude, and longitude as values
-location_buckets = {
-    "Keefe": {
-        "name": "Keefe Campus Center",
-        "latitude": 42.37141504481807,
-        "longitude": -72.51479991450528,
-    },
-    "Queer": {
-        "name": "Keefe Campus Center",
-        "latitude": 42.37141504481807,
-        "longitude": -72.51479991450528,
-    },
-    "Multicultural": {
-        "name": "Keefe Campus Center",
-        "latitude": 42.37141504481807,
-        "longitude": -72.51479991450528,
-    },
-    "Friedmann": {
-        "name": "Keefe Campus Center",
-        "latitude": 42.37141504481807,
-        "longitude": -72.51479991450528,
-    },
-    "Ford": {
-        "name": "Ford Hall",
-        "latitude": 42.36923506234738,
-        "longitude": -72.51529130962976,
-    },
-    "SCCE": {
-        "name": "Science Center",
-        "latitude": 42.37105378715133,
-        "longitude": -72.51334790776447,
-    },
-    "Science Center": {
-        "name": "Science Center",
-        "latitude": 42.37105378715133,
-        "longitude": -72.51334790776447,
-    },
-    "Chapin": {
-        "name": "Chapin Hall",
-        "latitude": 42.371771820543486,
-        "longitude": -72.51572746604714,
-    },
-    "Gym": {
-        "name": "Alumni Gymnasium",
-        "latitude": 42.368819594097864,
-        "longitude": -72.5188658145099,
-    },
-    "Cage": {
-        "name": "Alumni Gymnasium",
-        "latitude": 42.368819594097864,
-        "longitude": -72.5188658145099,
-    },
-    "Lefrak": {
-        "name": "Alumni Gymnasium",
-        "latitude": 42.368819594097864,
-        "longitude": -72.5188658145099,
-    },
-    "Middleton Gym": {
-        "name": "Alumni Gym",
-        "latitude": 42.368819594097864,
-        "longitude": -72.5188658145099,
-    },
-    "Frost": {
-        "name": "Frost Library",
-        "latitude": 42.37183195277655,
-        "longitude": -72.51699336789369,
-    },
-    "Paino": {
-        "name": "Beneski Museum of Natural History",
-        "latitude": 42.37209277500926,
-        "longitude": -72.51422459549485,
-    },
-    "Powerhouse": {
-        "name": "Powerhouse",
-        "latitude": 42.372109655195466,
-        "longitude": -72.51309270030836,
-    },
-    "Converse": {
-        "name": "Converse Hall",
-        "latitude": 42.37243680844771,
-        "longitude": -72.518433147017,
-    },
-    "Assembly Room": {
-        "name": "Converse Hall",
-        "latitude": 42.37243680844771,
-        "longitude": -72.518433147017,
-    },
-    "Red Room": {
-        "name": "Converse Hall",
-        "latitude": 42.37243680844771,
-        "longitude": -72.518433147017,
-    },
-}
-
-# Define categories
-CATEGORY_DESCRIPTIONS = {
-    'Social': 'social gathering party meetup networking friendship community hangout celebration',
-    'Group Business': 'business meeting organization planning committee board administrative professional',
-    'Athletics': 'sports game match competition athletic fitness exercise tournament physical team',
-    'Meeting': 'meeting discussion forum gathering assembly conference consultation',
-    'Community Service': 'volunteer service community help charity outreach support donation drive',
-    'Arts': 'art exhibition gallery creative visual performance theater theatre display',
-    'Concert': 'music concert performance band orchestra choir singing musical live',
-    'Arts and Craft': 'crafts making creating DIY hands-on artistic craft project workshop art supplies',
-    'Workshop': 'workshop training seminar learning skills development hands-on practical education',
-    'Cultural': 'cultural diversity international multicultural heritage tradition celebration ethnic',
-    'Thoughtful Learning': 'lecture academic learning educational intellectual discussion research scholarly',
-    'Spirituality': 'spiritual religious meditation faith worship prayer mindfulness wellness'
-}
+from access_amherst_algo.event_dedupe import (
+    DedupeEngine,
+    dedupe_fields,
+    outranks,
+)
+from access_amherst_algo.datetime_parsing import parse_datetime_utc
+from access_amherst_algo.location_resolver import (
+    jitter_coordinates,
+    lookup_location,
+    resolve_location,
+)
+from access_amherst_algo.calendar_scraper.category_classifier import (
+    CATEGORY_DESCRIPTIONS,
+    classify_texts,
+)
+from access_amherst_algo.event_fingerprint import (
+    CALENDAR_ID_BASE,
+    compute_content_hash,
+    event_source,
+    load_known_hashes,
+    stable_event_id,
+)
 
 # Configure logging
 logging.basicConfig(
@@ -135,6 +39,10 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+# Minimum TF-IDF title similarity for two events at the same start time to be
+# considered duplicates
+SIMILARITY_THRESHOLD = 0.57
+
 def load_calendar_json(folder_path):
     """
     Load the most recent JSON file from the specified folder.
@@ -211,13 +119,9 @@ def parse_calendar_datetime(date_str, pub_date=None):
         return None
 
     try:
-        dt = parser.parse(date_str)
-
-        if dt.tzinfo is None:
-            dt = pytz.timezone("America/New_York").localize(dt)
-        
-        return dt.astimezone(pytz.UTC)
-    except parser.ParserError as e:
+        # Times without an offset are Eastern Time
+        return parse_datetime_utc(date_str, "America/New_York")
+    except ValueError as e:
         logger.warning(f"Error parsing date string '{date_str}': {e}")
         return None
     except Exception as e:
@@ -225,131 +129,6 @@ def parse_calendar_datetime(date_str, pub_date=None):
         return None
 
 
-def preprocess_title(title):
-    """
-    Preprocess an event title for better similarity comparison.
-
-    This function converts the title to lowercase, removes special characters, 
-    and trims extra whitespace to standardize event title formatting.
-
-    Parameters
-    ----------
-    title : str
-        The event title to preprocess.
-
-    Returns
-    -------
-    str
-        The cleaned and standardized event title.
-
-    Examples
-    --------
-    >>> preprocess_title("  Guest Lecture: AI & Future  ")
-    'guest lecture ai future'
-    """
-    if not isinstance(title, str):
-        return ""
-    # Convert to lowercase and remove special characters
-    title = re.sub(r'[^\w\s]', '', title.lower())
-    # Remove extra whitespace
-    return " ".join(title.split())
-
-
-def is_calendar_event_similar(event_data):
-    """
-    Check if a similar event exists using start time and title similarity.
-
-    This function searches for existing events that have the same start time 
-    and compares their titles using a TF-IDF similarity score. If a similar 
-    event is found, it returns True.
-
-    Parameters
-    ----------
-    event_data : dict
-        A dictionary containing event details such as title and start time.
-
-    Returns
-    -------
-    bool
-        True if a similar event exists, otherwise False.
-
-    Examples
-    --------
-    >>> event_data = {
-    >>>     "title": "Guest Lecture: AI & Future",
-    >>>     "start_time": "2024-11-10T18:00:00"
-    >>> }
-    >>> is_calendar_event_similar(event_data)
-    False
-    """
-    try:
-        # Get and validate new title
-        new_title = event_data.get("title", "")
-        if not new_title:
-            logger.warning("Empty title provided")
-            return False
-
-        # Get start time only
-        pub_date = parse_calendar_datetime(event_data.get("pub_date"))
-        start_time = parse_calendar_datetime(event_data.get("start_time"), pub_date)
-
-        if not start_time:
-            logger.warning("No valid start time provided")
-            return False
-
-        # Query events with same start time only
-        similar_events = list(Event.objects.filter(start_time=start_time))
-        if not similar_events:
-            return False
-
-        # Preprocess all titles
-        existing_titles = [preprocess_title(event.title) for event in similar_events]
-        new_title_processed = preprocess_title(new_title)
-
-        # Remove empty titles
-        existing_titles = [title for title in existing_titles if title]
-        if not existing_titles:
-            return False
-
-        # Create and configure TF-IDF vectorizer
-        vectorizer = TfidfVectorizer(
-            min_df=1,
-            ngram_range=(1, 2),
-            strip_accents='unicode',
-            lowercase=True
-        )
-
-        # Calculate TF-IDF matrices
-        try:
-            all_titles = existing_titles + [new_title_processed]
-            tfidf_matrix = vectorizer.fit_transform(all_titles)
-        except ValueError as e:
-            logger.error(f"Vectorizer error: {e}")
-            return False
-
-        # Calculate similarities
-        new_vector = tfidf_matrix[-1:]
-        existing_matrix = tfidf_matrix[:-1]
-        similarities = cosine_similarity(new_vector, existing_matrix)[0]
-
-        # Check similarity threshold
-        SIMILARITY_THRESHOLD = 0.57
-        if similarities.size > 0 and np.max(similarities) > SIMILARITY_THRESHOLD:
-            similar_index = int(np.argmax(similarities))
-            most_similar_event = similar_events[similar_index]
-            logger.info(
-                f"Similar event found: '{most_similar_event.title}' "
-                f"(similarity: {similarities[similar_index]:.2f})"
-            )
-            return True
-
-        return False
-
-    except Exception as e:
-        logger.error(f"Error in similarity check for '{event_data.get('title', 'Unknown')}': {e}")
-        return False
-
-
 def categorize_location(location):
     """
     Categorize a location based on predefined keyword mappings.
@@ -372,10 +151,7 @@ def categorize_location(location):
     >>> categorize_location("Friedmann Room")
     'Keefe Campus Center'
     """
-    for keyword, info in location_buckets.items():
-        if re.search(rf"\b{keyword}\b", location, re.IGNORECASE):
-            return info["name"]
-    return "Other"
+    return resolve_location(location)[0]
 
 
 def get_lat_lng(location):
@@ -383,7 +159,8 @@ def get_lat_lng(location):
     Retrieve the latitude and longitude for a given location.
 
     This function searches the `location` string for any keyword defined in the
-    `location_buckets` dictionary. If a keyword is found, it returns the associated 
+    `LOCATION_BUCKETS` dictionary of `access_amherst_algo.location_resolver`.
+    If a keyword is found, it returns the associated 
     latitude and longitude. If no keyword is matched, it returns `(None, None)`.
 
     Parameters
@@ -403,20 +180,18 @@ def get_lat_lng(location):
     >>> get_lat_lng("Friedmann Room")
     (42.37141504481807, -72.51479991450528)
     """
-    for keyword, info in location_buckets.items():
-        if re.search(rf"\b{keyword}\b", location, re.IGNORECASE):
-            return info["latitude"], info["longitude"]
-    return None, None
+    return resolve_location(location)[1:]
 
 
-def add_random_offset(lat, lng):
+def add_random_offset(lat, lng, seed=None):
     """
-    Add a small random offset to latitude and longitude coordinates.
+    Add a small offset to latitude and longitude coordinates.
 
-    This function applies a random offset within a small range to both the latitude
-    and longitude values provided. The offset range can be adjusted as needed based
-    on the map scale to create minor variations in coordinates, which is useful for
-    visual distinction on maps.
+    This function applies an offset within a small range to both the latitude
+    and longitude values provided, which is useful for visual distinction on
+    maps. When a `seed` such as the event id is given, the offset is derived
+    from it deterministically (see `jitter_coordinates()`), so re-saving an
+    event keeps its coordinates. Without a seed the offset is random.
 
     Parameters
     ----------
@@ -424,23 +199,32 @@ def add_random_offset(lat, lng):
         The original latitude coordinate.
     lng : float
         The original longitude coordinate.
+    seed : int or str, optional
+        Value the offset is derived from, normally the event id.
 
     Returns
     -------
     tuple
         A tuple containing:
-        - `lat` (float): The latitude with a random offset applied.
-        - `lng` (float): The longitude with a random offset applied.
+        - `lat` (float): The latitude with the offset applied.
+        - `lng` (float): The longitude with the offset applied.
 
     Examples
     --------
-    >>> add_random_offset(42.37141504481807, -72.51479991450528)
-    (42.37149564586236, -72.51478632450079)  # Results may vary due to randomness
+    >>> add_random_offset(42.37141504481807, -72.51479991450528, seed=510538770)
+    (42.37138489684431, -72.51494259306966)
     """
-    offset_range = 0.00015
-    lat += random.uniform(-offset_range, offset_range)
-    lng += random.uniform(-offset_range, offset_range) 
-    return lat, lng
+    return jitter_coordinates(lat, lng, seed=seed)
+
+
+def _category_text(event_data):
+    """Combine the event fields used for categorization into one string."""
+    return ' '.join(filter(None, [
+        event_data.get('title', ''),
+        event_data.get('event_description', ''),
+        event_data.get('host', ''),
+        event_data.get('location', '')
+    ])).lower()
 
 
 def assign_categories(event_data):
@@ -448,7 +232,9 @@ def assign_categories(event_data):
     Assign the best-matching category to an event based on textual similarity.
 
     This function compares event details against predefined category descriptions 
-    using TF-IDF similarity scoring to determine the most relevant category.
+    using TF-IDF similarity scoring to determine the most relevant category. 
+    The category model is fitted once and persisted (see 
+    `access_amherst_algo.calendar_scraper.category_classifier`).
 
     Parameters
     ----------
@@ -466,63 +252,70 @@ def assign_categories(event_data):
     >>> assign_categories(event_data)
     ['Meeting']
     """
-    try:
-        # Combine relevant event fields into single text
-        event_text = ' '.join(filter(None, [
-            event_data.get('title', ''),
-            event_data.get('event_description', ''),
-            event_data.get('host', ''),
-            event_data.get('location', '')
-        ])).lower()
+    return assign_categories_batch([event_data])[0]
 
-        if not event_text.strip():
-            logger.warning("Empty event text, returning default category")
-            return ['Other']
 
-        # Prepare texts for comparison
-        texts = [event_text] + list(CATEGORY_DESCRIPTIONS.values())
-        
-        # Calculate TF-IDF similarity
-        vectorizer = TfidfVectorizer(stop_words='english')
+def assign_categories_batch(events):
+    """
+    Assign the best-matching category to each of a batch of events.
+
+    All events are scored together with one transform of the persisted 
+    category model. Events that cannot be categorized get `['Other']`.
+
+    Parameters
+    ----------
+    events : list of dict
+        The events to categorize.
+
+    Returns
+    -------
+    list of list
+        For each event, a list containing a single best-matching category.
+
+    Examples
+    --------
+    >>> assign_categories_batch([{"title": "Jazz Ensemble Concert"}, {"title": "TBD"}])
+    [['Concert'], ['Other']]
+    """
+    results = [['Other'] for _ in events]
+    texts, indices = [], []
+    for index, event_data in enumerate(events):
         try:
-            tfidf_matrix = vectorizer.fit_transform(texts)
-            similarities = cosine_similarity(tfidf_matrix[0:1], tfidf_matrix[1:])[0]
-            
-            # Get category with highest similarity
-            if len(similarities) > 0:
-                best_match_idx = similarities.argmax()
-                best_match_score = similarities[best_match_idx]
-                
-                if best_match_score > 0.02:  # Minimum similarity threshold
-                    best_category = list(CATEGORY_DESCRIPTIONS.keys())[best_match_idx]
-                    logger.info(f"Assigned category '{best_category}' with score {best_match_score:.3f}")
-                    return [best_category]
-            
-            logger.info("No category met similarity threshold")
-            return ['Other']
-            
+            event_text = _category_text(event_data)
         except Exception as e:
-            logger.error(f"Vectorizer error: {e}")
-            return ['Other']
-            
+            logger.error(f"Category assignment error: {e}")
+            continue
+        if not event_text.strip():
+            logger.warning("Empty event text, returning default category")
+            continue
+        texts.append(event_text)
+        indices.append(index)
+
+    try:
+        for index, categories in zip(indices, classify_texts(texts)):
+            results[index] = categories
     except Exception as e:
         logger.error(f"Category assignment error: {e}")
-        return ['Other']
+    return results
 
 
 # Modify save_calendar_event_to_db:
-def save_calendar_event_to_db(event_data):
+def save_calendar_event_to_db(event_data, auto_categories=None):
     """
     Save an event to the database with location and category validation.
 
-    This function processes event details, assigns categories, generates a 
-    unique event ID, and updates or creates a database entry.
+    This function processes event details, assigns categories, derives a 
+    stable event ID from the title and start time, and updates or creates a 
+    database entry.
 
     Parameters
     ----------
     event_data : dict
         A dictionary containing event details, including title, time, location, 
         and categories.
+    auto_categories : list, optional
+        Categories already assigned with `assign_categories_batch()`. If not 
+        given, `assign_categories()` is called for this event.
 
     Returns
     -------
@@ -549,36 +342,36 @@ def save_calendar_event_to_db(event_data):
         if not isinstance(title, str) or not title.strip():
             raise ValueError("Event must have a non-empty title string")
 
-        event_id = str(700_000_000 + hash(str(title)) % 100_000_000)
+        pub_date = parse_calendar_datetime(event_data.get("pub_date")) or timezone.now()
+        start_time = parse_calendar_datetime(event_data.get("start_time"), pub_date)
+        end_time = parse_calendar_datetime(event_data.get("end_time"), pub_date)
+
+        event_id = stable_event_id(CALENDAR_ID_BASE, title, start_time)
+        content_hash = compute_content_hash(event_data)
 
         # Get coordinates
         location = event_data.get("location", "")
-        map_location = categorize_location(location)
-        lat, lng = get_lat_lng(location)
+        map_location, lat, lng = lookup_location(location)
         if lat and lng:
-            lat, lng = add_random_offset(lat, lng)
-
-        pub_date = parse_calendar_datetime(event_data.get("pub_date")) or timezone.now()
-        start_time = parse_calendar_datetime(event_data.get("start_time"), pub_date)
-        end_time = parse_calendar_datetime(event_data.get("end_time"), pub_date)
+            lat, lng = add_random_offset(lat, lng, seed=event_id)
 
         # Get categories using similarity
-        try:
-            auto_categories = assign_categories(event_data)
-        except Exception as e:
-            logger.error(f"Category assignment error: {e}")
-            auto_categories = []
-
-                # Ensure at least one category
+        if auto_categories is None:
+            try:
+                auto_categories = assign_categories(event_data)
+            except Exception as e:
+                logger.error(f"Category assignment error: {e}")
+                auto_categories = []
+
+        # Ensure at least one category
         if not auto_categories:
             auto_categories = ["Other"]
 
+        # Combine with any existing categories, in a stable order
         existing_categories = event_data.get("categories", [])
-        all_categories = list(set(existing_categories + auto_categories))
-        
-        # Combine with any existing categories
-        existing_categories = event_data.get("categories", [])
-        all_categories = list(set(existing_categories + auto_categories))
+        all_categories = list(
+            dict.fromkeys(existing_categories + auto_categories)
+        )
 
         Event.objects.update_or_create(
             id=event_id,
@@ -597,6 +390,8 @@ def save_calendar_event_to_db(event_data):
                 "latitude": lat,
                 "longitude": lng,
                 "map_location": map_location,
+                "content_hash": content_hash,
+                **dedupe_fields(event_data["title"], start_time),
             },
         )
         logger.info(f"Successfully saved event: {event_data['title']} with categories {all_categories}")
@@ -610,13 +405,20 @@ def process_calendar_events():
     """
     Process and save calendar events extracted from JSON data.
 
-    This function loads event data from a JSON file, checks for duplicate events, 
-    and saves new events to the database.
+    This function loads event data from a JSON file, checks every event for 
+    duplicates with a single `DedupeEngine` (by dedupe key, against the Hub 
+    and email events, and by title similarity), categorizes the events in one 
+    batch, and saves new events to the database.
+    Events whose content hash is already stored are skipped without a write.
+    Duplicates of Hub events are skipped, while stored email copies of a 
+    calendar event are replaced by it, following `SOURCE_PRIORITY`.
 
     Returns
     -------
-    None
-        This function does not return any value but logs processing status messages.
+    collections.Counter
+        Number of events that were ``changed`` (written), ``unchanged``,
+        ``duplicate`` or ``failed``. Events merged with another source's
+        event, whichever row was kept, are also counted as ``cross_source``.
 
     Examples
     --------
@@ -627,18 +429,91 @@ def process_calendar_events():
     curr_dir = os.path.dirname(os.path.abspath(__file__))
     json_folder = os.path.join(curr_dir, "calendar_json_outputs")
 
+    counts = Counter(
+        changed=0, unchanged=0, duplicate=0, cross_source=0, failed=0
+    )
     events_data = load_calendar_json(json_folder)
     if not events_data:
         logger.warning("No events data to process")
-        return
+        return counts
+
+    # Skip events already stored with the same source fields
+    content_hashes = [compute_content_hash(event) for event in events_data]
+    known_hashes = load_known_hashes(content_hashes)
+    events_data = [
+        event
+        for event, content_hash in zip(events_data, content_hashes)
+        if content_hash not in known_hashes
+    ]
+    counts["unchanged"] = len(content_hashes) - len(events_data)
+
+    start_times = [
+        parse_calendar_datetime(event.get("start_time")) for event in events_data
+    ]
+    titles_and_times = [
+        (event.get("title"), start_time)
+        for event, start_time in zip(events_data, start_times)
+    ]
+    event_ids = [
+        stable_event_id(CALENDAR_ID_BASE, title, start_time)
+        for title, start_time in titles_and_times
+    ]
+    engine = DedupeEngine(
+        [
+            (title, start_time, event_id)
+            for (title, start_time), event_id in zip(
+                titles_and_times, event_ids
+            )
+        ],
+        source="calendar",
+        similarity_threshold=SIMILARITY_THRESHOLD,
+    )
 
-    for event in events_data:
+    # Categorize the whole batch with one pass of the category model
+    categories = assign_categories_batch(events_data)
+
+    for event, start_time, event_id, auto_categories in zip(
+        events_data, start_times, event_ids, categories
+    ):
         try:
-            if not is_calendar_event_similar(event):
-                save_calendar_event_to_db(event)
-            else:
-                logger.info(f"Skipping similar event: {event['title']}")
+            title = event.get("title")
+            duplicate_id = engine.find_duplicate(title, start_time, event_id)
+            cross = (
+                duplicate_id is not None
+                and event_source(duplicate_id) != "calendar"
+            )
+            if duplicate_id is not None and not outranks(
+                event_id, duplicate_id
+            ):
+                logger.info(
+                    f"Skipping duplicate of event {duplicate_id}: {title}"
+                )
+                counts["duplicate"] += 1
+                if cross:
+                    counts["cross_source"] += 1
+                continue
+
+            save_calendar_event_to_db(event, auto_categories)
+            if duplicate_id is not None:
+                logger.info(
+                    f"Replacing event {duplicate_id} with calendar event: "
+                    f"{title}"
+                )
+                Event.objects.filter(id=duplicate_id).delete()
+                engine.discard(duplicate_id)
+                if cross:
+                    counts["cross_source"] += 1
+            engine.add(title, start_time, event_id)
+            counts["changed"] += 1
         except Exception as e:
             logger.error(
                 f"Error processing event '{event.get('title', 'Unknown')}': {e}"
-            )
\ No newline at end of file
+            )
+            counts["failed"] += 1
+
+    logger.info(
+        f"Saved {counts['changed']} changed events; skipped "
+        f"{counts['unchanged']} unchanged and {counts['duplicate']} "
+        f"duplicate events ({counts['cross_source']} from other sources)."
+    )
+    return counts
@@ -0,0 +1,280 @@
+import hashlib
+import json
+import logging
+import os
+from collections import Counter
+from functools import lru_cache
+
+import joblib
+import numpy as np
+from scipy import sparse
+from sklearn.feature_extraction.text import CountVectorizer
+
+from access_amherst_algo.cache_paths import default_cache_path
+
+logger = logging.getLogger(__name__)
+
+# Define categories
+CATEGORY_DESCRIPTIONS = {
+    "Social": "social gathering party meetup networking friendship community hangout celebration",
+    "Group Business": "business meeting organization planning committee board administrative professional",
+    "Athletics": "sports game match competition athletic fitness exercise tournament physical team",
+    "Meeting": "meeting discussion forum gathering assembly conference consultation",
+    "Community Service": "volunteer service community help charity outreach support donation drive",
+    "Arts": "art exhibition gallery creative visual performance theater theatre display",
+    "Concert": "music concert performance band orchestra choir singing musical live",
+    "Arts and Craft": "crafts making creating DIY hands-on artistic craft project workshop art supplies",
+    "Workshop": "workshop training seminar learning skills development hands-on practical education",
+    "Cultural": "cultural diversity international multicultural heritage tradition celebration ethnic",
+    "Thoughtful Learning": "lecture academic learning educational intellectual discussion research scholarly",
+    "Spirituality": "spiritual religious meditation faith worship prayer mindfulness wellness",
+}
+
+# Minimum cosine similarity for the best category to be assigned
+MIN_CATEGORY_SCORE = 0.02
+
+# Scores closer than this are ties, which go to the category listed first.
+# Equal scores can differ in the last bits depending on how they were
+# computed, so exact ties must not be left to rounding.
+TIE_TOLERANCE = 1e-12
+
+MODEL_PATH = os.getenv("CATEGORY_MODEL_PATH") or default_cache_path(
+    "category_model.joblib"
+)
+
+
+def descriptions_version(descriptions=CATEGORY_DESCRIPTIONS):
+    """Fingerprint of the category descriptions a model was fitted on."""
+    payload = json.dumps(descriptions, sort_keys=True).encode("utf-8")
+    return hashlib.blake2b(payload, digest_size=8).hexdigest()
+
+
+def fit_category_model(descriptions=CATEGORY_DESCRIPTIONS):
+    """
+    Fit the category model on the category descriptions.
+
+    The model keeps the term counts of each description and how many
+    descriptions contain each term. That is all `score_categories()` needs
+    to reproduce, for any event, the TF-IDF vectors a vectorizer fitted on
+    that event plus the descriptions would produce.
+
+    Parameters
+    ----------
+    descriptions : dict, optional
+        Category names mapped to keyword descriptions.
+
+    Returns
+    -------
+    dict
+        The fitted model: `version`, `categories`, the fitted
+        `CountVectorizer` as `vectorizer`, the description term `counts` and
+        the per-term `doc_freq`.
+
+    Examples
+    --------
+    >>> model = fit_category_model()
+    >>> model["categories"][:2]
+    ['Social', 'Group Business']
+    """
+    vectorizer = CountVectorizer(stop_words="english")
+    counts = vectorizer.fit_transform(list(descriptions.values()))
+    counts = sparse.csr_matrix(counts, dtype=np.float64)
+    return {
+        "version": descriptions_version(descriptions),
+        "categories": list(descriptions),
+        "vectorizer": vectorizer,
+        "counts": counts,
+        "doc_freq": np.asarray((counts > 0).sum(axis=0)).ravel(),
+    }
+
+
+@lru_cache(maxsize=1)
+def load_category_model():
+    """
+    Load the persisted category model, fitting it if needed.
+
+    The model at `MODEL_PATH` (the `CATEGORY_MODEL_PATH` environment
+    variable, or a file under the user's cache directory) is used if it was fitted on the current
+    `CATEGORY_DESCRIPTIONS`. Otherwise, or if it cannot be read, the model
+    is fitted again and saved. The result is kept in memory for the rest of
+    the process.
+
+    Returns
+    -------
+    dict
+        The model, as returned by `fit_category_model()`.
+
+    Examples
+    --------
+    >>> load_category_model()["version"] == descriptions_version()
+    True
+    """
+    version = descriptions_version()
+    try:
+        model = joblib.load(MODEL_PATH)
+        if model.get("version") == version:
+            return model
+        logger.info("Category descriptions changed; refitting the model")
+    except FileNotFoundError:
+        logger.info("No saved category model; fitting one")
+    except Exception as e:
+        logger.warning(f"Could not load the category model: {e}")
+
+    model = fit_category_model()
+    try:
+        os.makedirs(os.path.dirname(MODEL_PATH), exist_ok=True)
+        joblib.dump(model, MODEL_PATH)
+    except OSError as e:
+        logger.warning(f"Could not save the category model: {e}")
+    return model
+
+
+def clear_category_model():
+    """Forget the in-memory category model so it is loaded again."""
+    load_category_model.cache_clear()
+
+
+def score_categories(texts, model=None):
+    """
+    Compute the similarity of each text to each category description.
+
+    The scores equal the cosine similarities a `TfidfVectorizer` with
+    English stop words would give when fitted on each text together with
+    the descriptions. Adding the text to the corpus raises the document
+    frequency of its terms by one, which changes their IDF weights in the
+    description vectors too, so these are adjusted per text. The whole
+    batch is scored with two sparse products instead of one vectorizer fit
+    per text.
+
+    Parameters
+    ----------
+    texts : list of str
+        The lowercased event texts.
+    model : dict, optional
+        The category model. Defaults to `load_category_model()`.
+
+    Returns
+    -------
+    numpy.ndarray
+        A `(len(texts), number of categories)` array of similarities.
+
+    Examples
+    --------
+    >>> score_categories(["jazz concert with the college band"]).argmax()
+    6
+    """
+    if model is None:
+        model = load_category_model()
+    counts = model["counts"]
+    doc_freq = model["doc_freq"]
+    vocabulary = model["vectorizer"].vocabulary_
+    analyzer = model["vectorizer"].build_analyzer()
+
+    # Smoothed IDF over the descriptions plus one text
+    n_docs = len(model["categories"]) + 1
+    idf_shared = np.log((1 + n_docs) / (2 + doc_freq)) + 1
+    idf_alone = np.log((1 + n_docs) / (1 + doc_freq)) + 1
+    idf_text_only = np.log((1 + n_docs) / 2) + 1
+
+    squared_counts = counts.power(2)
+    base_norms = squared_counts @ idf_alone**2
+    norm_shifts = squared_counts.multiply(idf_shared**2 - idf_alone**2).tocsr()
+
+    rows, columns, values = [], [], []
+    text_norms = np.zeros(len(texts))
+    for row, text in enumerate(texts):
+        norm = 0.0
+        for term, count in Counter(analyzer(text)).items():
+            column = vocabulary.get(term)
+            if column is None:
+                norm += (count * idf_text_only) ** 2
+            else:
+                norm += (count * idf_shared[column]) ** 2
+                rows.append(row)
+                columns.append(column)
+                values.append(count)
+        text_norms[row] = np.sqrt(norm)
+
+    shared_counts = sparse.csr_matrix(
+        (values, (rows, columns)),
+        shape=(len(texts), counts.shape[1]),
+        dtype=np.float64,
+    )
+    dots = (shared_counts.multiply(idf_shared**2).tocsr() @ counts.T).toarray()
+    category_norms = np.sqrt(
+        base_norms + (shared_counts.sign() @ norm_shifts.T).toarray()
+    )
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        scores = dots / (text_norms[:, None] * category_norms)
+    return np.nan_to_num(scores, nan=0.0, posinf=0.0, neginf=0.0)
+
+
+def best_category_index(scores):
+    """
+    Find the best-scoring category, breaking ties deterministically.
+
+    Scores within `TIE_TOLERANCE` of the highest one are tied, and the tie
+    goes to the category listed first in `CATEGORY_DESCRIPTIONS`, however
+    the scores were rounded.
+
+    Parameters
+    ----------
+    scores : numpy.ndarray
+        The similarities of one text to each category.
+
+    Returns
+    -------
+    int
+        The index of the best category.
+
+    Examples
+    --------
+    >>> best_category_index(np.array([0.1, 0.3, 0.3 + 1e-16]))
+    1
+    """
+    return int(np.flatnonzero(scores >= scores.max() - TIE_TOLERANCE)[0])
+
+
+def classify_texts(texts, model=None):
+    """
+    Assign the best-matching category to each text.
+
+    Parameters
+    ----------
+    texts : list of str
+        The lowercased event texts.
+    model : dict, optional
+        The category model. Defaults to `load_category_model()`.
+
+    Returns
+    -------
+    list of list of str
+        For each text, a single-element list with the best category, or
+        `['Other']` if no category scores above `MIN_CATEGORY_SCORE`.
+
+    Examples
+    --------
+    >>> classify_texts(["jazz concert with the college band", "tbd"])
+    [['Concert'], ['Other']]
+    """
+    if model is None:
+        model = load_category_model()
+    if not texts:
+        return []
+    scores = score_categories(texts, model)
+    results = []
+    for row in scores:
+        best_match_idx = best_category_index(row)
+        best_match_score = row[best_match_idx]
+        if best_match_score > MIN_CATEGORY_SCORE:
+            best_category = model["categories"][best_match_idx]
+            logger.info(
+                f"Assigned category '{best_category}' with score "
+                f"{best_match_score:.3f}"
+            )
+            results.append([best_category])
+        else:
+            logger.info("No category met similarity threshold")
+            results.append(["Other"])
+    return results
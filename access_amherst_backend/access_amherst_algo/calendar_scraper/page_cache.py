@@ -0,0 +1,266 @@
+import hashlib
+import json
+import logging
+import os
+import tempfile
+
+from access_amherst_algo.cache_paths import default_cache_path
+
+logger = logging.getLogger(__name__)
+
+CACHE_DIR = os.getenv("PAGE_CACHE_DIR") or default_cache_path("page_cache")
+
+
+def hash_body(body):
+    """Return the SHA-256 hex digest of a response body."""
+    return hashlib.sha256(body).hexdigest()
+
+
+def _write_atomic(path, data):
+    """Write `data` to `path` so readers never see a partial file."""
+    directory = os.path.dirname(path)
+    fd, temp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as file:
+            file.write(data)
+        os.replace(temp_path, path)
+    except BaseException:
+        os.unlink(temp_path)
+        raise
+
+
+class PageCache:
+    """
+    On-disk cache of calendar page responses and the events parsed from them.
+
+    Each URL has a metadata file holding the `ETag` and `Last-Modified`
+    validators, the SHA-256 hash of the body and the events parsed from that
+    body, next to a file with the body itself. Validators are sent back as
+    conditional request headers, and parsed events are reused whenever a page
+    body hashes to the stored value, so unchanged pages are neither
+    re-downloaded (on `304 Not Modified`) nor re-parsed.
+
+    Files are keyed by URL and replaced atomically, so pages can be cached
+    from several threads at once. Unreadable entries are treated as misses
+    and failed writes are logged, so the cache never stops a scrape.
+
+    Parameters
+    ----------
+    directory : str, optional
+        Directory holding the cache files. Defaults to `CACHE_DIR`, set by
+        the `PAGE_CACHE_DIR` environment variable or under the user's cache
+        directory (see `default_cache_path()`). Created if it does not exist.
+
+    Examples
+    --------
+    >>> cache = PageCache()
+    >>> events = scrape_page(f"{BASE_URL}?_page=0", cache=cache)
+    """
+
+    def __init__(self, directory=None):
+        self.directory = directory or CACHE_DIR
+        os.makedirs(self.directory, exist_ok=True)
+
+    def _path(self, url, extension):
+        key = hashlib.sha256(url.encode("utf-8")).hexdigest()
+        return os.path.join(self.directory, f"{key}.{extension}")
+
+    def _load_meta(self, url):
+        try:
+            with open(self._path(url, "json"), encoding="utf-8") as file:
+                meta = json.load(file)
+        except (OSError, ValueError):
+            return None
+        return meta if meta.get("url") == url else None
+
+    def _save_meta(self, url, meta):
+        meta["url"] = url
+        _write_atomic(
+            self._path(url, "json"),
+            json.dumps(meta, ensure_ascii=False).encode("utf-8"),
+        )
+
+    def conditional_headers(self, url):
+        """
+        Build the conditional request headers for a cached URL.
+
+        Parameters
+        ----------
+        url : str
+            The page URL.
+
+        Returns
+        -------
+        dict
+            `If-None-Match` / `If-Modified-Since` headers from the stored
+            validators; empty if nothing usable is cached.
+
+        Examples
+        --------
+        >>> cache.conditional_headers(f"{BASE_URL}?_page=0")
+        {'If-None-Match': '"5f3c-62a1"'}
+        """
+        meta = self._load_meta(url)
+        if meta is None or not os.path.exists(self._path(url, "html")):
+            return {}
+        headers = {}
+        if meta.get("etag"):
+            headers["If-None-Match"] = meta["etag"]
+        if meta.get("last_modified"):
+            headers["If-Modified-Since"] = meta["last_modified"]
+        return headers
+
+    def load_body(self, url):
+        """
+        Return the cached body of a URL.
+
+        Parameters
+        ----------
+        url : str
+            The page URL.
+
+        Returns
+        -------
+        bytes or None
+            The stored body, or None if it is not cached.
+
+        Examples
+        --------
+        >>> cache.load_body(f"{BASE_URL}?_page=0")[:15]
+        b'<!DOCTYPE html>'
+        """
+        try:
+            with open(self._path(url, "html"), "rb") as file:
+                return file.read()
+        except OSError:
+            return None
+
+    def store_response(self, url, response_headers, body):
+        """
+        Store a fetched body and its validators.
+
+        Events parsed from a previous body are kept if the new body has the
+        same hash, and dropped otherwise.
+
+        Parameters
+        ----------
+        url : str
+            The page URL.
+        response_headers : Mapping
+            Headers of the response, for `ETag` and `Last-Modified`.
+        body : bytes
+            The response body.
+
+        Returns
+        -------
+        None
+
+        Examples
+        --------
+        >>> cache.store_response(url, response.headers, response.content)
+        """
+        body_hash = hash_body(body)
+        meta = self._load_meta(url) or {}
+        try:
+            if meta.get("body_hash") != body_hash:
+                meta = {"body_hash": body_hash}
+                _write_atomic(self._path(url, "html"), body)
+            meta["etag"] = response_headers.get("ETag")
+            meta["last_modified"] = response_headers.get("Last-Modified")
+            self._save_meta(url, meta)
+        except OSError as e:
+            logger.warning(f"Could not cache response for {url}: {e}")
+
+    def refresh_validators(self, url, response_headers):
+        """
+        Update stored validators from a `304 Not Modified` response.
+
+        Parameters
+        ----------
+        url : str
+            The page URL.
+        response_headers : Mapping
+            Headers of the 304 response.
+
+        Returns
+        -------
+        None
+
+        Examples
+        --------
+        >>> cache.refresh_validators(url, response.headers)
+        """
+        meta = self._load_meta(url)
+        if meta is None:
+            return
+        for key, header in (
+            ("etag", "ETag"),
+            ("last_modified", "Last-Modified"),
+        ):
+            if response_headers.get(header):
+                meta[key] = response_headers[header]
+        try:
+            self._save_meta(url, meta)
+        except OSError as e:
+            logger.warning(f"Could not update validators for {url}: {e}")
+
+    def load_events(self, url, body):
+        """
+        Return the events parsed from a body, if it is the one cached.
+
+        Parameters
+        ----------
+        url : str
+            The page URL.
+        body : bytes
+            The page body about to be parsed.
+
+        Returns
+        -------
+        list of dict or None
+            The stored events if `body` hashes to the cached body hash and
+            events were stored for it, otherwise None.
+
+        Examples
+        --------
+        >>> cache.load_events(url, html)
+        [{'title': 'Literature Speaker Event', ...}]
+        """
+        meta = self._load_meta(url)
+        if meta is None or meta.get("body_hash") != hash_body(body):
+            return None
+        return meta.get("events")
+
+    def store_events(self, url, body, events):
+        """
+        Store the events parsed from a body.
+
+        Parameters
+        ----------
+        url : str
+            The page URL.
+        body : bytes
+            The body the events were parsed from.
+        events : list of dict
+            The parsed events.
+
+        Returns
+        -------
+        None
+
+        Examples
+        --------
+        >>> cache.store_events(url, html, events)
+        """
+        body_hash = hash_body(body)
+        meta = self._load_meta(url) or {}
+        try:
+            if meta.get("body_hash") != body_hash:
+                # The body was not fetched through this cache; store it so
+                # the events can be reused after a 304
+                meta = {"body_hash": body_hash}
+                _write_atomic(self._path(url, "html"), body)
+            meta["events"] = events
+            self._save_meta(url, meta)
+        except OSError as e:
+            logger.warning(f"Could not cache events for {url}: {e}")
@@ -0,0 +1,206 @@
+import re
+from datetime import date, datetime, time, timedelta
+from functools import lru_cache
+
+import pytz
+from dateutil import parser as dateutil_parser
+from dateutil.tz import tzoffset, tzutc
+
+# Number of distinct strings remembered by each cache
+CACHE_SIZE = 8192
+
+MONTHS = {
+    name: number
+    for number, name in enumerate(
+        "jan feb mar apr may jun jul aug sep oct nov dec".split(), start=1
+    )
+}
+
+# RFC 822 dates as used by the Hub RSS feed, e.g.
+# "Fri, 18 Oct 2024 20:00:00 GMT"
+RFC822_RE = re.compile(
+    r"(?:[A-Za-z]{3}, )?(\d{1,2}) ([A-Za-z]{3}) (\d{4}) "
+    r"(\d{2}):(\d{2}):(\d{2}) (GMT|UTC|Z|[+-]\d{4})"
+)
+
+# ISO 8601 dates as found in the calendar's `<meta itemprop>` tags, e.g.
+# "2024-11-07T15:00:00-05:00", "2024-11-07T15:00:00Z" or "2024-11-07"
+ISO_RE = re.compile(
+    r"(\d{4})-(\d{2})-(\d{2})"
+    r"(?:[T ](\d{2}):(\d{2})(?::(\d{2})(?:\.(\d{1,6}))?)?"
+    r"(Z|[+-]\d{2}:?\d{2})?)?"
+)
+
+# Times of day as extracted from emails, e.g. "18:00:00"
+TIME_RE = re.compile(r"(\d{1,2}):(\d{1,2}):(\d{1,2})")
+
+
+def _offset(text):
+    """Build the tzinfo dateutil would return for an offset suffix."""
+    if text in ("GMT", "UTC", "Z"):
+        return tzutc()
+    sign = -1 if text[0] == "-" else 1
+    digits = text[1:].replace(":", "")
+    seconds = sign * (int(digits[:2]) * 3600 + int(digits[2:]) * 60)
+    return tzutc() if seconds == 0 else tzoffset(None, seconds)
+
+
+def _parse_rfc822(value):
+    match = RFC822_RE.fullmatch(value)
+    if match is None:
+        return None
+    day, month, year, hour, minute, second, zone = match.groups()
+    month = MONTHS.get(month.lower())
+    if month is None:
+        return None
+    return datetime(
+        int(year),
+        month,
+        int(day),
+        int(hour),
+        int(minute),
+        int(second),
+        tzinfo=_offset(zone),
+    )
+
+
+def _parse_iso(value):
+    match = ISO_RE.fullmatch(value)
+    if match is None:
+        return None
+    year, month, day, hour, minute, second, fraction, zone = match.groups()
+    return datetime(
+        int(year),
+        int(month),
+        int(day),
+        int(hour or 0),
+        int(minute or 0),
+        int(second or 0),
+        int((fraction or "0").ljust(6, "0")),
+        tzinfo=_offset(zone) if zone else None,
+    )
+
+
+@lru_cache(maxsize=CACHE_SIZE)
+def _parse(value, today):
+    # `today` is part of the cache key because dateutil fills in missing
+    # date fields from the current date
+    if isinstance(value, str):
+        value = value.strip()
+        for fast_parser in (_parse_rfc822, _parse_iso):
+            try:
+                parsed = fast_parser(value)
+            except ValueError:
+                # Out-of-range fields: let dateutil decide
+                parsed = None
+            if parsed is not None:
+                return parsed
+    return dateutil_parser.parse(value)
+
+
+def parse_datetime(value):
+    """
+    Parse a date string the way `dateutil.parser.parse` would, but faster.
+
+    RFC 822 and ISO 8601 strings are parsed with exact patterns; anything
+    else is passed to dateutil. Results are memoized.
+
+    Parameters
+    ----------
+    value : str
+        The date string.
+
+    Returns
+    -------
+    datetime
+        The parsed datetime, timezone-aware if the string has an offset.
+
+    Raises
+    ------
+    ValueError
+        If the string cannot be parsed.
+    TypeError
+        If `value` is not a string.
+
+    Examples
+    --------
+    >>> parse_datetime("Fri, 18 Oct 2024 20:00:00 GMT")
+    datetime.datetime(2024, 10, 18, 20, 0, tzinfo=tzutc())
+    """
+    return _parse(value, date.today())
+
+
+@lru_cache(maxsize=CACHE_SIZE)
+def _parse_utc(value, default_timezone, today):
+    parsed = _parse(value, today)
+    if parsed.tzinfo is None and default_timezone is not None:
+        parsed = pytz.timezone(default_timezone).localize(parsed)
+    if parsed.utcoffset() == timedelta(0):
+        return parsed.replace(tzinfo=pytz.UTC)
+    return parsed.astimezone(pytz.UTC)
+
+
+def parse_datetime_utc(value, default_timezone=None):
+    """
+    Parse a date string and convert it to UTC.
+
+    Parameters
+    ----------
+    value : str
+        The date string.
+    default_timezone : str, optional
+        Time zone name assumed for strings without an offset, such as
+        "America/New_York". If not given, such strings are taken to be in
+        the server's local time, as `datetime.astimezone` does.
+
+    Returns
+    -------
+    datetime
+        A timezone-aware datetime in UTC.
+
+    Raises
+    ------
+    ValueError
+        If the string cannot be parsed.
+    TypeError
+        If `value` is not a string.
+
+    Examples
+    --------
+    >>> parse_datetime_utc("2024-11-10T18:00:00", "America/New_York")
+    datetime.datetime(2024, 11, 10, 23, 0, tzinfo=<UTC>)
+    """
+    return _parse_utc(value, default_timezone, date.today())
+
+
+@lru_cache(maxsize=CACHE_SIZE)
+def parse_time_of_day(value):
+    """
+    Parse an `HH:MM:SS` string, like `strptime(value, "%H:%M:%S").time()`.
+
+    Parameters
+    ----------
+    value : str
+        The time string.
+
+    Returns
+    -------
+    datetime.time
+        The parsed time.
+
+    Raises
+    ------
+    ValueError
+        If the string is not a valid time.
+
+    Examples
+    --------
+    >>> parse_time_of_day("18:00:00")
+    datetime.time(18, 0)
+    """
+    match = TIME_RE.fullmatch(value)
+    if match is not None:
+        hour, minute, second = (int(part) for part in match.groups())
+        if hour < 24 and minute < 60 and second < 60:
+            return time(hour, minute, second)
+    return datetime.strptime(value, "%H:%M:%S").time()
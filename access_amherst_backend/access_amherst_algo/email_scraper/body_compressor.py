@@ -0,0 +1,172 @@
+import logging
+import math
+import re
+
+from access_amherst_algo.email_scraper.digest_parser import (
+    FOOTER_RE,
+    parse_date,
+    parse_time_range,
+    split_sections,
+)
+
+logger = logging.getLogger(__name__)
+
+# Rough characters per token of English text, for logging estimates
+CHARS_PER_TOKEN = 4
+
+URL_RE = re.compile(r"<?(https?://[^\s<>\"']+[^\s<>\"'.,;:!?)\]])>?")
+PLACEHOLDER_RE = re.compile(r"\[URL(\d+)\]")
+
+# Quoted replies and the conventional signature delimiter
+QUOTED_LINE_RE = re.compile(r"^[ \t]*>.*$\n?", re.MULTILINE)
+SIGNATURE_RE = re.compile(r"^-- ?$", re.MULTILINE)
+
+INLINE_SPACE_RE = re.compile(r"[ \t ]+")
+
+
+def estimate_tokens(text):
+    """
+    Estimate the number of tokens a text costs the LLM.
+
+    Parameters
+    ----------
+    text : str
+        The text.
+
+    Returns
+    -------
+    int
+        About one token per `CHARS_PER_TOKEN` characters.
+
+    Examples
+    --------
+    >>> estimate_tokens("Queer Talk at 3 p.m.")
+    5
+    """
+    return math.ceil(len(text or "") / CHARS_PER_TOKEN)
+
+
+def _has_schedule(section):
+    return any(
+        parse_time_range(line)[0] or parse_date(line, 2000)
+        for line in section.splitlines()
+    )
+
+
+def compress_body(email_content):
+    """
+    Shrink a digest body before it is sent to the LLM.
+
+    Quoted lines, everything after a signature delimiter and footer
+    sections are removed, and runs of whitespace are collapsed. Each
+    distinct URL is replaced by a placeholder such as `[URL1]`, which
+    `restore_urls()` turns back into the URL in the extracted events.
+    Sections that mention no date or time are dropped, unless they directly
+    follow an event section, which they usually continue; the opening
+    section is always kept since it dates the digest.
+
+    Parameters
+    ----------
+    email_content : str
+        The email body.
+
+    Returns
+    -------
+    tuple of (str, dict)
+        The compressed body, and the URLs by placeholder number.
+
+    Examples
+    --------
+    >>> compress_body(
+    ...     "Queer Talk\\n3 p.m.\\nhttps://example.com/?utm_source=mail\\n\\n"
+    ...     "To unsubscribe, click here."
+    ... )
+    ('Queer Talk\\n3 p.m.\\n[URL1]', {1: 'https://example.com/?utm_source=mail'})
+    """
+    text = email_content or ""
+    signature = SIGNATURE_RE.search(text)
+    if signature:
+        text = text[: signature.start()]
+    text = QUOTED_LINE_RE.sub("", text)
+
+    urls = {}
+    numbers = {}
+
+    def placeholder(match):
+        url = match.group(1)
+        if url not in numbers:
+            numbers[url] = len(numbers) + 1
+            urls[numbers[url]] = url
+        return f"[URL{numbers[url]}]"
+
+    text = URL_RE.sub(placeholder, text)
+
+    kept = []
+    previous_kept = False
+    for index, section in enumerate(split_sections(text)):
+        if FOOTER_RE.search(section):
+            previous_kept = False
+            continue
+        lines = (
+            INLINE_SPACE_RE.sub(" ", line).strip()
+            for line in section.splitlines()
+        )
+        section = "\n".join(line for line in lines if line)
+        if index == 0:
+            # A header has a date but no time; an event continues below
+            kept.append(section)
+            previous_kept = any(
+                parse_time_range(line)[0] for line in section.splitlines()
+            )
+        elif _has_schedule(section):
+            kept.append(section)
+            previous_kept = True
+        elif previous_kept:
+            kept.append(section)
+            previous_kept = False
+    compressed = "\n\n".join(kept)
+
+    # Keep only the placeholders that survived
+    urls = {
+        number: url
+        for number, url in urls.items()
+        if f"[URL{number}]" in compressed
+    }
+    logger.info(
+        f"Compressed digest from ~{estimate_tokens(email_content)} to "
+        f"~{estimate_tokens(compressed)} tokens"
+    )
+    return compressed, urls
+
+
+def restore_urls(value, urls):
+    """
+    Put the URLs back in place of their placeholders.
+
+    Parameters
+    ----------
+    value : str, list or dict
+        Extracted events, or any value inside them.
+    urls : dict
+        The URLs by placeholder number, as returned by `compress_body()`.
+
+    Returns
+    -------
+    str, list or dict
+        A copy of `value` with every known placeholder replaced, through
+        nested lists and dicts.
+
+    Examples
+    --------
+    >>> restore_urls({"link": "[URL1]"}, {1: "https://example.com"})
+    {'link': 'https://example.com'}
+    """
+    if isinstance(value, str):
+        return PLACEHOLDER_RE.sub(
+            lambda match: urls.get(int(match.group(1)), match.group()), value
+        )
+    if isinstance(value, list):
+        return [restore_urls(item, urls) for item in value]
+    if isinstance(value, dict):
+        return {key: restore_urls(item, urls) for key, item in value.items()}
+    return value
@@ -0,0 +1,370 @@
+import base64
+import imaplib
+import logging
+import os
+import quopri
+import re
+from collections import namedtuple
+
+from access_amherst_algo.models import MailboxState
+
+logger = logging.getLogger(__name__)
+
+# Subject shared by every Daily Mammoth digest
+DIGEST_SUBJECT = "Amherst College Daily Mammoth"
+
+# Messages whose structure is requested per `UID FETCH`
+FETCH_CHUNK_SIZE = 50
+
+FetchedDigest = namedtuple(
+    "FetchedDigest", ["mailbox", "uid_validity", "uid", "body"]
+)
+FetchedDigest.__doc__ = """
+A digest fetched from a mailbox.
+
+Pass it to `mark_processed()` once its events are saved.
+"""
+
+# Tokens of an IMAP response: parentheses, quoted strings and atoms
+TOKEN_RE = re.compile(rb'\(|\)|"(?:[^"\\]|\\.)*"|[^\s()"]+')
+LITERAL_RE = re.compile(rb"\{(\d+)\}$")
+
+
+def mailbox_key(address, mail_server, folder, subject_filter):
+    """Name the `MailboxState` row of an account, folder and filter."""
+    return f"{address}@{mail_server}/{folder}?{subject_filter}"
+
+
+def _flatten(data):
+    """
+    Join an imaplib response into one line, quoting any literals.
+
+    imaplib returns literals as `(line ending in {n}, literal)` tuples; the
+    literal is inlined as a quoted string so the line can be tokenized.
+    """
+    pieces = []
+    for item in data:
+        if isinstance(item, tuple):
+            line, literal = item
+            line = LITERAL_RE.sub(b"", line.rstrip())
+            escaped = literal.replace(b"\\", b"\\\\").replace(b'"', b'\\"')
+            pieces.append(line + b' "' + escaped + b'"')
+        elif item:
+            pieces.append(item)
+    return b" ".join(pieces)
+
+
+def parse_response(line):
+    """
+    Parse a parenthesized IMAP response into nested lists.
+
+    Parameters
+    ----------
+    line : bytes
+        The response, e.g. a `BODYSTRUCTURE` value.
+
+    Returns
+    -------
+    list
+        The parsed items: strings, None for `NIL`, and lists for
+        parenthesized groups.
+
+    Examples
+    --------
+    >>> parse_response(b'("text" "plain" ("charset" "utf-8") NIL)')
+    [['text', 'plain', ['charset', 'utf-8'], None]]
+    """
+    stack = [[]]
+    for token in TOKEN_RE.findall(line):
+        if token == b"(":
+            stack.append([])
+        elif token == b")":
+            if len(stack) > 1:
+                group = stack.pop()
+                stack[-1].append(group)
+        elif token.startswith(b'"'):
+            value = re.sub(rb"\\(.)", rb"\1", token[1:-1])
+            stack[-1].append(value.decode("utf-8", "replace"))
+        elif token.upper() == b"NIL":
+            stack[-1].append(None)
+        else:
+            stack[-1].append(token.decode("utf-8", "replace"))
+    while len(stack) > 1:
+        group = stack.pop()
+        stack[-1].append(group)
+    return stack[0]
+
+
+def find_text_part(structure, path=()):
+    """
+    Find the plain-text body part in a `BODYSTRUCTURE`.
+
+    Parameters
+    ----------
+    structure : list
+        The parsed `BODYSTRUCTURE` value.
+    path : tuple of int, optional
+        Part numbers leading to `structure`, for recursion.
+
+    Returns
+    -------
+    tuple of (str, str, str) or None
+        The part specifier to fetch, e.g. "1.1", its transfer encoding
+        and its charset; None if the message has no inline text/plain part.
+
+    Examples
+    --------
+    >>> find_text_part(
+    ...     parse_response(
+    ...         b'(("text" "plain" ("charset" "utf-8") NIL NIL "7bit" 5 1)'
+    ...         b'("text" "html" NIL NIL NIL "7bit" 9 1) "alternative")'
+    ...     )[0]
+    ... )
+    ('1', '7bit', 'utf-8')
+    """
+    if structure and isinstance(structure[0], list):
+        # Multipart: the child parts come first, then the subtype
+        for number, child in enumerate(structure, start=1):
+            if not isinstance(child, list):
+                break
+            found = find_text_part(child, path + (number,))
+            if found:
+                return found
+        return None
+
+    if len(structure) < 6:
+        return None
+    main_type, subtype, params = structure[0], structure[1], structure[2]
+    if (main_type or "").lower() != "text" or (subtype or "").lower() != (
+        "plain"
+    ):
+        return None
+    # Text parts have MD5 and disposition after the body lines
+    disposition = structure[9] if len(structure) > 9 else None
+    if (
+        isinstance(disposition, list)
+        and disposition
+        and (disposition[0] or "").lower() == "attachment"
+    ):
+        return None
+    charset = "utf-8"
+    if isinstance(params, list):
+        for name, value in zip(params[::2], params[1::2]):
+            if (name or "").lower() == "charset" and value:
+                charset = value
+    part = ".".join(str(number) for number in path) or "1"
+    return part, (structure[5] or "7bit").lower(), charset
+
+
+def decode_part(payload, encoding, charset):
+    """
+    Decode a fetched body part.
+
+    Parameters
+    ----------
+    payload : bytes
+        The part as fetched.
+    encoding : str
+        Its `Content-Transfer-Encoding`.
+    charset : str
+        Its character set.
+
+    Returns
+    -------
+    str
+        The decoded text. Undecodable bytes are replaced.
+
+    Examples
+    --------
+    >>> decode_part(b"Caf=C3=A9 Night", "quoted-printable", "utf-8")
+    'Café Night'
+    """
+    if encoding == "base64":
+        payload = base64.b64decode(payload)
+    elif encoding == "quoted-printable":
+        payload = quopri.decodestring(payload)
+    try:
+        return payload.decode(charset, "replace")
+    except LookupError:
+        return payload.decode("utf-8", "replace")
+
+
+def _connect(mail_server, port, use_ssl):
+    if use_ssl:
+        return imaplib.IMAP4_SSL(mail_server, port or imaplib.IMAP4_SSL_PORT)
+    return imaplib.IMAP4(mail_server, port or imaplib.IMAP4_PORT)
+
+
+def _fetch_structures(mail, uids):
+    """Map each UID to its `BODYSTRUCTURE`, in chunked `UID FETCH`es."""
+    structures = {}
+    for start in range(0, len(uids), FETCH_CHUNK_SIZE):
+        chunk = uids[start : start + FETCH_CHUNK_SIZE]
+        status, data = mail.uid(
+            "FETCH", ",".join(str(uid) for uid in chunk), "(BODYSTRUCTURE)"
+        )
+        if status != "OK":
+            raise imaplib.IMAP4.error(f"UID FETCH failed: {status}")
+        for items in parse_response(_flatten(data)):
+            if not isinstance(items, list):
+                continue
+            fields = {
+                name: value
+                for name, value in zip(items[::2], items[1::2])
+                if isinstance(name, str)
+            }
+            if fields.get("UID") and "BODYSTRUCTURE" in fields:
+                structures[int(fields["UID"])] = fields["BODYSTRUCTURE"]
+    return structures
+
+
+def _fetch_part(mail, uid, part):
+    status, data = mail.uid("FETCH", str(uid), f"(BODY.PEEK[{part}])")
+    if status != "OK":
+        raise imaplib.IMAP4.error(f"UID FETCH failed: {status}")
+    for item in data:
+        if isinstance(item, tuple):
+            return item[1]
+    # Short parts may come back as a quoted string instead of a literal
+    for items in parse_response(_flatten(data)):
+        if isinstance(items, list):
+            for name, value in zip(items[::2], items[1::2]):
+                if isinstance(name, str) and name.startswith("BODY["):
+                    return value.encode("utf-8") if value else b""
+    return None
+
+
+def fetch_new_digests(
+    app_password,
+    subject_filter=DIGEST_SUBJECT,
+    mail_server="imap.gmail.com",
+    folder="inbox",
+    port=None,
+    use_ssl=True,
+):
+    """
+    Fetch the digests that arrived since the last processed one.
+
+    The folder is opened read-only and searched by UID above the
+    high-water mark stored in `MailboxState`, so only new messages are
+    considered. For each, the `BODYSTRUCTURE` is read and only the
+    text/plain part is downloaded, with `BODY.PEEK[]` so the message is
+    not marked as read; attachments and HTML alternatives are never
+    transferred. If the folder's `UIDVALIDITY` changed, the mark is reset
+    and the folder is read from the start.
+
+    The mark is not advanced here: call `mark_processed()` for each digest
+    once it is handled.
+
+    Parameters
+    ----------
+    app_password : str
+        The app password of the account in `EMAIL_ADDRESS`.
+    subject_filter : str, optional
+        Text the subject must contain.
+    mail_server : str, optional
+        The IMAP server.
+    folder : str, optional
+        The folder to read.
+    port : int, optional
+        The server port. Defaults to the IMAP or IMAPS port.
+    use_ssl : bool, optional
+        Whether to connect over TLS.
+
+    Returns
+    -------
+    list of FetchedDigest
+        The new digests in UID order; empty if login or fetching fails.
+
+    Examples
+    --------
+    >>> for digest in fetch_new_digests(os.getenv("EMAIL_PASSWORD")):
+    ...     handle(digest.body)
+    ...     mark_processed(digest)
+    """
+    address = os.getenv("EMAIL_ADDRESS")
+    key = mailbox_key(address, mail_server, folder, subject_filter)
+    try:
+        mail = _connect(mail_server, port, use_ssl)
+        mail.login(address, app_password)
+    except (imaplib.IMAP4.error, OSError) as e:
+        logger.error(f"Login failed: {e}")
+        return []
+
+    digests = []
+    try:
+        status, _ = mail.select(folder, readonly=True)
+        if status != "OK":
+            logger.error(f"Failed to open {folder}: {status}")
+            return []
+        _, uid_validity = mail.response("UIDVALIDITY")
+        uid_validity = int(uid_validity[0]) if uid_validity[0] else None
+
+        state = MailboxState.objects.filter(mailbox=key).first()
+        last_uid = 0
+        if state is not None and state.uid_validity == uid_validity:
+            last_uid = state.last_uid
+        elif state is not None:
+            logger.warning(f"UIDVALIDITY of {key} changed; reading it again")
+
+        subject = subject_filter.replace("\\", "\\\\").replace('"', '\\"')
+        status, data = mail.uid(
+            "SEARCH", None, f'UID {last_uid + 1}:* SUBJECT "{subject}"'
+        )
+        if status != "OK":
+            logger.error(f"Failed to search {folder}: {status}")
+            return []
+        # `n:*` always matches the newest message, even below n
+        uids = sorted(
+            uid
+            for uid in (int(uid) for uid in data[0].split())
+            if uid > last_uid
+        )
+        logger.info(f"{len(uids)} new digest(s) in {folder}")
+
+        structures = _fetch_structures(mail, uids)
+        for uid in uids:
+            text_part = find_text_part(structures.get(uid) or [])
+            if text_part is None:
+                logger.warning(f"Digest {uid} has no plain-text part")
+                digests.append(FetchedDigest(key, uid_validity, uid, None))
+                continue
+            part, encoding, charset = text_part
+            payload = _fetch_part(mail, uid, part)
+            body = (
+                decode_part(payload, encoding, charset)
+                if payload is not None
+                else None
+            )
+            digests.append(FetchedDigest(key, uid_validity, uid, body))
+    except (imaplib.IMAP4.error, OSError) as e:
+        logger.error(f"Error while fetching digests: {e}")
+    finally:
+        try:
+            mail.logout()
+        except (imaplib.IMAP4.error, OSError):
+            pass
+    return digests
+
+
+def mark_processed(digest):
+    """
+    Advance the mailbox's high-water mark past a digest.
+
+    Parameters
+    ----------
+    digest : FetchedDigest
+        The digest that was handled.
+
+    Returns
+    -------
+    None
+
+    Examples
+    --------
+    >>> mark_processed(digest)
+    """
+    MailboxState.objects.update_or_create(
+        mailbox=digest.mailbox,
+        defaults={"uid_validity": digest.uid_validity, "last_uid": digest.uid},
+    )
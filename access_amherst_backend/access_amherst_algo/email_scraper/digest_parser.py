@@ -0,0 +1,439 @@
+import logging
+import re
+from datetime import date
+
+logger = logging.getLogger(__name__)
+
+# Sections are separated by blank lines or separator lines such as "-----"
+SEPARATOR_LINE_RE = re.compile(r"^[ \t]*[-=_*~]{3,}[ \t]*$", re.MULTILINE)
+SECTION_BOUNDARY_RE = re.compile(r"(?:\n[ \t]*){2,}")
+
+MONTHS = {
+    name: number
+    for number, name in enumerate(
+        "january february march april may june july august september "
+        "october november december".split(),
+        start=1,
+    )
+}
+
+# Dates as written in the digest, e.g. "Thursday, November 7, 2024" or
+# "Nov. 7"; the weekday and year are optional
+DATE_RE = re.compile(
+    r"(?:(?:mon|tues|wednes|thurs|fri|satur|sun)day,?\s+)?"
+    r"(?P<month>jan|feb|mar|apr|may|jun|jul|aug|sept?|oct|nov|dec)[a-z]*\.?"
+    r"\s+(?P<day>\d{1,2})(?:st|nd|rd|th)?\b(?:,?\s+(?P<year>\d{4}))?",
+    re.IGNORECASE,
+)
+
+_TIME = (
+    r"(?:(?P<{0}hour>\d{{1,2}})(?::(?P<{0}minute>\d{{2}}))?"
+    r"\s*(?:(?P<{0}meridiem>[ap])\.?\s?m\b\.?)?"
+    r"|(?P<{0}word>noon|midnight))"
+)
+
+# Times and time ranges, e.g. "3 p.m.", "3:30-5 PM" or "noon to 1:30 p.m."
+TIME_RANGE_RE = re.compile(
+    r"(?<![\d:])"
+    + _TIME.format("start_")
+    + r"(?:\s*(?:-|–|—|to|until)\s*"
+    + _TIME.format("end_")
+    + r")?",
+    re.IGNORECASE,
+)
+
+# Labelled lines, e.g. "Location: Keefe Campus Center 213"
+FIELD_RE = re.compile(
+    r"(?P<label>location|where|place|hosted by|host|sponsored by|sponsor"
+    r"|contact|time|when|date)\s*:\s*(?P<value>.*)",
+    re.IGNORECASE,
+)
+FIELD_NAMES = {
+    "location": "location",
+    "where": "location",
+    "place": "location",
+    "hosted by": "host",
+    "host": "host",
+    "sponsored by": "host",
+    "sponsor": "host",
+    "contact": "contact",
+    "time": "time",
+    "when": "time",
+    "date": "time",
+}
+
+URL_RE = re.compile(r"https?://\S+")
+EMAIL_RE = re.compile(r"[\w.+-]+@[\w-]+(?:\.[\w-]+)+")
+BULLET_RE = re.compile(r"^[\s•*·>-]+")
+
+# Boilerplate sections that describe no event
+FOOTER_RE = re.compile(
+    r"unsubscribe|you are receiving|manage your subscription"
+    r"|view (?:this email )?in (?:your )?browser",
+    re.IGNORECASE,
+)
+
+# Longest line taken as an event title or an unlabelled location
+MAX_TITLE_CHARS = 150
+MAX_LOCATION_CHARS = 80
+
+# Lines after the title searched for the date and time
+TIME_LINE_WINDOW = 3
+
+
+def split_sections(text):
+    """
+    Split digest text into sections at blank and separator lines.
+
+    Parameters
+    ----------
+    text : str
+        The digest text.
+
+    Returns
+    -------
+    list of str
+        The stripped, non-empty sections in order.
+
+    Examples
+    --------
+    >>> split_sections("Queer Talk\\n-----\\nJazz Night\\n\\n\\nPoetry")
+    ['Queer Talk', 'Jazz Night', 'Poetry']
+    """
+    return [
+        section.strip()
+        for section in SECTION_BOUNDARY_RE.split(
+            SEPARATOR_LINE_RE.sub("", text or "")
+        )
+        if section.strip()
+    ]
+
+
+def _clock(hour, minute, meridiem):
+    # "word" marks noon and midnight, whose hour is already on a 24h clock
+    if meridiem and meridiem != "word":
+        if not 1 <= hour <= 12:
+            return None
+        hour = hour % 12 + (12 if meridiem.lower() == "p" else 0)
+    if hour > 23 or minute > 59:
+        return None
+    return f"{hour:02d}:{minute:02d}:00"
+
+
+def _side(match, prefix):
+    word = match.group(f"{prefix}word")
+    if word:
+        return (12 if word.lower() == "noon" else 0), 0, "word"
+    hour = match.group(f"{prefix}hour")
+    if hour is None:
+        return None
+    return (
+        int(hour),
+        int(match.group(f"{prefix}minute") or 0),
+        match.group(f"{prefix}meridiem"),
+    )
+
+
+def parse_time_range(text):
+    """
+    Find the start and end time of an event in a line of text.
+
+    A time needs an a.m./p.m. marker, or the end of its range must have
+    one; bare numbers such as years are never read as times. A start
+    without a marker takes the end's, unless that would put it after the
+    end ("11-1 p.m." starts at 11 a.m.).
+
+    Parameters
+    ----------
+    text : str
+        A line of the digest.
+
+    Returns
+    -------
+    tuple of (str or None, str or None)
+        The start and end as "HH:MM:SS", or None where not found.
+
+    Examples
+    --------
+    >>> parse_time_range("Thursday, November 7, 2024, 3-4:30 p.m.")
+    ('15:00:00', '16:30:00')
+    """
+    for match in TIME_RANGE_RE.finditer(text):
+        start = _side(match, "start_")
+        end = _side(match, "end_")
+        if start is None or (
+            start[2] is None and (end is None or end[2] is None)
+        ):
+            continue
+        end_time = _clock(*end) if end else None
+        if start[2] is not None:
+            start_time = _clock(*start)
+        else:
+            start_time = _clock(start[0], start[1], end[2])
+            if start_time and end_time and start_time > end_time:
+                start_time = _clock(start[0], start[1], "a")
+        if start_time:
+            return start_time, end_time
+    return None, None
+
+
+def parse_date(text, default_year):
+    """
+    Find a date such as "Thursday, November 7, 2024" in a line of text.
+
+    Parameters
+    ----------
+    text : str
+        A line of the digest.
+    default_year : int
+        Year used when the date has none.
+
+    Returns
+    -------
+    str or None
+        The date as "YYYY-MM-DD", or None if there is no valid date.
+
+    Examples
+    --------
+    >>> parse_date("Thursday, Nov. 7, 3 p.m.", 2024)
+    '2024-11-07'
+    """
+    for match in DATE_RE.finditer(text):
+        month = match.group("month").lower()
+        month = next(
+            number for name, number in MONTHS.items() if name.startswith(month)
+        )
+        try:
+            return date(
+                int(match.group("year") or default_year),
+                month,
+                int(match.group("day")),
+            ).isoformat()
+        except ValueError:
+            continue
+    return None
+
+
+def _empty_event():
+    return {
+        "title": None,
+        "pub_date": None,
+        "starttime": None,
+        "endtime": None,
+        "location": None,
+        "event_description": None,
+        "host": None,
+        "link": None,
+        "picture_link": None,
+        "categories": None,
+        "author_name": None,
+        "author_email": None,
+    }
+
+
+def parse_section(section, digest_date):
+    """
+    Parse one digest section into an event, if its layout is recognized.
+
+    A section is recognized when its first line is a title, a short line
+    that is not a sentence, and one of the next few lines holds a start
+    time. Labelled lines ("Location:",
+    "Sponsored by:", "Contact:") fill their fields, an unlabelled short
+    line right after the time line is the location, the first URL is the
+    link and the remaining lines form the description.
+
+    Parameters
+    ----------
+    section : str
+        A section as returned by `split_sections()`.
+    digest_date : str
+        The digest's date as "YYYY-MM-DD", used for events whose time line
+        has no date.
+
+    Returns
+    -------
+    dict or None
+        The event, with the same fields the LLM extraction returns, or None
+        if the section cannot be parsed confidently.
+
+    Examples
+    --------
+    >>> parse_section(
+    ...     "Queer Talk\\nThursday, Nov. 7, 3-4 p.m.\\nKeefe Campus Center 213",
+    ...     "2024-11-07",
+    ... )["location"]
+    'Keefe Campus Center 213'
+    """
+    lines = [line.strip() for line in section.splitlines() if line.strip()]
+    if len(lines) < 2:
+        return None
+    title = BULLET_RE.sub("", lines[0]).strip()
+    if (
+        not title
+        or len(title) > MAX_TITLE_CHARS
+        or title.endswith(".")
+        or FIELD_RE.match(title)
+        or URL_RE.search(title)
+    ):
+        return None
+
+    time_index = None
+    for index in range(1, min(len(lines), TIME_LINE_WINDOW + 1)):
+        line = lines[index]
+        field = FIELD_RE.match(line)
+        if field and FIELD_NAMES[field.group("label").lower()] == "time":
+            line = field.group("value")
+        elif field:
+            continue
+        starttime, endtime = parse_time_range(line)
+        if starttime:
+            time_index = index
+            break
+    if time_index is None:
+        return None
+
+    event = _empty_event()
+    event["title"] = title
+    event["starttime"] = starttime
+    event["endtime"] = endtime
+    event["pub_date"] = digest_date
+
+    # The date is on the time line or on a line of its own just before it
+    consumed = {time_index}
+    for index in range(time_index, 0, -1):
+        event_date = parse_date(lines[index], int(digest_date[:4]))
+        if event_date:
+            event["pub_date"] = event_date
+            consumed.add(index)
+            break
+
+    description = []
+    for index, line in enumerate(lines[1:], start=1):
+        if index in consumed:
+            continue
+        field = FIELD_RE.match(line)
+        if field:
+            name = FIELD_NAMES[field.group("label").lower()]
+            value = field.group("value").strip()
+            if name == "location":
+                event["location"] = value
+            elif name == "host":
+                event["host"] = [value]
+            elif name == "contact":
+                email_match = EMAIL_RE.search(value)
+                if email_match:
+                    event["author_email"] = email_match.group()
+                    value = value.replace(email_match.group(), "")
+                event["author_name"] = value.strip(" ,<>()") or None
+            continue
+        url = URL_RE.search(line)
+        if url and len(line) - len(url.group()) < 20:
+            event["link"] = event["link"] or url.group().rstrip(".,)>")
+            continue
+        if (
+            index == time_index + 1
+            and event["location"] is None
+            and len(line) <= MAX_LOCATION_CHARS
+            and not line.endswith(".")
+        ):
+            event["location"] = line
+            continue
+        description.append(line)
+
+    event["event_description"] = " ".join(description) or None
+    return event
+
+
+def parse_digest(email_content, fallback=None):
+    """
+    Extract the events of a digest email, parsing regular sections by rule.
+
+    The first section is the digest header and gives the date. Every other
+    section is parsed with `parse_section()`. A section the rules cannot
+    parse that has no time in it and follows a parsed event continues that
+    event's description; footers are dropped. The remaining sections are
+    joined under the header and passed to `fallback`, typically the LLM
+    extraction, and its events are added to the parsed ones.
+
+    Parameters
+    ----------
+    email_content : str
+        The email body.
+    fallback : callable, optional
+        Called with the text of the sections that need it and returning a
+        list of event dicts. If not given, those sections are skipped.
+
+    Returns
+    -------
+    tuple of (list of dict, dict)
+        The events, and counts of the `sections` considered, those
+        `parsed` by rule and those sent to the `fallback`, with
+        `fallback_share` the fraction of sections that needed it.
+
+    Examples
+    --------
+    >>> events, stats = parse_digest(email_body, extract_events_chunked)
+    >>> stats
+    {'sections': 12, 'parsed': 11, 'fallback': 1, 'fallback_share': 0.083}
+    """
+    sections = split_sections(email_content)
+    if not sections:
+        return [], {
+            "sections": 0,
+            "parsed": 0,
+            "fallback": 0,
+            "fallback_share": 0.0,
+        }
+
+    # The header names the digest's date; a first section that is itself
+    # an event is no header
+    header = ""
+    digest_date = parse_date(sections[0], date.today().year)
+    if digest_date is None:
+        digest_date = date.today().isoformat()
+    elif parse_section(sections[0], digest_date) is None:
+        header = sections.pop(0)
+
+    events = []
+    unparsed = []
+    previous_parsed = False
+    for section in sections:
+        if FOOTER_RE.search(section):
+            continue
+        event = parse_section(section, digest_date)
+        if event is not None:
+            events.append(event)
+            previous_parsed = True
+            continue
+        has_time = any(
+            parse_time_range(line)[0] for line in section.splitlines()
+        )
+        if previous_parsed and not has_time:
+            text = " ".join(section.split())
+            description = events[-1]["event_description"]
+            events[-1]["event_description"] = (
+                f"{description} {text}" if description else text
+            )
+            continue
+        unparsed.append(section)
+        previous_parsed = False
+
+    total = len(events) + len(unparsed)
+    stats = {
+        "sections": total,
+        "parsed": len(events),
+        "fallback": len(unparsed),
+        "fallback_share": round(len(unparsed) / total, 3) if total else 0.0,
+    }
+    logger.info(
+        f"Parsed {stats['parsed']} of {total} digest sections by rule; "
+        f"{stats['fallback']} ({stats['fallback_share']:.0%}) need the LLM"
+    )
+
+    if unparsed and fallback is not None:
+        fallback_events = fallback(
+            "\n\n".join(([header] if header else []) + unparsed)
+        )
+        if isinstance(fallback_events, list):
+            events.extend(fallback_events)
+    return events, stats
@@ -1,14 +1,28 @@
-import imaplib
-import email
+from concurrent.futures import ThreadPoolExecutor
 from email.header import decode_header
 import json
 import os
 import re
 from datetime import datetime
 from dotenv import load_dotenv
+import backoff
 import requests
-import sys
 import logging
+from access_amherst_algo.email_scraper.body_compressor import (
+    compress_body,
+    restore_urls,
+)
+from access_amherst_algo.email_scraper.digest_fetcher import (
+    DIGEST_SUBJECT,
+    fetch_new_digests,
+    mark_processed,
+)
+from access_amherst_algo.email_scraper.digest_parser import (
+    parse_digest,
+    split_sections,
+)
+from access_amherst_algo.email_scraper.llm_cache import LLMCache
+from access_amherst_algo.event_dedupe import preprocess_title
 
 # Configure logging
 logging.basicConfig(
@@ -23,11 +37,28 @@ logging.basicConfig(
 # Load environment variables
 load_dotenv()
 
-# LLaMA API endpoint
-LLAMA_API_URL = "https://openrouter.ai/api/v1/chat/completions"
+# LLaMA API endpoint; can point at a compatible local server
+LLAMA_API_URL = os.getenv(
+    "LLAMA_API_URL", "https://openrouter.ai/api/v1/chat/completions"
+)
+LLAMA_MODEL = "meta-llama/llama-3.1-405b-instruct:free"
 OPENROUTER_API_KEY = os.getenv("OPENROUTER_API_KEY")
 
-# System instruction for extracting events and generating valid JSON format
+# Seconds to wait for the API; long digests take a while to extract
+REQUEST_TIMEOUT = 180
+
+# Digests are extracted in chunks of about this many characters, small
+# enough for the model to answer every event within its output limit
+CHUNK_CHARS = 6000
+
+# Opening block repeated in front of every chunk when it is this short, so
+# the model still sees the digest's date
+HEADER_CHARS = 500
+
+# Chunks extracted at once, and attempts per chunk
+DEFAULT_LLM_WORKERS = 4
+MAX_TRIES = 4
+
 instruction = """
     You will be provided an email containing many events.
     Extract detailed event information and provide the result as a list of event JSON objects. Make sure to not omit any available information.
@@ -53,68 +84,6 @@ instruction = """
 """
 
 
-def connect_and_fetch_latest_email(
-    app_password, subject_filter, mail_server="imap.gmail.com"
-):
-    """
-    Connect to the email server and fetch the latest email matching a subject filter.
-
-    This function connects to the specified IMAP email server (default is Gmail),
-    logs in using the provided app password, and searches for the most recent email
-    with a subject matching the `subject_filter`. It returns the email message object 
-    of the latest matching email.
-
-    Parameters
-    ----------
-    app_password : str
-        The app password used for logging into the email account.
-    subject_filter : str
-        The subject filter used to search for specific emails.
-    mail_server : str, optional, default "imap.gmail.com"
-        The IMAP email server address (default is 'imap.gmail.com').
-
-    Returns
-    -------
-    email.message.Message or None
-        The latest email message matching the filter, or None if no matching email is 
-        found or login fails.
-
-    Examples
-    --------
-    >>> email = connect_and_fetch_latest_email("amherst_college_password", "Amherst College Daily Mammoth for Sunday, November 3, 2024")
-    >>> if email:
-    >>>     print(email["From"])
-    'noreply@amherst.edu'
-    """
-    logging.info("Connecting to email server...")
-    try:
-        mail = imaplib.IMAP4_SSL(mail_server)
-        mail.login(os.getenv("EMAIL_ADDRESS"), app_password)
-    except imaplib.IMAP4.error as e:
-        logging.error(f"Login failed: {e}")
-        return None
-
-    try:
-        mail.select("inbox")
-        status, messages = mail.search(None, f'SUBJECT "{subject_filter}"')
-        if status != "OK":
-            logging.error(f"Failed to fetch emails: {status}")
-            return None
-
-        for msg_num in messages[0].split()[
-            -1:
-        ]:  # Only fetch the latest message
-            res, msg = mail.fetch(msg_num, "(RFC822)")
-            for response_part in msg:
-                if isinstance(response_part, tuple):
-                    msg = email.message_from_bytes(response_part[1])
-                    logging.info("Email fetched successfully.")
-                    return msg
-    except Exception as e:
-        logging.error(f"Error while fetching emails: {e}")
-    return None
-
-
 def extract_email_body(msg):
     """
     Extract the body of an email message.
@@ -156,7 +125,67 @@ def extract_email_body(msg):
         return None
 
 
-def extract_event_info_using_llama(email_content):
+class LLMResponseError(Exception):
+    """Raised when the API answers with something other than event JSON."""
+
+
+class LLMAPIError(LLMResponseError):
+    """Raised when the API answers with an error, such as a rate limit."""
+
+
+class LLMExtractionError(Exception):
+    """Raised when events could not be extracted, after every retry."""
+
+
+def _is_client_error(error):
+    """Requests the API rejected will be rejected again; don't retry them."""
+    response = getattr(error, "response", None)
+    return (
+        response is not None
+        and 400 <= response.status_code < 500
+        and response.status_code != 429
+    )
+
+
+def _request_events(email_content):
+    """Send one extraction request and parse the events it returns."""
+    payload = {
+        "model": LLAMA_MODEL,
+        "messages": [
+            {"role": "system", "content": instruction},
+            {"role": "user", "content": email_content},
+        ],
+    }
+
+    headers = {
+        "Authorization": f"Bearer {OPENROUTER_API_KEY}",
+        "Content-Type": "application/json",
+    }
+
+    response = requests.post(
+        LLAMA_API_URL,
+        headers=headers,
+        json=payload,
+        timeout=REQUEST_TIMEOUT,
+    )
+    response.raise_for_status()
+    response_data = response.json()
+
+    if "error" in response_data:
+        raise LLMAPIError(response_data["error"].get("message", ""))
+
+    try:
+        extracted_events_json = response_data["choices"][0]["message"][
+            "content"
+        ]
+        return json.loads(extracted_events_json)
+    except (json.JSONDecodeError, KeyError) as e:
+        raise LLMResponseError(e) from e
+
+
+def extract_event_info_using_llama(
+    email_content, cache=None, max_tries=1, raise_errors=False
+):
     """
     Extract event info from the email content using the LLaMA API.
 
@@ -164,11 +193,23 @@ def extract_event_info_using_llama(email_content):
     It sends the email content along with an instruction to extract event details.
     If the API response is valid, the function parses and returns the extracted 
     event information as a list of event JSON objects.
+    Extracted events are cached by model, instruction and content, so the
+    same email is only sent to the API once.
 
     Parameters
     ----------
     email_content : str
         The raw content of the email to be processed by the LLaMA API.
+    cache : LLMCache, optional
+        Cache of extracted events. Defaults to an `LLMCache` in its default
+        directory.
+    max_tries : int, default 1
+        Number of attempts. Failed requests, error answers such as rate
+        limits and unparseable answers are retried with exponential
+        backoff, except requests the API rejected with a client error.
+    raise_errors : bool, default False
+        Raise `LLMExtractionError` when extraction fails, so a failure can
+        be told apart from an email without events.
 
     Returns
     -------
@@ -176,48 +217,216 @@ def extract_event_info_using_llama(email_content):
         A list of event data extracted from the email content in JSON format.
         If extraction fails, an empty list is returned.
 
+    Raises
+    ------
+    LLMExtractionError
+        If extraction fails and `raise_errors` is set.
+
     Examples
     --------
     >>> events = extract_event_info_using_llama("We're hosting a Literature Speaker Event this Tuesday, November 5, 2024 in Keefe Campus Center!")
     >>> print(events)
     [{"title": "Literature Speaker Event", "date": "2024-11-05", "location": "Keefe Campus Center"}]
     """
-    payload = {
-        "model": "meta-llama/llama-3.1-405b-instruct:free",
-        "messages": [
-            {"role": "system", "content": instruction},
-            {"role": "user", "content": email_content},
-        ],
-    }
-
-    headers = {
-        "Authorization": f"Bearer {OPENROUTER_API_KEY}",
-        "Content-Type": "application/json",
-    }
+    if cache is None:
+        cache = LLMCache()
+    cached_events = cache.load(LLAMA_MODEL, instruction, email_content)
+    if cached_events is not None:
+        logging.info("Event data loaded from the LLM response cache.")
+        return cached_events
+
+    request_events = _request_events
+    if max_tries > 1:
+        request_events = backoff.on_exception(
+            backoff.expo,
+            (requests.exceptions.RequestException, LLMResponseError),
+            max_tries=max_tries,
+            giveup=_is_client_error,
+        )(_request_events)
 
     try:
-        response = requests.post(LLAMA_API_URL, headers=headers, json=payload)
-        response.raise_for_status()
-        response_data = response.json()
-
-        if "error" in response_data:
-            error_message = response_data["error"].get("message", "")
-            logging.error(f"API Error: {error_message}")
-            sys.exit(1)
-
-        extracted_events_json = response_data["choices"][0]["message"][
-            "content"
-        ]
-        events_data = json.loads(extracted_events_json)
+        events_data = request_events(email_content)
         logging.info("Event data extracted successfully using LLaMA API.")
+        cache.store(LLAMA_MODEL, instruction, email_content, events_data)
         return events_data
     except requests.exceptions.RequestException as e:
         logging.error(f"Failed to fetch data from LLaMA API: {e}")
-    except (json.JSONDecodeError, KeyError) as e:
+        error = e
+    except LLMAPIError as e:
+        logging.error(f"API Error: {e}")
+        error = e
+    except LLMResponseError as e:
         logging.error(f"Failed to parse LLaMA API response: {e}")
+        error = e
+    if raise_errors:
+        raise LLMExtractionError(str(error)) from error
     return []
 
 
+def split_email_body(email_content, max_chars=CHUNK_CHARS):
+    """
+    Split email content into chunks at event boundaries.
+
+    The content is cut at blank lines and separator lines, and consecutive
+    blocks are packed into chunks of at most `max_chars` characters. A
+    block longer than that becomes a chunk of its own. A short opening
+    block, which usually names the digest and its date, is repeated at the
+    start of every chunk.
+
+    Parameters
+    ----------
+    email_content : str
+        The email body.
+    max_chars : int, optional
+        Largest chunk size, in characters.
+
+    Returns
+    -------
+    list of str
+        The chunks, in order. Empty if the content has no text.
+
+    Examples
+    --------
+    >>> split_email_body("Daily Mammoth\n\nQueer Talk\n\nJazz Night", 25)
+    ['Daily Mammoth\n\nQueer Talk', 'Daily Mammoth\n\nJazz Night']
+    """
+    blocks = split_sections(email_content)
+    if not blocks:
+        return []
+
+    header = ""
+    if len(blocks) > 1 and len(blocks[0]) <= HEADER_CHARS:
+        header = blocks.pop(0)
+
+    chunks = []
+    current = []
+    size = len(header)
+    for block in blocks:
+        if current and size + len(block) + 2 > max_chars:
+            chunks.append(current)
+            current = []
+            size = len(header)
+        current.append(block)
+        size += len(block) + 2
+    chunks.append(current)
+
+    return [
+        "\n\n".join(([header] if header else []) + chunk) for chunk in chunks
+    ]
+
+
+def merge_extracted_events(event_lists):
+    """
+    Merge the events extracted from several chunks, dropping repeats.
+
+    Events with the same normalized title, date and start time are one
+    event; fields missing from the first copy are filled from later ones.
+
+    Parameters
+    ----------
+    event_lists : list of list of dict
+        The events of each chunk, in chunk order.
+
+    Returns
+    -------
+    list of dict
+        The merged events, in order of first appearance.
+
+    Examples
+    --------
+    >>> merge_extracted_events([
+    ...     [{"title": "Queer Talk", "starttime": "15:00:00", "location": None}],
+    ...     [{"title": "Queer Talk!", "starttime": "15:00:00", "location": "Keefe"}],
+    ... ])
+    [{'title': 'Queer Talk', 'starttime': '15:00:00', 'location': 'Keefe'}]
+    """
+    merged = {}
+    for events in event_lists:
+        if not isinstance(events, list):
+            continue
+        for event in events:
+            if not isinstance(event, dict):
+                continue
+            key = (
+                preprocess_title(event.get("title")),
+                event.get("pub_date"),
+                event.get("starttime"),
+            )
+            if key not in merged:
+                merged[key] = dict(event)
+                continue
+            for field, value in event.items():
+                if merged[key].get(field) in (None, "", []):
+                    merged[key][field] = value
+    return list(merged.values())
+
+
+def extract_events_chunked(
+    email_content,
+    workers=DEFAULT_LLM_WORKERS,
+    max_chars=CHUNK_CHARS,
+    cache=None,
+):
+    """
+    Extract the events of a long email in concurrent chunks.
+
+    The content is first shrunk with `compress_body()`, whose URL
+    placeholders are restored in the events afterwards. It is then split
+    with `split_email_body()`, each chunk is extracted
+    with `extract_event_info_using_llama()` (retrying up to `MAX_TRIES`
+    times) on up to `workers` threads, and the results are merged with
+    `merge_extracted_events()`. Total latency is close to that of the
+    slowest chunk, and every chunk is cached on its own. A chunk that
+    still fails after its retries fails the whole email, so it is not
+    mistaken for an email without events; the chunks that succeeded are
+    served from the cache on the next attempt.
+
+    Parameters
+    ----------
+    email_content : str
+        The email body.
+    workers : int, optional
+        Number of chunks extracted at once.
+    max_chars : int, optional
+        Largest chunk size, in characters.
+    cache : LLMCache, optional
+        Cache of extracted events. Defaults to an `LLMCache` in its default
+        directory.
+
+    Returns
+    -------
+    list of dict
+        The extracted events.
+
+    Raises
+    ------
+    LLMExtractionError
+        If a chunk could not be extracted.
+
+    Examples
+    --------
+    >>> events = extract_events_chunked(email_body, workers=4)
+    >>> events[0]["title"]
+    'Literature Speaker Event'
+    """
+    if cache is None:
+        cache = LLMCache()
+    compressed, urls = compress_body(email_content)
+    chunks = split_email_body(compressed, max_chars)
+    if not chunks:
+        return []
+    logging.info(f"Extracting events from {len(chunks)} chunk(s).")
+
+    def extract(chunk):
+        return extract_event_info_using_llama(
+            chunk, cache, MAX_TRIES, raise_errors=True
+        )
+
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as executor:
+        event_lists = list(executor.map(extract, chunks))
+    return restore_urls(merge_extracted_events(event_lists), urls)
+
+
 def save_to_json_file(data, filename, folder):
     """
     Save the extracted events to a JSON file.
@@ -262,47 +471,100 @@ def save_to_json_file(data, filename, folder):
         logging.error(f"Failed to save data to {file_path}: {e}")
 
 
-def parse_email(subject_filter):
+def extract_digest_events(digests):
     """
-    Parse the email and extract event data.
+    Extract the events of fetched digests, in order.
 
-    This function connects to an email account, fetches the latest email based on the 
-    provided subject filter, extracts event information from the email body using the 
-    LLaMA API, and saves the extracted events to a JSON file. The file is saved with 
-    a timestamped filename in the 'json_outputs' directory.
+    Each body is parsed with `parse_digest()`, which uses the LLaMA API
+    only for sections it cannot parse by rule. A digest without events is
+    handled like any other. Extraction stops at the first digest whose API
+    requests fail; that digest and the ones after it are left for the next
+    run.
 
     Parameters
     ----------
-    subject_filter : str
-        The subject filter to identify the relevant email to fetch.
+    digests : list of FetchedDigest
+        The digests, as returned by `fetch_new_digests()`.
 
     Returns
     -------
-    None
-        This function does not return any value but logs status messages for each stage of the process.
+    tuple of (list of dict, list of FetchedDigest)
+        The events extracted, and the digests that were handled and can be
+        passed to `mark_processed()`.
 
     Examples
     --------
-    >>> parse_email("Amherst College Daily Mammoth for Sunday, November 3, 2024")
-    Email fetched successfully.
-    Events saved successfully to extracted_events_20231103_150000.json.
+    >>> events, handled = extract_digest_events(fetch_new_digests(password))
+    >>> len(handled)
+    2
     """
-    app_password = os.getenv("EMAIL_PASSWORD")
+    all_events = []
+    handled = []
+    for digest in digests:
+        if not digest.body:
+            logging.warning(f"Digest {digest.uid} has no text body; skipping.")
+            handled.append(digest)
+            continue
+
+        try:
+            events, stats = parse_digest(
+                digest.body, extract_events_chunked
+            )
+        except LLMExtractionError as e:
+            logging.error(
+                f"Extracting events from digest {digest.uid} failed: {e}"
+            )
+            break
+        logging.info(
+            f"{stats['fallback']} of {stats['sections']} sections of digest "
+            f"{digest.uid} ({stats['fallback_share']:.0%}) needed the LLM."
+        )
+        if not events:
+            logging.warning(f"Digest {digest.uid} has no events.")
+        all_events.extend(events)
+        handled.append(digest)
+    return all_events, handled
+
+
+def parse_email(subject_filter=DIGEST_SUBJECT):
+    """
+    Parse the new digest emails and extract their event data.
 
-    msg = connect_and_fetch_latest_email(app_password, subject_filter)
-    if not msg:
-        logging.error("No emails found or login failed.")
-        return
+    This function fetches every digest that arrived since the last run with
+    `fetch_new_digests()`, extracts their events with
+    `extract_digest_events()`, and saves the events of all of them to one
+    timestamped JSON file in the 'json_outputs' directory. A backlog of
+    digests is thus handled in one run. The mailbox's high-water mark is
+    then advanced past the digests handled.
 
-    email_body = extract_email_body(msg)
-    if not email_body:
-        logging.error("Failed to extract email body.")
-        return
+    Parameters
+    ----------
+    subject_filter : str, optional
+        Text the subject of the relevant emails contains.
 
-    all_events = extract_event_info_using_llama(email_body)
+    Returns
+    -------
+    str or None
+        Path of the JSON file written, or None if there was nothing to save.
+
+    Examples
+    --------
+    >>> parse_email("Amherst College Daily Mammoth")
+    '.../json_outputs/extracted_events_20241103_150000.json'
+    """
+    app_password = os.getenv("EMAIL_PASSWORD")
+
+    digests = fetch_new_digests(app_password, subject_filter)
+    if not digests:
+        logging.info("No new digests.")
+        return None
+
+    all_events, handled = extract_digest_events(digests)
     if not all_events:
         logging.warning("No event data extracted or extraction failed.")
-        return
+        for digest in handled:
+            mark_processed(digest)
+        return None
 
     try:
         timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
@@ -313,3 +575,8 @@ def parse_email(subject_filter):
         save_to_json_file(all_events, filename, output_dir)
     except Exception as e:
         logging.error(f"Error saving events: {e}")
+        return None
+
+    for digest in handled:
+        mark_processed(digest)
+    return os.path.join(output_dir, filename)
@@ -1,12 +1,58 @@
 from datetime import datetime, timedelta
+from collections import Counter
 from django.utils import timezone
 import json
 import os
 import difflib
 from access_amherst_algo.models import Event
+from access_amherst_algo.datetime_parsing import parse_time_of_day
+from access_amherst_algo.event_dedupe import (
+    DedupeEngine,
+    dedupe_fields,
+    outranks,
+)
+from access_amherst_algo.event_fingerprint import (
+    EMAIL_ID_BASE,
+    compute_content_hash,
+    event_source,
+    load_known_hashes,
+    stable_event_id,
+)
+from django.db import transaction
 from django.db.models import Q
+from django.db.models.functions import Length
 import pytz
 
+# Title similarity above which an email event duplicates a stored one
+SIMILARITY_THRESHOLD = 0.8
+
+# How far from its publication date an event without times is looked for
+SIMILARITY_WINDOW = timedelta(days=1)
+
+# Events written per bulk upsert statement
+BULK_BATCH_SIZE = 500
+
+# Every field an upsert overwrites on an existing row
+UPSERT_FIELDS = [
+    "title",
+    "author_name",
+    "pub_date",
+    "host",
+    "link",
+    "picture_link",
+    "event_description",
+    "start_time",
+    "end_time",
+    "location",
+    "categories",
+    "latitude",
+    "longitude",
+    "map_location",
+    "content_hash",
+    "normalized_title",
+    "dedupe_key",
+]
+
 
 def load_json_file(folder_path):
     """
@@ -102,7 +148,7 @@ def parse_datetime(date_str, pub_date=None):
 
         # If that fails, try parsing as time only
         try:
-            time = datetime.strptime(date_str, "%H:%M:%S").time()
+            time = parse_time_of_day(date_str)
 
             if pub_date:
                 if isinstance(pub_date, str):
@@ -127,7 +173,70 @@ def parse_datetime(date_str, pub_date=None):
         return None
 
 
-def is_similar_event(event_data):
+def parse_start_time(event_data):
+    """
+    Parse the start time of an email event the way `save_event_to_db` does.
+
+    Parameters
+    ----------
+    event_data : dict
+        A dictionary containing the event's `starttime` and `pub_date`.
+
+    Returns
+    -------
+    datetime or None
+        The timezone-aware start time in UTC, or None if it cannot be parsed.
+
+    Examples
+    --------
+    >>> parse_start_time({"starttime": "18:00:00", "pub_date": "2024-11-05"})
+    datetime.datetime(2024, 11, 5, 13, 0, tzinfo=<UTC>)
+    """
+    pub_date = parse_datetime(event_data.get("pub_date")) or timezone.now()
+    return parse_datetime(event_data.get("starttime"), pub_date)
+
+
+def similar_title_exists(title, candidates, threshold=SIMILARITY_THRESHOLD):
+    """
+    Check whether any candidate title is similar to a title.
+
+    Titles are compared case-insensitively with `difflib.SequenceMatcher`.
+    The cheap upper bounds `real_quick_ratio()` and `quick_ratio()` are
+    checked before the full `ratio()`, so most candidates are rejected
+    without computing a matching.
+
+    Parameters
+    ----------
+    title : str
+        The incoming title.
+    candidates : iterable of str
+        Stored titles to compare with.
+    threshold : float, optional
+        Ratio above which two titles are similar.
+
+    Returns
+    -------
+    bool
+        True if some candidate's ratio exceeds `threshold`.
+
+    Examples
+    --------
+    >>> similar_title_exists("Queer Talk", ["Queer Talk!", "Jazz Night"])
+    True
+    """
+    matcher = difflib.SequenceMatcher(None, title.lower())
+    for candidate in set(candidates):
+        matcher.set_seq2(candidate.lower())
+        if (
+            matcher.real_quick_ratio() > threshold
+            and matcher.quick_ratio() > threshold
+            and matcher.ratio() > threshold
+        ):
+            return True
+    return False
+
+
+def is_similar_event(event_data, exclude_id=None):
     """
     Check if a similar event exists using timezone-aware datetime comparison.
 
@@ -135,10 +244,19 @@ def is_similar_event(event_data):
     records to determine if a similar event already exists. It also checks for 
     title similarity using a string similarity ratio.
 
+    Candidates are pruned in the database before any title is compared:
+    events with the same start and end time, or, for events with neither,
+    events starting within `SIMILARITY_WINDOW` of the publication date. Of
+    those, only titles whose length allows a ratio above the threshold are
+    loaded, as plain strings, and compared with `similar_title_exists()`.
+
     Parameters
     ----------
     event_data : dict
         A dictionary containing event details such as title, start time, and end time.
+    exclude_id : int, optional
+        Id of a stored event to ignore, typically the event's own row, which
+        an update should not count as a duplicate of.
 
     Returns
     -------
@@ -167,35 +285,153 @@ def is_similar_event(event_data):
             query &= Q(start_time=start_time)
         if end_time is not None:
             query &= Q(end_time=end_time)
-
-        # Get similar events
-        similar_events = Event.objects.all()
-        if query:
-            similar_events = similar_events.filter(query)
+        if not query:
+            # Without times, only events around the publication date
+            # (as saved, now if there is none) can be the same event
+            reference = pub_date or timezone.now()
+            query = Q(
+                start_time__gte=reference - SIMILARITY_WINDOW,
+                start_time__lte=reference + SIMILARITY_WINDOW,
+            )
+
+        # 2 * min(n, m) / (n + m) bounds the ratio of titles of lengths n
+        # and m, so only lengths strictly between 2n/3 and 3n/2 can match
+        title = event_data.get("title", "")
+        similar_events = (
+            Event.objects.filter(query)
+            .annotate(title_length=Length("title"))
+            .filter(
+                title_length__gt=len(title) * 2 / 3,
+                title_length__lt=len(title) * 3 / 2,
+            )
+        )
+        if exclude_id is not None:
+            similar_events = similar_events.exclude(id=exclude_id)
 
         # Check title similarity for matching events
-        for event in similar_events:
-            title_similarity = difflib.SequenceMatcher(
-                None, 
-                event_data.get("title", "").lower(),
-                event.title.lower()
-            ).ratio()
-            if title_similarity > 0.8:
-                return True
-
-        return False
+        return similar_title_exists(
+            title, similar_events.values_list("title", flat=True)
+        )
 
     except Exception as e:
         print(f"Error checking for similar events: {e}")
         return False
 
 
+def is_similar_pending_event(fields, pending_events):
+    """
+    Check whether a similar event is already pending in the same batch.
+
+    Pending events are not stored yet, so `is_similar_event()` cannot see
+    them. They are pruned the same way: events with the same start and end
+    time, or, for events with neither, events starting within
+    `SIMILARITY_WINDOW` of the publication date. Their titles are then
+    compared with `similar_title_exists()`.
+
+    Parameters
+    ----------
+    fields : dict
+        Fields of the incoming event, as returned by `build_event_fields()`.
+    pending_events : iterable of Event
+        Unsaved events already selected from the batch.
+
+    Returns
+    -------
+    bool
+        True if a pending event is similar, otherwise False.
+
+    Examples
+    --------
+    >>> event_id, fields = build_event_fields(event_data)
+    >>> is_similar_pending_event(fields, pending.values())
+    True
+    """
+    start_time = fields["start_time"]
+    end_time = fields["end_time"]
+    if start_time is None and end_time is None:
+        reference = fields["pub_date"]
+        candidates = [
+            event.title
+            for event in pending_events
+            if event.start_time is not None
+            and abs(event.start_time - reference) <= SIMILARITY_WINDOW
+        ]
+    else:
+        candidates = [
+            event.title
+            for event in pending_events
+            if (start_time is None or event.start_time == start_time)
+            and (end_time is None or event.end_time == end_time)
+        ]
+    return similar_title_exists(fields["title"], candidates)
+
+
+def build_event_fields(event_data):
+    """
+    Derive the stored id and field values of an email event.
+
+    Dates are parsed with `pub_date` as the reference for time-only values,
+    and the id is derived from the title and start time with
+    `stable_event_id`.
+
+    Parameters
+    ----------
+    event_data : dict
+        The event as extracted from the email.
+
+    Returns
+    -------
+    tuple of (int, dict)
+        The event id and the values of every other `Event` field.
+
+    Examples
+    --------
+    >>> event_id, fields = build_event_fields(
+    ...     {"title": "Queer Talk", "starttime": "15:00:00", "pub_date": "2024-11-07"}
+    ... )
+    >>> fields["start_time"]
+    datetime.datetime(2024, 11, 7, 20, 0, tzinfo=<UTC>)
+    """
+    # Parse dates
+    pub_date = parse_datetime(event_data.get("pub_date")) or timezone.now()
+    start_time = parse_datetime(event_data.get("starttime"), pub_date)
+    end_time = parse_datetime(event_data.get("endtime"), pub_date)
+
+    # Derive a stable ID for email-sourced events
+    event_id = stable_event_id(EMAIL_ID_BASE, event_data["title"], start_time)
+    content_hash = compute_content_hash(event_data)
+
+    # Ensure 'link' and 'event_description' have default values
+    link = event_data.get("link", "https://www.amherst.edu")
+    description = event_data.get("event_description", "")
+
+    return event_id, {
+        "title": event_data["title"],
+        "author_name": event_data.get("author_name", ""),
+        "pub_date": pub_date,
+        "host": json.dumps(event_data.get("host", [])),
+        "link": link,
+        "picture_link": event_data.get("picture_link", ""),
+        "event_description": description,
+        "start_time": start_time,
+        "end_time": end_time,
+        "location": event_data.get("location", "TBD"),
+        "categories": json.dumps(event_data.get("categories", [])),
+        "latitude": None,
+        "longitude": None,
+        "map_location": "Other",
+        "content_hash": content_hash,
+        **dedupe_fields(event_data["title"], start_time),
+    }
+
+
 def save_event_to_db(event_data):
     """
     Save an event to the database, allowing nullable start and end times.
 
-    This function processes event data by generating a unique ID, parsing 
-    date fields, and saving or updating the event in the database.
+    This function processes event data by parsing date fields, deriving a 
+    stable ID from the title and start time, and saving or updating the 
+    event in the database.
 
     Parameters
     ----------
@@ -221,40 +457,10 @@ def save_event_to_db(event_data):
     Successfully saved/updated event: Literature Speaker Event
     """
     try:
-        # Generate a unique ID for email-sourced events
-        event_id = str(
-            600_000_000 + hash(str(event_data["title"])) % 100_000_000
-        )
-
-        # Parse dates
-        pub_date = parse_datetime(event_data.get("pub_date")) or timezone.now()
-        start_time = parse_datetime(event_data.get("starttime"), pub_date)
-        end_time = parse_datetime(event_data.get("endtime"), pub_date)
-
-        # Ensure 'link' and 'event_description' have default values
-        link = event_data.get("link", "https://www.amherst.edu")
-        description = event_data.get("event_description", "")
+        event_id, fields = build_event_fields(event_data)
 
         # Update or create the event
-        Event.objects.update_or_create(
-            id=event_id,
-            defaults={
-                "title": event_data["title"],
-                "author_name": event_data.get("author_name", ""),
-                "pub_date": pub_date,
-                "host": json.dumps(event_data.get("host", [])),
-                "link": link,
-                "picture_link": event_data.get("picture_link", ""),
-                "event_description": description,
-                "start_time": start_time,
-                "end_time": end_time,
-                "location": event_data.get("location", "TBD"),
-                "categories": json.dumps(event_data.get("categories", [])),
-                "latitude": None,
-                "longitude": None,
-                "map_location": "Other",
-            },
-        )
+        Event.objects.update_or_create(id=event_id, defaults=fields)
         print(f"Successfully saved/updated event: {event_data['title']}")
     except Exception as e:
         print(f"Error saving event to database: {e}")
@@ -267,18 +473,21 @@ def process_email_events():
     Process and save events extracted from email JSON data.
 
     This function loads the most recent JSON file containing extracted email event data, 
-    checks for duplicate events, and saves new events to the database.
+    selects the events to write with `dedupe_email_events()` and saves them
+    with `bulk_upsert_events()`, as the Daily Mammoth workflow does.
 
     Returns
     -------
-    None
-        This function does not return any value but prints processing status messages.
+    collections.Counter
+        Number of events that were ``changed`` (written), ``unchanged``,
+        ``duplicate`` or ``failed``. Duplicates of another source's events
+        are also counted as ``cross_source``.
 
     Examples
     --------
     >>> process_email_events()
     Skipping similar event: Literature Speaker Event
-    Successfully saved/updated event: New Music Festival
+    Saved 1 changed events; skipped 0 unchanged and 1 duplicate events (0 from other sources).
     """
     # Get the current directory
     curr_dir = os.path.dirname(os.path.abspath(__file__))
@@ -288,16 +497,167 @@ def process_email_events():
     events_data = load_json_file(json_folder)
     if not events_data:
         print("No events data to process")
-        return
+        return Counter(
+            changed=0, unchanged=0, duplicate=0, cross_source=0, failed=0
+        )
+
+    events, counts, replaced_ids = dedupe_email_events(events_data)
+    try:
+        bulk_upsert_events(events, replaced_ids)
+    except Exception as e:
+        print(f"Error saving events to database: {e}")
+        counts["failed"] += counts["changed"]
+        counts["changed"] = 0
+
+    print(
+        f"Saved {counts['changed']} changed events; skipped "
+        f"{counts['unchanged']} unchanged and {counts['duplicate']} "
+        f"duplicate events ({counts['cross_source']} from other sources)."
+    )
+    return counts
+
+
+def dedupe_email_events(events_data):
+    """
+    Select the events of a batch that need writing, without touching the DB.
 
-    # Process each event
-    for event in events_data:
+    Events are skipped if their content hash is unchanged, if a
+    `DedupeEngine` finds them stored by dedupe key or from a source ranking
+    above email in `SOURCE_PRIORITY`, or if a similar email event is stored
+    under another id; the row an event would update is not a duplicate of
+    it. Stored duplicates from lower-ranked sources are replaced instead.
+    Events repeated within the batch, or similar to one selected earlier in
+    it, are written once. Nothing is saved;
+    pass the result to `bulk_upsert_events()`.
+
+    Parameters
+    ----------
+    events_data : list of dict
+        The events as extracted from the emails.
+
+    Returns
+    -------
+    tuple of (list of Event, collections.Counter, list of int)
+        Unsaved `Event` instances to write, the number of events that are
+        ``changed``, ``unchanged``, ``duplicate`` or ``failed`` (events
+        merged with another source's event also count as
+        ``cross_source``), and the ids of the stored rows they replace.
+
+    Examples
+    --------
+    >>> events, counts, replaced_ids = dedupe_email_events(events_data)
+    >>> counts
+    Counter({'changed': 11, 'unchanged': 3, 'duplicate': 1, ...})
+    """
+    counts = Counter(
+        changed=0, unchanged=0, duplicate=0, cross_source=0, failed=0
+    )
+    if not events_data:
+        return [], counts, []
+
+    content_hashes = [compute_content_hash(event) for event in events_data]
+    known_hashes = load_known_hashes(content_hashes)
+    start_times = [parse_start_time(event) for event in events_data]
+    engine = DedupeEngine(
+        [
+            (
+                event.get("title"),
+                start_time,
+                stable_event_id(EMAIL_ID_BASE, event.get("title"), start_time),
+            )
+            for event, start_time, content_hash in zip(
+                events_data, start_times, content_hashes
+            )
+            if content_hash not in known_hashes
+        ],
+        source="email",
+    )
+
+    pending = {}
+    replaced_ids = []
+    for event, start_time, content_hash in zip(
+        events_data, start_times, content_hashes
+    ):
+        if content_hash in known_hashes:
+            counts["unchanged"] += 1
+            continue
         try:
-            if not is_similar_event(event):
-                save_event_to_db(event)
+            title = event.get("title")
+            event_id, fields = build_event_fields(event)
+            if event_id in pending:
+                print(f"Skipping repeated event: {title}")
+                counts["duplicate"] += 1
+                continue
+
+            duplicate_id = engine.find_duplicate(title, start_time, event_id)
+            cross = (
+                duplicate_id is not None
+                and event_source(duplicate_id) != "email"
+            )
+            if duplicate_id is not None and not outranks(
+                event_id, duplicate_id
+            ):
+                print(f"Skipping duplicate of event {duplicate_id}: {title}")
+                counts["duplicate"] += 1
+                if cross:
+                    counts["cross_source"] += 1
+            elif duplicate_id is None and (
+                is_similar_event(event, exclude_id=event_id)
+                or is_similar_pending_event(fields, pending.values())
+            ):
+                print(f"Skipping similar event: {title}")
+                counts["duplicate"] += 1
             else:
-                print(f"Skipping similar event: {event['title']}")
+                pending[event_id] = Event(id=event_id, **fields)
+                if duplicate_id is not None:
+                    print(f"Replacing event {duplicate_id}: {title}")
+                    replaced_ids.append(duplicate_id)
+                    engine.discard(duplicate_id)
+                    if cross:
+                        counts["cross_source"] += 1
+                engine.add(title, start_time, event_id)
+                counts["changed"] += 1
         except Exception as e:
             print(
                 f"Error processing event '{event.get('title', 'Unknown')}': {e}"
-            )
\ No newline at end of file
+            )
+            counts["failed"] += 1
+    return list(pending.values()), counts, replaced_ids
+
+
+def bulk_upsert_events(events, replaced_ids=()):
+    """
+    Insert or update events with bulk statements in one transaction.
+
+    Parameters
+    ----------
+    events : list of Event
+        Unsaved instances, as returned by `dedupe_email_events()`. Rows with
+        the same id are overwritten.
+    replaced_ids : iterable of int, optional
+        Ids of stored duplicates the events replace, deleted in the same
+        transaction.
+
+    Returns
+    -------
+    int
+        The number of events written.
+
+    Examples
+    --------
+    >>> bulk_upsert_events(events)
+    11
+    """
+    if not events:
+        return 0
+    with transaction.atomic():
+        if replaced_ids:
+            Event.objects.filter(id__in=list(replaced_ids)).delete()
+        Event.objects.bulk_create(
+            events,
+            batch_size=BULK_BATCH_SIZE,
+            update_conflicts=True,
+            unique_fields=["id"],
+            update_fields=UPSERT_FIELDS,
+        )
+    return len(events)
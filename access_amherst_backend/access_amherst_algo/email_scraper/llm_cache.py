@@ -0,0 +1,146 @@
+import hashlib
+import json
+import logging
+import os
+import tempfile
+
+from access_amherst_algo.cache_paths import default_cache_path
+
+logger = logging.getLogger(__name__)
+
+
+def cache_key(model, prompt, body):
+    """
+    Hash the inputs of an extraction request.
+
+    Parameters
+    ----------
+    model : str
+        The model name.
+    prompt : str
+        The system instruction.
+    body : str
+        The email content.
+
+    Returns
+    -------
+    str
+        A 64-character SHA-256 hex digest.
+
+    Examples
+    --------
+    >>> cache_key("meta-llama/llama-3.1-405b-instruct:free", instruction, body)
+    '3c1f0e...'
+    """
+    payload = json.dumps([model, prompt, body], ensure_ascii=False)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class LLMCache:
+    """
+    On-disk cache of the events extracted from email content by the LLM.
+
+    Each response is stored in its own JSON file named by `cache_key()` of
+    the model, the prompt and the email body, so re-processing an email
+    returns its events without an API call, while changing the model or the
+    prompt misses the cache. Files are replaced atomically. Unreadable
+    entries are treated as misses and failed writes are logged, so the
+    cache never stops an extraction.
+
+    Parameters
+    ----------
+    directory : str, optional
+        Directory holding the cache files. Defaults to the `LLM_CACHE_DIR`
+        environment variable, or `llm_cache` under the user's cache
+        directory (see `default_cache_path()`). Created if it does not
+        exist.
+
+    Examples
+    --------
+    >>> cache = LLMCache()
+    >>> events = extract_event_info_using_llama(email_body, cache=cache)
+    """
+
+    def __init__(self, directory=None):
+        self.directory = (
+            directory
+            or os.getenv("LLM_CACHE_DIR")
+            or default_cache_path("llm_cache")
+        )
+        os.makedirs(self.directory, exist_ok=True)
+
+    def _path(self, key):
+        return os.path.join(self.directory, f"{key}.json")
+
+    def load(self, model, prompt, body):
+        """
+        Return the cached events of a request.
+
+        Parameters
+        ----------
+        model : str
+            The model name.
+        prompt : str
+            The system instruction.
+        body : str
+            The email content.
+
+        Returns
+        -------
+        list or None
+            The stored events, or None if the request is not cached.
+
+        Examples
+        --------
+        >>> cache.load(LLAMA_MODEL, instruction, email_body)
+        [{'title': 'Literature Speaker Event', ...}]
+        """
+        key = cache_key(model, prompt, body)
+        try:
+            with open(self._path(key), encoding="utf-8") as file:
+                entry = json.load(file)
+        except (OSError, ValueError):
+            return None
+        if entry.get("key") != key:
+            return None
+        return entry.get("events")
+
+    def store(self, model, prompt, body, events):
+        """
+        Store the events extracted by a request.
+
+        Parameters
+        ----------
+        model : str
+            The model name.
+        prompt : str
+            The system instruction.
+        body : str
+            The email content.
+        events : list
+            The extracted events.
+
+        Returns
+        -------
+        None
+
+        Examples
+        --------
+        >>> cache.store(LLAMA_MODEL, instruction, email_body, events)
+        """
+        key = cache_key(model, prompt, body)
+        data = json.dumps(
+            {"key": key, "model": model, "events": events},
+            ensure_ascii=False,
+        ).encode("utf-8")
+        try:
+            fd, temp_path = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+            try:
+                with os.fdopen(fd, "wb") as file:
+                    file.write(data)
+                os.replace(temp_path, self._path(key))
+            except BaseException:
+                os.unlink(temp_path)
+                raise
+        except OSError as e:
+            logger.warning(f"Could not cache LLM response: {e}")
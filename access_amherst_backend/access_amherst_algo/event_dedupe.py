@@ -0,0 +1,1186 @@
+import hashlib
+import logging
+import re
+import zlib
+from collections import defaultdict, deque, namedtuple
+from datetime import timedelta
+from functools import lru_cache
+
+import numpy as np
+from sklearn.feature_extraction.text import CountVectorizer
+
+from access_amherst_algo.event_fingerprint import (
+    HASH_QUERY_CHUNK_SIZE,
+    event_source,
+)
+from access_amherst_algo.models import Event
+
+logger = logging.getLogger(__name__)
+
+# Start times in dedupe keys are rounded down to this bucket
+DEDUPE_KEY_BUCKET = timedelta(minutes=15)
+
+# Cross-source matching: character shingles of the preprocessed title,
+# summarized by MinHash signatures and indexed with LSH bands
+SHINGLE_SIZE = 3
+MINHASH_PERMUTATIONS = 32
+LSH_BANDS = 16
+
+# Jaccard similarity of title shingles at which events from different sources
+# are the same event
+CROSS_SOURCE_THRESHOLD = 0.6
+
+# Sources disagree on start times by up to an hour (fixed vs. daylight-saving
+# offsets), so cross-source matches tolerate that much drift
+CROSS_SOURCE_TIME_TOLERANCE = timedelta(hours=1)
+
+# Source whose row is kept when duplicates are merged: Hub events have links
+# and images, calendar events structured times, emails neither
+SOURCE_PRIORITY = ("hub", "calendar", "email", "other")
+
+# Rows read per query and hashed together when scanning the whole table
+SCAN_CHUNK_SIZE = 2000
+
+# Universal hashing `(a * x + b) mod p` with a Mersenne prime small enough
+# for the products to fit in 64 bits
+_MINHASH_PRIME = (1 << 31) - 1
+_minhash_rng = np.random.RandomState(20241107)
+_MINHASH_A = _minhash_rng.randint(
+    1, _MINHASH_PRIME, size=MINHASH_PERMUTATIONS
+).astype(np.uint64)
+_MINHASH_B = _minhash_rng.randint(
+    0, _MINHASH_PRIME, size=MINHASH_PERMUTATIONS
+).astype(np.uint64)
+
+_IndexedEvent = namedtuple(
+    "_IndexedEvent", "event_id title start_time source shingles"
+)
+
+
+def preprocess_title(title):
+    """
+    Preprocess an event title for better similarity comparison.
+
+    This function converts the title to lowercase, removes special characters,
+    and trims extra whitespace to standardize event title formatting.
+
+    Parameters
+    ----------
+    title : str
+        The event title to preprocess.
+
+    Returns
+    -------
+    str
+        The cleaned and standardized event title.
+
+    Examples
+    --------
+    >>> preprocess_title("  Guest Lecture: AI & Future  ")
+    'guest lecture ai future'
+    """
+    if not isinstance(title, str):
+        logger.warning("Title provided is not a string.")
+        return ""
+    # Convert to lowercase and remove special characters
+    title = re.sub(r"[^\w\s]", "", title.lower())
+    # Remove extra whitespace
+    return " ".join(title.split())
+
+
+def compute_dedupe_key(normalized_title, start_time):
+    """
+    Build the key shared by exact duplicates of an event.
+
+    Parameters
+    ----------
+    normalized_title : str
+        The title, as returned by `preprocess_title()`.
+    start_time : datetime or None
+        The timezone-aware start time.
+
+    Returns
+    -------
+    str or None
+        A 32-character BLAKE2b digest of the normalized title and the start
+        time rounded down to `DEDUPE_KEY_BUCKET`, or None if either is
+        missing.
+
+    Examples
+    --------
+    >>> compute_dedupe_key("queer talk", start_time)
+    '0f6b0f5c2e...'
+    """
+    if not normalized_title or start_time is None:
+        return None
+    bucket = int(start_time.timestamp()) // int(
+        DEDUPE_KEY_BUCKET.total_seconds()
+    )
+    key = f"{normalized_title}|{bucket}"
+    return hashlib.blake2b(key.encode("utf-8"), digest_size=16).hexdigest()
+
+
+def dedupe_fields(title, start_time):
+    """
+    Compute the `normalized_title` and `dedupe_key` fields of an event.
+
+    Parameters
+    ----------
+    title : str
+        The event title.
+    start_time : datetime or None
+        The timezone-aware start time.
+
+    Returns
+    -------
+    dict
+        The two field values, to be merged into the saved fields.
+
+    Examples
+    --------
+    >>> dedupe_fields("Queer Talk!", start_time)
+    {'normalized_title': 'queer talk', 'dedupe_key': '0f6b0f5c2e...'}
+    """
+    normalized_title = preprocess_title(title)
+    return {
+        "normalized_title": normalized_title,
+        "dedupe_key": compute_dedupe_key(normalized_title, start_time),
+    }
+
+
+class ExactDuplicateIndex:
+    """
+    Detect incoming events whose dedupe key is already stored.
+
+    The keys of the whole batch are looked up on the indexed `dedupe_key`
+    column with one query per `HASH_QUERY_CHUNK_SIZE` keys, so exact
+    duplicates are found without scoring any titles. Rows stored under the
+    incoming event's own id are updates, not duplicates. Hub events carry
+    the Hub's own ids, so other Hub rows are not duplicates of a Hub event.
+
+    Parameters
+    ----------
+    events : list of tuple
+        `(title, start_time)` pairs for every event in the batch.
+    source : str
+        Source of the batch: ``"hub"``, ``"email"`` or ``"calendar"``.
+
+    Examples
+    --------
+    >>> index = ExactDuplicateIndex([("Queer Talk!", start_time)], "calendar")
+    >>> index.find("Queer Talk!", start_time, event_id)
+    500012345
+    """
+
+    def __init__(self, events, source):
+        self.source = source
+        self._stored = defaultdict(list)
+
+        keys = list(
+            dict.fromkeys(
+                key
+                for key in (
+                    compute_dedupe_key(preprocess_title(title), start_time)
+                    for title, start_time in events
+                )
+                if key is not None
+            )
+        )
+        try:
+            for start in range(0, len(keys), HASH_QUERY_CHUNK_SIZE):
+                chunk = keys[start : start + HASH_QUERY_CHUNK_SIZE]
+                for key, event_id in Event.objects.filter(
+                    dedupe_key__in=chunk
+                ).values_list("dedupe_key", "id"):
+                    self._stored[key].append(event_id)
+        except Exception as e:
+            logger.error(f"Error loading stored dedupe keys: {e}")
+            self._stored.clear()
+
+    def find(self, title, start_time, event_id):
+        """
+        Find a stored event the incoming event exactly duplicates.
+
+        Parameters
+        ----------
+        title : str
+            Title of the incoming event.
+        start_time : datetime or None
+            Start time of the incoming event.
+        event_id : int
+            Id the incoming event would be saved under.
+
+        Returns
+        -------
+        int or None
+            The id of the duplicated event, or None.
+        """
+        key = compute_dedupe_key(preprocess_title(title), start_time)
+        for stored_id in self._stored.get(key, ()):
+            if stored_id == int(event_id):
+                continue
+            if self.source == "hub" and event_source(stored_id) == "hub":
+                continue
+            return stored_id
+        return None
+
+    def add(self, title, start_time, event_id):
+        """
+        Register an event saved during this batch.
+
+        Parameters
+        ----------
+        title : str
+            Title of the saved event.
+        start_time : datetime or None
+            Start time of the saved event.
+        event_id : int
+            Id the event was saved under.
+        """
+        key = compute_dedupe_key(preprocess_title(title), start_time)
+        if key is not None:
+            self._stored[key].append(int(event_id))
+
+    def discard(self, event_id):
+        """
+        Forget a stored event deleted during this batch.
+
+        Parameters
+        ----------
+        event_id : int
+            Id of the deleted event.
+        """
+        for stored_ids in self._stored.values():
+            while int(event_id) in stored_ids:
+                stored_ids.remove(int(event_id))
+
+
+class BatchDeduplicator:
+    """
+    Detect incoming events that duplicate stored events, one batch at a time.
+
+    The per-event similarity checks query the database and fit a new
+    TF-IDF vectorizer for every incoming event. This class does the same work
+    once per ingestion run: it loads every stored event inside the batch's
+    time window with a single query, groups them by start time, and tokenizes
+    all titles with one shared vectorizer. Each incoming title is then scored
+    against the stored titles sharing its start time. The stored row an
+    incoming event would update is passed as `exclude_id`, so an event whose
+    content changed is not mistaken for a duplicate of itself.
+
+    The TF-IDF weights are recomputed from the document frequencies of the
+    bucket plus the incoming title, so the cosine scores (and therefore the
+    duplicate decisions) are the same as fitting a `TfidfVectorizer` on that
+    bucket alone.
+
+    Parameters
+    ----------
+    events : list of tuple
+        `(title, start_time)` pairs for every event in the batch. `start_time`
+        must be a timezone-aware datetime in UTC, or None.
+    threshold : float
+        Cosine similarity above which two titles are considered duplicates.
+
+    Examples
+    --------
+    >>> deduplicator = BatchDeduplicator(
+    ...     [("Guest Lecture: AI & Future", start_time)], threshold=0.57
+    ... )
+    >>> deduplicator.is_duplicate("Guest Lecture: AI & Future", start_time)
+    False
+    """
+
+    def __init__(self, events, threshold):
+        self.threshold = threshold
+        self._buckets = defaultdict(list)
+        self._rows = {}
+        self._counts = None
+
+        events = [
+            (title, start_time)
+            for title, start_time in events
+            if title and start_time is not None
+        ]
+        if not events:
+            return
+
+        self._load_existing_events(
+            min(start_time for _, start_time in events),
+            max(start_time for _, start_time in events),
+        )
+        self._fit_vocabulary(
+            [title for _, title in self._iter_bucket_titles()]
+            + [preprocess_title(title) for title, _ in events]
+        )
+
+    def _load_existing_events(self, window_start, window_end):
+        """Load stored titles in the batch window, grouped by start time."""
+        try:
+            existing = Event.objects.filter(
+                start_time__range=(window_start, window_end)
+            ).values_list("id", "title", "normalized_title", "start_time")
+            for event_id, title, normalized_title, start_time in existing:
+                processed = normalized_title or preprocess_title(title)
+                if processed:
+                    self._buckets[start_time].append(
+                        (title, processed, event_id)
+                    )
+        except Exception as e:
+            logger.error(f"Error loading events for duplicate detection: {e}")
+            self._buckets.clear()
+
+    def _iter_bucket_titles(self):
+        for bucket in self._buckets.values():
+            for title, processed, _ in bucket:
+                yield title, processed
+
+    def _fit_vocabulary(self, processed_titles):
+        """Tokenize every title in the batch with one shared vectorizer."""
+        unique_titles = list(dict.fromkeys(t for t in processed_titles if t))
+        if not unique_titles:
+            return
+
+        vectorizer = CountVectorizer(
+            min_df=1,
+            ngram_range=(1, 2),
+            strip_accents="unicode",
+            lowercase=True,
+        )
+        try:
+            self._counts = vectorizer.fit_transform(unique_titles).tocsr()
+        except ValueError as e:
+            logger.error(f"Vectorizer error: {e}")
+            return
+        self._rows = {title: row for row, title in enumerate(unique_titles)}
+
+    def _similarities(self, processed_title, bucket):
+        """
+        Compute TF-IDF cosine similarities of one title against a bucket.
+
+        Only the columns used by the bucket or the new title are materialized,
+        which keeps the dense arithmetic proportional to the bucket size.
+        """
+        bucket_counts = self._counts[[self._rows[t] for _, t, _ in bucket]]
+        new_counts = self._counts[self._rows[processed_title]]
+
+        columns = np.union1d(bucket_counts.indices, new_counts.indices)
+        if columns.size == 0:
+            return np.zeros(len(bucket))
+        bucket_counts = bucket_counts[:, columns].toarray()
+        new_counts = new_counts[:, columns].toarray().ravel()
+
+        # Smoothed idf, as computed by TfidfVectorizer on bucket + new title
+        n_documents = len(bucket) + 1
+        document_frequency = (bucket_counts > 0).sum(axis=0) + (new_counts > 0)
+        idf = np.log((1 + n_documents) / (1 + document_frequency)) + 1
+
+        bucket_weights = bucket_counts * idf
+        new_weights = new_counts * idf
+        bucket_norms = np.linalg.norm(bucket_weights, axis=1)
+        new_norm = np.linalg.norm(new_weights)
+        if new_norm == 0:
+            return np.zeros(len(bucket))
+
+        dots = bucket_weights @ new_weights
+        with np.errstate(divide="ignore", invalid="ignore"):
+            similarities = np.where(
+                bucket_norms > 0, dots / (bucket_norms * new_norm), 0.0
+            )
+        return similarities
+
+    def find(self, title, start_time, exclude_id=None):
+        """
+        Find the known event an incoming event duplicates.
+
+        Parameters
+        ----------
+        title : str
+            Title of the incoming event.
+        start_time : datetime or None
+            Start time of the incoming event, in UTC.
+        exclude_id : int, optional
+            Id the incoming event would be saved under. The row stored under
+            it is the event itself, not a duplicate.
+
+        Returns
+        -------
+        int or None
+            The id of the most similar known event with the same start time
+            whose title similarity exceeds the threshold, or None. Events
+            added without an id are reported as 0.
+        """
+        try:
+            if not title:
+                logger.warning("Empty title provided")
+                return None
+            if start_time is None or self._counts is None:
+                return None
+
+            bucket = [
+                entry
+                for entry in self._buckets.get(start_time, ())
+                if exclude_id is None or entry[2] != int(exclude_id)
+            ]
+            if not bucket:
+                return None
+
+            processed_title = preprocess_title(title)
+            if processed_title not in self._rows:
+                return None
+
+            similarities = self._similarities(processed_title, bucket)
+            if similarities.size > 0 and similarities.max() > self.threshold:
+                similar_index = int(np.argmax(similarities))
+                logger.info(
+                    f"Similar event found: '{bucket[similar_index][0]}' "
+                    f"(similarity: {similarities[similar_index]:.2f})"
+                )
+                return bucket[similar_index][2] or 0
+            return None
+
+        except Exception as e:
+            logger.error(f"Error in similarity check for '{title}': {e}")
+            return None
+
+    def is_duplicate(self, title, start_time, exclude_id=None):
+        """
+        Check whether an incoming event duplicates a known event.
+
+        Parameters
+        ----------
+        title : str
+            Title of the incoming event.
+        start_time : datetime or None
+            Start time of the incoming event, in UTC.
+        exclude_id : int, optional
+            Id the incoming event would be saved under. The row stored under
+            it is the event itself, not a duplicate.
+
+        Returns
+        -------
+        bool
+            True if a known event with the same start time has a title whose
+            similarity exceeds the threshold, otherwise False.
+        """
+        return self.find(title, start_time, exclude_id) is not None
+
+    def add(self, title, start_time, event_id=None):
+        """
+        Register an event saved during this batch.
+
+        Later events in the same batch are compared against it, just as they
+        would be compared against the database row it produced.
+
+        Parameters
+        ----------
+        title : str
+            Title of the saved event.
+        start_time : datetime or None
+            Start time of the saved event, in UTC.
+        event_id : int, optional
+            Id the event was saved under.
+        """
+        processed_title = preprocess_title(title)
+        if start_time is None or processed_title not in self._rows:
+            return
+        self._buckets[start_time].append(
+            (title, processed_title, int(event_id) if event_id else None)
+        )
+
+    def discard(self, event_id):
+        """
+        Forget a stored event deleted during this batch.
+
+        Parameters
+        ----------
+        event_id : int
+            Id of the deleted event.
+        """
+        for start_time, bucket in self._buckets.items():
+            self._buckets[start_time] = [
+                entry for entry in bucket if entry[2] != int(event_id)
+            ]
+
+
+@lru_cache(maxsize=8192)
+def title_shingles(title):
+    """
+    Split a preprocessed title into overlapping character shingles.
+
+    The title is padded with a space on each side so word boundaries count
+    as characters, which keeps short titles distinguishable.
+
+    Parameters
+    ----------
+    title : str
+        The event title.
+
+    Returns
+    -------
+    frozenset of str
+        The `SHINGLE_SIZE`-character shingles; empty if the title has no
+        words.
+
+    Examples
+    --------
+    >>> sorted(title_shingles("Queer Talk!"))[:4]
+    [' qu', ' ta', 'alk', 'eer']
+    """
+    processed = preprocess_title(title)
+    if not processed:
+        return frozenset()
+    padded = f" {processed} "
+    return frozenset(
+        padded[i : i + SHINGLE_SIZE]
+        for i in range(len(padded) - SHINGLE_SIZE + 1)
+    )
+
+
+def minhash_signatures(shingle_sets):
+    """
+    Compute the MinHash signatures of several sets of shingles at once.
+
+    All shingles are hashed with one vectorized pass, which is much faster
+    than hashing the sets one by one.
+
+    Parameters
+    ----------
+    shingle_sets : list of collection of str
+        Non-empty sets of shingles.
+
+    Returns
+    -------
+    numpy.ndarray
+        A `(len(shingle_sets), MINHASH_PERMUTATIONS)` array of unsigned
+        integers, one signature per set.
+
+    Examples
+    --------
+    >>> minhash_signatures([title_shingles("Queer Talk")]).shape
+    (1, 32)
+    """
+    lengths = np.fromiter(
+        (len(shingles) for shingles in shingle_sets),
+        dtype=np.int64,
+        count=len(shingle_sets),
+    )
+    if lengths.size == 0:
+        return np.empty((0, MINHASH_PERMUTATIONS), dtype=np.uint64)
+    hashes = np.fromiter(
+        (
+            zlib.crc32(shingle.encode("utf-8"))
+            for shingles in shingle_sets
+            for shingle in shingles
+        ),
+        dtype=np.uint64,
+        count=int(lengths.sum()),
+    )
+    hashes %= np.uint64(_MINHASH_PRIME)
+    permuted = (
+        _MINHASH_A[:, None] * hashes[None, :] + _MINHASH_B[:, None]
+    ) % np.uint64(_MINHASH_PRIME)
+    offsets = np.concatenate(([0], np.cumsum(lengths)[:-1]))
+    return np.minimum.reduceat(permuted, offsets, axis=1).T
+
+
+def minhash_signature(shingles):
+    """
+    Compute the MinHash signature of a set of shingles.
+
+    Parameters
+    ----------
+    shingles : collection of str
+        A non-empty set of shingles.
+
+    Returns
+    -------
+    numpy.ndarray
+        `MINHASH_PERMUTATIONS` unsigned integers. The fraction of positions
+        at which two signatures agree estimates the Jaccard similarity of
+        their shingle sets.
+
+    Examples
+    --------
+    >>> minhash_signature(title_shingles("Queer Talk")).shape
+    (32,)
+    """
+    return minhash_signatures([shingles])[0]
+
+
+# Odd multipliers folding the rows of a band, and the band number, into one
+# 64-bit key; colliding keys only add candidates, which are verified anyway
+_ROW_MULTIPLIER = np.uint64(0x9E3779B97F4A7C15)
+_BAND_SALTS = np.arange(LSH_BANDS, dtype=np.uint64) * np.uint64(
+    0xC2B2AE3D27D4EB4F
+)
+
+
+def _band_keys(signatures):
+    """Fold each signature into one integer key per LSH band."""
+    bands = signatures.reshape(len(signatures), LSH_BANDS, -1)
+    keys = _BAND_SALTS[None, :].repeat(len(signatures), axis=0)
+    with np.errstate(over="ignore"):
+        for row in range(bands.shape[2]):
+            keys = keys * _ROW_MULTIPLIER + bands[:, :, row]
+    return keys.tolist()
+
+
+def _time_bucket(start_time, time_tolerance):
+    return int(start_time.timestamp() // time_tolerance.total_seconds())
+
+
+def _jaccard(first, second):
+    return len(first & second) / len(first | second)
+
+
+class CrossSourceDeduplicator:
+    """
+    Detect incoming events that duplicate events stored by another source.
+
+    The same event is often announced on the Hub, the college calendar and
+    the daily digest emails. Each saver already skips repeats from its own
+    source; this class catches the rest. It loads every stored event from
+    the other sources around the batch's time window with one query and
+    indexes their titles with MinHash signatures split into LSH bands, keyed
+    by start time rounded to the time tolerance. An incoming title is only
+    compared with the events sharing a band in its own or a neighbouring
+    time bucket, so each lookup costs about the same however many events are
+    stored. Candidates are confirmed with the exact Jaccard similarity of
+    their title shingles.
+
+    Every match is recorded in `merged`, so callers can report which events
+    were merged into which.
+
+    Parameters
+    ----------
+    events : list of tuple
+        `(title, start_time)` pairs for every event in the batch. `start_time`
+        must be a timezone-aware datetime, or None.
+    source : str
+        Source of the batch: ``"hub"``, ``"email"`` or ``"calendar"``. Stored
+        events of the same source are left to the source's own checks.
+    threshold : float, optional
+        Jaccard similarity of title shingles at or above which two events
+        are the same.
+    time_tolerance : datetime.timedelta, optional
+        Largest difference in start times between two matching events.
+
+    Examples
+    --------
+    >>> deduplicator = CrossSourceDeduplicator(
+    ...     [("Queer Talk!", start_time)], source="calendar"
+    ... )
+    >>> deduplicator.is_duplicate("Queer Talk!", start_time)
+    True
+    >>> deduplicator.merged[0]["matched_source"]
+    'hub'
+    """
+
+    def __init__(
+        self,
+        events,
+        source,
+        threshold=CROSS_SOURCE_THRESHOLD,
+        time_tolerance=CROSS_SOURCE_TIME_TOLERANCE,
+    ):
+        self.source = source
+        self.threshold = threshold
+        self.time_tolerance = time_tolerance
+        self.merged = []
+        self._entries = []
+        self._index = defaultdict(list)
+        self._discarded = set()
+
+        start_times = [
+            start_time
+            for title, start_time in events
+            if title and start_time is not None
+        ]
+        if not start_times:
+            return
+
+        self._load_existing_events(
+            min(start_times) - time_tolerance,
+            max(start_times) + time_tolerance,
+        )
+
+    def _load_existing_events(self, window_start, window_end):
+        """Index the stored events of other sources in the batch window."""
+        try:
+            existing = Event.objects.filter(
+                start_time__range=(window_start, window_end)
+            ).values_list("id", "title", "normalized_title", "start_time")
+            for event_id, title, normalized_title, start_time in existing:
+                source = event_source(event_id)
+                if source != self.source:
+                    self._add_entry(
+                        event_id,
+                        title,
+                        normalized_title or title,
+                        start_time,
+                        source,
+                    )
+        except Exception as e:
+            logger.error(f"Error loading events for duplicate detection: {e}")
+            self._entries.clear()
+            self._index.clear()
+
+    def _add_entry(
+        self, event_id, title, normalized_title, start_time, source
+    ):
+        # Normalizing a normalized title returns it unchanged
+        shingles = title_shingles(normalized_title)
+        if not shingles or start_time is None:
+            return
+        position = len(self._entries)
+        self._entries.append(
+            _IndexedEvent(event_id, title, start_time, source, shingles)
+        )
+        bucket = _time_bucket(start_time, self.time_tolerance)
+        for key in _band_keys(minhash_signatures([shingles]))[0]:
+            self._index[key, bucket].append(position)
+
+    def find_duplicate(self, title, start_time):
+        """
+        Find the stored event of another source that an event duplicates.
+
+        Parameters
+        ----------
+        title : str
+            Title of the incoming event.
+        start_time : datetime or None
+            Start time of the incoming event.
+
+        Returns
+        -------
+        tuple or None
+            `(event_id, title, start_time, source, similarity)` of the most
+            similar matching event, or None if there is none.
+
+        Examples
+        --------
+        >>> deduplicator.find_duplicate("Queer Talk!", start_time)
+        (500123456, 'Queer Talk', datetime.datetime(...), 'hub', 1.0)
+        """
+        if not self._entries or start_time is None:
+            return None
+        shingles = title_shingles(title)
+        if not shingles:
+            return None
+
+        bucket = _time_bucket(start_time, self.time_tolerance)
+        candidates = set()
+        for key in _band_keys(minhash_signatures([shingles]))[0]:
+            for neighbour in (bucket - 1, bucket, bucket + 1):
+                candidates.update(self._index.get((key, neighbour), ()))
+
+        best, best_similarity = None, 0.0
+        for position in candidates:
+            entry = self._entries[position]
+            if entry.event_id in self._discarded:
+                continue
+            if abs(entry.start_time - start_time) > self.time_tolerance:
+                continue
+            similarity = _jaccard(shingles, entry.shingles)
+            if similarity >= self.threshold and similarity > best_similarity:
+                best, best_similarity = entry, similarity
+        if best is None:
+            return None
+        return (
+            best.event_id,
+            best.title,
+            best.start_time,
+            best.source,
+            best_similarity,
+        )
+
+    def match(self, title, start_time):
+        """
+        Find and record the stored event of another source an event matches.
+
+        A match is logged and appended to `merged`. Its ``"replaced"`` entry
+        tells whether the incoming event's source outranks the stored
+        event's in `SOURCE_PRIORITY`, so the stored row gives way to it.
+
+        Parameters
+        ----------
+        title : str
+            Title of the incoming event.
+        start_time : datetime or None
+            Start time of the incoming event.
+
+        Returns
+        -------
+        int or None
+            Id of the matching stored event, or None if there is none.
+        """
+        try:
+            match = self.find_duplicate(title, start_time)
+        except Exception as e:
+            logger.error(f"Error in cross-source check for '{title}': {e}")
+            return None
+        if match is None:
+            return None
+
+        event_id, matched_title, _, matched_source, similarity = match
+        replaced = _source_rank(self.source) < _source_rank(matched_source)
+        self.merged.append(
+            {
+                "title": title,
+                "source": self.source,
+                "start_time": start_time,
+                "matched_id": event_id,
+                "matched_title": matched_title,
+                "matched_source": matched_source,
+                "similarity": similarity,
+                "replaced": replaced,
+            }
+        )
+        if replaced:
+            logger.info(
+                f"Replaced {matched_source} event '{matched_title}' "
+                f"(id {event_id}) with {self.source} event '{title}' "
+                f"(similarity {similarity:.2f})"
+            )
+        else:
+            logger.info(
+                f"Merged {self.source} event '{title}' into {matched_source} "
+                f"event '{matched_title}' (id {event_id}, similarity "
+                f"{similarity:.2f})"
+            )
+        return event_id
+
+    def is_duplicate(self, title, start_time):
+        """
+        Check whether an incoming event duplicates another source's event.
+
+        A match is logged and appended to `merged`.
+
+        Parameters
+        ----------
+        title : str
+            Title of the incoming event.
+        start_time : datetime or None
+            Start time of the incoming event.
+
+        Returns
+        -------
+        bool
+            True if a stored event of another source matches.
+        """
+        return self.match(title, start_time) is not None
+
+    def discard(self, event_id):
+        """
+        Forget a stored event deleted during this batch.
+
+        Parameters
+        ----------
+        event_id : int
+            Id of the deleted event.
+        """
+        self._discarded.add(int(event_id))
+
+
+def _source_rank(source):
+    """Position of a source in `SOURCE_PRIORITY`, unknown sources last."""
+    if source in SOURCE_PRIORITY:
+        return SOURCE_PRIORITY.index(source)
+    return len(SOURCE_PRIORITY)
+
+
+def outranks(event_id, other_id):
+    """
+    Check whether an event's source takes priority over another event's.
+
+    Parameters
+    ----------
+    event_id : int
+        Id of the incoming event.
+    other_id : int
+        Id of the stored event it duplicates.
+
+    Returns
+    -------
+    bool
+        True if the incoming event's source comes strictly before the stored
+        event's in `SOURCE_PRIORITY`, so the stored row should be replaced.
+
+    Examples
+    --------
+    >>> outranks(500000001, 700000001)
+    True
+    >>> outranks(700000001, 700000002)
+    False
+    """
+    return _source_rank(event_source(event_id)) < _source_rank(
+        event_source(other_id)
+    )
+
+
+class DedupeEngine:
+    """
+    Run every duplicate check an incoming event goes through in one call.
+
+    Savers used to chain the exact-key index, the cross-source MinHash
+    index and the TF-IDF similarity check themselves; the engine tries
+    them in that order and returns the id of the first duplicate found, so
+    the caller can decide by `outranks` whether to skip the incoming event
+    or replace the stored row.
+
+    Parameters
+    ----------
+    events : list of tuple
+        `(title, start_time, event_id)` triples for every event in the
+        batch. `start_time` must be a timezone-aware datetime, or None.
+    source : str
+        Source of the batch: ``"hub"``, ``"email"`` or ``"calendar"``.
+    similarity_threshold : float, optional
+        Cosine similarity of TF-IDF title vectors above which two events of
+        the same start time are duplicates. Without it the TF-IDF check is
+        skipped. It never applies to Hub events, whose ids are stable link
+        numbers.
+
+    Attributes
+    ----------
+    merged : list of dict
+        Cross-source matches, as recorded by `CrossSourceDeduplicator`.
+
+    Examples
+    --------
+    >>> engine = DedupeEngine(
+    ...     [("Queer Talk!", start_time, 700000001)], source="calendar"
+    ... )
+    >>> engine.find_duplicate("Queer Talk!", start_time, 700000001)
+    500123456
+    """
+
+    def __init__(self, events, source, similarity_threshold=None):
+        self.source = source
+        self._exact = ExactDuplicateIndex(
+            [(title, start_time) for title, start_time, _ in events],
+            source=source,
+        )
+        self._cross_source = CrossSourceDeduplicator(
+            [(title, start_time) for title, start_time, _ in events],
+            source=source,
+        )
+        self._similar = None
+        if similarity_threshold is not None:
+            similar_events = [
+                (title, start_time)
+                for title, start_time, event_id in events
+                if event_source(event_id) != "hub"
+            ]
+            if similar_events:
+                self._similar = BatchDeduplicator(
+                    similar_events, threshold=similarity_threshold
+                )
+
+    @property
+    def merged(self):
+        return self._cross_source.merged
+
+    def find_duplicate(self, title, start_time, event_id):
+        """
+        Find the event an incoming event duplicates.
+
+        Parameters
+        ----------
+        title : str
+            Title of the incoming event.
+        start_time : datetime or None
+            Start time of the incoming event, in UTC.
+        event_id : int
+            Id the incoming event would be saved under.
+
+        Returns
+        -------
+        int or None
+            Id of the stored or earlier batch event it duplicates, or None.
+        """
+        duplicate_id = self._exact.find(title, start_time, event_id)
+        if duplicate_id is not None:
+            return duplicate_id
+        duplicate_id = self._cross_source.match(title, start_time)
+        if duplicate_id is not None:
+            return duplicate_id
+        if self._similar is not None and event_source(event_id) != "hub":
+            return self._similar.find(title, start_time, exclude_id=event_id)
+        return None
+
+    def add(self, title, start_time, event_id):
+        """
+        Register a saved event so later events in the batch match it.
+
+        Parameters
+        ----------
+        title : str
+            Title of the saved event.
+        start_time : datetime or None
+            Start time of the saved event, in UTC.
+        event_id : int
+            Id the event was saved under.
+        """
+        self._exact.add(title, start_time, event_id)
+        if self._similar is not None and event_source(event_id) != "hub":
+            self._similar.add(title, start_time, event_id)
+
+    def discard(self, event_id):
+        """
+        Forget a stored event replaced during this batch.
+
+        Parameters
+        ----------
+        event_id : int
+            Id of the deleted event.
+        """
+        self._exact.discard(event_id)
+        self._cross_source.discard(event_id)
+        if self._similar is not None:
+            self._similar.discard(event_id)
+
+
+def _canonical_order(row):
+    """Sort key putting the row to keep first: by source, then newest."""
+    event_id, _, _, pub_date = row
+    source = event_source(event_id)
+    return (
+        SOURCE_PRIORITY.index(source),
+        pub_date is None,
+        -pub_date.timestamp() if pub_date is not None else 0,
+        event_id,
+    )
+
+
+def find_duplicate_clusters(
+    rows,
+    threshold=CROSS_SOURCE_THRESHOLD,
+    time_tolerance=CROSS_SOURCE_TIME_TOLERANCE,
+    chunk_size=SCAN_CHUNK_SIZE,
+):
+    """
+    Group stored events that are the same event, in one pass over the table.
+
+    Rows must arrive sorted by start time. They are read in chunks whose
+    title signatures are computed together, and indexed with the same LSH
+    bands as `CrossSourceDeduplicator`. Only rows in the current and the
+    previous time bucket stay indexed, so memory is bounded by the busiest
+    stretch of the calendar rather than the size of the table. Two rows
+    match if their title shingles reach `threshold` Jaccard similarity and
+    they start at the same time, or within `time_tolerance` if they come
+    from different sources. Matches are merged transitively into clusters.
+
+    Parameters
+    ----------
+    rows : iterable of tuple
+        `(id, title, start_time, pub_date)` rows sorted by `start_time`.
+        Rows without a title or start time are ignored.
+    threshold : float, optional
+        Jaccard similarity of title shingles at or above which two rows
+        match.
+    time_tolerance : datetime.timedelta, optional
+        Largest difference in start times between matching rows of
+        different sources.
+    chunk_size : int, optional
+        Number of rows hashed together.
+
+    Returns
+    -------
+    list of list of tuple
+        The clusters of two or more rows. Each cluster is ordered with the
+        row to keep first: the highest `SOURCE_PRIORITY` source, then the
+        latest `pub_date`, then the lowest id.
+
+    Examples
+    --------
+    >>> rows = Event.objects.order_by("start_time").values_list(
+    ...     "id", "title", "start_time", "pub_date"
+    ... )
+    >>> find_duplicate_clusters(rows.iterator())
+    [[(500012345, 'Queer Talk', ...), (796602952, 'Queer Talk!', ...)]]
+    """
+    parent = {}
+
+    def find(position):
+        while parent[position] != position:
+            parent[position] = parent[parent[position]]
+            position = parent[position]
+        return position
+
+    matched = {}
+    # Rows of the current and previous time bucket, and their band keys
+    # mapped to positions in scan order
+    window = deque()
+    entries = {}
+    index = {}
+    position = 0
+    rows = iter(rows)
+
+    while True:
+        chunk = [
+            row
+            for row in (next(rows, None) for _ in range(chunk_size))
+            if row is not None and row[1] and row[2] is not None
+        ]
+        if not chunk:
+            break
+        shingle_sets = [title_shingles(title) for _, title, _, _ in chunk]
+        chunk = [row for row, shingles in zip(chunk, shingle_sets) if shingles]
+        shingle_sets = [shingles for shingles in shingle_sets if shingles]
+        chunk_keys = _band_keys(minhash_signatures(shingle_sets))
+
+        for row, shingles, keys in zip(chunk, shingle_sets, chunk_keys):
+            event_id, _, start_time, _ = row
+            source = event_source(event_id)
+            bucket = _time_bucket(start_time, time_tolerance)
+
+            # Rows are sorted, so rows of older buckets can no longer match.
+            # They are the oldest in every list they appear in.
+            while window and window[0][0] < bucket - 1:
+                _, old = window.popleft()
+                for key in entries.pop(old)[3]:
+                    positions = index[key]
+                    positions.popleft()
+                    if not positions:
+                        del index[key]
+
+            candidates = set()
+            for key in keys:
+                positions = index.get(key)
+                if positions:
+                    candidates.update(positions)
+
+            for candidate in candidates:
+                other_row, other_source, other_shingles, _ = entries[candidate]
+                tolerance = (
+                    time_tolerance if source != other_source else timedelta(0)
+                )
+                if abs(start_time - other_row[2]) > tolerance:
+                    continue
+                if _jaccard(shingles, other_shingles) < threshold:
+                    continue
+                for member, member_row in (
+                    (position, row),
+                    (candidate, other_row),
+                ):
+                    if member not in parent:
+                        parent[member] = member
+                        matched[member] = member_row
+                parent[find(position)] = find(candidate)
+
+            entries[position] = (row, source, shingles, keys)
+            window.append((bucket, position))
+            for key in keys:
+                positions = index.get(key)
+                if positions is None:
+                    index[key] = positions = deque()
+                positions.append(position)
+            position += 1
+
+    clusters = defaultdict(list)
+    for member, row in matched.items():
+        clusters[find(member)].append(row)
+    return [
+        sorted(cluster, key=_canonical_order) for cluster in clusters.values()
+    ]
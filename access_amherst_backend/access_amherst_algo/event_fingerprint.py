@@ -0,0 +1,177 @@
+import hashlib
+import json
+import logging
+from datetime import timezone
+
+from access_amherst_algo.models import Event
+
+logger = logging.getLogger(__name__)
+
+# Fields derived by the savers rather than read from the source
+DERIVED_FIELDS = {"id", "map_location", "content_hash"}
+
+# Number of fingerprints per query when loading stored hashes
+HASH_QUERY_CHUNK_SIZE = 500
+
+# Id ranges of each source; Hub events use the Hub's own event id, the others
+# a digest of their title and start time
+HUB_ID_BASE = 500_000_000
+EMAIL_ID_BASE = 600_000_000
+CALENDAR_ID_BASE = 700_000_000
+ID_RANGE = 100_000_000
+
+
+def _normalize(value):
+    """Collapse whitespace in strings, recursively through lists and dicts."""
+    if isinstance(value, str):
+        return " ".join(value.split())
+    if isinstance(value, (list, tuple)):
+        return [_normalize(item) for item in value]
+    if isinstance(value, dict):
+        return {key: _normalize(item) for key, item in value.items()}
+    return value
+
+
+def compute_content_hash(event_data):
+    """
+    Compute a stable fingerprint of an event's source fields.
+
+    Fields derived by the savers (`id`, `map_location`, `content_hash`) are
+    ignored, strings are whitespace-normalized, and keys are sorted, so the
+    same source event always hashes to the same value regardless of dict
+    order or incidental formatting.
+
+    Parameters
+    ----------
+    event_data : dict
+        The event as produced by a scraper.
+
+    Returns
+    -------
+    str
+        A 64-character SHA-256 hex digest.
+
+    Examples
+    --------
+    >>> compute_content_hash({"title": "Queer Talk", "location": "Keefe 213"})
+    '5b0b6c...'
+    """
+    source_fields = {
+        key: _normalize(value)
+        for key, value in event_data.items()
+        if key not in DERIVED_FIELDS
+    }
+    payload = json.dumps(
+        source_fields, sort_keys=True, ensure_ascii=False, default=str
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def load_known_hashes(content_hashes):
+    """
+    Find which fingerprints of a batch are already stored.
+
+    The lookup is keyed on the indexed `content_hash` column rather than on
+    event ids, since calendar and email ids are not stable across runs.
+
+    Parameters
+    ----------
+    content_hashes : iterable of str
+        Fingerprints of the events in the batch.
+
+    Returns
+    -------
+    set of str
+        The fingerprints that already exist in the database. If the lookup
+        fails, an empty set is returned so that every event is treated as
+        changed.
+
+    Examples
+    --------
+    >>> load_known_hashes(["5b0b6c...", "9f2e4a..."])
+    {'5b0b6c...'}
+    """
+    content_hashes = list(dict.fromkeys(content_hashes))
+    known_hashes = set()
+    try:
+        for start in range(0, len(content_hashes), HASH_QUERY_CHUNK_SIZE):
+            chunk = content_hashes[start : start + HASH_QUERY_CHUNK_SIZE]
+            known_hashes.update(
+                Event.objects.filter(content_hash__in=chunk).values_list(
+                    "content_hash", flat=True
+                )
+            )
+    except Exception as e:
+        logger.error(f"Error loading stored content hashes: {e}")
+        return set()
+    return known_hashes
+
+
+def event_source(event_id):
+    """
+    Name the source an event id belongs to.
+
+    Parameters
+    ----------
+    event_id : int
+        The event id.
+
+    Returns
+    -------
+    str
+        ``"hub"``, ``"email"`` or ``"calendar"``, or ``"other"`` for ids
+        outside the source ranges.
+
+    Examples
+    --------
+    >>> event_source(796602952)
+    'calendar'
+    """
+    for source, base in (
+        ("hub", HUB_ID_BASE),
+        ("email", EMAIL_ID_BASE),
+        ("calendar", CALENDAR_ID_BASE),
+    ):
+        if base <= event_id < base + ID_RANGE:
+            return source
+    return "other"
+
+
+def stable_event_id(base, title, start_time):
+    """
+    Derive an event id from the event's title and start time.
+
+    The id is a BLAKE2b digest of the whitespace-normalized, case-folded
+    title and the UTC start time, reduced into the source's id range. Unlike
+    `hash()`, it is the same in every process, so re-scraping an event
+    updates its row instead of adding a new one.
+
+    Parameters
+    ----------
+    base : int
+        First id of the source's range, e.g. `CALENDAR_ID_BASE`.
+    title : str
+        The event title.
+    start_time : datetime or None
+        The timezone-aware start time.
+
+    Returns
+    -------
+    int
+        An id in `[base, base + ID_RANGE)`.
+
+    Examples
+    --------
+    >>> stable_event_id(
+    ...     CALENDAR_ID_BASE,
+    ...     "Queer Talk",
+    ...     datetime(2024, 11, 7, 20, 0, tzinfo=timezone.utc),
+    ... )
+    796602952
+    """
+    start = (
+        start_time.astimezone(timezone.utc).isoformat() if start_time else ""
+    )
+    key = f"{_normalize(title or '').casefold()}|{start}"
+    digest = hashlib.blake2b(key.encode("utf-8"), digest_size=8).digest()
+    return base + int.from_bytes(digest, "big") % ID_RANGE
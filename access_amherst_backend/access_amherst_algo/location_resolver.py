@@ -0,0 +1,291 @@
+import hashlib
+import json
+import logging
+import random
+import re
+from functools import lru_cache
+
+from access_amherst_algo.models import ResolvedLocation
+
+logger = logging.getLogger(__name__)
+
+# Location buckets with keywords as keys and dictionaries containing full
+# names, latitude, and longitude as values. Keywords are matched in this
+# order: when several occur in a location, the first one listed wins.
+LOCATION_BUCKETS = {
+    "Keefe": {
+        "name": "Keefe Campus Center",
+        "latitude": 42.37141504481807,
+        "longitude": -72.51479991450528,
+    },
+    "Queer": {
+        "name": "Keefe Campus Center",
+        "latitude": 42.37141504481807,
+        "longitude": -72.51479991450528,
+    },
+    "Multicultural": {
+        "name": "Keefe Campus Center",
+        "latitude": 42.37141504481807,
+        "longitude": -72.51479991450528,
+    },
+    "Friedmann": {
+        "name": "Keefe Campus Center",
+        "latitude": 42.37141504481807,
+        "longitude": -72.51479991450528,
+    },
+    "Ford": {
+        "name": "Ford Hall",
+        "latitude": 42.36923506234738,
+        "longitude": -72.51529130962976,
+    },
+    "SCCE": {
+        "name": "Science Center",
+        "latitude": 42.37105378715133,
+        "longitude": -72.51334790776447,
+    },
+    "Science Center": {
+        "name": "Science Center",
+        "latitude": 42.37105378715133,
+        "longitude": -72.51334790776447,
+    },
+    "Chapin": {
+        "name": "Chapin Hall",
+        "latitude": 42.371771820543486,
+        "longitude": -72.51572746604714,
+    },
+    "Gym": {
+        "name": "Alumni Gymnasium",
+        "latitude": 42.368819594097864,
+        "longitude": -72.5188658145099,
+    },
+    "Cage": {
+        "name": "Alumni Gymnasium",
+        "latitude": 42.368819594097864,
+        "longitude": -72.5188658145099,
+    },
+    "Lefrak": {
+        "name": "Alumni Gymnasium",
+        "latitude": 42.368819594097864,
+        "longitude": -72.5188658145099,
+    },
+    "Middleton Gym": {
+        "name": "Alumni Gym",
+        "latitude": 42.368819594097864,
+        "longitude": -72.5188658145099,
+    },
+    "Frost": {
+        "name": "Frost Library",
+        "latitude": 42.37183195277655,
+        "longitude": -72.51699336789369,
+    },
+    "Paino": {
+        "name": "Beneski Museum of Natural History",
+        "latitude": 42.37209277500926,
+        "longitude": -72.51422459549485,
+    },
+    "Powerhouse": {
+        "name": "Powerhouse",
+        "latitude": 42.372109655195466,
+        "longitude": -72.51309270030836,
+    },
+    "Converse": {
+        "name": "Converse Hall",
+        "latitude": 42.37243680844771,
+        "longitude": -72.518433147017,
+    },
+    "Assembly Room": {
+        "name": "Converse Hall",
+        "latitude": 42.37243680844771,
+        "longitude": -72.518433147017,
+    },
+    "Red Room": {
+        "name": "Converse Hall",
+        "latitude": 42.37243680844771,
+        "longitude": -72.518433147017,
+    },
+}
+
+# All keywords compiled once into a single pattern. Each keyword has its own
+# group, in priority order, inside a lookahead so that matches may overlap:
+# at any position the earliest-listed keyword that matches there is reported.
+_LOCATION_RE = re.compile(
+    r"(?=\b(?:"
+    + "|".join(f"({re.escape(keyword)})" for keyword in LOCATION_BUCKETS)
+    + r")\b)",
+    re.IGNORECASE,
+)
+_BUCKETS = list(LOCATION_BUCKETS.values())
+
+# Fingerprint of the table, stored with persisted resolutions so that they
+# are redone whenever the buckets change
+LOCATION_TABLE_VERSION = hashlib.blake2b(
+    json.dumps(LOCATION_BUCKETS, sort_keys=True).encode("utf-8"),
+    digest_size=8,
+).hexdigest()
+
+# Maximum coordinate offset, in degrees, applied to separate map markers
+JITTER_RANGE = 0.00015
+
+
+@lru_cache(maxsize=4096)
+def resolve_location(location):
+    """
+    Resolve a raw location string to a building name and coordinates.
+
+    The location is scanned once for all keywords in `LOCATION_BUCKETS`.
+    As with checking the keywords one by one, the match for the earliest
+    listed keyword wins, wherever it occurs in the string. Results are
+    memoized on the raw location string.
+
+    Parameters
+    ----------
+    location : str or None
+        The location description.
+
+    Returns
+    -------
+    tuple
+        A tuple containing:
+        - `name` (str): The building name, or "Other" if no keyword matched.
+        - `latitude` (float or None): The building's latitude.
+        - `longitude` (float or None): The building's longitude.
+
+    Examples
+    --------
+    >>> resolve_location("Friedmann Room")
+    ('Keefe Campus Center', 42.37141504481807, -72.51479991450528)
+    >>> resolve_location("Unknown Location")
+    ('Other', None, None)
+    """
+    if not isinstance(location, str):
+        return "Other", None, None
+
+    best = None
+    for match in _LOCATION_RE.finditer(location):
+        index = match.lastindex - 1
+        if best is None or index < best:
+            best = index
+            if best == 0:
+                break
+
+    if best is None:
+        return "Other", None, None
+    info = _BUCKETS[best]
+    return info["name"], info["latitude"], info["longitude"]
+
+
+@lru_cache(maxsize=1)
+def _load_resolved_locations():
+    """Load every persisted resolution for the current table, once."""
+    return {
+        row.raw_location: (row.name, row.latitude, row.longitude)
+        for row in ResolvedLocation.objects.filter(
+            table_version=LOCATION_TABLE_VERSION
+        )
+    }
+
+
+def lookup_location(location):
+    """
+    Resolve a location through the persistent `ResolvedLocation` cache.
+
+    All resolutions for the current location table are loaded with one
+    query the first time this is called. Locations that have not been seen
+    before are resolved with `resolve_location()` and stored. If the
+    database is unavailable, the location is resolved in memory.
+
+    Parameters
+    ----------
+    location : str or None
+        The raw location description.
+
+    Returns
+    -------
+    tuple
+        `(name, latitude, longitude)`, as returned by `resolve_location()`.
+
+    Examples
+    --------
+    >>> lookup_location("Queer Resource Center (Keefe 213)")
+    ('Keefe Campus Center', 42.37141504481807, -72.51479991450528)
+    """
+    if not isinstance(location, str) or not location:
+        return resolve_location(location)
+
+    try:
+        resolved = _load_resolved_locations()
+        if location in resolved:
+            return resolved[location]
+
+        name, lat, lng = resolve_location(location)
+        ResolvedLocation.objects.update_or_create(
+            raw_location=location,
+            defaults={
+                "name": name,
+                "latitude": lat,
+                "longitude": lng,
+                "table_version": LOCATION_TABLE_VERSION,
+            },
+        )
+        resolved[location] = (name, lat, lng)
+        return name, lat, lng
+    except Exception as e:
+        logger.error(f"Error using resolved location cache: {e}")
+        return resolve_location(location)
+
+
+def clear_location_cache():
+    """
+    Drop the in-process copies of resolved locations.
+
+    Examples
+    --------
+    >>> clear_location_cache()
+    """
+    resolve_location.cache_clear()
+    _load_resolved_locations.cache_clear()
+
+
+def jitter_coordinates(lat, lng, seed=None):
+    """
+    Offset coordinates slightly so that events in one building do not overlap.
+
+    With a `seed` (normally the event id), the offset is derived from a hash
+    of the seed, so the same event always lands on the same point and
+    re-ingesting it produces identical rows and map output. Without one, a
+    random offset is used.
+
+    Parameters
+    ----------
+    lat : float
+        The base latitude.
+    lng : float
+        The base longitude.
+    seed : int or str, optional
+        Value the offset is derived from.
+
+    Returns
+    -------
+    tuple
+        The offset `(lat, lng)`, each within `JITTER_RANGE` of the input.
+
+    Examples
+    --------
+    >>> jitter_coordinates(42.37141504481807, -72.51479991450528, seed=510538770)
+    (42.37138489684431, -72.51494259306966)
+    """
+    if seed is None:
+        return (
+            lat + random.uniform(-JITTER_RANGE, JITTER_RANGE),
+            lng + random.uniform(-JITTER_RANGE, JITTER_RANGE),
+        )
+
+    digest = hashlib.blake2b(
+        str(seed).encode("utf-8"), digest_size=16
+    ).digest()
+    lat_fraction = int.from_bytes(digest[:8], "big") / 2**64
+    lng_fraction = int.from_bytes(digest[8:], "big") / 2**64
+    return (
+        lat + (2 * lat_fraction - 1) * JITTER_RANGE,
+        lng + (2 * lng_fraction - 1) * JITTER_RANGE,
+    )
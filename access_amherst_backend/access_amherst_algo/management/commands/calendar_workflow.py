@@ -1,20 +1,63 @@
 import os
 import shutil
+from datetime import timedelta
 from django.core.management.base import BaseCommand
-from access_amherst_algo.calendar_scraper.calendar_parser import scrape_all_pages, save_to_json
+from django.utils import timezone
+from access_amherst_algo.calendar_scraper.calendar_parser import (
+    DEFAULT_WORKERS,
+    scrape_all_pages_concurrent,
+    save_to_json,
+)
 from access_amherst_algo.calendar_scraper.calendar_saver import process_calendar_events
+from access_amherst_algo.calendar_scraper.page_cache import PageCache
 
 
 class Command(BaseCommand):
     help = "Scrapes calendar events and saves them to the database"
 
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--workers",
+            type=int,
+            default=DEFAULT_WORKERS,
+            help="Number of calendar pages fetched at once",
+        )
+        parser.add_argument(
+            "--no-cache",
+            action="store_true",
+            help="Re-download and re-parse every page instead of reusing "
+            "cached responses for unchanged pages",
+        )
+        parser.add_argument(
+            "--horizon-days",
+            type=int,
+            default=None,
+            help="Stop at the first page whose events all start more than "
+            "this many days from now",
+        )
+        parser.add_argument(
+            "--incremental",
+            action="store_true",
+            help="Stop at the first page whose events are all already "
+            "stored unchanged",
+        )
+
     def handle(self, *args, **kwargs):
         json_dir = "access_amherst_algo/calendar_scraper/calendar_json_outputs"
 
         try:
             # Scrape the calendar events and save them to JSON files
             self.stdout.write("Scraping calendar events...")
-            events = scrape_all_pages()
+            cache = None if kwargs.get("no_cache") else PageCache()
+            horizon = None
+            if kwargs.get("horizon_days") is not None:
+                horizon = timezone.now() + timedelta(days=kwargs["horizon_days"])
+            events = scrape_all_pages_concurrent(
+                workers=kwargs.get("workers", DEFAULT_WORKERS),
+                cache=cache,
+                horizon=horizon,
+                incremental=kwargs.get("incremental", False),
+            )
             self.stdout.write(self.style.SUCCESS("Successfully scraped calendar events."))
 
             # Save to json
@@ -24,10 +67,15 @@ class Command(BaseCommand):
 
             # Process the JSON files and save events to the database
             self.stdout.write("Processing calendar events...")
-            process_calendar_events()
+            counts = process_calendar_events()
             self.stdout.write(
                 self.style.SUCCESS("Successfully processed calendar events and saved to the database.")
             )
+            self.stdout.write(
+                f"{counts['changed']} changed, {counts['unchanged']} "
+                f"unchanged, {counts['duplicate']} duplicate events "
+                f"({counts['cross_source']} merged across sources)."
+            )
 
         except Exception as e:
             self.stdout.write(self.style.ERROR(f"An error occurred: {str(e)}"))
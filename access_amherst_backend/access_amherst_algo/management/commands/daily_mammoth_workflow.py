@@ -0,0 +1,101 @@
+import fcntl
+import os
+import tempfile
+import time
+from django.core.management.base import BaseCommand
+from access_amherst_algo.email_scraper.digest_fetcher import (
+    DIGEST_SUBJECT,
+    fetch_new_digests,
+    mark_processed,
+)
+from access_amherst_algo.email_scraper.email_parser import (
+    extract_digest_events,
+)
+from access_amherst_algo.email_scraper.email_saver import (
+    bulk_upsert_events,
+    dedupe_email_events,
+)
+
+# Held while a run is in progress, so that overlapping runs skip
+LOCK_PATH = os.path.join(tempfile.gettempdir(), "daily_mammoth_workflow.lock")
+
+
+class Command(BaseCommand):
+    help = "Fetches new Daily Mammoth digests and saves their events into DB"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--subject",
+            default=DIGEST_SUBJECT,
+            help="Text the subject of the digest emails contains",
+        )
+
+    def handle(self, *args, **options):
+        with open(LOCK_PATH, "a") as lock_file:
+            try:
+                fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                self.stdout.write(
+                    "Another Daily Mammoth run is in progress; skipping."
+                )
+                return
+            try:
+                self._run(options.get("subject", DIGEST_SUBJECT))
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def _run(self, subject):
+        # Each stage hands its results to the next in memory; only the
+        # mailbox's high-water mark is persisted between runs
+        timings = {}
+        try:
+            started = time.perf_counter()
+            digests = fetch_new_digests(os.getenv("EMAIL_PASSWORD"), subject)
+            timings["fetch"] = time.perf_counter() - started
+            if not digests:
+                self.stdout.write(
+                    self.style.SUCCESS("No new digests; nothing to do.")
+                )
+                self._write_timings(timings)
+                return
+
+            started = time.perf_counter()
+            events, handled = extract_digest_events(digests)
+            timings["extract"] = time.perf_counter() - started
+
+            started = time.perf_counter()
+            new_events, counts, replaced_ids = dedupe_email_events(events)
+            timings["dedupe"] = time.perf_counter() - started
+
+            started = time.perf_counter()
+            bulk_upsert_events(new_events, replaced_ids)
+            timings["upsert"] = time.perf_counter() - started
+
+            # Only once the events are stored may the digests be skipped
+            for digest in handled:
+                mark_processed(digest)
+
+            self.stdout.write(
+                self.style.SUCCESS(
+                    f"Processed {len(handled)} of {len(digests)} new "
+                    "digest(s) and saved their events to the database."
+                )
+            )
+            self.stdout.write(
+                f"{counts['changed']} changed, {counts['unchanged']} "
+                f"unchanged, {counts['duplicate']} duplicate events "
+                f"({counts['cross_source']} merged across sources)."
+            )
+            self._write_timings(timings)
+        except Exception as e:
+            self.stdout.write(self.style.ERROR(f"An error occurred: {str(e)}"))
+            # Raise the exception to signal failure
+            raise e
+
+    def _write_timings(self, timings):
+        self.stdout.write(
+            "Timings: "
+            + ", ".join(
+                f"{stage} {seconds:.2f}s" for stage, seconds in timings.items()
+            )
+        )
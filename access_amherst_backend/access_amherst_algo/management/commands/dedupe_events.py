@@ -0,0 +1,96 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from access_amherst_algo.event_dedupe import (
+    CROSS_SOURCE_THRESHOLD,
+    SCAN_CHUNK_SIZE,
+    find_duplicate_clusters,
+)
+from access_amherst_algo.event_fingerprint import event_source
+from access_amherst_algo.models import Event
+
+# Number of ids per delete query
+DELETE_CHUNK_SIZE = 500
+
+
+class Command(BaseCommand):
+    help = (
+        "Finds near-duplicate events across the whole table and deletes all "
+        "but one row of each, preferring Hub, then calendar, then email rows"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--dry-run",
+            action="store_true",
+            help="Report the duplicates without deleting anything",
+        )
+        parser.add_argument(
+            "--threshold",
+            type=float,
+            default=CROSS_SOURCE_THRESHOLD,
+            help="Title similarity (0-1) at which events are duplicates",
+        )
+        parser.add_argument(
+            "--tolerance-minutes",
+            type=int,
+            default=60,
+            help="Largest start time difference between sources, in minutes",
+        )
+
+    def handle(self, *args, **options):
+        dry_run = options.get("dry_run", False)
+        rows = (
+            Event.objects.exclude(start_time=None)
+            .order_by("start_time", "id")
+            .values_list("id", "title", "start_time", "pub_date")
+            .iterator(chunk_size=SCAN_CHUNK_SIZE)
+        )
+        clusters = find_duplicate_clusters(
+            rows,
+            threshold=options.get("threshold", CROSS_SOURCE_THRESHOLD),
+            time_tolerance=timedelta(
+                minutes=options.get("tolerance_minutes", 60)
+            ),
+        )
+
+        duplicate_ids = []
+        for keep, *duplicates in clusters:
+            self.stdout.write(self._describe("Keeping", keep))
+            for duplicate in duplicates:
+                self.stdout.write(
+                    self.style.WARNING(self._describe("  Merging", duplicate))
+                )
+                duplicate_ids.append(duplicate[0])
+
+        if dry_run:
+            self.stdout.write(
+                self.style.SUCCESS(
+                    f"Dry run: would delete {len(duplicate_ids)} duplicate "
+                    f"event(s) in {len(clusters)} cluster(s)."
+                )
+            )
+            return
+
+        deleted_count = 0
+        with transaction.atomic():
+            for start in range(0, len(duplicate_ids), DELETE_CHUNK_SIZE):
+                chunk = duplicate_ids[start : start + DELETE_CHUNK_SIZE]
+                deleted, _ = Event.objects.filter(id__in=chunk).delete()
+                deleted_count += deleted
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Deleted {deleted_count} duplicate event(s) in "
+                f"{len(clusters)} cluster(s)."
+            )
+        )
+
+    @staticmethod
+    def _describe(action, row):
+        event_id, title, start_time, _ = row
+        return (
+            f"{action} event: ID={event_id} ({event_source(event_id)}), "
+            f"Name={title}, Start Time={start_time}"
+        )
@@ -1,40 +1,97 @@
 import os
 import shutil
 from django.core.management.base import BaseCommand
-from access_amherst_algo.rss_scraper.fetch_rss import fetch_rss
+from access_amherst_algo.rss_scraper.fetch_rss import (
+    fetch_rss,
+    save_feed_state,
+)
 from access_amherst_algo.rss_scraper.parse_rss import (
     create_events_list,
     save_json,
     save_to_db,
+    stream_to_db,
 )
 
 
 class Command(BaseCommand):
     help = "Fetches the RSS feed from the Amherst Hub into DB"
 
-    def handle(self, *args, **kwargs):
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--debug-json",
+            action="store_true",
+            help="Keep JSON snapshots of the parsed and cleaned events",
+        )
+        parser.add_argument(
+            "--stream",
+            action="store_true",
+            help="Stream the feed into the database in batches "
+            "(for very large feeds; no JSON snapshots are written)",
+        )
+        parser.add_argument(
+            "--workers",
+            type=int,
+            default=None,
+            help="Number of processes used to parse event descriptions",
+        )
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=100,
+            help="Number of events saved per batch in --stream mode",
+        )
+
+    def handle(self, *args, **options):
         rss_dir = "access_amherst_algo/rss_scraper/rss_files"
         json_dir = "access_amherst_algo/rss_scraper/cleaned_json_outputs"
+        debug_json = options.get("debug_json", False)
 
         try:
-            # Perform the RSS fetch and saving to DB
-            fetch_rss()
-            create_events_list()
-            save_json()
-            save_to_db()
+            # Fetch the feed (skipping the run if it is unchanged) and parse
+            # it once; the parsed events flow through cleaning, dedupe and
+            # saving in memory
+            validators = fetch_rss()
+            if not validators:
+                self.stdout.write(
+                    self.style.SUCCESS(
+                        "RSS feed unchanged since the last run; nothing to do."
+                    )
+                )
+                return
+
+            if options.get("stream"):
+                counts = stream_to_db(
+                    batch_size=options.get("batch_size", 100)
+                )
+            else:
+                events_list = create_events_list(
+                    workers=options.get("workers")
+                )
+                if debug_json:
+                    save_json(events_list)
+                counts = save_to_db(events_list, write_json=debug_json)
+
+            # Only once the events are saved may this feed version be skipped
+            save_feed_state(validators)
 
             self.stdout.write(
                 self.style.SUCCESS(
                     "Successfully fetched the RSS feed and saved to the database."
                 )
             )
+            self.stdout.write(
+                f"{counts['changed']} changed, {counts['unchanged']} "
+                f"unchanged, {counts['duplicate']} duplicate events "
+                f"({counts['cross_source']} merged across sources)."
+            )
 
             # Clear directories
             self._clear_directory(rss_dir)
-            self._clear_directory(json_dir)
-            self._clear_directory(
-                "access_amherst_algo/rss_scraper/json_outputs"
-            )
+            if not debug_json:
+                self._clear_directory(json_dir)
+                self._clear_directory(
+                    "access_amherst_algo/rss_scraper/json_outputs"
+                )
 
             self.stdout.write(
                 self.style.SUCCESS("Successfully cleaned up files.")
@@ -0,0 +1,44 @@
+# Generated by Django 5.1.7 on 2026-10-19 15:57
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        (
+            "access_amherst_algo",
+            "0007_alter_event_end_time_alter_event_host_and_more",
+        ),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="FeedState",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("url", models.URLField(max_length=500, unique=True)),
+                (
+                    "etag",
+                    models.CharField(blank=True, max_length=255, null=True),
+                ),
+                (
+                    "last_modified",
+                    models.CharField(blank=True, max_length=255, null=True),
+                ),
+                (
+                    "content_hash",
+                    models.CharField(blank=True, max_length=64, null=True),
+                ),
+                ("updated_at", models.DateTimeField(auto_now=True)),
+            ],
+        ),
+    ]
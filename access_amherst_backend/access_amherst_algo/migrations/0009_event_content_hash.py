@@ -0,0 +1,20 @@
+# Generated by Django 5.1.7 on 2026-10-19 15:59
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("access_amherst_algo", "0008_feedstate"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="event",
+            name="content_hash",
+            field=models.CharField(
+                blank=True, db_index=True, max_length=64, null=True
+            ),
+        ),
+    ]
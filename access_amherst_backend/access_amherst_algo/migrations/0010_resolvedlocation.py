@@ -0,0 +1,36 @@
+# Generated by Django 5.1.7 on 2026-10-19 16:08
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("access_amherst_algo", "0009_event_content_hash"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="ResolvedLocation",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "raw_location",
+                    models.CharField(max_length=500, unique=True),
+                ),
+                ("name", models.CharField(max_length=255)),
+                ("latitude", models.FloatField(blank=True, null=True)),
+                ("longitude", models.FloatField(blank=True, null=True)),
+                ("table_version", models.CharField(max_length=16)),
+                ("updated_at", models.DateTimeField(auto_now=True)),
+            ],
+        ),
+    ]
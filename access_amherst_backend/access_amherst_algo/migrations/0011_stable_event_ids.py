@@ -0,0 +1,69 @@
+# Re-keys email and calendar events from salted hash() ids to the stable
+# ids of `event_fingerprint.stable_event_id`, collapsing rows that were
+# saved under a different id on each run.
+
+import hashlib
+from collections import defaultdict
+from datetime import datetime, timezone
+
+from django.db import migrations
+
+EMAIL_ID_BASE = 600_000_000
+CALENDAR_ID_BASE = 700_000_000
+ID_RANGE = 100_000_000
+
+
+def stable_event_id(base, title, start_time):
+    # Frozen copy of `event_fingerprint.stable_event_id`
+    start = (
+        start_time.astimezone(timezone.utc).isoformat() if start_time else ""
+    )
+    key = f"{' '.join((title or '').split()).casefold()}|{start}"
+    digest = hashlib.blake2b(key.encode("utf-8"), digest_size=8).digest()
+    return base + int.from_bytes(digest, "big") % ID_RANGE
+
+
+def collapse_duplicate_events(apps, schema_editor):
+    Event = apps.get_model("access_amherst_algo", "Event")
+
+    groups = defaultdict(list)
+    for event in Event.objects.filter(
+        id__gte=EMAIL_ID_BASE, id__lt=CALENDAR_ID_BASE + ID_RANGE
+    ):
+        base = (
+            EMAIL_ID_BASE if event.id < CALENDAR_ID_BASE else CALENDAR_ID_BASE
+        )
+        groups[stable_event_id(base, event.title, event.start_time)].append(
+            event
+        )
+
+    oldest = datetime.min.replace(tzinfo=timezone.utc)
+    rekeyed = []
+    for new_id, events in groups.items():
+        # Keep the most recently published copy
+        keep = max(
+            events, key=lambda event: (event.pub_date or oldest, event.id)
+        )
+        if len(events) == 1 and keep.id == new_id:
+            continue
+        Event.objects.filter(id__in=[event.id for event in events]).delete()
+        keep.id = new_id
+        # Saved coordinates were jittered with the old id; clearing the
+        # fingerprint makes the next scrape rewrite the row
+        keep.content_hash = None
+        rekeyed.append(keep)
+
+    Event.objects.bulk_create(rekeyed)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("access_amherst_algo", "0010_resolvedlocation"),
+    ]
+
+    operations = [
+        migrations.RunPython(
+            collapse_duplicate_events, migrations.RunPython.noop
+        ),
+    ]
@@ -0,0 +1,70 @@
+# Adds the normalized title and dedupe key columns and fills them for the
+# events already stored.
+
+import hashlib
+import re
+
+from django.db import migrations, models
+
+DEDUPE_KEY_BUCKET_SECONDS = 15 * 60
+BATCH_SIZE = 500
+
+
+def preprocess_title(title):
+    # Frozen copy of `event_dedupe.preprocess_title`
+    if not isinstance(title, str):
+        return ""
+    return " ".join(re.sub(r"[^\w\s]", "", title.lower()).split())
+
+
+def compute_dedupe_key(normalized_title, start_time):
+    # Frozen copy of `event_dedupe.compute_dedupe_key`
+    if not normalized_title or start_time is None:
+        return None
+    bucket = int(start_time.timestamp()) // DEDUPE_KEY_BUCKET_SECONDS
+    key = f"{normalized_title}|{bucket}"
+    return hashlib.blake2b(key.encode("utf-8"), digest_size=16).hexdigest()
+
+
+def fill_dedupe_keys(apps, schema_editor):
+    Event = apps.get_model("access_amherst_algo", "Event")
+
+    batch = []
+    for event in Event.objects.only("id", "title", "start_time").iterator(
+        chunk_size=BATCH_SIZE
+    ):
+        event.normalized_title = preprocess_title(event.title)
+        event.dedupe_key = compute_dedupe_key(
+            event.normalized_title, event.start_time
+        )
+        batch.append(event)
+        if len(batch) >= BATCH_SIZE:
+            Event.objects.bulk_update(
+                batch, ["normalized_title", "dedupe_key"]
+            )
+            batch = []
+    if batch:
+        Event.objects.bulk_update(batch, ["normalized_title", "dedupe_key"])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("access_amherst_algo", "0011_stable_event_ids"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="event",
+            name="normalized_title",
+            field=models.CharField(blank=True, max_length=255, null=True),
+        ),
+        migrations.AddField(
+            model_name="event",
+            name="dedupe_key",
+            field=models.CharField(
+                blank=True, db_index=True, max_length=32, null=True
+            ),
+        ),
+        migrations.RunPython(fill_dedupe_keys, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,34 @@
+# Generated by Django 5.1.7 on 2026-10-19 16:44
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("access_amherst_algo", "0012_event_dedupe_key"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="MailboxState",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("mailbox", models.CharField(max_length=500, unique=True)),
+                (
+                    "uid_validity",
+                    models.BigIntegerField(blank=True, null=True),
+                ),
+                ("last_uid", models.BigIntegerField(default=0)),
+                ("updated_at", models.DateTimeField(auto_now=True)),
+            ],
+        ),
+    ]
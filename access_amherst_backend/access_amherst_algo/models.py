@@ -42,6 +42,15 @@ class Event(models.Model):
         The longitude of the event location.
     map_location : str, optional
         A textual description of the location on a map.
+    content_hash : str, optional
+        A fingerprint of the source fields the event was last saved from,
+        used to skip rewriting unchanged events.
+    normalized_title : str, optional
+        The title as compared by duplicate detection: lowercased, without
+        punctuation and with collapsed whitespace.
+    dedupe_key : str, optional
+        A digest of the normalized title and the start time rounded to a
+        bucket, shared by exact duplicates.
 
     Methods
     -------
@@ -70,6 +79,13 @@ class Event(models.Model):
     latitude = models.FloatField(null=True, blank=True)
     longitude = models.FloatField(null=True, blank=True)
     map_location = models.CharField(max_length=500, null=True)
+    content_hash = models.CharField(
+        max_length=64, null=True, blank=True, db_index=True
+    )
+    normalized_title = models.CharField(max_length=255, null=True, blank=True)
+    dedupe_key = models.CharField(
+        max_length=32, null=True, blank=True, db_index=True
+    )
     
     CATEGORY_EMOJI_MAP = {
         'Social': '👥',  # Two people
@@ -97,3 +113,102 @@ class Event(models.Model):
 
     def __str__(self):
         return self.title
+
+
+class FeedState(models.Model):
+    """
+    HTTP cache validators for a fetched feed, used to make conditional requests.
+
+    Parameters
+    ----------
+    url : str
+        The URL of the feed (unique).
+    etag : str, optional
+        The `ETag` header returned by the last successful fetch.
+    last_modified : str, optional
+        The `Last-Modified` header returned by the last successful fetch.
+    content_hash : str, optional
+        SHA-256 hex digest of the last fetched response body.
+    updated_at : datetime
+        When the state was last refreshed.
+
+    Methods
+    -------
+    __str__() :
+        Returns the feed URL.
+    """
+    url = models.URLField(max_length=500, unique=True)
+    etag = models.CharField(max_length=255, null=True, blank=True)
+    last_modified = models.CharField(max_length=255, null=True, blank=True)
+    content_hash = models.CharField(max_length=64, null=True, blank=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return self.url
+
+
+class MailboxState(models.Model):
+    """
+    High-water mark of the digest emails already processed from a mailbox.
+
+    Parameters
+    ----------
+    mailbox : str
+        The account, server, folder and subject filter the state is for
+        (unique).
+    uid_validity : int, optional
+        The folder's `UIDVALIDITY`. UIDs from a different value are not
+        comparable, so the mark is reset when it changes.
+    last_uid : int
+        UID of the last message processed.
+    updated_at : datetime
+        When the state was last advanced.
+
+    Methods
+    -------
+    __str__() :
+        Returns the mailbox and its last UID.
+    """
+    mailbox = models.CharField(max_length=500, unique=True)
+    uid_validity = models.BigIntegerField(null=True, blank=True)
+    last_uid = models.BigIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.mailbox} @ {self.last_uid}"
+
+
+class ResolvedLocation(models.Model):
+    """
+    Cached resolution of a raw location string to a building.
+
+    Parameters
+    ----------
+    raw_location : str
+        The location string as it appears in the source (unique).
+    name : str
+        The resolved building name, or "Other".
+    latitude : float, optional
+        The building's base latitude, before any per-event jitter.
+    longitude : float, optional
+        The building's base longitude, before any per-event jitter.
+    table_version : str
+        Fingerprint of the location table the row was resolved with. Rows
+        from an older table are resolved again.
+    updated_at : datetime
+        When the row was last resolved.
+
+    Methods
+    -------
+    __str__() :
+        Returns the raw location and its building name.
+    """
+    raw_location = models.CharField(max_length=500, unique=True)
+    name = models.CharField(max_length=255)
+    latitude = models.FloatField(null=True, blank=True)
+    longitude = models.FloatField(null=True, blank=True)
+    table_version = models.CharField(max_length=16)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.raw_location} -> {self.name}"
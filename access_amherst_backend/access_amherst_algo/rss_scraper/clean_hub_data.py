@@ -5,7 +5,7 @@ import re
 import os
 
 
-def clean_hub_data(events_list=None):
+def clean_hub_data(events_list=None, write_json=True):
     """
     Clean and preprocess a list of data from events.
 
@@ -13,7 +13,7 @@ def clean_hub_data(events_list=None):
     - Removes events that are marked as "Cancelled" in the title.
     - Splits the author information into separate `author_name` and `author_email` fields.
     - Assigns a unique ID to each event based on its link.
-    - Saves the cleaned event data to a timestamped JSON file for later use.
+    - Optionally saves the cleaned event data to a timestamped JSON file for later use.
 
     If no `events_list` is provided, the function will create one by calling `create_events_list()`.
 
@@ -22,6 +22,8 @@ def clean_hub_data(events_list=None):
     events_list : list of dict, optional
         A list of events to be cleaned. If not provided, the function will generate 
         the list using `create_events_list()`.
+    write_json : bool, default True
+        Whether to save the cleaned events to a timestamped JSON file.
 
     Returns
     -------
@@ -38,31 +40,10 @@ def clean_hub_data(events_list=None):
     if events_list is None:
         events_list = create_events_list()
 
-    cleaned_events = []
-    for event in events_list:
-        # Remove cancelled events
-        if "Cancelled" in event["title"]:
-            continue
-
-        # Split author into name and email
-        if event["author"] is not None:
-            author_email, author_name = event["author"].split(" (", 1)
-            author_name = author_name[
-                :-1
-            ]  # Remove the last character which is ')'
-            event["author_name"] = author_name
-            event["author_email"] = author_email
-            del event["author"]
-        else:
-            event["author_name"] = None
-            event["author_email"] = None
-
-        # Generate unique event ID
-        event["id"] = (
-            int(re.search(r"/(\d+)$", event["link"]).group(1)) + 500_000_000
-        )
-
-        cleaned_events.append(event)
+    cleaned_events = list(iter_cleaned_events(events_list))
+
+    if not write_json:
+        return cleaned_events
 
     # Define the directory and output file name
     directory = "access_amherst_algo/rss_scraper/cleaned_json_outputs"
@@ -74,3 +55,78 @@ def clean_hub_data(events_list=None):
         json.dump(cleaned_events, f, indent=4)
 
     return cleaned_events
+
+
+def clean_event(event):
+    """
+    Clean a single event extracted from the RSS feed.
+
+    Parameters
+    ----------
+    event : dict
+        An event as returned by `extract_event_details()`. It is updated in
+        place.
+
+    Returns
+    -------
+    dict or None
+        The cleaned event, or None if the event is cancelled.
+
+    Examples
+    --------
+    >>> event = clean_event({
+    ...     "title": "Queer Talk",
+    ...     "author": None,
+    ...     "link": "https://thehub.amherst.edu/event/10538770",
+    ... })
+    >>> event["id"]
+    510538770
+    """
+    # Remove cancelled events
+    if "Cancelled" in event["title"]:
+        return None
+
+    # Split author into name and email
+    if event["author"] is not None:
+        author_email, author_name = event["author"].split(" (", 1)
+        author_name = author_name[
+            :-1
+        ]  # Remove the last character which is ')'
+        event["author_name"] = author_name
+        event["author_email"] = author_email
+        del event["author"]
+    else:
+        event["author_name"] = None
+        event["author_email"] = None
+
+    # Generate unique event ID
+    event["id"] = (
+        int(re.search(r"/(\d+)$", event["link"]).group(1)) + 500_000_000
+    )
+
+    return event
+
+
+def iter_cleaned_events(events):
+    """
+    Lazily clean a stream of events, dropping cancelled ones.
+
+    Parameters
+    ----------
+    events : iterable of dict
+        Events as returned by `extract_event_details()`, for example from the
+        `iter_events()` generator.
+
+    Yields
+    ------
+    dict
+        Cleaned events.
+
+    Examples
+    --------
+    >>> cleaned = iter_cleaned_events(iter_events())
+    """
+    for event in events:
+        cleaned_event = clean_event(event)
+        if cleaned_event is not None:
+            yield cleaned_event
@@ -0,0 +1,300 @@
+import logging
+import re
+from concurrent.futures import ProcessPoolExecutor
+from html.entities import name2codepoint
+from html.parser import HTMLParser
+
+from bs4 import BeautifulSoup
+
+logger = logging.getLogger(__name__)
+
+DESCRIPTION_CLASS = "p-description description"
+
+# Below this many descriptions, starting worker processes costs more than
+# it saves
+MIN_PARALLEL_DESCRIPTIONS = 50
+
+# fmt: off
+# Tags BeautifulSoup serializes as `<tag/>`
+VOID_TAGS = {
+    "area", "base", "basefont", "bgsound", "br", "col", "command", "embed",
+    "frame", "hr", "image", "img", "input", "isindex", "keygen", "link",
+    "menuitem", "meta", "nextid", "param", "source", "spacer", "track", "wbr",
+}
+
+# Tags whose text BeautifulSoup keeps verbatim or does not escape
+UNSUPPORTED_TAGS = {"pre", "script", "style", "template", "textarea"}
+
+# Attributes BeautifulSoup splits on whitespace and re-joins with one space
+MULTI_VALUED_ATTRIBUTES = {
+    "class", "accesskey", "dropzone", "rel", "rev", "headers",
+    "accept-charset", "archive", "sizes", "sandbox", "for",
+}
+# fmt: on
+
+# Named entities that BeautifulSoup and the HTML 4 table decode identically
+NAMED_ENTITIES = {
+    name: chr(codepoint)
+    for name, codepoint in name2codepoint.items()
+    if name not in ("lang", "rang")
+}
+
+ASCII_SPACES = "\x20\x0a\x09\x0c\x0d"
+ESCAPE_RE = re.compile("[&<>]")
+ESCAPES = {"&": "&amp;", "<": "&lt;", ">": "&gt;"}
+
+
+class _Irregular(Exception):
+    """Raised when markup needs BeautifulSoup's full tree building."""
+
+
+class _Found(Exception):
+    """Raised to stop parsing once the description div is closed."""
+
+
+def _escape(text):
+    return ESCAPE_RE.sub(lambda match: ESCAPES[match.group()], text)
+
+
+class _DescriptionExtractor(HTMLParser):
+    """
+    Serialize the contents of the description div without building a tree.
+
+    The parser sees exactly the token stream BeautifulSoup's `html.parser`
+    builder sees, and re-emits it with BeautifulSoup's formatting. Markup
+    where the tree builder would repair or reinterpret something (mismatched
+    end tags, comments, ambiguous entities, ...) raises `_Irregular` so the
+    caller can fall back to BeautifulSoup.
+    """
+
+    def __init__(self):
+        super().__init__(convert_charrefs=False)
+        self.stack = []
+        self.capture_depth = None
+        self.pieces = []
+        self.data = []
+        # Void tags opened without `/>`; BeautifulSoup treats a later `<tag/>`
+        # of the same name as the missing end tag
+        self.open_void_tags = set()
+
+    def _flush(self):
+        if not self.data:
+            return
+        text = "".join(self.data)
+        self.data = []
+        if self.capture_depth is None:
+            return
+        if not text.strip(ASCII_SPACES):
+            text = "\n" if "\n" in text else " "
+        # `str()` of a top-level string is unescaped; nested strings are
+        # escaped when their parent tag is serialized
+        if len(self.stack) > self.capture_depth:
+            text = _escape(text)
+        self.pieces.append(text)
+
+    def _format_start(self, tag, attrs, close):
+        if len({name for name, _ in attrs}) != len(attrs):
+            raise _Irregular(f"duplicate attribute in {tag}")
+        parts = ["<", tag]
+        # BeautifulSoup's default formatter sorts attributes by name
+        for name, value in sorted(attrs, key=lambda attr: attr[0]):
+            value = "" if value is None else value
+            if (
+                name in MULTI_VALUED_ATTRIBUTES
+                and " ".join(value.split()) != value
+            ):
+                raise _Irregular(f"irregular whitespace in {name}")
+            value = _escape(value)
+            if '"' in value:
+                if "'" in value:
+                    value = '"' + value.replace('"', "&quot;") + '"'
+                else:
+                    value = "'" + value + "'"
+            else:
+                value = '"' + value + '"'
+            parts.append(f" {name}={value}")
+        parts.append("/>" if close else ">")
+        return "".join(parts)
+
+    def handle_starttag(self, tag, attrs):
+        self._start(tag, attrs, self_closing=False)
+
+    def handle_startendtag(self, tag, attrs):
+        self._start(tag, attrs, self_closing=True)
+
+    def _start(self, tag, attrs, self_closing):
+        if tag in UNSUPPORTED_TAGS:
+            raise _Irregular(f"unsupported tag {tag}")
+        self._flush()
+        void = tag in VOID_TAGS
+        if void and self_closing and tag in self.open_void_tags:
+            raise _Irregular(f"ambiguous self-closing {tag}")
+        if void and not self_closing:
+            self.open_void_tags.add(tag)
+        if self.capture_depth is not None:
+            self.pieces.append(self._format_start(tag, attrs, close=void))
+            if self_closing and not void:
+                self.pieces.append(f"</{tag}>")
+        elif tag == "div" and self._is_description(attrs):
+            if self_closing:
+                raise _Irregular("self-closing description div")
+            self.capture_depth = len(self.stack) + 1
+        if not void and not self_closing:
+            self.stack.append(tag)
+
+    @staticmethod
+    def _is_description(attrs):
+        classes = [value or "" for name, value in attrs if name == "class"]
+        return bool(classes) and " ".join(classes[-1].split()) == (
+            DESCRIPTION_CLASS
+        )
+
+    def handle_endtag(self, tag):
+        if tag in VOID_TAGS:
+            raise _Irregular(f"end tag for void element {tag}")
+        if not self.stack or self.stack[-1] != tag:
+            raise _Irregular(f"mismatched end tag {tag}")
+        self._flush()
+        if self.capture_depth == len(self.stack):
+            raise _Found()
+        self.stack.pop()
+        if self.capture_depth is not None:
+            self.pieces.append(f"</{tag}>")
+
+    def handle_data(self, data):
+        self.data.append(data)
+
+    def handle_entityref(self, name):
+        if name not in NAMED_ENTITIES:
+            raise _Irregular(f"unknown entity {name}")
+        self.data.append(NAMED_ENTITIES[name])
+
+    def handle_charref(self, name):
+        try:
+            codepoint = int(name[1:], 16) if name[:1] in "xX" else int(name)
+        except ValueError:
+            raise _Irregular(f"malformed character reference {name}")
+        if (
+            not (32 <= codepoint < 127 or codepoint in (9, 10, 13))
+            and not 160 <= codepoint < 0xD800
+            and not 0xE000 <= codepoint <= 0x10FFFF
+        ):
+            raise _Irregular(f"ambiguous character reference {name}")
+        self.data.append(chr(codepoint))
+
+    def handle_comment(self, data):
+        raise _Irregular("comment")
+
+    def handle_decl(self, decl):
+        raise _Irregular("declaration")
+
+    def unknown_decl(self, data):
+        raise _Irregular("declaration")
+
+    def handle_pi(self, data):
+        raise _Irregular("processing instruction")
+
+
+def extract_description_bs4(description):
+    """
+    Extract the event description HTML with BeautifulSoup.
+
+    Parameters
+    ----------
+    description : str
+        The HTML of an RSS item's `<description>`.
+
+    Returns
+    -------
+    str
+        The serialized contents of the `p-description description` div.
+
+    Examples
+    --------
+    >>> extract_description_bs4(
+    ...     '<div class="p-description description"><p>Hi!</p></div>'
+    ... )
+    '<p>Hi!</p>'
+    """
+    soup = BeautifulSoup(description, "html.parser")
+    description_div = soup.find("div", class_=DESCRIPTION_CLASS)
+    return "".join(str(content) for content in description_div.contents)
+
+
+def extract_description(description):
+    """
+    Extract the event description HTML, using a fast path when possible.
+
+    Well-formed markup is serialized directly from the `html.parser` token
+    stream, which is several times faster than building a BeautifulSoup tree.
+    Anything the fast path cannot reproduce exactly is handed to
+    `extract_description_bs4()`, so the output is always identical to it.
+
+    Parameters
+    ----------
+    description : str
+        The HTML of an RSS item's `<description>`.
+
+    Returns
+    -------
+    str
+        The serialized contents of the `p-description description` div.
+
+    Examples
+    --------
+    >>> extract_description(
+    ...     '<div class="p-description description"><p>Hi!</p></div>'
+    ... )
+    '<p>Hi!</p>'
+    """
+    parser = _DescriptionExtractor()
+    try:
+        parser.feed(description)
+        parser.close()
+    except _Found:
+        return "".join(parser.pieces)
+    except _Irregular as e:
+        logger.debug(f"Falling back to BeautifulSoup: {e}")
+    return extract_description_bs4(description)
+
+
+def _extract_or_empty(description):
+    return extract_description(description) if description else ""
+
+
+def extract_descriptions(descriptions, workers=None):
+    """
+    Extract the description HTML of many RSS items, optionally in parallel.
+
+    Parameters
+    ----------
+    descriptions : list of str or None
+        The `<description>` HTML of each item. Missing descriptions produce
+        an empty string.
+    workers : int, optional
+        Number of worker processes. Parsing runs in this process unless
+        `workers` is greater than 1 and there are at least
+        `MIN_PARALLEL_DESCRIPTIONS` descriptions.
+
+    Returns
+    -------
+    list of str
+        The extracted descriptions, in input order.
+
+    Examples
+    --------
+    >>> extract_descriptions(descriptions, workers=4)
+    ['<p>Join us at the QRC for Queer Talk...</p>', ...]
+    """
+    if (
+        not workers
+        or workers <= 1
+        or len(descriptions) < MIN_PARALLEL_DESCRIPTIONS
+    ):
+        return [_extract_or_empty(description) for description in descriptions]
+
+    chunksize = max(1, len(descriptions) // (workers * 4))
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        return list(
+            executor.map(_extract_or_empty, descriptions, chunksize=chunksize)
+        )
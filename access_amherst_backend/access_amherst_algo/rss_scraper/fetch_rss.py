@@ -1,28 +1,76 @@
 import requests
 import os
+import hashlib
+import logging
 from datetime import datetime
+from access_amherst_algo.models import FeedState
+
+logger = logging.getLogger(__name__)
+
+RSS_URL = "https://thehub.amherst.edu/events.rss"
+REQUEST_TIMEOUT = 30  # seconds
 
 
 def fetch_rss():
     """
-    Fetch the RSS feed and save it as an XML file.
+    Fetch the RSS feed and save it as an XML file if it has changed.
 
     This function retrieves the RSS feed from The Hub (`https://thehub.amherst.edu/events.rss`),
     and saves the raw content of the response as an XML file. The filename is timestamped based
     on the current date and time, and the file is stored in the `rss_files` directory.
 
-    The function uses the `requests` library to fetch the data and saves it in binary format.
+    The request is conditional: the `ETag` and `Last-Modified` validators of the
+    last ingested fetch are stored in a `FeedState` row and sent back as
+    `If-None-Match` / `If-Modified-Since`. If the server answers
+    `304 Not Modified`, or the body hashes to the same value as last time,
+    nothing is written and the function returns None.
+
+    The validators of new content are returned rather than stored, so that a
+    run which fails to parse or save the feed fetches it again next time.
+    Pass them to `save_feed_state()` once its events are saved.
 
     Returns
     -------
-    None
+    dict or None
+        The `url`, `etag`, `last_modified` and `content_hash` of the feed if
+        new content was saved, None if the feed is unchanged.
 
     Examples
     --------
-    >>> fetch_rss()
+    >>> validators = fetch_rss()
+    >>> if validators:
+    ...     save_to_db(create_events_list())
+    ...     save_feed_state(validators)
     """
-    url = "https://thehub.amherst.edu/events.rss"
-    response = requests.get(url)
+    url = RSS_URL
+    state = FeedState.objects.filter(url=url).first()
+
+    # Send the validators from the previous fetch, if any
+    headers = {}
+    if state is not None:
+        if state.etag:
+            headers["If-None-Match"] = state.etag
+        if state.last_modified:
+            headers["If-Modified-Since"] = state.last_modified
+
+    response = requests.get(url, headers=headers, timeout=REQUEST_TIMEOUT)
+    if response.status_code == 304:
+        logger.info("RSS feed not modified since the last fetch.")
+        return None
+    response.raise_for_status()
+
+    content_hash = hashlib.sha256(response.content).hexdigest()
+    validators = {
+        "url": url,
+        "etag": response.headers.get("ETag"),
+        "last_modified": response.headers.get("Last-Modified"),
+        "content_hash": content_hash,
+    }
+    if state is not None and state.content_hash == content_hash:
+        # Already ingested; only the validators may have changed
+        save_feed_state(validators)
+        logger.info("RSS feed content unchanged since the last fetch.")
+        return None
 
     # Define the directory and file name
     directory = "access_amherst_algo/rss_scraper/rss_files"
@@ -36,3 +84,31 @@ def fetch_rss():
     # Save the content as an XML file
     with open(file_name, "wb") as file:
         file.write(response.content)
+    return validators
+
+
+def save_feed_state(validators):
+    """
+    Record that a fetched feed has been ingested.
+
+    Parameters
+    ----------
+    validators : dict
+        The validators returned by `fetch_rss()`.
+
+    Returns
+    -------
+    None
+
+    Examples
+    --------
+    >>> save_feed_state(validators)
+    """
+    FeedState.objects.update_or_create(
+        url=validators["url"],
+        defaults={
+            "etag": validators["etag"],
+            "last_modified": validators["last_modified"],
+            "content_hash": validators["content_hash"],
+        },
+    )
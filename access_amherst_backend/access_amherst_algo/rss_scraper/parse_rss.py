@@ -1,118 +1,37 @@
 import xml.etree.ElementTree as ET
 import json
-from datetime import datetime, timedelta
+from datetime import datetime
 from access_amherst_algo.models import Event  # Import the Event model
-from bs4 import BeautifulSoup
-import random
-import re
 import os
 from dotenv import load_dotenv
-from django.db.models import Q
-import difflib
-from dateutil import parser
-import pytz
-from sklearn.feature_extraction.text import TfidfVectorizer
-from sklearn.metrics.pairwise import cosine_similarity
-import numpy as np
+from django.db import transaction
+from itertools import islice
+from collections import Counter
 import logging
+from access_amherst_algo.event_dedupe import (
+    DedupeEngine,
+    dedupe_fields,
+    outranks,
+)
+from access_amherst_algo.datetime_parsing import parse_datetime_utc
+from access_amherst_algo.location_resolver import (
+    jitter_coordinates,
+    lookup_location,
+    resolve_location,
+)
+from access_amherst_algo.rss_scraper.description_parser import (
+    extract_description,
+    extract_descriptions,
+)
+from access_amherst_algo.event_fingerprint import (
+    compute_content_hash,
+    event_source,
+    load_known_hashes,
+)
 
 load_dotenv()
 
 
-# Define location buckets with keywords as keys and dictionaries containing full names, latitude, and longitude as values
-location_buckets = {
-    "Keefe": {
-        "name": "Keefe Campus Center",
-        "latitude": 42.37141504481807,
-        "longitude": -72.51479991450528,
-    },
-    "Queer": {
-        "name": "Keefe Campus Center",
-        "latitude": 42.37141504481807,
-        "longitude": -72.51479991450528,
-    },
-    "Multicultural": {
-        "name": "Keefe Campus Center",
-        "latitude": 42.37141504481807,
-        "longitude": -72.51479991450528,
-    },
-    "Friedmann": {
-        "name": "Keefe Campus Center",
-        "latitude": 42.37141504481807,
-        "longitude": -72.51479991450528,
-    },
-    "Ford": {
-        "name": "Ford Hall",
-        "latitude": 42.36923506234738,
-        "longitude": -72.51529130962976,
-    },
-    "SCCE": {
-        "name": "Science Center",
-        "latitude": 42.37105378715133,
-        "longitude": -72.51334790776447,
-    },
-    "Science Center": {
-        "name": "Science Center",
-        "latitude": 42.37105378715133,
-        "longitude": -72.51334790776447,
-    },
-    "Chapin": {
-        "name": "Chapin Hall",
-        "latitude": 42.371771820543486,
-        "longitude": -72.51572746604714,
-    },
-    "Gym": {
-        "name": "Alumni Gymnasium",
-        "latitude": 42.368819594097864,
-        "longitude": -72.5188658145099,
-    },
-    "Cage": {
-        "name": "Alumni Gymnasium",
-        "latitude": 42.368819594097864,
-        "longitude": -72.5188658145099,
-    },
-    "Lefrak": {
-        "name": "Alumni Gymnasium",
-        "latitude": 42.368819594097864,
-        "longitude": -72.5188658145099,
-    },
-    "Middleton Gym": {
-        "name": "Alumni Gym",
-        "latitude": 42.368819594097864,
-        "longitude": -72.5188658145099,
-    },
-    "Frost": {
-        "name": "Frost Library",
-        "latitude": 42.37183195277655,
-        "longitude": -72.51699336789369,
-    },
-    "Paino": {
-        "name": "Beneski Museum of Natural History",
-        "latitude": 42.37209277500926,
-        "longitude": -72.51422459549485,
-    },
-    "Powerhouse": {
-        "name": "Powerhouse",
-        "latitude": 42.372109655195466,
-        "longitude": -72.51309270030836,
-    },
-    "Converse": {
-        "name": "Converse Hall",
-        "latitude": 42.37243680844771,
-        "longitude": -72.518433147017,
-    },
-    "Assembly Room": {
-        "name": "Converse Hall",
-        "latitude": 42.37243680844771,
-        "longitude": -72.518433147017,
-    },
-    "Red Room": {
-        "name": "Converse Hall",
-        "latitude": 42.37243680844771,
-        "longitude": -72.518433147017,
-    },
-}
-
 # Configure logging
 logging.basicConfig(
     level=logging.INFO,  # Set to DEBUG for detailed logs in a dev environment
@@ -124,13 +43,17 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
-# Update categorize_location to use new dictionary structure
+# Minimum TF-IDF title similarity for two events at the same start time to be
+# considered duplicates
+SIMILARITY_THRESHOLD = 0.4
+
 def categorize_location(location):
     """
-    Categorize a location based on keywords in the `location_buckets` dictionary.
+    Categorize a location based on keywords in the `LOCATION_BUCKETS` dictionary.
 
     This function searches the `location` string for any keyword defined in the
-    `location_buckets` dictionary. If a keyword is found, it returns the associated 
+    `LOCATION_BUCKETS` dictionary of `access_amherst_algo.location_resolver`.
+    If a keyword is found, it returns the associated 
     category name from the dictionary. If no keyword is matched, it returns "Other" 
     as the default category.
 
@@ -149,17 +72,11 @@ def categorize_location(location):
     >>> categorize_location("Friedmann Room")
     'Keefe Campus Center'
     """
-    logging.info("Categorizing location...")
-    for keyword, info in location_buckets.items():
-        if re.search(rf"\b{keyword}\b", location, re.IGNORECASE):
-            logging.info("Location found.")
-            return info["name"]
-    logging.info("No location found.")
-    return "Other"  # Default category if no match is found
+    return resolve_location(location)[0]
 
 
 # Function to extract the details of an event from an XML item
-def extract_event_details(item):
+def extract_event_details(item, event_description=None):
     """
     Extract relevant event details from an XML item element.
 
@@ -171,6 +88,9 @@ def extract_event_details(item):
     ----------
     item : xml.etree.ElementTree.Element
         The XML item element containing event details.
+    event_description : str, optional
+        The item's description HTML, if it was already extracted (for example
+        in parallel by `extract_descriptions()`).
 
     Returns
     -------
@@ -208,16 +128,13 @@ def extract_event_details(item):
     picture_link = enclosure.attrib["url"] if enclosure is not None else None
 
     # Parse event description HTML if available
-    description = item.find("description").text
-    event_description = ""
-    if description:
-        logging.info("Event description found. Parsing...")
-        soup = BeautifulSoup(description, "html.parser")
-        description_div = soup.find("div", class_="p-description description")
-        event_description = "".join(
-            str(content) for content in description_div.contents
-        )
-        logging.info("Event description parsing completed.")
+    if event_description is None:
+        description = item.find("description").text
+        event_description = ""
+        if description:
+            logging.info("Event description found. Parsing...")
+            event_description = extract_description(description)
+            logging.info("Event description parsing completed.")
 
     # Gather categories and other event metadata
     categories = [format_category(category.text) for category in item.findall("category")]
@@ -294,7 +211,7 @@ def get_lat_lng(location):
     Retrieve the latitude and longitude for a given location.
 
     This function searches the `location` string for any keyword defined in the
-    `location_buckets` dictionary. If a keyword is found, it returns the associated 
+    `LOCATION_BUCKETS` dictionary. If a keyword is found, it returns the associated 
     latitude and longitude. If no keyword is matched, it returns `(None, None)`.
 
     Parameters
@@ -314,24 +231,19 @@ def get_lat_lng(location):
     >>> get_lat_lng("Friedmann Room")
     (42.37141504481807, -72.51479991450528)
     """
-    logging.info("Finding location lat/lng...")
-    for keyword, info in location_buckets.items():
-        if re.search(rf"\b{keyword}\b", location, re.IGNORECASE):
-            logging.info("Location lat/lng found")
-            return info["latitude"], info["longitude"]
-    logging.info("Location lat/lng not found; None/None returned")
-    return None, None
+    return resolve_location(location)[1:]
 
 
-# Function to add a slight random offset to latitude and longitude
-def add_random_offset(lat, lng):
+# Function to add a slight offset to latitude and longitude
+def add_random_offset(lat, lng, seed=None):
     """
-    Add a small random offset to latitude and longitude coordinates.
+    Add a small offset to latitude and longitude coordinates.
 
-    This function applies a random offset within a small range to both the latitude
-    and longitude values provided. The offset range can be adjusted as needed based
-    on the map scale to create minor variations in coordinates, which is useful for
-    visual distinction on maps.
+    This function applies an offset within a small range to both the latitude
+    and longitude values provided, which is useful for visual distinction on
+    maps. When a `seed` such as the event id is given, the offset is derived
+    from it deterministically (see `jitter_coordinates()`), so re-saving an
+    event keeps its coordinates. Without a seed the offset is random.
 
     Parameters
     ----------
@@ -339,25 +251,22 @@ def add_random_offset(lat, lng):
         The original latitude coordinate.
     lng : float
         The original longitude coordinate.
+    seed : int or str, optional
+        Value the offset is derived from, normally the event id.
 
     Returns
     -------
     tuple
         A tuple containing:
-        - `lat` (float): The latitude with a random offset applied.
-        - `lng` (float): The longitude with a random offset applied.
+        - `lat` (float): The latitude with the offset applied.
+        - `lng` (float): The longitude with the offset applied.
 
     Examples
     --------
-    >>> add_random_offset(42.37141504481807, -72.51479991450528)
-    (42.37149564586236, -72.51478632450079)  # Results may vary due to randomness
+    >>> add_random_offset(42.37141504481807, -72.51479991450528, seed=510538770)
+    (42.37138489684431, -72.51494259306966)
     """
-    # Define a small range for random offsets (in degrees)
-    offset_range = 0.00015  # Adjust this value as needed for your map scale
-    lat += random.uniform(-offset_range, offset_range)
-    lng += random.uniform(-offset_range, offset_range)
-    logging.info("Offset added to location.")
-    return lat, lng
+    return jitter_coordinates(lat, lng, seed=seed)
 
 
 # Function to save the event to the Django model
@@ -395,34 +304,22 @@ def save_event_to_db(event_data):
     ... }
     >>> save_event_to_db(event_data)
     """
+    # Fingerprint the source fields before any derived fields are added
+    content_hash = compute_content_hash(event_data)
 
-    # Parse dates and times
-    pub_date = parser.parse(event_data["pub_date"])
-    start_time = parser.parse(event_data["starttime"])
-    end_time = parser.parse(event_data["endtime"])
-    
-    # Check if the dates are in UTC, if not, convert them to UTC
+    # Parse dates and times, converted to UTC
     # NOTE: It best practice to store all dates in UTC in the database
-    
-    if pub_date.tzinfo is None or pub_date.tzinfo.utcoffset(pub_date) != pytz.UTC.utcoffset(pub_date):
-        pub_date = pub_date.astimezone(pytz.UTC)
-
-    if start_time.tzinfo is None or start_time.tzinfo.utcoffset(start_time) != pytz.UTC.utcoffset(start_time):
-        start_time = start_time.astimezone(pytz.UTC)
-
-    if end_time.tzinfo is None or end_time.tzinfo.utcoffset(end_time) != pytz.UTC.utcoffset(end_time):
-        end_time = end_time.astimezone(pytz.UTC)
-    logging.info("Converted date/time to UTC.")
+    pub_date = parse_datetime_utc(event_data["pub_date"])
+    start_time = parse_datetime_utc(event_data["starttime"])
+    end_time = parse_datetime_utc(event_data["endtime"])
 
-    # get map location
-    event_data["map_location"] = categorize_location(event_data["location"])
-
-    # Geocode to get latitude and longitude using hardcoded values
+    # Categorize the location and find lat/lng of the mapped building
+    event_data["map_location"] = lookup_location(event_data["location"])[0]
     lat, lng = get_lat_lng(event_data["map_location"])
 
-    # Add random offset to coordinates if lat/lng are available
+    # Add an offset derived from the event id if lat/lng are available
     if lat is not None and lng is not None:
-        lat, lng = add_random_offset(lat, lng)
+        lat, lng = add_random_offset(lat, lng, seed=int(event_data["id"]))
 
     # Save or update event in the database
     Event.objects.update_or_create(
@@ -444,12 +341,35 @@ def save_event_to_db(event_data):
             "latitude": lat if lat is not None else None,
             "longitude": lng if lng is not None else None,
             "map_location": event_data["map_location"],
+            "content_hash": content_hash,
+            **dedupe_fields(event_data["title"], start_time),
         },
     )
 
 
+def get_rss_file_name():
+    """
+    Build the path of the RSS XML file fetched in the current hour.
+
+    Returns
+    -------
+    str
+        The timestamped path written by `fetch_rss()`.
+
+    Examples
+    --------
+    >>> get_rss_file_name()
+    'access_amherst_algo/rss_scraper/rss_files/hub_2024_11_03_05.xml'
+    """
+    return (
+        "access_amherst_algo/rss_scraper/rss_files/hub_"
+        + datetime.now().strftime("%Y_%m_%d_%H")
+        + ".xml"
+    )
+
+
 # Function to create a list of events from an RSS XML file
-def create_events_list():
+def create_events_list(workers=None):
     """
     Create a list of event details from an RSS XML file.
 
@@ -458,6 +378,12 @@ def create_events_list():
     The event details are returned as a list of dictionaries, with each dictionary
     containing relevant information for a single event.
 
+    Parameters
+    ----------
+    workers : int, optional
+        Number of worker processes used to parse the description HTML of
+        large feeds. By default descriptions are parsed in this process.
+
     Returns
     -------
     list of dict
@@ -471,34 +397,89 @@ def create_events_list():
     'Literature Speaker Event'
     """
     logging.info("Creating events list from rss file...")
-    rss_file_name = (
-        "access_amherst_algo/rss_scraper/rss_files/hub_"
-        + datetime.now().strftime("%Y_%m_%d_%H")
-        + ".xml"
-    )
+    rss_file_name = get_rss_file_name()
     root = ET.parse(rss_file_name).getroot()
     logging.info("Rss file sucessfully parsed.")
 
+    items = root.findall(".//item")
+    if workers and workers > 1:
+        # Parse the description HTML up front, spread over worker processes
+        descriptions = extract_descriptions(
+            [item.find("description").text for item in items],
+            workers=workers,
+        )
+    else:
+        descriptions = [None] * len(items)
     events_list = [
-        extract_event_details(item) for item in root.findall(".//item")
+        extract_event_details(item, event_description=description)
+        for item, description in zip(items, descriptions)
     ]
     logging.info("Event list created.")
     return events_list
 
 
+def iter_events(rss_file_name=None):
+    """
+    Lazily extract event details from an RSS XML file.
+
+    Unlike `create_events_list()`, this generator never holds the whole feed
+    in memory. The file is read with `ElementTree.iterparse`, each `<item>` is
+    yielded as soon as its closing tag is parsed, and the element is then
+    cleared and detached from its parent.
+
+    Parameters
+    ----------
+    rss_file_name : str, optional
+        Path of the RSS file. Defaults to the file fetched in the current hour.
+
+    Yields
+    ------
+    dict
+        Event details extracted by `extract_event_details`.
+
+    Examples
+    --------
+    >>> events = iter_events()
+    >>> print(next(events)["title"])
+    'Literature Speaker Event'
+    """
+    if rss_file_name is None:
+        rss_file_name = get_rss_file_name()
+
+    parents = []
+    for event, element in ET.iterparse(rss_file_name, events=("start", "end")):
+        if event == "start":
+            parents.append(element)
+            continue
+
+        parents.pop()
+        if element.tag == "item":
+            yield extract_event_details(element)
+            # Free the parsed item so memory does not grow with the feed size
+            element.clear()
+            if parents:
+                parents[-1].remove(element)
+
+
 # Function to save extracted events to a JSON file
-def save_json():
+def save_json(events_list=None):
     """
     Save the list of extracted events to a JSON file.
 
     This function generates a timestamped JSON file containing event details.
-    It first creates a list of events by calling `create_events_list()`, and
-    then writes this list to a JSON file with a filename format based on the
-    current date and time.
+    If no `events_list` is provided, it first creates a list of events by
+    calling `create_events_list()`, and then writes this list to a JSON file
+    with a filename format based on the current date and time.
 
     The resulting JSON file is saved in the `json_outputs` directory under the
     `rss_scraper` folder.
 
+    Parameters
+    ----------
+    events_list : list of dict, optional
+        Events already parsed from the RSS file. Passing them avoids parsing
+        the file a second time.
+
     Returns
     -------
     None
@@ -508,7 +489,8 @@ def save_json():
     >>> save_json()
     """
     # Generate the events list
-    events_list = create_events_list()
+    if events_list is None:
+        events_list = create_events_list()
 
     # Define the directory and output file name
     directory = "access_amherst_algo/rss_scraper/json_outputs"
@@ -522,163 +504,205 @@ def save_json():
         json.dump(events_list, f, indent=4)
 
 
-def preprocess_title(title):
+def parse_start_time(event_data):
+    """
+    Parse the start time of an event into a UTC datetime.
+
+    Parameters
+    ----------
+    event_data : dict
+        A dictionary containing the event's `starttime` string.
+
+    Returns
+    -------
+    datetime or None
+        The timezone-aware start time in UTC, or None if it cannot be parsed.
+
+    Examples
+    --------
+    >>> parse_start_time({"starttime": "Tue, 05 Nov 2024 18:00:00 GMT"})
+    datetime.datetime(2024, 11, 5, 18, 0, tzinfo=<UTC>)
+    """
+    try:
+        return parse_datetime_utc(event_data["starttime"])
+    except (KeyError, TypeError, ValueError) as e:
+        logger.warning(f"Could not parse start time: {e}")
+        return None
+
+
+def save_to_db(events_list=None, write_json=False):
     """
-    Preprocess an event title for better similarity comparison.
+    Clean and save event data to the database.
+
+    This function first retrieves a cleaned list of events by calling the 
+    `clean_hub_data()` function. It then deduplicates and saves the whole list
+    with `save_events_batch()`.
 
-    This function converts the title to lowercase, removes special characters, 
-    and trims extra whitespace to standardize event title formatting.
+    This process ensures that only cleaned event data is stored in the database.
 
     Parameters
     ----------
-    title : str
-        The event title to preprocess.
+    events_list : list of dict, optional
+        Events already parsed by `create_events_list()`. If not provided, the
+        RSS file is parsed by `clean_hub_data()`.
+    write_json : bool, default False
+        Whether `clean_hub_data()` should also write the cleaned events to a
+        JSON file for debugging.
 
     Returns
     -------
-    str
-        The cleaned and standardized event title.
+    collections.Counter
+        Number of events that were ``changed`` (written), ``unchanged``
+        (skipped because their content hash matched) and ``duplicate``.
 
     Examples
     --------
-    >>> preprocess_title("  Guest Lecture: AI & Future  ")
-    'guest lecture ai future'
+    >>> save_to_db(create_events_list())
+    Counter({'unchanged': 340, 'changed': 2})
     """
-    if not isinstance(title, str):
-        logging.warning("Title provided is not a string.")
-        return ""
-    # Convert to lowercase and remove special characters
-    title = re.sub(r'[^\w\s]', '', title.lower())
-    # Remove extra whitespace
-    return " ".join(title.split())
+    from access_amherst_algo.rss_scraper.clean_hub_data import clean_hub_data
+
+    events_list = clean_hub_data(
+        events_list, write_json=write_json
+    )  # Get the cleaned list of events to be saved
 
+    return save_events_batch(events_list)
 
-def is_similar_event(event_data):
+
+def save_events_batch(events_list):
     """
-    Check if a similar event exists using start time and title similarity.
+    Deduplicate and save a batch of cleaned events in one transaction.
 
-    This function searches for existing events that have the same start time 
-    and compares their titles using a TF-IDF similarity score. If a similar 
-    event is found, it returns True.
+    The stored content hashes of the batch are loaded with one query, and
+    events whose fingerprint is unchanged are skipped without a write.
+    Every changed event is checked with one `DedupeEngine` for the whole
+    batch: by dedupe key, against the calendar and email events, and, for
+    events without a Hub ID, by title similarity within the feed. Hub events
+    are saved even when they duplicate a stored calendar or email event,
+    since the Hub ranks first in `SOURCE_PRIORITY`; the stored copy is
+    deleted in the same transaction.
 
     Parameters
     ----------
-    event_data : dict
-        A dictionary containing event details such as title and start time.
+    events_list : list of dict
+        Cleaned events, as returned by `clean_hub_data()`.
 
     Returns
     -------
-    bool
-        True if a similar event exists, otherwise False.
+    collections.Counter
+        Number of events that were ``changed``, ``unchanged`` and
+        ``duplicate``. Events merged with another source's event, whichever
+        row was kept, are also counted as ``cross_source``.
 
     Examples
     --------
-    >>> event_data = {
-    >>>     "title": "Guest Lecture: AI & Future",
-    >>>     "start_time": "2024-11-10T18:00:00"
-    >>> }
-    >>> is_calendar_event_similar(event_data)
-    False
+    >>> save_events_batch(clean_hub_data(create_events_list()))
+    Counter({'unchanged': 98, 'changed': 2})
     """
-    try:
-        # Validate title
-        new_title = event_data.get("title", "")
-        if not new_title:
-            logger.warning("Empty title provided")
-            return False
-
-        # Parse and validate start time only
-        start_time = parser.parse(event_data["starttime"])
-        
-        # Convert to UTC if needed
-        if start_time.tzinfo is None or start_time.tzinfo.utcoffset(start_time) != pytz.UTC.utcoffset(start_time):
-            start_time = start_time.astimezone(pytz.UTC)
-
-        # Query events with same start time only
-        similar_events = list(Event.objects.filter(start_time=start_time))
-        
-        if not similar_events:
-            return False
-
-        # Preprocess titles
-        existing_titles = [preprocess_title(event.title) for event in similar_events]
-        new_title_processed = preprocess_title(new_title)
-
-        # Remove empty titles
-        existing_titles = [title for title in existing_titles if title]
-        if not existing_titles:
-            return False
-
-        # Configure vectorizer
-        vectorizer = TfidfVectorizer(
-            min_df=1,
-            ngram_range=(1, 2),
-            strip_accents='unicode',
-            lowercase=True
-        )
+    counts = Counter(changed=0, unchanged=0, duplicate=0, cross_source=0)
+    content_hashes = [compute_content_hash(event) for event in events_list]
+    known_hashes = load_known_hashes(content_hashes)
+    changed_events = [
+        event
+        for event, content_hash in zip(events_list, content_hashes)
+        if content_hash not in known_hashes
+    ]
+    counts["unchanged"] = len(events_list) - len(changed_events)
+    events_list = changed_events
 
-        # Calculate TF-IDF matrices
-        try:
-            all_titles = existing_titles + [new_title_processed]
-            tfidf_matrix = vectorizer.fit_transform(all_titles)
-        except ValueError as e:
-            logger.error(f"Vectorizer error: {e}")
-            return False
-
-        # Calculate similarities
-        new_vector = tfidf_matrix[-1:]
-        existing_matrix = tfidf_matrix[:-1]
-        similarities = cosine_similarity(new_vector, existing_matrix)[0]
-
-        # Check similarity threshold
-        SIMILARITY_THRESHOLD = 0.4
-        if similarities.size > 0 and np.max(similarities) > SIMILARITY_THRESHOLD:
-            similar_index = int(np.argmax(similarities))
-            most_similar_event = similar_events[similar_index]
-            
-            logger.info(
-                f"Similar event found: '{most_similar_event.title}' "
-                f"(similarity: {similarities[similar_index]:.2f})"
+    start_times = [parse_start_time(event) for event in events_list]
+    titles_and_times = [
+        (event.get("title"), start_time)
+        for event, start_time in zip(events_list, start_times)
+    ]
+    engine = DedupeEngine(
+        [
+            (title, start_time, int(event["id"]))
+            for (title, start_time), event in zip(
+                titles_and_times, events_list
             )
-            return True
+        ],
+        source="hub",
+        similarity_threshold=SIMILARITY_THRESHOLD,
+    )
 
-        return False
+    with transaction.atomic():
+        for index, event in enumerate(events_list):
+            title = event.get("title")
+            start_time = start_times[index]
+            event_id = int(event["id"])
+            duplicate_id = engine.find_duplicate(title, start_time, event_id)
+            cross = duplicate_id is not None and event_source(
+                duplicate_id
+            ) != event_source(event_id)
+            if duplicate_id is not None and not outranks(
+                event_id, duplicate_id
+            ):
+                logger.info(f"Skipping duplicate of event {duplicate_id}")
+                counts["duplicate"] += 1
+                if cross:
+                    counts["cross_source"] += 1
+                continue
 
-    except Exception as e:
-        logger.error(f"Error in similarity check for '{event_data.get('title', 'Unknown')}': {e}")
-        return False
+            save_event_to_db(event)
+            if duplicate_id is not None:
+                logger.info(
+                    f"Replacing event {duplicate_id} with hub event "
+                    f"{event_id}"
+                )
+                Event.objects.filter(id=duplicate_id).delete()
+                engine.discard(duplicate_id)
+                if cross:
+                    counts["cross_source"] += 1
+            engine.add(title, start_time, event_id)
+            counts["changed"] += 1
+
+    logger.info(
+        f"Saved {counts['changed']} changed events; skipped "
+        f"{counts['unchanged']} unchanged and {counts['duplicate']} "
+        f"duplicate events ({counts['cross_source']} from other sources)."
+    )
+    return counts
 
 
-# Function to clean and save events to the database
-def save_to_db():
+def stream_to_db(rss_file_name=None, batch_size=100):
     """
-    Clean and save event data to the database.
+    Stream events from the RSS file into the database in fixed-size batches.
 
-    This function first retrieves a cleaned list of events by calling the 
-    `clean_hub_data()` function. It then iterates through each event in the 
-    list and saves the event data to the database using the `save_event_to_db()` 
-    function.
+    The generators chain extract -> clean -> dedupe -> save, so peak memory
+    is bounded by `batch_size` rather than by the size of the feed. This is
+    meant for very large feeds or backfills.
 
-    This process ensures that only cleaned event data is stored in the database.
+    Parameters
+    ----------
+    rss_file_name : str, optional
+        Path of the RSS file. Defaults to the file fetched in the current hour.
+    batch_size : int, default 100
+        Number of cleaned events deduplicated and saved together.
 
     Returns
     -------
-    None
+    collections.Counter
+        Number of events that were ``changed``, ``unchanged`` and
+        ``duplicate``, summed over all batches.
 
     Examples
     --------
-    >>> save_to_db()
+    >>> stream_to_db(batch_size=200)
+    Counter({'unchanged': 340, 'changed': 2, 'duplicate': 0})
     """
-    from access_amherst_algo.rss_scraper.clean_hub_data import clean_hub_data
-
-    events_list = (
-        clean_hub_data()
-    )  # Get the cleaned list of events to be saved
+    from access_amherst_algo.rss_scraper.clean_hub_data import (
+        iter_cleaned_events,
+    )
 
-    for event in events_list:
-        # Check if a similar event already exists. Cases:
-        # (if hub event, collision detection handled by update_or_create so always call save_event_to_db)
-        # (if not hub event, and not similar to something in DB, then only call save_event_to_db)
-        if int(event["id"]) > 500_000_000 or not is_similar_event(event):
-            # If no similar event is found, save the event
-            save_event_to_db(event)
+    events = iter_cleaned_events(iter_events(rss_file_name))
+    counts = Counter(changed=0, unchanged=0, duplicate=0)
+    processed = 0
+    while True:
+        batch = list(islice(events, batch_size))
+        if not batch:
+            break
+        counts.update(save_events_batch(batch))
+        processed += len(batch)
+        logger.info(f"Streamed {processed} events into the database.")
+    return counts
@@ -0,0 +1,38 @@
+import pytest
+from access_amherst_algo.calendar_scraper import category_classifier
+from access_amherst_algo.calendar_scraper import page_cache
+from access_amherst_algo.location_resolver import clear_location_cache
+
+
+@pytest.fixture(autouse=True)
+def fresh_location_cache():
+    """Keep resolved locations loaded in one test from leaking into others."""
+    clear_location_cache()
+    yield
+    clear_location_cache()
+
+
+@pytest.fixture(autouse=True)
+def category_model_path(tmp_path, monkeypatch):
+    """Keep the persisted category model out of the source tree."""
+    path = tmp_path / "category_model.joblib"
+    monkeypatch.setattr(category_classifier, "MODEL_PATH", str(path))
+    category_classifier.clear_category_model()
+    yield path
+    category_classifier.clear_category_model()
+
+
+@pytest.fixture(autouse=True)
+def llm_cache_dir(tmp_path, monkeypatch):
+    """Keep cached LLM responses out of the source tree and between tests."""
+    path = tmp_path / "llm_cache"
+    monkeypatch.setenv("LLM_CACHE_DIR", str(path))
+    yield path
+
+
+@pytest.fixture(autouse=True)
+def page_cache_dir(tmp_path, monkeypatch):
+    """Keep cached calendar pages out of the user's cache directory."""
+    path = tmp_path / "page_cache"
+    monkeypatch.setattr(page_cache, "CACHE_DIR", str(path))
+    yield path
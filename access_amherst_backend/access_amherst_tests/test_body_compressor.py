@@ -0,0 +1,102 @@
+import logging
+
+from access_amherst_algo.email_scraper.body_compressor import (
+    compress_body,
+    estimate_tokens,
+    restore_urls,
+)
+
+TRACKING_URL = (
+    "https://click.amherst.edu/track?u=queer-talk&utm_source=mammoth"
+    "&utm_medium=email&id=8f3a9c"
+)
+
+DIGEST = f"""Amherst College Daily Mammoth for Thursday, November 7, 2024
+
+Welcome to today's digest!    Read on   for events.
+
+Queer Talk
+Thursday, November 7, 2024,    3-4 p.m.
+Keefe   Campus Center 213
+More: <{TRACKING_URL}>
+
+Bring a friend, see {TRACKING_URL}.
+
+Parking reminder: lots A and B are closed for paving.
+
+Jazz Night
+7 p.m.
+https://www.amherst.edu/jazz
+
+> On Wed, someone wrote:
+> an old reply quoted in full
+
+You are receiving this email because you subscribed.
+Unsubscribe: https://lists.amherst.edu/unsubscribe?id=123
+
+-- 
+Office of Communications
+https://www.amherst.edu/communications
+"""
+
+
+def test_compress_body_strips_boilerplate_and_shortens_urls():
+    compressed, urls = compress_body(DIGEST)
+
+    assert compressed == (
+        "Amherst College Daily Mammoth for Thursday, November 7, 2024\n\n"
+        "Queer Talk\n"
+        "Thursday, November 7, 2024, 3-4 p.m.\n"
+        "Keefe Campus Center 213\n"
+        "More: [URL1]\n\n"
+        "Bring a friend, see [URL1].\n\n"
+        "Jazz Night\n"
+        "7 p.m.\n"
+        "[URL2]"
+    )
+    assert urls == {1: TRACKING_URL, 2: "https://www.amherst.edu/jazz"}
+
+
+def test_compress_body_keeps_continuation_of_leading_event():
+    compressed, _ = compress_body("Queer Talk\n3 p.m.\n\nBring a friend.")
+
+    assert compressed == "Queer Talk\n3 p.m.\n\nBring a friend."
+
+
+def test_compress_body_logs_token_estimates(caplog):
+    with caplog.at_level(logging.INFO):
+        compressed, _ = compress_body(DIGEST)
+
+    message = (
+        f"Compressed digest from ~{estimate_tokens(DIGEST)} to "
+        f"~{estimate_tokens(compressed)} tokens"
+    )
+    assert message in caplog.text
+    assert estimate_tokens(compressed) < estimate_tokens(DIGEST) / 2
+
+
+def test_restore_urls():
+    events = [
+        {
+            "title": "Queer Talk",
+            "link": "[URL1]",
+            "event_description": "See [URL1] or [URL9].",
+            "host": ["[URL2]"],
+            "starttime": None,
+        }
+    ]
+
+    assert restore_urls(events, {1: TRACKING_URL, 2: "https://a.edu"}) == [
+        {
+            "title": "Queer Talk",
+            "link": TRACKING_URL,
+            "event_description": f"See {TRACKING_URL} or [URL9].",
+            "host": ["https://a.edu"],
+            "starttime": None,
+        }
+    ]
+
+
+def test_estimate_tokens():
+    assert estimate_tokens("") == 0
+    assert estimate_tokens("Queer Talk at 3 p.m.") == 5
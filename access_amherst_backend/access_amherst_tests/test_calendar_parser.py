@@ -2,16 +2,32 @@ import pytest
 from unittest.mock import patch, MagicMock, mock_open, call
 import json
 import os
+import pytz
 from datetime import datetime
 from bs4 import BeautifulSoup
 import requests
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
 
 # Import the functions from calendar parser
+from access_amherst_algo.models import Event
+from access_amherst_algo.event_fingerprint import compute_content_hash
+from access_amherst_algo.calendar_scraper.page_cache import PageCache
 from access_amherst_algo.calendar_scraper.calendar_parser import (
+    clean_event,
+    create_session,
+    extract_event,
     fetch_page,
+    find_last_page,
+    has_captcha,
+    parse_events,
     scrape_page,
     scrape_all_pages,
+    scrape_all_pages_concurrent,
     save_to_json,
+    should_stop_scrape,
 )
 
 # Mock data for testing
@@ -224,5 +240,314 @@ def test_fetch_page_unexpected_exception(mock_session):
 
     mock_session.return_value.get.assert_called_once()  # Ensure GET was called
 
+FIXTURE_PAGES = 10
+FIXTURE_EVENTS_PER_PAGE = 3
+FIXTURE_DELAY = 0.05  # seconds per request
+
+
+def make_calendar_page(page, pager, version=0):
+    """Render a calendar listing page like the live site's."""
+    articles = "".join(
+        f"""
+        <article class="mm-calendar-event">
+            <h2 class="mm-event-listing-title"><a href="/event/{page}-{index}">Event {page}-{index} v{version}</a></h2>
+            <h3 class="mm-calendar-period">
+                <meta itemprop="startDate" content="2024-11-{page + 1:02d}T09:00:00">
+            </h3>
+        </article>
+        """
+        for index in range(FIXTURE_EVENTS_PER_PAGE)
+    ) if page < FIXTURE_PAGES else ""
+    links = ""
+    if pager:
+        links = "".join(
+            f'<a href="?_page={number}">{number + 1}</a>'
+            for number in range(min(page + 3, FIXTURE_PAGES))
+        )
+        links += f'<a href="?_page={FIXTURE_PAGES - 1}">last</a>'
+    return f"<html><body>{articles}<nav>{links}</nav></body></html>".encode()
+
+
+@pytest.fixture
+def calendar_server():
+    """Serve a paginated calendar locally, with a delay per request.
+
+    Pages carry an ETag and answer `If-None-Match` with 304. Bumping
+    `server.version` changes every page; `server.send_etag` can turn the
+    validators off.
+    """
+    requested = []
+    not_modified = []
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def do_GET(self):
+            url = urlparse(self.path)
+            page = int(parse_qs(url.query).get("_page", ["0"])[0])
+            requested.append(page)
+            time.sleep(FIXTURE_DELAY)
+            etag = f'"{page}-{server.version}"'
+            if server.send_etag and self.headers.get("If-None-Match") == etag:
+                not_modified.append(page)
+                self.send_response(304)
+                self.send_header("Content-Length", "0")
+                self.end_headers()
+                return
+            body = make_calendar_page(
+                page, pager=url.path == "/pager", version=server.version
+            )
+            self.send_response(200)
+            if server.send_etag:
+                self.send_header("ETag", etag)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    server.version = 0
+    server.send_etag = True
+    server.not_modified = not_modified
+    server.requested = requested
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    server.url = f"http://127.0.0.1:{server.server_port}"
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def test_find_last_page():
+    assert find_last_page(b'<a href="?_page=2">3</a><a href="?_page=12">last</a>') == 12
+    assert find_last_page(b"<html>no pager</html>") == 0
+    assert find_last_page(None) == 0
+
+
+def test_fetch_page_uses_given_session_with_timeout():
+    session = MagicMock()
+    session.get.return_value.status_code = 200
+    session.get.return_value.content = b"Test content"
+
+    assert fetch_page("https://test.com", session=session) == b"Test content"
+    assert session.get.call_args.kwargs["timeout"] > 0
+
+
+def test_create_session_pools_connections():
+    session = create_session(pool_size=8)
+    assert session.get_adapter("https://www.amherst.edu")._pool_maxsize == 8
+
+
+@pytest.mark.parametrize("path", ["/pager", "/no-pager"])
+def test_concurrent_scrape_matches_sequential(calendar_server, path):
+    base_url, requested = calendar_server.url, calendar_server.requested
+
+    sequential = scrape_all_pages(base_url=base_url + path)
+    concurrent = scrape_all_pages_concurrent(workers=4, base_url=base_url + path)
+
+    assert len(concurrent) == FIXTURE_PAGES * FIXTURE_EVENTS_PER_PAGE
+    assert [event["title"] for event in concurrent] == [
+        event["title"] for event in sequential
+    ]
+
+
+def test_concurrent_scrape_fetches_each_page_once(calendar_server):
+    base_url, requested = calendar_server.url, calendar_server.requested
+
+    scrape_all_pages_concurrent(workers=4, base_url=base_url + "/pager")
+
+    # Every page plus the empty one after the last
+    assert sorted(requested) == list(range(FIXTURE_PAGES + 1))
+
+
+def test_concurrent_scrape_is_faster(calendar_server):
+    base_url, requested = calendar_server.url, calendar_server.requested
+
+    start = time.perf_counter()
+    scrape_all_pages(base_url=base_url + "/pager")
+    sequential_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    scrape_all_pages_concurrent(workers=4, base_url=base_url + "/pager")
+    concurrent_time = time.perf_counter() - start
+
+    assert concurrent_time < sequential_time / 2
+
+
+@patch('access_amherst_algo.calendar_scraper.calendar_parser.fetch_page')
+def test_concurrent_scrape_empty_first_page(mock_fetch_page):
+    mock_fetch_page.return_value = None
+
+    assert scrape_all_pages_concurrent(workers=4) == []
+    mock_fetch_page.assert_called_once()
+
+def test_cached_scrape_skips_unchanged_pages(calendar_server, tmp_path):
+    cache = PageCache(str(tmp_path))
+    base_url = calendar_server.url + "/pager"
+
+    first = scrape_all_pages_concurrent(workers=4, base_url=base_url, cache=cache)
+    assert calendar_server.not_modified == []
+
+    with patch(
+        'access_amherst_algo.calendar_scraper.calendar_parser.BeautifulSoup'
+    ) as mock_soup:
+        second = scrape_all_pages_concurrent(
+            workers=4, base_url=base_url, cache=cache
+        )
+
+    assert second == first
+    assert sorted(calendar_server.not_modified) == list(range(FIXTURE_PAGES + 1))
+    mock_soup.assert_not_called()
+
+
+def test_cached_scrape_reuses_events_for_identical_bodies(calendar_server, tmp_path):
+    """Without validators, unchanged bodies are downloaded but not re-parsed."""
+    calendar_server.send_etag = False
+    cache = PageCache(str(tmp_path))
+    base_url = calendar_server.url + "/pager"
+
+    first = scrape_all_pages(base_url=base_url, cache=cache)
+    with patch(
+        'access_amherst_algo.calendar_scraper.calendar_parser.BeautifulSoup'
+    ) as mock_soup:
+        second = scrape_all_pages(base_url=base_url, cache=cache)
+
+    assert second == first
+    mock_soup.assert_not_called()
+
+
+def test_cached_scrape_reparses_changed_pages(calendar_server, tmp_path):
+    cache = PageCache(str(tmp_path))
+    base_url = calendar_server.url + "/pager"
+
+    scrape_all_pages_concurrent(workers=4, base_url=base_url, cache=cache)
+    calendar_server.version = 1
+    events = scrape_all_pages_concurrent(workers=4, base_url=base_url, cache=cache)
+
+    assert len(events) == FIXTURE_PAGES * FIXTURE_EVENTS_PER_PAGE
+    assert all(event["title"].endswith("v1") for event in events)
+
+def test_should_stop_scrape_past_horizon():
+    horizon = datetime(2024, 11, 7, 12, 0, tzinfo=pytz.UTC)
+    before = {"title": "Before", "start_time": "2024-11-07T06:00:00"}
+    after = {"title": "After", "start_time": "2024-11-07T09:00:00"}
+    undated = {"title": "Undated", "start_time": None}
+
+    # 09:00 Eastern is 14:00 UTC
+    assert should_stop_scrape([after, after], horizon=horizon)
+    assert not should_stop_scrape([before, after], horizon=horizon)
+    assert not should_stop_scrape([after, undated], horizon=horizon)
+    assert not should_stop_scrape([after])
+    assert not should_stop_scrape([], horizon=horizon)
+
+
+@pytest.mark.django_db
+def test_should_stop_scrape_incremental():
+    stored = {"title": "Stored", "start_time": "2024-11-07T09:00:00", "host": None}
+    new = {"title": "New", "start_time": "2024-11-07T09:00:00", "host": None}
+    Event.objects.create(
+        id=700_000_001,
+        title="Stored",
+        categories="[]",
+        content_hash=compute_content_hash(clean_event(stored)),
+    )
+
+    assert should_stop_scrape([stored], incremental=True)
+    assert not should_stop_scrape([stored, new], incremental=True)
+    assert not should_stop_scrape([stored])
+
+
+@pytest.mark.parametrize("concurrent", [False, True])
+def test_scrape_stops_at_horizon(calendar_server, concurrent):
+    base_url = calendar_server.url + "/pager"
+    # Page N starts on November N + 1 at 09:00 Eastern
+    horizon = datetime(2024, 11, 5, 20, 0, tzinfo=pytz.UTC)
+
+    if concurrent:
+        events = scrape_all_pages_concurrent(
+            workers=2, base_url=base_url, horizon=horizon
+        )
+    else:
+        events = scrape_all_pages(base_url=base_url, horizon=horizon)
+
+    assert len(events) == 5 * FIXTURE_EVENTS_PER_PAGE
+    assert events[-1]["title"].startswith("Event 4-")
+    if not concurrent:
+        assert calendar_server.requested == list(range(6))
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize("concurrent", [False, True])
+def test_incremental_scrape_stops_at_stored_page(calendar_server, concurrent):
+    base_url = calendar_server.url + "/pager"
+    for index, event in enumerate(scrape_all_pages(base_url=base_url)):
+        if event["title"].startswith("Event 3-"):
+            Event.objects.create(
+                id=700_000_000 + index,
+                title=event["title"],
+                categories="[]",
+                content_hash=compute_content_hash(clean_event(event)),
+            )
+
+    if concurrent:
+        events = scrape_all_pages_concurrent(
+            workers=2, base_url=base_url, incremental=True
+        )
+    else:
+        events = scrape_all_pages(base_url=base_url, incremental=True)
+
+    assert len(events) == 3 * FIXTURE_EVENTS_PER_PAGE
+    assert events[-1]["title"].startswith("Event 2-")
+
+CALENDAR_PAGE_FIXTURE = os.path.join(
+    os.path.dirname(__file__), "fixtures", "calendar_page_sample.html"
+)
+
+
+def test_parse_events_matches_full_parse():
+    with open(CALENDAR_PAGE_FIXTURE, "rb") as file:
+        html = file.read()
+
+    soup = BeautifulSoup(html, "html.parser")
+    expected = [
+        extract_event(article)
+        for article in soup.find_all("article", class_="mm-calendar-event")
+    ]
+
+    events = parse_events(html)
+    assert events == expected
+    assert len(events) == 12
+    assert events[2]["title"] == "Guest Lecture: AI & the Future"
+    assert events[1]["picture_link"] == (
+        "https://www.amherst.edu/system/files/styles/event_listing/public/event-1.jpg"
+    )
+
+
+@pytest.mark.parametrize(
+    "html,expected",
+    [
+        (b"<html>captcha detected</html>", True),
+        (b"<html><p>Please complete the CAPTCHA</p></html>", True),
+        ("<html><p>Captcha</p></html>", True),
+        (b'<script src="https://www.google.com/recaptcha/api.js"></script>', False),
+        (b"<html><p>Queer Talk</p></html>", False),
+    ],
+)
+def test_has_captcha(html, expected):
+    assert has_captcha(html) == expected
+
+
+@patch('access_amherst_algo.calendar_scraper.calendar_parser.fetch_page')
+def test_scrape_page_ignores_captcha_in_scripts(mock_fetch_page, mock_html):
+    mock_fetch_page.return_value = (
+        '<script src="https://www.google.com/recaptcha/api.js"></script>'
+        + mock_html
+    ).encode()
+
+    events = scrape_page("https://test.com")
+    assert len(events) == 1
+
 if __name__ == "__main__":
     pytest.main()
\ No newline at end of file
@@ -8,10 +8,15 @@ import os
 from access_amherst_algo.calendar_scraper.calendar_saver import (
     load_calendar_json,
     parse_calendar_datetime,
-    is_calendar_event_similar,
     save_calendar_event_to_db,
     process_calendar_events,
 )
+from access_amherst_algo.event_dedupe import compute_dedupe_key, dedupe_fields
+from access_amherst_algo.event_fingerprint import (
+    CALENDAR_ID_BASE,
+    compute_content_hash,
+    stable_event_id,
+)
 
 # Sample test data
 sample_calendar_event = {
@@ -105,37 +110,6 @@ def test_parse_calendar_datetime_empty():
     result = parse_calendar_datetime("")
     assert result is None
 
-def test_is_calendar_event_similar_true(mock_event_model):
-    """Test detection of similar calendar events when one exists."""
-    result = is_calendar_event_similar(sample_calendar_event)
-    assert result is True
-    mock_event_model.objects.filter.assert_called()
-
-
-def test_is_calendar_event_similar_false(mock_event_model, mock_event_queryset):
-    """Test detection of similar calendar events when none exist."""
-    mock_event = MagicMock()
-    mock_event.title = "Different Event"
-    mock_event_queryset.filter.return_value = [mock_event]
-
-    result = is_calendar_event_similar(sample_calendar_event)
-    assert result is False
-
-
-def test_is_calendar_event_similar_no_times():
-    """Test similar event detection with missing time data."""
-    event_no_times = sample_calendar_event.copy()
-    del event_no_times["start_time"]
-    del event_no_times["end_time"]
-    
-    with patch("access_amherst_algo.calendar_scraper.calendar_saver.Event") as mock_event:
-        mock_event.objects.all.return_value = mock_event.objects
-        mock_event.objects.filter.return_value = []
-        
-        result = is_calendar_event_similar(event_no_times)
-        assert result is False
-
-
 def test_save_calendar_event_to_db(mock_event_model):
     """Test saving calendar event to database."""
     save_calendar_event_to_db(sample_calendar_event)
@@ -151,6 +125,32 @@ def test_save_calendar_event_to_db(mock_event_model):
     assert sample_calendar_event["categories"][0] in json.loads(defaults["categories"])
 
 
+def test_save_calendar_event_to_db_orders_categories(mock_event_model):
+    """Merged categories keep their first-seen order, without repeats."""
+    event_data = dict(sample_calendar_event, categories=["Music", "Arts"])
+
+    save_calendar_event_to_db(event_data, ["Arts", "Social", "Music"])
+
+    defaults = mock_event_model.objects.update_or_create.call_args[1][
+        "defaults"
+    ]
+    assert json.loads(defaults["categories"]) == ["Music", "Arts", "Social"]
+
+
+def test_save_calendar_event_to_db_uses_stable_id(mock_event_model):
+    """The id depends only on the title and start time."""
+    save_calendar_event_to_db(sample_calendar_event)
+    save_calendar_event_to_db(dict(sample_calendar_event, location="Elsewhere"))
+
+    first, second = mock_event_model.objects.update_or_create.call_args_list
+    assert first.kwargs["id"] == second.kwargs["id"]
+    assert first.kwargs["id"] == stable_event_id(
+        CALENDAR_ID_BASE,
+        sample_calendar_event["title"],
+        datetime(2024, 11, 7, 15, 0, tzinfo=pytz.UTC),
+    )
+
+
 def test_save_calendar_event_to_db_missing_optional():
     """Test saving calendar event with missing optional fields."""
     event_data = sample_calendar_event.copy()
@@ -176,18 +176,177 @@ def test_save_calendar_event_to_db_error():
 
 
 @patch("access_amherst_algo.calendar_scraper.calendar_saver.load_calendar_json")
-@patch("access_amherst_algo.calendar_scraper.calendar_saver.is_calendar_event_similar")
+@patch("access_amherst_algo.calendar_scraper.calendar_saver.DedupeEngine")
 @patch("access_amherst_algo.calendar_scraper.calendar_saver.save_calendar_event_to_db")
-def test_process_calendar_events_success(mock_save, mock_is_similar, mock_load):
+def test_process_calendar_events_success(mock_save, mock_engine, mock_load):
     """Test successful processing of calendar events."""
     mock_load.return_value = sample_calendar_events_list
-    mock_is_similar.return_value = False
+    mock_find = mock_engine.return_value.find_duplicate
+    mock_find.return_value = None
 
     process_calendar_events()
 
+    start_time = datetime(2024, 11, 7, 15, 0, tzinfo=pytz.UTC)
+    event_id = stable_event_id(
+        CALENDAR_ID_BASE, "Test Calendar Event", start_time
+    )
     mock_load.assert_called_once()
-    mock_is_similar.assert_called_once_with(sample_calendar_event)
-    mock_save.assert_called_once_with(sample_calendar_event)
+    mock_engine.assert_called_once_with(
+        [("Test Calendar Event", start_time, event_id)],
+        source="calendar",
+        similarity_threshold=0.57,
+    )
+    mock_find.assert_called_once_with(
+        "Test Calendar Event", start_time, event_id
+    )
+    mock_save.assert_called_once_with(sample_calendar_event, ["Other"])
+    mock_engine.return_value.add.assert_called_once_with(
+        "Test Calendar Event", start_time, event_id
+    )
+
+
+@patch("access_amherst_algo.calendar_scraper.calendar_saver.load_calendar_json")
+@patch("access_amherst_algo.calendar_scraper.calendar_saver.DedupeEngine")
+@patch("access_amherst_algo.calendar_scraper.calendar_saver.save_calendar_event_to_db")
+def test_process_calendar_events_skips_duplicates(mock_save, mock_engine, mock_load):
+    """Test that duplicate calendar events are not saved."""
+    mock_load.return_value = sample_calendar_events_list
+    mock_engine.return_value.find_duplicate.return_value = 700_000_002
+
+    counts = process_calendar_events()
+
+    mock_save.assert_not_called()
+    mock_engine.return_value.add.assert_not_called()
+    assert counts["duplicate"] == 1
+    assert counts["cross_source"] == 0
+
+
+@patch("access_amherst_algo.calendar_scraper.calendar_saver.load_calendar_json")
+@patch("access_amherst_algo.calendar_scraper.calendar_saver.load_known_hashes")
+@patch("access_amherst_algo.calendar_scraper.calendar_saver.DedupeEngine")
+@patch("access_amherst_algo.calendar_scraper.calendar_saver.save_calendar_event_to_db")
+def test_process_calendar_events_skips_unchanged(
+    mock_save, mock_engine, mock_known_hashes, mock_load
+):
+    """Test that events stored with the same content hash are not rewritten."""
+    mock_load.return_value = sample_calendar_events_list
+    mock_known_hashes.return_value = {
+        compute_content_hash(sample_calendar_event)
+    }
+
+    counts = process_calendar_events()
+
+    mock_save.assert_not_called()
+    mock_engine.return_value.find_duplicate.assert_not_called()
+    assert counts["unchanged"] == 1
+    assert counts["changed"] == 0
+
+
+@pytest.mark.django_db
+@patch("access_amherst_algo.calendar_scraper.calendar_saver.load_calendar_json")
+@patch("access_amherst_algo.calendar_scraper.calendar_saver.save_calendar_event_to_db")
+def test_process_calendar_events_merges_hub_duplicates(mock_save, mock_load):
+    """Test that events already stored from the Hub are not saved again."""
+    from access_amherst_algo.models import Event
+
+    Event.objects.create(
+        id=500_012_345,
+        title="Test Calendar Event!",
+        start_time=datetime(2024, 11, 7, 16, 0, tzinfo=pytz.UTC),
+        categories="[]",
+    )
+    mock_load.return_value = sample_calendar_events_list
+
+    counts = process_calendar_events()
+
+    mock_save.assert_not_called()
+    assert counts["duplicate"] == 1
+    assert counts["cross_source"] == 1
+
+
+@pytest.mark.django_db
+@patch("access_amherst_algo.calendar_scraper.calendar_saver.load_calendar_json")
+def test_process_calendar_events_replaces_email_duplicates(mock_load):
+    """Test that a calendar event replaces the stored email copy of it."""
+    from access_amherst_algo.models import Event
+
+    Event.objects.create(
+        id=600_012_345,
+        title="Test Calendar Event!",
+        start_time=datetime(2024, 11, 7, 15, 30, tzinfo=pytz.UTC),
+        categories="[]",
+    )
+    mock_load.return_value = sample_calendar_events_list
+
+    counts = process_calendar_events()
+
+    assert counts["changed"] == 1
+    assert counts["duplicate"] == 0
+    assert counts["cross_source"] == 1
+    assert list(Event.objects.values_list("id", flat=True)) == [
+        stable_event_id(
+            CALENDAR_ID_BASE,
+            "Test Calendar Event",
+            datetime(2024, 11, 7, 15, 0, tzinfo=pytz.UTC),
+        )
+    ]
+
+
+@pytest.mark.django_db
+@patch("access_amherst_algo.calendar_scraper.calendar_saver.load_calendar_json")
+def test_process_calendar_events_updates_changed_event(mock_load):
+    """Test that a re-scraped event with new details updates its own row."""
+    from access_amherst_algo.models import Event
+
+    mock_load.return_value = [dict(sample_calendar_event, location="Keefe")]
+    process_calendar_events()
+    mock_load.return_value = [
+        dict(sample_calendar_event, location="Frost Library")
+    ]
+
+    counts = process_calendar_events()
+
+    assert counts["changed"] == 1
+    assert counts["duplicate"] == 0
+    assert Event.objects.get().location == "Frost Library"
+
+
+@pytest.mark.django_db
+def test_save_calendar_event_to_db_fills_dedupe_key():
+    """Test that saved events carry their normalized title and dedupe key."""
+    from access_amherst_algo.models import Event
+
+    save_calendar_event_to_db(sample_calendar_event, ["Other"])
+
+    event = Event.objects.get()
+    assert event.normalized_title == "test calendar event"
+    assert event.dedupe_key == compute_dedupe_key(
+        "test calendar event", datetime(2024, 11, 7, 15, 0, tzinfo=pytz.UTC)
+    )
+
+
+@pytest.mark.django_db
+@patch("access_amherst_algo.calendar_scraper.calendar_saver.load_calendar_json")
+@patch("access_amherst_algo.calendar_scraper.calendar_saver.save_calendar_event_to_db")
+def test_process_calendar_events_skips_exact_duplicates(mock_save, mock_load):
+    """Test that a stored row with the same dedupe key is not duplicated."""
+    from access_amherst_algo.models import Event
+
+    start_time = datetime(2024, 11, 7, 15, 5, tzinfo=pytz.UTC)
+    Event.objects.create(
+        id=700_000_001,
+        title="TEST: Calendar Event",
+        start_time=start_time,
+        categories="[]",
+        **dedupe_fields("TEST: Calendar Event", start_time),
+    )
+    mock_load.return_value = sample_calendar_events_list
+
+    counts = process_calendar_events()
+
+    mock_save.assert_not_called()
+    assert counts["duplicate"] == 1
+    assert counts["cross_source"] == 0
 
 
 @patch("access_amherst_algo.calendar_scraper.calendar_saver.load_calendar_json")
@@ -199,19 +358,21 @@ def test_process_calendar_events_no_events(mock_load):
 
 
 @patch("access_amherst_algo.calendar_scraper.calendar_saver.load_calendar_json")
-@patch("access_amherst_algo.calendar_scraper.calendar_saver.is_calendar_event_similar")
+@patch("access_amherst_algo.calendar_scraper.calendar_saver.DedupeEngine")
 @patch("access_amherst_algo.calendar_scraper.calendar_saver.save_calendar_event_to_db")
-def test_process_calendar_events_error_handling(mock_save, mock_is_similar, mock_load):
+def test_process_calendar_events_error_handling(mock_save, mock_engine, mock_load):
     """Test error handling during event processing."""
     mock_load.return_value = sample_calendar_events_list
-    mock_is_similar.return_value = False
+    mock_engine.return_value.find_duplicate.return_value = None
     mock_save.side_effect = Exception("Test error")
 
-    process_calendar_events()
+    counts = process_calendar_events()
 
     mock_load.assert_called_once()
-    mock_is_similar.assert_called_once()
+    mock_engine.return_value.find_duplicate.assert_called_once()
     mock_save.assert_called_once()
+    mock_engine.return_value.add.assert_not_called()
+    assert counts["failed"] == 1
 
 
 @pytest.mark.parametrize("location,expected", [
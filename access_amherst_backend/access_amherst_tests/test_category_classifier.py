@@ -0,0 +1,141 @@
+import joblib
+import numpy as np
+import pytest
+from unittest.mock import patch
+from sklearn.feature_extraction.text import TfidfVectorizer
+from sklearn.metrics.pairwise import cosine_similarity
+from access_amherst_algo.calendar_scraper import category_classifier
+from access_amherst_algo.calendar_scraper.category_classifier import (
+    CATEGORY_DESCRIPTIONS,
+    best_category_index,
+    classify_texts,
+    fit_category_model,
+    load_category_model,
+    score_categories,
+)
+from access_amherst_algo.calendar_scraper.calendar_saver import (
+    assign_categories,
+    assign_categories_batch,
+)
+
+TEXTS = [
+    "jazz ensemble concert buckley recital hall",
+    "guest lecture: ai & the future research discussion",
+    "queer talk social gathering community keefe 213",
+    "cricket club practice team sports",
+    "meditation and prayer in the chapel",
+    "workshop workshop workshop hands-on training",
+    "social business",
+    "the and of",
+    "tbd",
+    "",
+    "word " * 1000,
+]
+
+
+def per_event_scores(text):
+    """Scores as computed by fitting a vectorizer for each event."""
+    vectorizer = TfidfVectorizer(stop_words="english")
+    tfidf_matrix = vectorizer.fit_transform(
+        [text] + list(CATEGORY_DESCRIPTIONS.values())
+    )
+    return cosine_similarity(tfidf_matrix[0:1], tfidf_matrix[1:])[0]
+
+
+def per_event_category(text):
+    similarities = per_event_scores(text)
+    best_match_idx = best_category_index(similarities)
+    if similarities[best_match_idx] > 0.02:
+        return [list(CATEGORY_DESCRIPTIONS)[best_match_idx]]
+    return ["Other"]
+
+
+def test_scores_match_per_event_vectorizer():
+    scores = score_categories(TEXTS)
+
+    assert scores.shape == (len(TEXTS), len(CATEGORY_DESCRIPTIONS))
+    for text, row in zip(TEXTS, scores):
+        np.testing.assert_allclose(row, per_event_scores(text), atol=1e-12)
+
+
+def test_classification_matches_per_event_vectorizer():
+    # Includes exact ties, which must go to the first category
+    texts = TEXTS + [
+        "ethnic visual and frost multicultural athletic meeting",
+        "talk orchestra game practical outreach room social",
+    ]
+    assert classify_texts(texts) == [
+        per_event_category(text) for text in texts
+    ]
+
+
+def test_ties_go_to_the_first_category():
+    assert best_category_index(np.array([0.1, 0.3, 0.3 + 1e-16])) == 1
+    assert best_category_index(np.array([0.3 + 1e-16, 0.3, 0.1])) == 0
+    assert best_category_index(np.array([0.1, 0.3, 0.30001])) == 2
+
+
+def test_model_is_fitted_once_and_persisted(category_model_path):
+    model = load_category_model()
+    assert category_model_path.exists()
+
+    category_classifier.clear_category_model()
+    with patch.object(category_classifier, "fit_category_model") as mock_fit:
+        reloaded = load_category_model()
+        load_category_model()
+
+    mock_fit.assert_not_called()
+    assert reloaded["version"] == model["version"]
+
+
+def test_model_is_refitted_when_descriptions_change(category_model_path):
+    stale = fit_category_model({"Social": "party"})
+    joblib.dump(stale, category_model_path)
+
+    model = load_category_model()
+
+    assert model["categories"] == list(CATEGORY_DESCRIPTIONS)
+    assert joblib.load(category_model_path)["version"] == model["version"]
+
+
+def test_unreadable_model_is_refitted(category_model_path):
+    category_model_path.write_bytes(b"not a model")
+
+    assert load_category_model()["categories"] == list(CATEGORY_DESCRIPTIONS)
+
+
+def test_batch_matches_single_event_assignment():
+    events = [
+        {"title": "Jazz Ensemble Concert", "location": "Buckley"},
+        {"title": "Guest Lecture", "event_description": "research talk"},
+        {"title": "Hosted", "host": ["Not", "a", "string"]},
+        {"title": ""},
+        "not an event",
+    ]
+
+    batch = assign_categories_batch(events)
+
+    assert batch == [assign_categories(event) for event in events]
+    assert batch[0] == ["Concert"]
+    assert batch[2:] == [["Other"], ["Other"], ["Other"]]
+
+
+def test_batch_uses_one_model_pass():
+    events = [{"title": text} for text in TEXTS]
+    with patch(
+        "access_amherst_algo.calendar_scraper.calendar_saver.classify_texts",
+        wraps=classify_texts,
+    ) as mock_classify:
+        assign_categories_batch(events)
+
+    mock_classify.assert_called_once()
+
+
+def test_classifier_error_returns_other():
+    with patch(
+        "access_amherst_algo.calendar_scraper.calendar_saver.classify_texts",
+        side_effect=MemoryError("Test error"),
+    ):
+        assert assign_categories_batch([{"title": "Jazz Concert"}]) == [
+            ["Other"]
+        ]
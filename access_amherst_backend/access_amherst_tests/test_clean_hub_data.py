@@ -56,3 +56,12 @@ def test_clean_hub_data(
     )
 
     mock_open.assert_called_once_with(expected_filename, "w")
+
+
+@patch("builtins.open", new_callable=mock_open)
+def test_clean_hub_data_without_json(mock_open, sample_pre_cleaned_data):
+    cleaned_events = clean_hub_data(sample_pre_cleaned_data, write_json=False)
+
+    assert len(cleaned_events) == 1
+    assert cleaned_events[0]["id"] == 10428286 + 500_000_000
+    mock_open.assert_not_called()
@@ -0,0 +1,163 @@
+import fcntl
+import pytest
+from io import StringIO
+from unittest.mock import patch
+from django.core.management import call_command
+from access_amherst_algo.email_scraper.digest_fetcher import FetchedDigest
+from access_amherst_algo.management.commands import daily_mammoth_workflow
+from access_amherst_algo.models import Event, MailboxState
+
+COMMAND = "access_amherst_algo.management.commands.daily_mammoth_workflow"
+
+FIRST_DIGEST = """Amherst College Daily Mammoth for Thursday, November 7, 2024
+
+Queer Talk
+Thursday, November 7, 2024, 3-4 p.m.
+Keefe Campus Center 213
+Join us for a discussion.
+
+Jazz Night
+7 p.m.
+Location: Buckley Recital Hall
+Come hear the band."""
+
+SECOND_DIGEST = """Amherst College Daily Mammoth for Friday, November 8, 2024
+
+Jazz Night
+Thursday, November 7, 2024, 7 p.m.
+Location: Buckley Recital Hall
+Come hear the band.
+
+Poetry Reading
+Friday, Nov. 8, noon
+Frost Library"""
+
+
+@pytest.fixture(autouse=True)
+def lock_path(tmp_path, monkeypatch):
+    path = tmp_path / "daily_mammoth_workflow.lock"
+    monkeypatch.setattr(daily_mammoth_workflow, "LOCK_PATH", str(path))
+    return path
+
+
+@pytest.fixture
+def mock_fetch():
+    with patch(f"{COMMAND}.fetch_new_digests") as mock_fetch, patch(
+        "access_amherst_algo.email_scraper.email_parser.extract_events_chunked",
+        side_effect=AssertionError("the LLM should not be needed"),
+    ):
+        yield mock_fetch
+
+
+def digests(*bodies, first_uid=3):
+    return [
+        FetchedDigest("inbox", 42, first_uid + index, body)
+        for index, body in enumerate(bodies)
+    ]
+
+
+@pytest.mark.django_db
+def test_daily_mammoth_workflow_saves_backlog(mock_fetch):
+    mock_fetch.return_value = digests(FIRST_DIGEST, SECOND_DIGEST)
+    out = StringIO()
+
+    call_command("daily_mammoth_workflow", stdout=out)
+
+    titles = sorted(Event.objects.values_list("title", flat=True))
+    assert titles == ["Jazz Night", "Poetry Reading", "Queer Talk"]
+    assert Event.objects.filter(dedupe_key__isnull=False).count() == 3
+    state = MailboxState.objects.get()
+    assert (state.uid_validity, state.last_uid) == (42, 4)
+    output = out.getvalue()
+    assert "Processed 2 of 2 new digest(s)" in output
+    assert "3 changed, 0 unchanged, 1 duplicate events" in output
+    for stage in ("fetch", "extract", "dedupe", "upsert"):
+        assert f"{stage} " in output.split("Timings: ")[1]
+
+
+@pytest.mark.django_db
+def test_daily_mammoth_workflow_moves_past_digests_without_events(
+    mock_fetch,
+):
+    empty = "Amherst College Daily Mammoth for Wednesday, November 6, 2024"
+    mock_fetch.return_value = digests(empty, FIRST_DIGEST)
+    out = StringIO()
+
+    call_command("daily_mammoth_workflow", stdout=out)
+
+    assert sorted(Event.objects.values_list("title", flat=True)) == [
+        "Jazz Night",
+        "Queer Talk",
+    ]
+    assert MailboxState.objects.get().last_uid == 4
+    assert "Processed 2 of 2 new digest(s)" in out.getvalue()
+
+
+@pytest.mark.django_db
+def test_daily_mammoth_workflow_rerun_is_idempotent(mock_fetch):
+    mock_fetch.return_value = digests(FIRST_DIGEST)
+    call_command("daily_mammoth_workflow", stdout=StringIO())
+    stored = {event.id: event.content_hash for event in Event.objects.all()}
+    out = StringIO()
+
+    call_command("daily_mammoth_workflow", stdout=out)
+
+    assert {
+        event.id: event.content_hash for event in Event.objects.all()
+    } == stored
+    assert "0 changed, 2 unchanged" in out.getvalue()
+
+
+@pytest.mark.django_db
+def test_daily_mammoth_workflow_updates_changed_events(mock_fetch):
+    mock_fetch.return_value = digests(FIRST_DIGEST)
+    call_command("daily_mammoth_workflow", stdout=StringIO())
+    mock_fetch.return_value = digests(
+        FIRST_DIGEST.replace("Keefe Campus Center 213", "Keefe 214"),
+        first_uid=9,
+    )
+
+    call_command("daily_mammoth_workflow", stdout=StringIO())
+
+    assert Event.objects.get(title="Queer Talk").location == "Keefe 214"
+    assert Event.objects.count() == 2
+    assert MailboxState.objects.get().last_uid == 9
+
+
+@pytest.mark.django_db
+def test_daily_mammoth_workflow_without_new_digests(mock_fetch):
+    mock_fetch.return_value = []
+    out = StringIO()
+
+    call_command("daily_mammoth_workflow", stdout=out)
+
+    assert "No new digests; nothing to do." in out.getvalue()
+    assert "Timings: fetch" in out.getvalue()
+    assert not MailboxState.objects.exists()
+
+
+@pytest.mark.django_db
+def test_daily_mammoth_workflow_skips_while_another_run_holds_lock(
+    mock_fetch, lock_path
+):
+    out = StringIO()
+
+    with open(lock_path, "a") as held:
+        fcntl.flock(held, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        call_command("daily_mammoth_workflow", stdout=out)
+
+    assert "Another Daily Mammoth run is in progress" in out.getvalue()
+    mock_fetch.assert_not_called()
+
+
+@pytest.mark.django_db
+def test_daily_mammoth_workflow_keeps_mark_when_saving_fails(mock_fetch):
+    mock_fetch.return_value = digests(FIRST_DIGEST)
+
+    with patch(
+        f"{COMMAND}.bulk_upsert_events", side_effect=Exception("DB down")
+    ):
+        with pytest.raises(Exception, match="DB down"):
+            call_command("daily_mammoth_workflow", stdout=StringIO())
+
+    assert not MailboxState.objects.exists()
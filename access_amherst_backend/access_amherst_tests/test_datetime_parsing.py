@@ -0,0 +1,95 @@
+import pytest
+import pytz
+from datetime import datetime, time
+from unittest.mock import patch
+from dateutil import parser
+from access_amherst_algo import datetime_parsing
+from access_amherst_algo.datetime_parsing import (
+    parse_datetime,
+    parse_datetime_utc,
+    parse_time_of_day,
+)
+
+SAMPLES = [
+    "Fri, 18 Oct 2024 02:21:19 GMT",
+    "Sun, 20 Oct 2024 20:30:00 GMT",
+    "18 Oct 2024 16:00:00 -0400",
+    "Fri, 18 Oct 2024 20:00:00 +0000",
+    "2024-11-07T15:00:00Z",
+    "2024-11-07T15:00:00-05:00",
+    "2024-11-07T15:00:00.5+05:30",
+    "2024-11-07 15:00",
+    "2024-11-07",
+    " 2024-11-07T15:00:00 ",
+    # Formats without a fast path
+    "2024-10-18T16:00:00.0000000-04:00",
+    "November 7, 2024 3:00 PM",
+]
+
+
+@pytest.mark.parametrize("value", SAMPLES)
+def test_parse_datetime_matches_dateutil(value):
+    expected = parser.parse(value)
+    parsed = parse_datetime(value)
+
+    assert parsed == expected
+    assert parsed.utcoffset() == expected.utcoffset()
+
+
+def test_fast_formats_skip_dateutil():
+    with patch.object(
+        datetime_parsing.dateutil_parser, "parse", wraps=parser.parse
+    ) as mock_parse:
+        parse_datetime("Sat, 02 Nov 2024 18:00:00 GMT")
+        parse_datetime("2024-11-02T18:00:00-04:00")
+        parse_datetime("November 2, 2024 6:00 PM")
+
+    assert [call.args[0] for call in mock_parse.call_args_list] == [
+        "November 2, 2024 6:00 PM"
+    ]
+
+
+def test_invalid_dates_raise_like_dateutil():
+    with pytest.raises(ValueError):
+        parse_datetime("2024-02-31T10:00:00")
+    with pytest.raises(ValueError):
+        parse_datetime("not a date")
+    with pytest.raises(TypeError):
+        parse_datetime(None)
+
+
+def test_parse_datetime_utc():
+    assert parse_datetime_utc("Fri, 18 Oct 2024 20:00:00 GMT") == datetime(
+        2024, 10, 18, 20, 0, tzinfo=pytz.UTC
+    )
+    assert parse_datetime_utc("2024-11-07T15:00:00-05:00").tzinfo is pytz.UTC
+    # Strings without an offset use the given time zone
+    assert parse_datetime_utc(
+        "2024-11-10T18:00:00", "America/New_York"
+    ) == datetime(2024, 11, 10, 23, 0, tzinfo=pytz.UTC)
+
+
+def test_parse_datetime_utc_is_memoized():
+    datetime_parsing._parse_utc.cache_clear()
+    parse_datetime_utc("2024-11-07T15:00:00Z")
+    parse_datetime_utc("2024-11-07T15:00:00Z")
+    assert datetime_parsing._parse_utc.cache_info().hits == 1
+
+
+@pytest.mark.parametrize(
+    "value", ["18:00:00", "9:05:00", "23:59:59", "00:00:00"]
+)
+def test_parse_time_of_day_matches_strptime(value):
+    assert (
+        parse_time_of_day(value) == datetime.strptime(value, "%H:%M:%S").time()
+    )
+
+
+@pytest.mark.parametrize("value", ["24:00:00", "18:00", "6 PM"])
+def test_parse_time_of_day_rejects_invalid_times(value):
+    with pytest.raises(ValueError):
+        parse_time_of_day(value)
+
+
+def test_parse_time_of_day_returns_time():
+    assert parse_time_of_day("18:00:00") == time(18, 0)
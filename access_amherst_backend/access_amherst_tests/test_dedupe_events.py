@@ -0,0 +1,71 @@
+import pytest
+import pytz
+from datetime import datetime, timedelta
+from io import StringIO
+from django.core.management import call_command
+from access_amherst_algo.models import Event
+
+START = datetime(2024, 11, 7, 15, 0, tzinfo=pytz.UTC)
+LATER = START + timedelta(hours=4)
+
+# (id, title, start time, pub date)
+ROWS = [
+    # Announced everywhere; the Hub row is kept
+    (700_000_001, "Queer Talk!", START, START - timedelta(days=1)),
+    (500_000_001, "Queer Talk", START + timedelta(hours=1), None),
+    (600_000_001, "Queer talk", START, START - timedelta(days=2)),
+    # Saved twice by the calendar; the newer row is kept
+    (700_000_002, "Jazz Ensemble Concert", LATER, START - timedelta(days=3)),
+    (700_000_003, "Jazz Ensemble Concert", LATER, START - timedelta(days=1)),
+    # Distinct events: a week later, or the same source at another time
+    (700_000_004, "Jazz Ensemble Concert", LATER + timedelta(days=7), None),
+    (600_000_002, "Poetry Reading", START, None),
+    (600_000_003, "Poetry Reading", START + timedelta(minutes=30), None),
+]
+
+
+@pytest.fixture
+def duplicated_events(db):
+    for event_id, title, start_time, pub_date in ROWS:
+        Event.objects.create(
+            id=event_id,
+            title=title,
+            start_time=start_time,
+            pub_date=pub_date,
+            categories="[]",
+        )
+
+
+def test_dedupe_events_dry_run(duplicated_events):
+    out = StringIO()
+
+    call_command("dedupe_events", "--dry-run", stdout=out)
+
+    assert Event.objects.count() == len(ROWS)
+    output = out.getvalue()
+    assert "Keeping event: ID=500000001 (hub)" in output
+    assert "Merging event: ID=600000001 (email)" in output
+    assert "would delete 3 duplicate event(s) in 2 cluster(s)" in output
+
+
+def test_dedupe_events_deletes_duplicates(duplicated_events):
+    out = StringIO()
+
+    call_command("dedupe_events", stdout=out)
+
+    assert set(Event.objects.values_list("id", flat=True)) == {
+        500_000_001,
+        700_000_003,
+        700_000_004,
+        600_000_002,
+        600_000_003,
+    }
+    assert "Deleted 3 duplicate event(s) in 2 cluster(s)." in out.getvalue()
+
+
+def test_dedupe_events_empty_table(db):
+    out = StringIO()
+
+    call_command("dedupe_events", stdout=out)
+
+    assert "Deleted 0 duplicate event(s) in 0 cluster(s)." in out.getvalue()
@@ -0,0 +1,95 @@
+import os
+import pytest
+import xml.etree.ElementTree as ET
+from unittest.mock import patch
+from access_amherst_algo.rss_scraper import description_parser
+from access_amherst_algo.rss_scraper.description_parser import (
+    extract_description,
+    extract_description_bs4,
+    extract_descriptions,
+)
+from access_amherst_algo.rss_scraper.parse_rss import create_events_list
+
+FIXTURE = os.path.join(
+    os.path.dirname(__file__), "fixtures", "hub_feed_sample.xml"
+)
+
+
+def wrap(body):
+    return (
+        '<div class="h-event vevent">\n'
+        '<div class="p-name summary">Title</div>\n'
+        f'<div class="p-description description">{body}</div>\n'
+        "<div>From 4:00 PM</div></div>"
+    )
+
+
+@pytest.fixture
+def recorded_descriptions():
+    root = ET.parse(FIXTURE).getroot()
+    return [item.find("description").text for item in root.findall(".//item")]
+
+
+def test_matches_beautifulsoup_on_recorded_feed(recorded_descriptions):
+    for description in recorded_descriptions:
+        assert extract_description(description) == extract_description_bs4(
+            description
+        )
+
+
+def test_fast_path_handles_regular_markup(recorded_descriptions):
+    with patch.object(
+        description_parser,
+        "extract_description_bs4",
+        wraps=extract_description_bs4,
+    ) as mock_bs4:
+        for description in recorded_descriptions:
+            extract_description(description)
+
+    # Only the item with an HTML comment needs the full parser
+    assert mock_bs4.call_count == 1
+    assert "<!--" in mock_bs4.call_args.args[0]
+
+
+@pytest.mark.parametrize(
+    "body",
+    [
+        "<p>Q&amp;A &lt;3</p> &amp; more",
+        '<a href=\'say "hi"\' class="b  a">x</a>',
+        "<img src=x alt><br/><span/>",
+        "<br><br/>text",
+        "<p>unclosed<div>nested</p></div>",
+        "&#150; &foo; &copy",
+        "<pre>  keep  </pre>",
+        "\n   <p>  </p>\t",
+    ],
+)
+def test_irregular_markup_matches_beautifulsoup(body):
+    description = wrap(body)
+    assert extract_description(description) == extract_description_bs4(
+        description
+    )
+
+
+def test_missing_description_div_raises():
+    with pytest.raises(AttributeError):
+        extract_description("<div>No description</div>")
+
+
+def test_extract_descriptions_in_parallel(recorded_descriptions, monkeypatch):
+    monkeypatch.setattr(description_parser, "MIN_PARALLEL_DESCRIPTIONS", 1)
+    descriptions = recorded_descriptions + [None]
+
+    parallel = extract_descriptions(descriptions, workers=2)
+
+    assert parallel == extract_descriptions(descriptions)
+    assert parallel[-1] == ""
+
+
+def test_create_events_list_with_workers(monkeypatch):
+    monkeypatch.setattr(description_parser, "MIN_PARALLEL_DESCRIPTIONS", 1)
+    with patch(
+        "access_amherst_algo.rss_scraper.parse_rss.get_rss_file_name",
+        return_value=FIXTURE,
+    ):
+        assert create_events_list(workers=2) == create_events_list()
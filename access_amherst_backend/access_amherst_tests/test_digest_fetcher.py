@@ -0,0 +1,318 @@
+import base64
+import quopri
+import re
+import socketserver
+import threading
+
+import pytest
+
+from access_amherst_algo.email_scraper import digest_fetcher
+from access_amherst_algo.email_scraper.digest_fetcher import (
+    DIGEST_SUBJECT,
+    decode_part,
+    fetch_new_digests,
+    find_text_part,
+    mark_processed,
+    parse_response,
+)
+from access_amherst_algo.models import MailboxState
+
+DIGEST_TEXT = (
+    "Daily Mammoth for Thursday, November 7, 2024\n\nCafé Night\n7 p.m."
+)
+
+
+def text_part(subtype, text, encoding="quoted-printable", disposition=None):
+    raw = text.encode("utf-8")
+    if encoding == "quoted-printable":
+        payload = quopri.encodestring(raw)
+    elif encoding == "base64":
+        payload = base64.encodebytes(raw)
+    else:
+        payload = raw
+    return {
+        "type": "text",
+        "subtype": subtype,
+        "encoding": encoding,
+        "payload": payload,
+        "disposition": disposition,
+    }
+
+
+def attachment(name, data):
+    return {
+        "type": "application",
+        "subtype": "pdf",
+        "encoding": "base64",
+        "payload": base64.encodebytes(data),
+        "disposition": name,
+    }
+
+
+def digest_message(text, encoding="quoted-printable"):
+    """A digest with text and HTML alternatives and a PDF attachment."""
+    return (
+        "mixed",
+        [
+            (
+                "alternative",
+                [
+                    text_part("plain", text, encoding),
+                    text_part("html", f"<p>{text}</p>", encoding),
+                ],
+            ),
+            attachment("flyer.pdf", b"%PDF" + b"x" * 4096),
+        ],
+    )
+
+
+def bodystructure(node):
+    if isinstance(node, tuple):
+        subtype, children = node
+        return (
+            "("
+            + "".join(bodystructure(child) for child in children)
+            + f' "{subtype}")'
+        )
+    disposition = (
+        f'("attachment" ("filename" "{node["disposition"]}"))'
+        if node["disposition"]
+        else "NIL"
+    )
+    size = len(node["payload"])
+    if node["type"] == "text":
+        lines = node["payload"].count(b"\n")
+        return (
+            f'("text" "{node["subtype"]}" ("charset" "utf-8") NIL NIL '
+            f'"{node["encoding"]}" {size} {lines} NIL {disposition} NIL)'
+        )
+    return (
+        f'("{node["type"]}" "{node["subtype"]}" NIL NIL NIL '
+        f'"{node["encoding"]}" {size} NIL {disposition} NIL)'
+    )
+
+
+def find_part(node, spec):
+    for number in spec.split("."):
+        if isinstance(node, tuple):
+            node = node[1][int(number) - 1]
+    return node
+
+
+class IMAPHandler(socketserver.StreamRequestHandler):
+    """Just enough IMAP4rev1 for imaplib to log in, search and fetch."""
+
+    def send(self, line):
+        self.wfile.write(line + b"\r\n")
+
+    def handle(self):
+        server = self.server
+        self.send(b"* OK IMAP4rev1 stand-in ready")
+        while True:
+            line = self.rfile.readline()
+            if not line:
+                return
+            line = line.rstrip(b"\r\n").decode()
+            server.commands.append(line)
+            tag, command = line.split(" ", 1)
+            name = command.split(" ", 1)[0].upper()
+            if name == "CAPABILITY":
+                self.send(b"* CAPABILITY IMAP4rev1")
+            elif name == "LOGIN":
+                if server.password not in command:
+                    self.send(f"{tag} NO invalid credentials".encode())
+                    continue
+            elif name in ("SELECT", "EXAMINE"):
+                self.send(f"* {len(server.messages)} EXISTS".encode())
+                self.send(
+                    f"* OK [UIDVALIDITY {server.uid_validity}] UIDs".encode()
+                )
+            elif name == "UID":
+                self.uid_command(command)
+            elif name == "LOGOUT":
+                self.send(b"* BYE")
+                self.send(f"{tag} OK LOGOUT completed".encode())
+                return
+            self.send(f"{tag} OK {name} completed".encode())
+
+    def uid_command(self, command):
+        server = self.server
+        uids = sorted(server.messages)
+        search = re.match(r'UID SEARCH UID (\d+):\* SUBJECT "(.*)"', command)
+        if search:
+            first = int(search.group(1))
+            subject = search.group(2)
+            found = [
+                uid
+                for uid in uids
+                if uid >= first and subject in server.messages[uid][0]
+            ]
+            # Like real servers, `n:*` includes the newest message
+            if not found and uids:
+                found = [uids[-1]]
+            self.send(("* SEARCH " + " ".join(map(str, found))).encode())
+            return
+        fetch = re.match(r"UID FETCH ([\d,]+) \((.*)\)", command)
+        wanted = [int(uid) for uid in fetch.group(1).split(",")]
+        for uid in wanted:
+            sequence = uids.index(uid) + 1
+            message = server.messages[uid][1]
+            if fetch.group(2) == "BODYSTRUCTURE":
+                self.send(
+                    f"* {sequence} FETCH (UID {uid} BODYSTRUCTURE "
+                    f"{bodystructure(message)})".encode()
+                )
+                continue
+            spec = re.fullmatch(r"BODY\.PEEK\[([\d.]+)\]", fetch.group(2))
+            payload = find_part(message, spec.group(1))["payload"]
+            self.send(
+                f"* {sequence} FETCH (UID {uid} BODY[{spec.group(1)}] "
+                f"{{{len(payload)}}}".encode()
+            )
+            self.wfile.write(payload)
+            self.send(b")")
+
+
+@pytest.fixture
+def imap_server(monkeypatch):
+    """Serve a mailbox over plain IMAP on a local port."""
+    server = socketserver.ThreadingTCPServer(("127.0.0.1", 0), IMAPHandler)
+    server.daemon_threads = True
+    server.password = "app-password"
+    server.uid_validity = 42
+    server.messages = {}
+    server.commands = []
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    monkeypatch.setenv("EMAIL_ADDRESS", "events@amherst.edu")
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def fetch(server, password="app-password"):
+    return fetch_new_digests(
+        password,
+        mail_server="127.0.0.1",
+        port=server.server_address[1],
+        use_ssl=False,
+    )
+
+
+def test_parse_response_and_find_text_part():
+    structure = parse_response(
+        b'(("text" "plain" ("charset" "ISO-8859-1") NIL NIL "BASE64" 5 1)'
+        b'("text" "html" NIL NIL NIL "7bit" 9 1) "alternative")'
+    )[0]
+
+    assert find_text_part(structure) == ("1", "base64", "ISO-8859-1")
+    assert find_text_part(structure[1]) is None
+    assert find_text_part(["text", "plain", None, None, None, None, 1, 1]) == (
+        "1",
+        "7bit",
+        "utf-8",
+    )
+
+
+def test_find_text_part_skips_attached_text():
+    structure = parse_response(
+        b'(("text" "plain" NIL NIL NIL "7bit" 5 1 NIL '
+        b'("attachment" ("filename" "notes.txt")) NIL)'
+        b'("text" "plain" NIL NIL NIL "7bit" 5 1) "mixed")'
+    )[0]
+
+    assert find_text_part(structure)[0] == "2"
+
+
+def test_decode_part():
+    assert decode_part(b"Caf=C3=A9", "quoted-printable", "utf-8") == "Café"
+    assert decode_part(b"Q2Fmw6k=", "base64", "utf-8") == "Café"
+    assert decode_part(b"Caf\xe9", "7bit", "no-such-charset") == "Caf�"
+
+
+@pytest.mark.django_db
+def test_fetch_new_digests_fetches_backlog_text_parts_only(imap_server):
+    imap_server.messages = {
+        3: (f"{DIGEST_SUBJECT} for Wednesday", digest_message(DIGEST_TEXT)),
+        5: ("Unrelated", digest_message("Not a digest")),
+        8: (
+            f"{DIGEST_SUBJECT} for Thursday",
+            digest_message("Second digest", encoding="base64"),
+        ),
+    }
+
+    digests = fetch(imap_server)
+
+    assert [(d.uid, d.body) for d in digests] == [
+        (3, DIGEST_TEXT),
+        (8, "Second digest"),
+    ]
+    assert all(d.uid_validity == 42 for d in digests)
+    fetches = [c for c in imap_server.commands if "FETCH" in c]
+    # One structure request for the backlog, then only the plain-text parts
+    assert fetches[0].endswith("UID FETCH 3,8 (BODYSTRUCTURE)")
+    assert [c.split(" ", 1)[1] for c in fetches[1:]] == [
+        "UID FETCH 3 (BODY.PEEK[1.1])",
+        "UID FETCH 8 (BODY.PEEK[1.1])",
+    ]
+    assert any(" EXAMINE " in c for c in imap_server.commands)
+    assert any(c.endswith(" LOGOUT") for c in imap_server.commands)
+
+
+@pytest.mark.django_db
+def test_fetch_new_digests_resumes_after_last_processed_uid(imap_server):
+    imap_server.messages = {
+        3: (f"{DIGEST_SUBJECT} 1", digest_message("First")),
+        8: (f"{DIGEST_SUBJECT} 2", digest_message("Second")),
+    }
+    for digest in fetch(imap_server):
+        mark_processed(digest)
+    imap_server.commands.clear()
+
+    assert fetch(imap_server) == []
+    assert any(
+        'UID SEARCH UID 9:* SUBJECT "' in c for c in imap_server.commands
+    )
+    assert not any("FETCH" in c for c in imap_server.commands)
+
+    imap_server.messages[11] = (f"{DIGEST_SUBJECT} 3", digest_message("Third"))
+    assert [d.body for d in fetch(imap_server)] == ["Third"]
+
+    state = MailboxState.objects.get()
+    assert (state.uid_validity, state.last_uid) == (42, 8)
+
+
+@pytest.mark.django_db
+def test_fetch_new_digests_restarts_when_uidvalidity_changes(imap_server):
+    imap_server.messages = {3: (DIGEST_SUBJECT, digest_message("First"))}
+    mark_processed(fetch(imap_server)[0])
+
+    imap_server.uid_validity = 43
+
+    assert [d.uid for d in fetch(imap_server)] == [3]
+
+
+@pytest.mark.django_db
+def test_fetch_new_digests_login_failure(imap_server):
+    assert fetch(imap_server, password="wrong") == []
+    assert not MailboxState.objects.exists()
+
+
+@pytest.mark.django_db
+def test_fetch_new_digests_without_text_part(imap_server):
+    imap_server.messages = {
+        3: (DIGEST_SUBJECT, ("mixed", [attachment("flyer.pdf", b"%PDF")])),
+    }
+
+    digests = fetch(imap_server)
+
+    assert [(d.uid, d.body) for d in digests] == [(3, None)]
+    assert not any("BODY.PEEK" in c for c in imap_server.commands)
+
+
+def test_mailbox_key_separates_filters():
+    assert digest_fetcher.mailbox_key(
+        "a@b.edu", "imap.gmail.com", "inbox", "Daily Mammoth"
+    ) != digest_fetcher.mailbox_key(
+        "a@b.edu", "imap.gmail.com", "inbox", "Weekly"
+    )
@@ -0,0 +1,169 @@
+import pytest
+
+from access_amherst_algo.email_scraper.digest_parser import (
+    parse_date,
+    parse_digest,
+    parse_section,
+    parse_time_range,
+    split_sections,
+)
+
+DIGEST = """Amherst College Daily Mammoth for Thursday, November 7, 2024
+
+Queer Talk
+Thursday, November 7, 2024, 3-4 p.m.
+Keefe Campus Center 213
+Join us for a discussion.
+https://example.com/queer-talk
+
+A second paragraph of the description.
+
+-----
+Jazz Night
+Friday, Nov. 8
+7 p.m.
+Location: Buckley Recital Hall
+Sponsored by: Music Department
+Contact: Jane Doe <jdoe@amherst.edu>
+Come hear the band.
+
+Open studio hours all week in Fayerweather, see website.
+Starting at 4 p.m. daily.
+
+To unsubscribe, click here."""
+
+
+@pytest.mark.parametrize(
+    "text, expected",
+    [
+        ("Thursday, November 7, 2024, 3-4:30 p.m.", ("15:00:00", "16:30:00")),
+        ("11-1 p.m.", ("11:00:00", "13:00:00")),
+        ("noon to 1:30 p.m.", ("12:00:00", "13:30:00")),
+        ("10:30 a.m.–noon", ("10:30:00", "12:00:00")),
+        ("3:00 PM - 5:00 PM", ("15:00:00", "17:00:00")),
+        ("Time: 7 PM", ("19:00:00", None)),
+        ("Room 204, 2024", (None, None)),
+        ("13 p.m.", (None, None)),
+    ],
+)
+def test_parse_time_range(text, expected):
+    assert parse_time_range(text) == expected
+
+
+def test_parse_date():
+    assert parse_date("Thursday, Nov. 7, 3 p.m.", 2024) == "2024-11-07"
+    assert parse_date("September 3, 2025", 2024) == "2025-09-03"
+    assert parse_date("Sept 31", 2024) is None
+    assert parse_date("Room 204", 2024) is None
+
+
+def test_split_sections():
+    assert split_sections("Queer Talk\n-----\nJazz Night\n\n \n Poetry") == [
+        "Queer Talk",
+        "Jazz Night",
+        "Poetry",
+    ]
+
+
+def test_parse_section_reads_labelled_fields():
+    event = parse_section(
+        "Jazz Night\nFriday, Nov. 8\n7 p.m.\nLocation: Buckley Recital Hall\n"
+        "Sponsored by: Music Department\n"
+        "Contact: Jane Doe <jdoe@amherst.edu>\nCome hear the band.",
+        "2024-11-07",
+    )
+
+    assert event == {
+        "title": "Jazz Night",
+        "pub_date": "2024-11-08",
+        "starttime": "19:00:00",
+        "endtime": None,
+        "location": "Buckley Recital Hall",
+        "event_description": "Come hear the band.",
+        "host": ["Music Department"],
+        "link": None,
+        "picture_link": None,
+        "categories": None,
+        "author_name": "Jane Doe",
+        "author_email": "jdoe@amherst.edu",
+    }
+
+
+@pytest.mark.parametrize(
+    "section",
+    [
+        "Queer Talk",
+        "Queer Talk\nJoin us for a discussion.\nSee you there!\nAll welcome",
+        "Open studio hours all week, see website.\nStarting at 4 p.m.",
+        "Location: Keefe\n3 p.m.",
+    ],
+)
+def test_parse_section_rejects_irregular_sections(section):
+    assert parse_section(section, "2024-11-07") is None
+
+
+def test_parse_digest_parses_regular_sections_and_falls_back():
+    fallback_calls = []
+
+    def fallback(text):
+        fallback_calls.append(text)
+        return [{"title": "Open Studio", "starttime": "16:00:00"}]
+
+    events, stats = parse_digest(DIGEST, fallback)
+
+    assert [event["title"] for event in events] == [
+        "Queer Talk",
+        "Jazz Night",
+        "Open Studio",
+    ]
+    queer_talk = events[0]
+    assert queer_talk["pub_date"] == "2024-11-07"
+    assert queer_talk["starttime"] == "15:00:00"
+    assert queer_talk["endtime"] == "16:00:00"
+    assert queer_talk["location"] == "Keefe Campus Center 213"
+    assert queer_talk["link"] == "https://example.com/queer-talk"
+    assert queer_talk["event_description"] == (
+        "Join us for a discussion. A second paragraph of the description."
+    )
+    # Only the section the rules could not handle reaches the LLM, under
+    # the header that dates it
+    assert fallback_calls == [
+        "Amherst College Daily Mammoth for Thursday, November 7, 2024\n\n"
+        "Open studio hours all week in Fayerweather, see website.\n"
+        "Starting at 4 p.m. daily."
+    ]
+    assert stats == {
+        "sections": 3,
+        "parsed": 2,
+        "fallback": 1,
+        "fallback_share": 0.333,
+    }
+
+
+def test_parse_digest_skips_fallback_when_everything_parses():
+    def fallback(text):
+        raise AssertionError("fallback should not be called")
+
+    events, stats = parse_digest(
+        "Daily Mammoth for Thursday, November 7, 2024\n\n"
+        "Queer Talk\n3 p.m.\nKeefe 213",
+        fallback,
+    )
+
+    assert len(events) == 1
+    assert stats["fallback_share"] == 0.0
+
+
+def test_parse_digest_without_header_or_fallback():
+    events, stats = parse_digest("Queer Talk\nNov. 7, 3 p.m.\n\nJust a note")
+
+    assert [event["title"] for event in events] == ["Queer Talk"]
+    assert events[0]["pub_date"].endswith("-11-07")
+    assert stats["sections"] == 1
+
+
+def test_parse_digest_empty():
+    assert parse_digest("") == (
+        [],
+        {"sections": 0, "parsed": 0, "fallback": 0, "fallback_share": 0.0},
+    )
@@ -3,11 +3,15 @@ from unittest.mock import patch, MagicMock, mock_open, call
 from datetime import datetime
 import json
 import os
+import threading
+import time
 from email.message import EmailMessage
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
 
 # Import specific functions from email_parser_script
+from access_amherst_algo.email_scraper import email_parser
+from access_amherst_algo.email_scraper.digest_fetcher import FetchedDigest
 from access_amherst_algo.email_scraper.email_parser import (
-    connect_and_fetch_latest_email,
     extract_email_body,
     extract_event_info_using_llama,
     save_to_json_file,
@@ -50,27 +54,6 @@ def setup_mock_env_vars(monkeypatch):
     monkeypatch.setenv("EMAIL_ADDRESS", "test@example.com")
 
 
-def test_connect_and_fetch_latest_email(setup_mock_env_vars, mock_email):
-    """Test connecting to Gmail and fetching the latest email."""
-    with patch(
-        "access_amherst_algo.email_scraper.email_parser.imaplib.IMAP4_SSL"
-    ) as mock_imap:
-        mock_instance = mock_imap.return_value
-        mock_instance.login.return_value = "OK"
-        mock_instance.select.return_value = ("OK", None)
-        mock_instance.search.return_value = ("OK", [b"1"])
-        mock_instance.fetch.return_value = (
-            "OK",
-            [(None, mock_email.as_bytes())],
-        )
-
-        email = connect_and_fetch_latest_email(
-            app_password="test-password", subject_filter="Test Subject"
-        )
-        assert email is not None
-        assert email.get_payload().strip() == email_content.strip()
-
-
 def test_extract_email_body(mock_email):
     """Test extracting the email body from a message."""
     body = extract_email_body(mock_email)
@@ -121,28 +104,35 @@ def test_save_to_json_file(mock_makedirs, mock_exists, mock_open):
     assert json.loads(written_content) == json.loads(expected_content)
 
 
+def _fetched(uid, body):
+    return FetchedDigest("inbox", 42, uid, body)
+
+
+def _extract_or_fail(body):
+    if "fails" in body:
+        raise email_parser.LLMExtractionError("Rate limit exceeded")
+    if "empty" in body:
+        return []
+    return [{"title": body}]
+
+
+@patch("access_amherst_algo.email_scraper.email_parser.mark_processed")
+@patch("access_amherst_algo.email_scraper.email_parser.fetch_new_digests")
 @patch(
-    "access_amherst_algo.email_scraper.email_parser.connect_and_fetch_latest_email"
-)
-@patch(
-    "access_amherst_algo.email_scraper.email_parser.extract_email_body",
-    return_value=email_content,
-)
-@patch(
-    "access_amherst_algo.email_scraper.email_parser.extract_event_info_using_llama",
+    "access_amherst_algo.email_scraper.email_parser.extract_events_chunked",
     return_value=mock_response_json,
 )
 @patch("access_amherst_algo.email_scraper.email_parser.save_to_json_file")
 def test_parse_email(
     mock_save_to_json_file,
-    mock_extract_event_info_using_llama,
-    mock_extract_email_body,
-    mock_connect_and_fetch_latest_email,
+    mock_extract_events_chunked,
+    mock_fetch_new_digests,
+    mock_mark_processed,
     setup_mock_env_vars,
-    mock_email,
 ):
     """Test the main parse_email function."""
-    mock_connect_and_fetch_latest_email.return_value = mock_email
+    digest = _fetched(7, email_content)
+    mock_fetch_new_digests.return_value = [digest]
 
     with patch(
         "access_amherst_algo.email_scraper.email_parser.datetime"
@@ -150,31 +140,71 @@ def test_parse_email(
         mock_datetime.now.return_value = datetime(2024, 11, 7, 12, 0, 0)
 
         # Run parse_email with a subject filter
-        parse_email("Test Subject")
+        path = parse_email("Test Subject")
 
         # Assertions to check if functions were called
-        mock_connect_and_fetch_latest_email.assert_called_once()
-        mock_extract_email_body.assert_called_once()
-        mock_extract_event_info_using_llama.assert_called_once_with(
-            email_content
+        mock_fetch_new_digests.assert_called_once_with(
+            "test-password", "Test Subject"
         )
+        mock_extract_events_chunked.assert_called_once_with(email_content)
         mock_save_to_json_file.assert_called_once()
+        mock_mark_processed.assert_called_once_with(digest)
+        assert path.endswith("extracted_events_20241107_120000.json")
 
 
-def test_connect_and_fetch_latest_email_search_failure(setup_mock_env_vars):
-    """Test search failure in connect_and_fetch_latest_email."""
-    with patch(
-        "access_amherst_algo.email_scraper.email_parser.imaplib.IMAP4_SSL"
-    ) as mock_imap:
-        mock_instance = mock_imap.return_value
-        mock_instance.login.return_value = "OK"
-        mock_instance.select.return_value = ("OK", None)
-        mock_instance.search.side_effect = Exception("Search failed")
-
-        email = connect_and_fetch_latest_email(
-            app_password="test-password", subject_filter="Test Subject"
-        )
-        assert email is None
+@patch("access_amherst_algo.email_scraper.email_parser.mark_processed")
+@patch("access_amherst_algo.email_scraper.email_parser.fetch_new_digests")
+@patch(
+    "access_amherst_algo.email_scraper.email_parser.extract_events_chunked",
+    side_effect=_extract_or_fail,
+)
+@patch("access_amherst_algo.email_scraper.email_parser.save_to_json_file")
+def test_parse_email_processes_backlog_until_first_failure(
+    mock_save_to_json_file,
+    mock_extract_events_chunked,
+    mock_fetch_new_digests,
+    mock_mark_processed,
+    setup_mock_env_vars,
+):
+    digests = [
+        _fetched(3, "first digest"),
+        _fetched(4, None),
+        _fetched(5, "an empty digest"),
+        _fetched(6, "second digest"),
+        _fetched(7, "this one fails"),
+        _fetched(8, "third digest"),
+    ]
+    mock_fetch_new_digests.return_value = digests
+
+    parse_email()
+
+    saved_events = mock_save_to_json_file.call_args[0][0]
+    assert [event["title"] for event in saved_events] == [
+        "first digest",
+        "second digest",
+    ]
+    # Digests without events are done with; the failed digest and those
+    # after it are fetched again next run
+    assert [c.args[0].uid for c in mock_mark_processed.call_args_list] == [
+        3,
+        4,
+        5,
+        6,
+    ]
+
+
+@patch("access_amherst_algo.email_scraper.email_parser.mark_processed")
+@patch(
+    "access_amherst_algo.email_scraper.email_parser.fetch_new_digests",
+    return_value=[],
+)
+@patch("access_amherst_algo.email_scraper.email_parser.save_to_json_file")
+def test_parse_email_without_new_digests(
+    mock_save_to_json_file, mock_fetch_new_digests, mock_mark_processed
+):
+    assert parse_email() is None
+    mock_save_to_json_file.assert_not_called()
+    mock_mark_processed.assert_not_called()
 
 
 def test_extract_email_body_exception_handling():
@@ -187,9 +217,9 @@ def test_extract_email_body_exception_handling():
 
 
 @patch("access_amherst_algo.email_scraper.email_parser.requests.post")
-@patch("access_amherst_algo.email_scraper.email_parser.sys.exit")
+@patch("access_amherst_algo.email_scraper.email_parser.logging.error")
 def test_extract_event_info_using_llama_api_error(
-    mock_exit, mock_post, setup_mock_env_vars
+    mock_logging_error, mock_post, setup_mock_env_vars
 ):
     """Test API error handling in extract_event_info_using_llama."""
     mock_post.return_value.status_code = 400
@@ -200,8 +230,7 @@ def test_extract_event_info_using_llama_api_error(
     extracted_events = extract_event_info_using_llama(email_content)
     # Assert that no events are extracted
     assert extracted_events == []
-    # Ensure sys.exit was called with 1
-    mock_exit.assert_called_once_with(1)
+    mock_logging_error.assert_called_once_with("API Error: Invalid request")
 
 
 @patch(
@@ -219,10 +248,10 @@ def test_save_to_json_file_permission_error(mock_logging_error, mock_open):
 
 
 @patch(
-    "access_amherst_algo.email_scraper.email_parser.connect_and_fetch_latest_email",
+    "access_amherst_algo.email_scraper.email_parser.fetch_new_digests",
     side_effect=Exception("Error connecting to email"),
 )
-def test_parse_email_connect_exception(mock_connect_and_fetch_latest_email):
+def test_parse_email_connect_exception(mock_fetch_new_digests):
     """Test exception handling in parse_email."""
     with pytest.raises(Exception):
         parse_email("Test Subject")
@@ -272,5 +301,282 @@ def test_extract_event_info_using_llama_key_error(mock_post, setup_mock_env_vars
     extracted_events = extract_event_info_using_llama(email_content)
     assert extracted_events == []
 
+@pytest.fixture
+def llm_server(monkeypatch):
+    """Serve OpenRouter-style chat completions locally.
+
+    Every request body is recorded in `server.requests`; responses carry
+    `server.events` as the model's answer, or `server.responder(content)`
+    if set. Each response waits `server.delay` seconds, and the first
+    `server.failures` requests get a 503, or `server.failure_payload` if
+    set.
+    """
+    requests_seen = []
+    lock = threading.Lock()
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def do_POST(self):
+            length = int(self.headers["Content-Length"])
+            payload = json.loads(self.rfile.read(length))
+            with lock:
+                requests_seen.append(payload)
+                failing = server.failures > 0
+                server.failures -= 1
+            time.sleep(server.delay)
+            if failing and server.failure_payload is None:
+                self.send_response(503)
+                self.send_header("Content-Length", "0")
+                self.end_headers()
+                return
+            content = payload["messages"][1]["content"]
+            events = (
+                server.responder(content) if server.responder else server.events
+            )
+            answer = (
+                server.failure_payload
+                if failing
+                else {"choices": [{"message": {"content": json.dumps(events)}}]}
+            )
+            body = json.dumps(answer).encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    server.events = mock_response_json
+    server.requests = requests_seen
+    server.responder = None
+    server.delay = 0
+    server.failures = 0
+    server.failure_payload = None
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    monkeypatch.setattr(
+        email_parser,
+        "LLAMA_API_URL",
+        f"http://127.0.0.1:{server.server_port}/api/v1/chat/completions",
+    )
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def test_extract_event_info_using_llama_local_server(llm_server):
+    """Test extraction against a stand-in for the API."""
+    extracted_events = extract_event_info_using_llama(email_content)
+
+    assert extracted_events == mock_response_json
+    assert len(llm_server.requests) == 1
+    assert llm_server.requests[0]["model"] == email_parser.LLAMA_MODEL
+    assert llm_server.requests[0]["messages"][1]["content"] == email_content
+
+
+def test_extract_event_info_using_llama_reuses_cached_response(llm_server):
+    """Test that the same email is only sent to the API once."""
+    first = extract_event_info_using_llama(email_content)
+    llm_server.events = []
+    second = extract_event_info_using_llama(email_content)
+
+    assert first == second == mock_response_json
+    assert len(llm_server.requests) == 1
+
+    # Other content misses the cache
+    assert extract_event_info_using_llama(email_content + " More.") == []
+    assert len(llm_server.requests) == 2
+
+
+@patch("access_amherst_algo.email_scraper.email_parser.requests.post")
+def test_extract_event_info_using_llama_sends_timeout(
+    mock_post, setup_mock_env_vars
+):
+    """Test that API requests cannot hang forever."""
+    mock_post.return_value.json.return_value = {
+        "choices": [{"message": {"content": json.dumps(mock_response_json)}}]
+    }
+
+    extract_event_info_using_llama(email_content)
+
+    assert mock_post.call_args.kwargs["timeout"] == (
+        email_parser.REQUEST_TIMEOUT
+    )
+
+
+@patch("access_amherst_algo.email_scraper.email_parser.requests.post")
+def test_extract_event_info_using_llama_does_not_cache_failures(
+    mock_post, setup_mock_env_vars
+):
+    """Test that failed extractions are retried on the next run."""
+    mock_post.return_value.json.return_value = {
+        "choices": [{"message": {"content": "invalid json"}}]
+    }
+    assert extract_event_info_using_llama(email_content) == []
+
+    mock_post.return_value.json.return_value = {
+        "choices": [{"message": {"content": json.dumps(mock_response_json)}}]
+    }
+    assert extract_event_info_using_llama(email_content) == mock_response_json
+    assert mock_post.call_count == 2
+
+
 if __name__ == "__main__":
     pytest.main()
+
+
+def _digest(count, size=200):
+    """A digest of `count` events separated by blank lines."""
+    sections = [
+        f"Event {i}\n7 p.m.\n" + "Details of the event. " * (size // 22)
+        for i in range(count)
+    ]
+    return "Daily Mammoth - 2024-11-07\n\n" + "\n\n".join(sections)
+
+
+def _events_in(chunk):
+    """Answer a chunk with one event per `Event N` line in it."""
+    return [
+        {"title": line, "pub_date": "2024-11-07", "starttime": "18:00:00"}
+        for line in chunk.splitlines()
+        if line.startswith("Event ")
+    ]
+
+
+def test_split_email_body_packs_blocks_and_repeats_header():
+    chunks = email_parser.split_email_body(_digest(6, 200), max_chars=700)
+
+    assert len(chunks) > 1
+    assert all(len(chunk) <= 700 for chunk in chunks)
+    assert all(
+        chunk.startswith("Daily Mammoth - 2024-11-07\n\n") for chunk in chunks
+    )
+    titles = [e["title"] for chunk in chunks for e in _events_in(chunk)]
+    assert titles == [f"Event {i}" for i in range(6)]
+
+
+def test_split_email_body_splits_on_separator_lines():
+    body = "Queer Talk\n-----\nJazz Night\n=====\nPoetry Reading"
+
+    chunks = email_parser.split_email_body(body, max_chars=15)
+
+    assert chunks == [
+        "Queer Talk\n\nJazz Night",
+        "Queer Talk\n\nPoetry Reading",
+    ]
+
+
+def test_split_email_body_empty():
+    assert email_parser.split_email_body("  \n\n ") == []
+
+
+def test_merge_extracted_events_dedupes_and_fills_fields():
+    merged = email_parser.merge_extracted_events(
+        [
+            [{"title": "Queer Talk", "starttime": "15:00:00", "location": None}],
+            [
+                {"title": "Queer  Talk!", "starttime": "15:00:00", "location": "Keefe"},
+                {"title": "Queer Talk", "starttime": "19:00:00", "location": None},
+            ],
+            "not a list",
+        ]
+    )
+
+    assert merged == [
+        {"title": "Queer Talk", "starttime": "15:00:00", "location": "Keefe"},
+        {"title": "Queer Talk", "starttime": "19:00:00", "location": None},
+    ]
+
+
+def test_extract_events_chunked_runs_chunks_concurrently(llm_server):
+    llm_server.responder = _events_in
+    llm_server.delay = 0.3
+    body = _digest(8, 400)
+
+    started = time.perf_counter()
+    events = email_parser.extract_events_chunked(
+        body, workers=4, max_chars=1000
+    )
+    elapsed = time.perf_counter() - started
+
+    chunk_count = len(llm_server.requests)
+    assert chunk_count >= 4
+    # Serially the chunks would take chunk_count * 0.3 seconds
+    assert elapsed < chunk_count * llm_server.delay * 0.6
+    assert [e["title"] for e in events] == [f"Event {i}" for i in range(8)]
+
+
+def test_extract_events_chunked_retries_failed_chunks(llm_server, monkeypatch):
+    def no_wait():
+        while True:
+            yield 0
+
+    monkeypatch.setattr(email_parser.backoff, "expo", no_wait)
+    llm_server.responder = _events_in
+    llm_server.failures = 2
+
+    events = email_parser.extract_events_chunked(_digest(2), workers=1)
+
+    assert len(llm_server.requests) == 3
+    assert [e["title"] for e in events] == ["Event 0", "Event 1"]
+
+
+def test_extract_events_chunked_retries_error_answers(
+    llm_server, monkeypatch, caplog
+):
+    def no_wait():
+        while True:
+            yield 0
+
+    monkeypatch.setattr(email_parser.backoff, "expo", no_wait)
+    llm_server.responder = _events_in
+    llm_server.failure_payload = {"error": {"message": "Rate limit exceeded"}}
+    llm_server.failures = 2
+
+    events = email_parser.extract_events_chunked(_digest(2), workers=1)
+
+    assert len(llm_server.requests) == 3
+    assert [e["title"] for e in events] == ["Event 0", "Event 1"]
+
+    # A chunk that keeps failing is given up on and logged, and fails the
+    # email without stopping the run from the worker thread
+    llm_server.requests.clear()
+    llm_server.failures = 100
+    with caplog.at_level("ERROR"), pytest.raises(
+        email_parser.LLMExtractionError
+    ):
+        email_parser.extract_events_chunked(_digest(3))
+
+    assert len(llm_server.requests) == email_parser.MAX_TRIES
+    assert "API Error: Rate limit exceeded" in caplog.text
+
+
+@patch("access_amherst_algo.email_scraper.email_parser.requests.post")
+def test_extract_event_info_using_llama_does_not_retry_client_errors(
+    mock_post, setup_mock_env_vars
+):
+    response = MagicMock(status_code=400)
+    response.raise_for_status.side_effect = (
+        email_parser.requests.exceptions.HTTPError(response=response)
+    )
+    mock_post.return_value = response
+
+    assert email_parser.extract_event_info_using_llama("x", max_tries=4) == []
+    assert mock_post.call_count == 1
+
+
+def test_extract_events_chunked_sends_compressed_body(llm_server):
+    url = "https://click.amherst.edu/track?u=queer-talk&utm_source=mammoth"
+    llm_server.events = [{"title": "Queer Talk", "link": "[URL1]"}]
+
+    events = email_parser.extract_events_chunked(
+        f"Queer Talk\n3   p.m.\n{url}\n\nTo unsubscribe, click here."
+    )
+
+    sent = llm_server.requests[0]["messages"][1]["content"]
+    assert sent == "Queer Talk\n3 p.m.\n[URL1]"
+    assert events == [{"title": "Queer Talk", "link": url}]
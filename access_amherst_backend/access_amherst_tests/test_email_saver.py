@@ -3,15 +3,23 @@ import pytz
 from unittest.mock import patch, mock_open, MagicMock
 from datetime import datetime, timedelta
 from django.utils import timezone
+import difflib
 import json
 import os
 from access_amherst_algo.email_scraper.email_saver import (
+    build_event_fields,
     load_json_file,
     parse_datetime,
     is_similar_event,
+    similar_title_exists,
     save_event_to_db,
     process_email_events,
 )
+from access_amherst_algo.models import Event
+from access_amherst_algo.event_fingerprint import (
+    EMAIL_ID_BASE,
+    stable_event_id,
+)
 
 # Sample test data
 sample_event = {
@@ -58,45 +66,106 @@ def mock_event_model(mock_event_queryset):
         yield mock_event
 
 
-def test_is_similar_event_true(mock_event_model):
-    """Test detection of similar events when one exists."""
-    result = is_similar_event(sample_event)
+def store_event(event_data, **overrides):
+    """Save an email event the way the saver would and return its row."""
+    event_id, fields = build_event_fields(event_data)
+    fields = {"id": event_id, **fields, **overrides}
+    return Event.objects.create(**fields)
+
 
-    # Verify the queryset was filtered correctly
-    mock_event_model.objects.filter.assert_called()
+@pytest.mark.django_db
+def test_is_similar_event_true():
+    """Test detection of similar events when one exists."""
+    store_event(sample_event, title="Test Event!")
 
-    # Verify we got True as the result
-    assert result is True
+    assert is_similar_event(sample_event) is True
 
 
-def test_is_similar_event_false(mock_event_model, mock_event_queryset):
+@pytest.mark.django_db
+def test_is_similar_event_false():
     """Test detection of similar events when none exist."""
-    # Create a mock event with different title
-    mock_event = MagicMock()
-    mock_event.title = "Completely Different Event"
-    mock_event_queryset.filter.return_value = [mock_event]
+    store_event(sample_event, title="Completely Different Event")
 
-    result = is_similar_event(sample_event)
-    assert result is False
+    assert is_similar_event(sample_event) is False
 
 
-def test_is_similar_event_no_times(mock_event_model, mock_event_queryset):
+@pytest.mark.django_db
+def test_is_similar_event_requires_same_times():
+    store_event({**sample_event, "starttime": "11:00:00"})
+
+    assert is_similar_event(sample_event) is False
+
+
+@pytest.mark.django_db
+def test_is_similar_event_no_times():
     """Test similar event detection with missing time data."""
     event_no_times = sample_event.copy()
     del event_no_times["starttime"]
     del event_no_times["endtime"]
+    store_event(sample_event)
+
+    assert is_similar_event(event_no_times) is True
 
-    mock_event = MagicMock()
-    mock_event.title = "Test Event"
-    mock_event_queryset.all.return_value = [mock_event]
 
-    result = is_similar_event(event_no_times)
-    assert result is True
+@pytest.mark.django_db
+def test_is_similar_event_no_times_only_searches_near_pub_date():
+    event_no_times = {
+        key: value
+        for key, value in sample_event.items()
+        if key not in ("starttime", "endtime")
+    }
+    store_event({**sample_event, "pub_date": "2024-11-20"})
+
+    assert is_similar_event(event_no_times) is False
+
+
+@pytest.mark.django_db
+def test_is_similar_event_empty_db():
+    """Test similarity detection with an empty database."""
+    assert is_similar_event(sample_event) is False
+
+
+@pytest.mark.django_db
+def test_is_similar_event_ignores_excluded_row():
+    stored = store_event(sample_event)
+
+    assert is_similar_event(sample_event, exclude_id=stored.id) is False
+
+
+@pytest.mark.django_db
+def test_is_similar_event_loads_titles_only(django_assert_num_queries):
+    for index in range(5):
+        store_event(
+            sample_event, id=EMAIL_ID_BASE + index, title=f"Other {index}"
+        )
+
+    with django_assert_num_queries(1) as context:
+        assert is_similar_event(sample_event) is False
+    sql = context.captured_queries[0]["sql"]
+    assert "event_description" not in sql
+
+
+@pytest.mark.parametrize(
+    "title, candidates, expected",
+    [
+        ("Test Event", ["Test Event"], True),
+        ("Test Event", ["test event!"], True),
+        ("Test Event", ["Completely Unrelated Event"], False),
+        ("Test Event", ["Tset Evnet", "Rest Events"], True),
+        ("Test Event", [], False),
+    ],
+)
+def test_similar_title_exists_matches_full_ratio(title, candidates, expected):
+    full_ratio = any(
+        difflib.SequenceMatcher(None, title.lower(), c.lower()).ratio() > 0.8
+        for c in candidates
+    )
+    assert similar_title_exists(title, candidates) is expected is full_ratio
 
 
 def test_is_similar_event_error(mock_event_model):
     """Test error handling in similar event detection."""
-    mock_event_model.objects.all.side_effect = Exception("Database error")
+    mock_event_model.objects.filter.side_effect = Exception("Database error")
 
     result = is_similar_event(sample_event)
     assert result is False
@@ -117,60 +186,99 @@ def test_save_event_to_db(mock_event_model):
     assert json.loads(defaults["categories"]) == sample_event["categories"]
 
 
+def test_save_event_to_db_uses_stable_id(mock_event_model):
+    """The id depends only on the title and start time."""
+    save_event_to_db(sample_event)
+    save_event_to_db(dict(sample_event, location="Elsewhere"))
+
+    first, second = mock_event_model.objects.update_or_create.call_args_list
+    start_time = first.kwargs["defaults"]["start_time"]
+    assert first.kwargs["id"] == second.kwargs["id"]
+    assert first.kwargs["id"] == stable_event_id(
+        EMAIL_ID_BASE, sample_event["title"], start_time
+    )
+
+
+@pytest.mark.django_db
 @patch("access_amherst_algo.email_scraper.email_saver.load_json_file")
-@patch("access_amherst_algo.email_scraper.email_saver.is_similar_event")
-@patch("access_amherst_algo.email_scraper.email_saver.save_event_to_db")
-def test_process_email_events_success(mock_save, mock_is_similar, mock_load):
+def test_process_email_events_success(mock_load):
     """Test successful processing of email events."""
-    # Setup mocks
     mock_load.return_value = sample_events_list
-    mock_is_similar.return_value = False
 
-    # Run the function
-    process_email_events()
+    counts = process_email_events()
 
-    # Verify calls
     mock_load.assert_called_once()
-    mock_is_similar.assert_called_once_with(sample_event)
-    mock_save.assert_called_once_with(sample_event)
+    assert counts["changed"] == 1
+    assert Event.objects.get().title == "Test Event"
 
 
+@pytest.mark.django_db
 @patch("access_amherst_algo.email_scraper.email_saver.load_json_file")
-@patch("access_amherst_algo.email_scraper.email_saver.is_similar_event")
-@patch("access_amherst_algo.email_scraper.email_saver.save_event_to_db")
-def test_process_email_events_error_handling(
-    mock_save, mock_is_similar, mock_load
-):
-    """Test error handling during event processing."""
+def test_process_email_events_skips_similar_events_in_batch(mock_load):
+    """Test that a near-identical title later in the batch is skipped."""
+    mock_load.return_value = [
+        dict(sample_event, title="Literature Speaker Event"),
+        dict(sample_event, title="Literature Speakers Event"),
+        dict(
+            sample_event, title="Literature Speakers Event", endtime="11:00:00"
+        ),
+    ]
+
+    counts = process_email_events()
+
+    assert counts["changed"] == 2
+    assert counts["duplicate"] == 1
+    assert sorted(Event.objects.values_list("title", flat=True)) == [
+        "Literature Speaker Event",
+        "Literature Speakers Event",
+    ]
+
+
+@pytest.mark.django_db
+@patch("access_amherst_algo.email_scraper.email_saver.load_json_file")
+def test_process_email_events_updates_changed_event(mock_load):
+    """Test that an event extracted again with new details updates its row."""
     mock_load.return_value = sample_events_list
-    mock_is_similar.return_value = False
-    mock_save.side_effect = Exception("Test error")
-
-    # This should not raise an exception
     process_email_events()
+    mock_load.return_value = [dict(sample_event, location="Frost Library")]
+
+    counts = process_email_events()
+
+    assert counts["changed"] == 1
+    assert counts["duplicate"] == 0
+    assert Event.objects.get().location == "Frost Library"
 
-    mock_load.assert_called_once()
-    mock_is_similar.assert_called_once()
-    mock_save.assert_called_once()
 
+@pytest.mark.django_db
+@patch("access_amherst_algo.email_scraper.email_saver.load_json_file")
+def test_process_email_events_replaces_lower_priority_rows(mock_load):
+    """Test that an email event replaces a stored copy of an unknown source."""
+    event_id, fields = build_event_fields(sample_event)
+    Event.objects.create(**dict(fields, id=12_345, content_hash=None))
+    mock_load.return_value = sample_events_list
+
+    counts = process_email_events()
+
+    assert counts["changed"] == 1
+    assert counts["duplicate"] == 0
+    assert counts["cross_source"] == 1
+    assert list(Event.objects.values_list("id", flat=True)) == [event_id]
 
+
+@pytest.mark.django_db
 @patch("access_amherst_algo.email_scraper.email_saver.load_json_file")
-@patch("access_amherst_algo.email_scraper.email_saver.is_similar_event")
-@patch("access_amherst_algo.email_scraper.email_saver.save_event_to_db")
-def test_process_email_events_error_handling(
-    mock_save, mock_is_similar, mock_load
-):
+@patch("access_amherst_algo.email_scraper.email_saver.bulk_upsert_events")
+def test_process_email_events_error_handling(mock_upsert, mock_load):
     """Test error handling during event processing."""
     mock_load.return_value = sample_events_list
-    mock_is_similar.return_value = False
-    mock_save.side_effect = Exception("Test error")
+    mock_upsert.side_effect = Exception("Test error")
 
     # This should not raise an exception
-    process_email_events()
+    counts = process_email_events()
 
-    mock_load.assert_called_once()
-    mock_is_similar.assert_called_once()
-    mock_save.assert_called_once()
+    mock_upsert.assert_called_once()
+    assert counts["changed"] == 0
+    assert counts["failed"] == 1
 
 
 def test_parse_datetime_full_date():
@@ -292,34 +400,5 @@ def test_process_email_events_no_events(mock_load):
     mock_load.assert_called_once()
 
 
-def test_is_similar_event_empty_db(mock_event_model):
-    """Test similarity detection with an empty database."""
-    mock_event_model.objects.all.return_value = []
-    result = is_similar_event(sample_event)
-    assert result is False
-
-
-def test_is_similar_event_exact_match(mock_event_model, mock_event_queryset):
-    """Test similarity detection with an exact match."""
-    mock_event = MagicMock()
-    mock_event.title = sample_event["title"]
-    mock_event_queryset.filter.return_value = [mock_event]
-
-    result = is_similar_event(sample_event)
-    assert result is True
-
-
-def test_is_similar_event_low_similarity(
-    mock_event_model, mock_event_queryset
-):
-    """Test similarity detection with low similarity."""
-    mock_event = MagicMock()
-    mock_event.title = "Completely Unrelated Event"
-    mock_event_queryset.filter.return_value = [mock_event]
-
-    result = is_similar_event(sample_event)
-    assert result is False
-
-
 if __name__ == "__main__":
     pytest.main()
@@ -0,0 +1,465 @@
+import pytest
+import pytz
+from datetime import datetime, timedelta
+import importlib
+from unittest.mock import patch
+from django.apps import apps
+from access_amherst_algo.models import Event
+from access_amherst_algo.event_dedupe import (
+    BatchDeduplicator,
+    CrossSourceDeduplicator,
+    DedupeEngine,
+    ExactDuplicateIndex,
+    compute_dedupe_key,
+    dedupe_fields,
+    find_duplicate_clusters,
+    minhash_signature,
+    minhash_signatures,
+    outranks,
+    preprocess_title,
+    title_shingles,
+)
+
+dedupe_key_migration = importlib.import_module(
+    "access_amherst_algo.migrations.0012_event_dedupe_key"
+)
+
+START = datetime(2024, 11, 7, 15, 0, tzinfo=pytz.UTC)
+LATER = datetime(2024, 11, 7, 18, 0, tzinfo=pytz.UTC)
+
+EXISTING_TITLES = [
+    (START, "Regular HEMAC Meeting"),
+    (START, "Queer Talk"),
+    (START, "Amherst Cricket Club Practices"),
+    (LATER, "Guest Lecture: AI & Future"),
+    (LATER, "Jazz Ensemble Concert"),
+]
+
+INCOMING_TITLES = [
+    (START, "Regular HEMAC Meet"),
+    (START, "HEMAC Meeting"),
+    (START, "Queer Talk!"),
+    (START, "Cricket Club Practice"),
+    (START, "Completely Unrelated Event"),
+    (START, "a"),
+    (LATER, "Guest Lecture - AI and the Future"),
+    (LATER, "Jazz Concert"),
+    (LATER, "Ensemble"),
+    (datetime(2024, 11, 8, 12, 0, tzinfo=pytz.UTC), "Queer Talk"),
+]
+
+
+@pytest.fixture
+def existing_events(db):
+    for index, (start_time, title) in enumerate(EXISTING_TITLES):
+        Event.objects.create(
+            id=700_000_000 + index,
+            title=title,
+            start_time=start_time,
+            categories="[]",
+        )
+
+
+def test_preprocess_title():
+    assert preprocess_title("  Guest Lecture: AI & Future  ") == (
+        "guest lecture ai future"
+    )
+    assert preprocess_title(None) == ""
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize(
+    "threshold,expected",
+    [
+        # Calendar threshold
+        (0.57, [False, True, True] + [False] * 7),
+        # Hub threshold
+        (0.4, [True, True, True, False, False, False, True] + [False] * 3),
+    ],
+)
+def test_batch_decisions(existing_events, threshold, expected):
+    """The batch scores reproduce the former per-event TF-IDF decisions."""
+    deduplicator = BatchDeduplicator(
+        [(title, start) for start, title in INCOMING_TITLES],
+        threshold=threshold,
+    )
+    decisions = [
+        deduplicator.is_duplicate(title, start)
+        for start, title in INCOMING_TITLES
+    ]
+    assert decisions == expected
+
+
+@pytest.mark.django_db
+def test_batch_loads_existing_events_with_one_query(
+    existing_events, django_assert_num_queries
+):
+    with django_assert_num_queries(1):
+        deduplicator = BatchDeduplicator(
+            [(title, start) for start, title in INCOMING_TITLES],
+            threshold=0.57,
+        )
+        for start, title in INCOMING_TITLES:
+            deduplicator.is_duplicate(title, start)
+
+
+@pytest.mark.django_db
+def test_added_events_are_compared_within_the_batch():
+    incoming = [("Swing Dance Social", START), ("Swing Dance Social!", START)]
+    deduplicator = BatchDeduplicator(incoming, threshold=0.57)
+
+    assert not deduplicator.is_duplicate(*incoming[0])
+    deduplicator.add(*incoming[0])
+    assert deduplicator.is_duplicate(*incoming[1])
+
+
+@pytest.mark.django_db
+def test_stored_row_of_the_event_itself_is_not_a_duplicate(existing_events):
+    deduplicator = BatchDeduplicator([("Queer Talk!", START)], 0.57)
+
+    assert deduplicator.is_duplicate("Queer Talk!", START)
+    assert not deduplicator.is_duplicate(
+        "Queer Talk!", START, exclude_id=700_000_001
+    )
+
+
+def test_empty_batch_does_not_query_database():
+    with patch("access_amherst_algo.event_dedupe.Event") as mock_event:
+        deduplicator = BatchDeduplicator(
+            [("Queer Talk", None), ("", START)], threshold=0.57
+        )
+        assert not deduplicator.is_duplicate("Queer Talk", None)
+        assert not deduplicator.is_duplicate("", START)
+        mock_event.objects.filter.assert_not_called()
+
+
+def test_database_error_treats_batch_as_new():
+    with patch("access_amherst_algo.event_dedupe.Event") as mock_event:
+        mock_event.objects.filter.side_effect = Exception("Database error")
+        deduplicator = BatchDeduplicator([("Queer Talk", START)], 0.57)
+        assert not deduplicator.is_duplicate("Queer Talk", START)
+
+
+@pytest.fixture
+def hub_event(db):
+    return Event.objects.create(
+        id=500_012_345,
+        title="Guest Lecture: AI & Future",
+        start_time=START,
+        categories="[]",
+    )
+
+
+def test_title_shingles():
+    assert title_shingles("Queer Talk!") == title_shingles(" queer  talk")
+    assert " qu" in title_shingles("Queer Talk")
+    assert title_shingles("") == frozenset()
+    assert title_shingles(None) == frozenset()
+
+
+def test_minhash_signature_estimates_jaccard():
+    first = title_shingles("Regular HEMAC Meeting")
+    second = title_shingles("Regular HEMAC Meet")
+    jaccard = len(first & second) / len(first | second)
+
+    agreement = (minhash_signature(first) == minhash_signature(second)).mean()
+
+    assert (minhash_signature(first) == minhash_signature(first)).all()
+    assert abs(agreement - jaccard) < 0.2
+
+
+def test_minhash_signatures_match_single_signatures():
+    shingle_sets = [
+        title_shingles(title) for _, title in EXISTING_TITLES + INCOMING_TITLES
+    ]
+
+    signatures = minhash_signatures(shingle_sets)
+
+    for shingles, signature in zip(shingle_sets, signatures):
+        assert (signature == minhash_signature(shingles)).all()
+
+
+@pytest.mark.django_db
+def test_cross_source_duplicate_is_merged_and_reported(hub_event):
+    # The calendar reports the event an hour off and with a reworded title
+    start = START + timedelta(hours=1)
+    title = "Guest Lecture - AI and the Future"
+    deduplicator = CrossSourceDeduplicator([(title, start)], "calendar")
+
+    assert deduplicator.is_duplicate(title, start)
+    assert deduplicator.merged == [
+        {
+            "title": title,
+            "source": "calendar",
+            "start_time": start,
+            "matched_id": hub_event.id,
+            "matched_title": "Guest Lecture: AI & Future",
+            "matched_source": "hub",
+            "similarity": pytest.approx(0.66, abs=0.01),
+            "replaced": False,
+        }
+    ]
+
+
+@pytest.mark.django_db
+def test_cross_source_match_of_lower_source_is_replaced(hub_event):
+    Event.objects.create(
+        id=600_000_001,
+        title="Queer Talk",
+        start_time=START,
+        categories="[]",
+    )
+    deduplicator = CrossSourceDeduplicator([("Queer Talk!", START)], "hub")
+
+    assert deduplicator.match("Queer Talk!", START) == 600_000_001
+    assert deduplicator.merged[0]["replaced"]
+
+    deduplicator.discard(600_000_001)
+    assert deduplicator.match("Queer Talk!", START) is None
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize(
+    "title,start",
+    [
+        ("Jazz Ensemble Concert", START),
+        ("Guest Lecture: AI & Future", START + timedelta(hours=2)),
+        ("Guest Lecture: AI & Future", START - timedelta(days=7)),
+        ("", START),
+        ("Guest Lecture: AI & Future", None),
+    ],
+)
+def test_cross_source_non_duplicates(hub_event, title, start):
+    deduplicator = CrossSourceDeduplicator([(title, start)], "email")
+
+    assert not deduplicator.is_duplicate(title, start)
+    assert deduplicator.merged == []
+
+
+@pytest.mark.django_db
+def test_cross_source_ignores_same_source(hub_event):
+    deduplicator = CrossSourceDeduplicator(
+        [("Guest Lecture: AI & Future", START)], "hub"
+    )
+
+    assert not deduplicator.is_duplicate("Guest Lecture: AI & Future", START)
+
+
+@pytest.mark.django_db
+def test_cross_source_loads_events_with_one_query(
+    existing_events, hub_event, django_assert_num_queries
+):
+    with django_assert_num_queries(1):
+        deduplicator = CrossSourceDeduplicator(
+            [(title, start) for start, title in INCOMING_TITLES], "email"
+        )
+        decisions = [
+            deduplicator.is_duplicate(title, start)
+            for start, title in INCOMING_TITLES
+        ]
+
+    # Matches the calendar events of `EXISTING_TITLES`
+    assert decisions == [
+        True,
+        True,
+        True,
+        True,
+        False,
+        False,
+        True,
+        False,
+        False,
+        False,
+    ]
+
+
+def test_cross_source_database_error_treats_batch_as_new():
+    with patch("access_amherst_algo.event_dedupe.Event") as mock_event:
+        mock_event.objects.filter.side_effect = Exception("Database error")
+        deduplicator = CrossSourceDeduplicator([("Queer Talk", START)], "hub")
+        assert not deduplicator.is_duplicate("Queer Talk", START)
+
+
+def test_find_duplicate_clusters():
+    rows = [
+        (600_000_001, "Queer Talk", START, LATER),
+        (700_000_001, "Queer Talk!", START, None),
+        (500_000_001, "Queer Talk", START + timedelta(minutes=45), None),
+        (700_000_002, "Queer Talk", START + timedelta(minutes=45), None),
+        (600_000_002, "", LATER, None),
+        (700_000_003, "Jazz Concert", LATER, None),
+        (700_000_004, "Jazz Concert", LATER, None),
+        (700_000_005, "Jazz Concert", LATER + timedelta(days=7), None),
+        (600_000_003, "Jazz Concert", None, None),
+    ]
+
+    # Small chunks check that matches carry across chunk boundaries
+    clusters = find_duplicate_clusters(rows, chunk_size=2)
+
+    assert sorted([row[0] for row in cluster] for cluster in clusters) == [
+        [500_000_001, 700_000_001, 700_000_002, 600_000_001],
+        [700_000_003, 700_000_004],
+    ]
+
+
+def test_find_duplicate_clusters_requires_same_time_within_a_source():
+    rows = [
+        (700_000_001, "Queer Talk", START, None),
+        (700_000_002, "Queer Talk", START + timedelta(minutes=30), None),
+    ]
+
+    assert find_duplicate_clusters(rows) == []
+    assert find_duplicate_clusters([]) == []
+
+
+def test_compute_dedupe_key():
+    key = compute_dedupe_key("queer talk", START)
+
+    assert len(key) == 32
+    assert compute_dedupe_key("queer talk", START + timedelta(minutes=14)) == (
+        key
+    )
+    assert compute_dedupe_key("queer talk", START + timedelta(minutes=15)) != (
+        key
+    )
+    assert compute_dedupe_key("queer talks", START) != key
+    assert compute_dedupe_key("", START) is None
+    assert compute_dedupe_key("queer talk", None) is None
+    assert dedupe_fields(" Queer  Talk!", START) == {
+        "normalized_title": "queer talk",
+        "dedupe_key": key,
+    }
+
+
+def test_migration_uses_same_dedupe_keys():
+    for title, start in [("Queer Talk!", START), ("", START), ("A", None)]:
+        normalized = dedupe_key_migration.preprocess_title(title)
+        assert normalized == preprocess_title(title)
+        assert dedupe_key_migration.compute_dedupe_key(
+            normalized, start
+        ) == compute_dedupe_key(normalized, start)
+
+
+@pytest.mark.django_db
+def test_migration_fills_dedupe_keys():
+    Event.objects.create(
+        id=700_000_001, title="Queer Talk!", start_time=START, categories="[]"
+    )
+    Event.objects.create(id=700_000_002, title="TBD", categories="[]")
+
+    dedupe_key_migration.fill_dedupe_keys(apps, None)
+
+    assert list(
+        Event.objects.order_by("id").values_list(
+            "normalized_title", "dedupe_key"
+        )
+    ) == [
+        ("queer talk", compute_dedupe_key("queer talk", START)),
+        ("tbd", None),
+    ]
+
+
+@pytest.fixture
+def keyed_events(db):
+    for event_id, title in [
+        (500_000_001, "Queer Talk"),
+        (700_000_001, "Jazz Concert"),
+    ]:
+        Event.objects.create(
+            id=event_id,
+            title=title,
+            start_time=START,
+            categories="[]",
+            **dedupe_fields(title, START),
+        )
+
+
+def test_exact_duplicate_index(keyed_events, django_assert_num_queries):
+    incoming = [
+        ("Queer Talk!", START + timedelta(minutes=5)),
+        ("jazz concert", START),
+        ("Poetry Reading", START),
+    ]
+    with django_assert_num_queries(1):
+        index = ExactDuplicateIndex(incoming, "calendar")
+
+    assert index.find("Queer Talk!", incoming[0][1], 700_000_009) == (
+        500_000_001
+    )
+    # A row stored under the event's own id is an update
+    assert index.find("jazz concert", START, 700_000_001) is None
+    assert index.find("jazz concert", START, 700_000_002) == 700_000_001
+    assert index.find("Poetry Reading", START, 700_000_003) is None
+
+    index.add("Poetry Reading", START, 700_000_003)
+    assert index.find("Poetry Reading!", START, 700_000_004) == 700_000_003
+
+
+def test_exact_duplicate_index_keeps_hub_events_apart(keyed_events):
+    index = ExactDuplicateIndex(
+        [("Queer Talk", START), ("Jazz Concert", START)], "hub"
+    )
+
+    assert index.find("Queer Talk", START, 500_000_002) is None
+    assert index.find("Jazz Concert", START, 500_000_003) == 700_000_001
+
+
+def test_exact_duplicate_index_database_error():
+    with patch("access_amherst_algo.event_dedupe.Event") as mock_event:
+        mock_event.objects.filter.side_effect = Exception("Database error")
+        index = ExactDuplicateIndex([("Queer Talk", START)], "email")
+        assert index.find("Queer Talk", START, 600_000_001) is None
+
+
+@pytest.mark.parametrize(
+    "event_id,other_id,expected",
+    [
+        (500_000_001, 700_000_001, True),
+        (700_000_001, 600_000_001, True),
+        (600_000_001, 12_345, True),
+        (700_000_001, 500_000_001, False),
+        (600_000_001, 700_000_001, False),
+        (700_000_001, 700_000_002, False),
+    ],
+)
+def test_outranks(event_id, other_id, expected):
+    assert outranks(event_id, other_id) == expected
+
+
+@pytest.mark.django_db
+def test_dedupe_engine_runs_checks_in_order(keyed_events, hub_event):
+    incoming = [
+        ("jazz concert", START, 700_000_002),
+        ("Guest Lecture - AI and the Future", START, 700_000_003),
+        ("Swing Dance Social", LATER, 700_000_004),
+        ("Swing Dance Social!", LATER, 700_000_005),
+    ]
+    engine = DedupeEngine(
+        incoming, source="calendar", similarity_threshold=0.57
+    )
+
+    # Exact dedupe key, then another source, then title similarity
+    assert engine.find_duplicate(*incoming[0]) == 700_000_001
+    assert engine.find_duplicate(*incoming[1]) == hub_event.id
+    assert engine.merged[0]["matched_id"] == hub_event.id
+    assert engine.find_duplicate(*incoming[2]) is None
+    engine.add(*incoming[2])
+    assert engine.find_duplicate(*incoming[3]) == 700_000_004
+
+
+@pytest.mark.django_db
+def test_dedupe_engine_forgets_discarded_events(keyed_events):
+    incoming = [("Jazz Concert!", START, 500_000_002)]
+    engine = DedupeEngine(incoming, source="hub", similarity_threshold=0.4)
+
+    assert engine.find_duplicate(*incoming[0]) == 700_000_001
+    engine.discard(700_000_001)
+    assert engine.find_duplicate(*incoming[0]) is None
+
+
+@pytest.mark.django_db
+def test_dedupe_engine_skips_similarity_for_hub_events(existing_events):
+    incoming = [("Queer Talk: Part II", START, 500_000_001)]
+    engine = DedupeEngine(incoming, source="hub", similarity_threshold=0.4)
+
+    assert engine.find_duplicate(*incoming[0]) is None
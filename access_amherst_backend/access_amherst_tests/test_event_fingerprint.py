@@ -0,0 +1,177 @@
+import importlib
+import pytest
+from unittest.mock import patch
+from datetime import datetime
+import pytz
+from django.apps import apps
+from access_amherst_algo.models import Event
+from access_amherst_algo.event_fingerprint import (
+    CALENDAR_ID_BASE,
+    EMAIL_ID_BASE,
+    HUB_ID_BASE,
+    ID_RANGE,
+    compute_content_hash,
+    event_source,
+    load_known_hashes,
+    stable_event_id,
+)
+
+stable_ids_migration = importlib.import_module(
+    "access_amherst_algo.migrations.0011_stable_event_ids"
+)
+
+sample_event = {
+    "title": "Queer Talk",
+    "starttime": "Fri, 18 Oct 2024 20:00:00 GMT",
+    "location": "Queer Resource Center (Keefe 213)",
+    "host": ["Queer Resource Center"],
+    "categories": ["Social"],
+}
+
+
+def test_content_hash_is_stable():
+    reordered = dict(reversed(list(sample_event.items())))
+    reformatted = dict(sample_event, title="  Queer\n Talk ")
+
+    assert len(compute_content_hash(sample_event)) == 64
+    assert compute_content_hash(reordered) == compute_content_hash(
+        sample_event
+    )
+    assert compute_content_hash(reformatted) == compute_content_hash(
+        sample_event
+    )
+
+
+def test_content_hash_ignores_derived_fields():
+    derived = dict(
+        sample_event, id=510538770, map_location="Keefe Campus Center"
+    )
+    assert compute_content_hash(derived) == compute_content_hash(sample_event)
+
+
+def test_content_hash_changes_with_source_fields():
+    moved = dict(sample_event, location="Frost Library")
+    recategorized = dict(sample_event, categories=["Social", "Meeting"])
+
+    assert compute_content_hash(moved) != compute_content_hash(sample_event)
+    assert compute_content_hash(recategorized) != compute_content_hash(
+        sample_event
+    )
+
+
+@pytest.mark.django_db
+def test_load_known_hashes():
+    content_hash = compute_content_hash(sample_event)
+    Event.objects.create(
+        id=510538770,
+        title="Queer Talk",
+        start_time=datetime(2024, 10, 18, 20, 0, tzinfo=pytz.UTC),
+        categories="[]",
+        content_hash=content_hash,
+    )
+
+    assert load_known_hashes([content_hash, "0" * 64, content_hash]) == {
+        content_hash
+    }
+    assert load_known_hashes([]) == set()
+
+
+def test_load_known_hashes_database_error():
+    with patch("access_amherst_algo.event_fingerprint.Event") as mock_event:
+        mock_event.objects.filter.side_effect = Exception("Database error")
+        assert load_known_hashes(["0" * 64]) == set()
+
+
+START = datetime(2024, 11, 7, 20, 0, tzinfo=pytz.UTC)
+
+
+def test_stable_event_id():
+    event_id = stable_event_id(CALENDAR_ID_BASE, "Queer Talk", START)
+
+    # Independent of the process's hash seed
+    assert event_id == 796602952
+    assert CALENDAR_ID_BASE <= event_id < CALENDAR_ID_BASE + ID_RANGE
+    assert stable_event_id(CALENDAR_ID_BASE, " queer  TALK", START) == event_id
+    assert (
+        stable_event_id(
+            CALENDAR_ID_BASE,
+            "Queer Talk",
+            START.astimezone(pytz.timezone("America/New_York")),
+        )
+        == event_id
+    )
+
+
+def test_stable_event_id_distinguishes_events():
+    event_id = stable_event_id(CALENDAR_ID_BASE, "Queer Talk", START)
+
+    assert stable_event_id(CALENDAR_ID_BASE, "Queer Talks", START) != event_id
+    assert (
+        stable_event_id(
+            CALENDAR_ID_BASE,
+            "Queer Talk",
+            datetime(2024, 11, 8, tzinfo=pytz.UTC),
+        )
+        != event_id
+    )
+    assert stable_event_id(CALENDAR_ID_BASE, "Queer Talk", None) != event_id
+    assert (
+        EMAIL_ID_BASE
+        <= stable_event_id(EMAIL_ID_BASE, "Queer Talk", START)
+        < (EMAIL_ID_BASE + ID_RANGE)
+    )
+
+
+def test_event_source():
+    assert event_source(HUB_ID_BASE + 1) == "hub"
+    assert event_source(EMAIL_ID_BASE) == "email"
+    assert event_source(796602952) == "calendar"
+    assert event_source(CALENDAR_ID_BASE + ID_RANGE) == "other"
+    assert event_source(42) == "other"
+
+
+def test_migration_uses_same_ids():
+    for base in (EMAIL_ID_BASE, CALENDAR_ID_BASE):
+        for title, start in [("Queer Talk", START), (" Jazz  Night", None)]:
+            assert stable_ids_migration.stable_event_id(
+                base, title, start
+            ) == stable_event_id(base, title, start)
+
+
+@pytest.mark.django_db
+def test_migration_collapses_duplicates():
+    def create(event_id, title, pub_day, **fields):
+        Event.objects.create(
+            id=event_id,
+            title=title,
+            start_time=START,
+            pub_date=datetime(2024, 11, pub_day, tzinfo=pytz.UTC),
+            categories="[]",
+            content_hash="abc",
+            **fields,
+        )
+
+    # The same calendar event saved by three runs, one email event, one hub
+    # event and one calendar event already on its stable id
+    create(700_000_001, "Queer Talk", 1, location="Old")
+    create(712_345_678, "Queer Talk", 3, location="Newest")
+    create(799_999_999, "Queer  Talk", 2, location="Middle")
+    create(600_000_001, "Jazz Night", 1)
+    create(500_000_001, "Hub Event", 1)
+    stable_id = stable_event_id(CALENDAR_ID_BASE, "Film Screening", START)
+    create(stable_id, "Film Screening", 1)
+
+    stable_ids_migration.collapse_duplicate_events(apps, None)
+
+    calendar_event = Event.objects.get(
+        id=stable_event_id(CALENDAR_ID_BASE, "Queer Talk", START)
+    )
+    assert calendar_event.location == "Newest"
+    assert calendar_event.content_hash is None
+    assert Event.objects.filter(title__startswith="Queer").count() == 1
+    assert Event.objects.filter(
+        id=stable_event_id(EMAIL_ID_BASE, "Jazz Night", START)
+    ).exists()
+    assert Event.objects.get(id=500_000_001).content_hash == "abc"
+    assert Event.objects.get(id=stable_id).content_hash == "abc"
+    assert Event.objects.count() == 4
@@ -1,6 +1,10 @@
 import pytest
 from unittest.mock import patch, mock_open
-from access_amherst_algo.rss_scraper.fetch_rss import fetch_rss
+from access_amherst_algo.rss_scraper.fetch_rss import (
+    fetch_rss,
+    save_feed_state,
+)
+from access_amherst_algo.models import FeedState
 from datetime import datetime
 
 
@@ -10,10 +14,15 @@ def mock_requests_get():
     with patch("requests.get") as mock_get:
         mock_get.return_value.status_code = 200
         mock_get.return_value.content = b"<rss>Mock RSS content</rss>"
+        mock_get.return_value.headers = {
+            "ETag": '"abc123"',
+            "Last-Modified": "Fri, 18 Oct 2024 02:21:19 GMT",
+        }
         yield mock_get
 
 
 # Test function for `fetch_rss`
+@pytest.mark.django_db
 def test_fetch_rss(mock_requests_get):
     # Mock the file handling to prevent actual file creation
     with patch("builtins.open", mock_open()) as mock_file, patch(
@@ -29,11 +38,11 @@ def test_fetch_rss(mock_requests_get):
         mock_join.return_value = expected_filename
 
         # Call the function
-        fetch_rss()
+        validators = fetch_rss()
 
         # Check if the GET request was called with the correct URL
         mock_requests_get.assert_called_once_with(
-            "https://thehub.amherst.edu/events.rss"
+            "https://thehub.amherst.edu/events.rss", headers={}, timeout=30
         )
 
         # Check if the file was opened with the correct name and mode
@@ -43,3 +52,71 @@ def test_fetch_rss(mock_requests_get):
         mock_file().write.assert_called_once_with(
             b"<rss>Mock RSS content</rss>"
         )
+
+    # The validators are only stored once the feed is ingested
+    assert not FeedState.objects.exists()
+    save_feed_state(validators)
+    state = FeedState.objects.get(url="https://thehub.amherst.edu/events.rss")
+    assert state.etag == '"abc123"'
+    assert state.last_modified == "Fri, 18 Oct 2024 02:21:19 GMT"
+
+
+@pytest.mark.django_db
+def test_fetch_rss_sends_validators_and_handles_not_modified(
+    mock_requests_get,
+):
+    with patch("builtins.open", mock_open()):
+        save_feed_state(fetch_rss())
+
+    mock_requests_get.reset_mock()
+    mock_requests_get.return_value.status_code = 304
+    with patch("builtins.open", mock_open()) as mock_file:
+        assert fetch_rss() is None
+        mock_file.assert_not_called()
+
+    mock_requests_get.assert_called_once_with(
+        "https://thehub.amherst.edu/events.rss",
+        headers={
+            "If-None-Match": '"abc123"',
+            "If-Modified-Since": "Fri, 18 Oct 2024 02:21:19 GMT",
+        },
+        timeout=30,
+    )
+
+
+@pytest.mark.django_db
+def test_fetch_rss_skips_unchanged_content(mock_requests_get):
+    # Servers without validators still let us skip identical bodies
+    mock_requests_get.return_value.headers = {}
+    with patch("builtins.open", mock_open()):
+        save_feed_state(fetch_rss())
+
+    with patch("builtins.open", mock_open()) as mock_file:
+        assert fetch_rss() is None
+        mock_file.assert_not_called()
+
+    mock_requests_get.return_value.content = b"<rss>Updated content</rss>"
+    with patch("builtins.open", mock_open()) as mock_file:
+        assert fetch_rss()["content_hash"] != (
+            FeedState.objects.get().content_hash
+        )
+        mock_file().write.assert_called_once_with(
+            b"<rss>Updated content</rss>"
+        )
+
+
+@pytest.mark.django_db
+def test_fetch_rss_refetches_feed_that_was_not_ingested(mock_requests_get):
+    # A run that fails after fetching must not make the feed look handled
+    with patch("builtins.open", mock_open()):
+        assert fetch_rss()
+
+    with patch("builtins.open", mock_open()) as mock_file:
+        assert fetch_rss()
+        mock_file().write.assert_called_once_with(
+            b"<rss>Mock RSS content</rss>"
+        )
+
+    mock_requests_get.assert_called_with(
+        "https://thehub.amherst.edu/events.rss", headers={}, timeout=30
+    )
@@ -0,0 +1,120 @@
+import pytest
+from io import StringIO
+from unittest.mock import patch
+from django.core.management import call_command
+
+COMMAND = "access_amherst_algo.management.commands.hub_workflow"
+
+
+@pytest.fixture
+def mock_pipeline():
+    with patch(f"{COMMAND}.fetch_rss") as mock_fetch, patch(
+        f"{COMMAND}.create_events_list"
+    ) as mock_create, patch(f"{COMMAND}.save_json") as mock_save_json, patch(
+        f"{COMMAND}.save_to_db"
+    ) as mock_save_to_db, patch(
+        f"{COMMAND}.stream_to_db"
+    ) as mock_stream, patch(
+        f"{COMMAND}.save_feed_state"
+    ) as mock_save_state, patch(
+        f"{COMMAND}.Command._clear_directory"
+    ) as mock_clear:
+        mock_fetch.return_value = {"content_hash": "abc"}
+        mock_create.return_value = [{"title": "Queer Talk"}]
+        counts = {
+            "changed": 1,
+            "unchanged": 0,
+            "duplicate": 0,
+            "cross_source": 0,
+        }
+        mock_save_to_db.return_value = counts
+        mock_stream.return_value = counts
+        yield {
+            "fetch": mock_fetch,
+            "create": mock_create,
+            "save_json": mock_save_json,
+            "save_to_db": mock_save_to_db,
+            "stream": mock_stream,
+            "save_state": mock_save_state,
+            "clear": mock_clear,
+        }
+
+
+def test_hub_workflow_parses_feed_once(mock_pipeline):
+    call_command("hub_workflow")
+
+    mock_pipeline["fetch"].assert_called_once()
+    mock_pipeline["create"].assert_called_once_with(workers=None)
+    mock_pipeline["save_json"].assert_not_called()
+    mock_pipeline["save_to_db"].assert_called_once_with(
+        mock_pipeline["create"].return_value, write_json=False
+    )
+    mock_pipeline["save_state"].assert_called_once_with(
+        mock_pipeline["fetch"].return_value
+    )
+
+
+def test_hub_workflow_debug_json_keeps_snapshots(mock_pipeline):
+    call_command("hub_workflow", "--debug-json")
+
+    events = mock_pipeline["create"].return_value
+    mock_pipeline["create"].assert_called_once_with(workers=None)
+    mock_pipeline["save_json"].assert_called_once_with(events)
+    mock_pipeline["save_to_db"].assert_called_once_with(
+        events, write_json=True
+    )
+    mock_pipeline["clear"].assert_called_once_with(
+        "access_amherst_algo/rss_scraper/rss_files"
+    )
+
+
+def test_hub_workflow_failure_reraises(mock_pipeline):
+    mock_pipeline["save_to_db"].side_effect = Exception("Database error")
+
+    with pytest.raises(Exception):
+        call_command("hub_workflow")
+    assert mock_pipeline["clear"].call_count == 2
+    # The feed is fetched again on the next run
+    mock_pipeline["save_state"].assert_not_called()
+
+
+def test_hub_workflow_stream_mode(mock_pipeline):
+    call_command("hub_workflow", "--stream", "--batch-size", "50")
+
+    mock_pipeline["stream"].assert_called_once_with(batch_size=50)
+    mock_pipeline["save_state"].assert_called_once()
+    mock_pipeline["create"].assert_not_called()
+    mock_pipeline["save_to_db"].assert_not_called()
+
+
+def test_hub_workflow_exits_when_feed_unchanged(mock_pipeline):
+    mock_pipeline["fetch"].return_value = None
+
+    call_command("hub_workflow")
+
+    mock_pipeline["create"].assert_not_called()
+    mock_pipeline["save_to_db"].assert_not_called()
+    mock_pipeline["stream"].assert_not_called()
+
+
+def test_hub_workflow_reports_counts(mock_pipeline):
+    out = StringIO()
+    mock_pipeline["save_to_db"].return_value = {
+        "changed": 2,
+        "unchanged": 340,
+        "duplicate": 1,
+        "cross_source": 1,
+    }
+
+    call_command("hub_workflow", stdout=out)
+
+    assert (
+        "2 changed, 340 unchanged, 1 duplicate events "
+        "(1 merged across sources)." in out.getvalue()
+    )
+
+
+def test_hub_workflow_passes_description_workers(mock_pipeline):
+    call_command("hub_workflow", "--workers", "4")
+
+    mock_pipeline["create"].assert_called_once_with(workers=4)
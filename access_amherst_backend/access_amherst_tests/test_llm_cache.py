@@ -0,0 +1,74 @@
+import os
+import pytest
+from unittest.mock import patch
+from access_amherst_algo.email_scraper.llm_cache import LLMCache, cache_key
+
+MODEL = "meta-llama/llama-3.1-405b-instruct:free"
+PROMPT = "Extract the events."
+BODY = "Queer Talk, Thursday 3pm, Keefe 213"
+EVENTS = [{"title": "Queer Talk", "location": "Keefe 213"}]
+
+
+@pytest.fixture
+def cache(tmp_path):
+    return LLMCache(str(tmp_path / "cache"))
+
+
+def test_cache_key_depends_on_every_input():
+    key = cache_key(MODEL, PROMPT, BODY)
+
+    assert key == cache_key(MODEL, PROMPT, BODY)
+    keys = {
+        key,
+        cache_key("other-model", PROMPT, BODY),
+        cache_key(MODEL, "Other prompt.", BODY),
+        cache_key(MODEL, PROMPT, BODY + " "),
+    }
+    assert len(keys) == 4
+
+
+def test_store_and_load(cache):
+    assert cache.load(MODEL, PROMPT, BODY) is None
+
+    cache.store(MODEL, PROMPT, BODY, EVENTS)
+
+    assert cache.load(MODEL, PROMPT, BODY) == EVENTS
+    assert cache.load("other-model", PROMPT, BODY) is None
+
+
+def test_default_directory_from_environment(tmp_path, monkeypatch):
+    monkeypatch.setenv("LLM_CACHE_DIR", str(tmp_path / "from_env"))
+
+    LLMCache().store(MODEL, PROMPT, BODY, EVENTS)
+
+    assert os.listdir(tmp_path / "from_env") == [
+        f"{cache_key(MODEL, PROMPT, BODY)}.json"
+    ]
+
+
+def test_default_directory_is_outside_the_source_tree(monkeypatch, tmp_path):
+    monkeypatch.delenv("LLM_CACHE_DIR")
+    monkeypatch.setenv("ACCESS_AMHERST_CACHE_DIR", str(tmp_path))
+
+    assert LLMCache().directory == str(tmp_path / "llm_cache")
+
+
+def test_corrupt_entry_is_a_miss(cache):
+    cache.store(MODEL, PROMPT, BODY, EVENTS)
+    path = os.path.join(
+        cache.directory, f"{cache_key(MODEL, PROMPT, BODY)}.json"
+    )
+    with open(path, "w") as file:
+        file.write("{not json")
+
+    assert cache.load(MODEL, PROMPT, BODY) is None
+
+
+def test_failed_write_is_logged(cache):
+    with patch(
+        "access_amherst_algo.email_scraper.llm_cache.tempfile.mkstemp",
+        side_effect=OSError("Disk full"),
+    ):
+        cache.store(MODEL, PROMPT, BODY, EVENTS)
+
+    assert cache.load(MODEL, PROMPT, BODY) is None
@@ -0,0 +1,129 @@
+import re
+import pytest
+from unittest.mock import patch
+from access_amherst_algo.models import ResolvedLocation
+from access_amherst_algo.location_resolver import (
+    JITTER_RANGE,
+    LOCATION_BUCKETS,
+    LOCATION_TABLE_VERSION,
+    jitter_coordinates,
+    lookup_location,
+    resolve_location,
+)
+
+KEEFE = ("Keefe Campus Center", 42.37141504481807, -72.51479991450528)
+ALUMNI_GYM = ("Alumni Gymnasium", 42.368819594097864, -72.5188658145099)
+
+
+def resolve_by_scanning(location):
+    """The original keyword-by-keyword lookup, for comparison."""
+    for keyword, info in LOCATION_BUCKETS.items():
+        if re.search(rf"\b{keyword}\b", location, re.IGNORECASE):
+            return info["name"], info["latitude"], info["longitude"]
+    return "Other", None, None
+
+
+@pytest.mark.parametrize(
+    "location,expected",
+    [
+        ("Friedmann Room", KEEFE),
+        ("Queer Resource Center (Keefe 213)", KEEFE),
+        ("Amherst Alumni Gym (Coolidge Cage)", ALUMNI_GYM),
+        # "Gym" is listed before "Middleton Gym", so it takes priority
+        ("Middleton Gym", ALUMNI_GYM),
+        ("KEEFE CAMPUS CENTER", KEEFE),
+        ("Gymnasium Lobby", ("Other", None, None)),
+        ("Unknown Location", ("Other", None, None)),
+        ("", ("Other", None, None)),
+        (None, ("Other", None, None)),
+    ],
+)
+def test_resolve_location(location, expected):
+    assert resolve_location(location) == expected
+
+
+def test_priority_does_not_depend_on_position():
+    # "Keefe" outranks "Frost" even when "Frost" appears first
+    assert resolve_location("Frost steps, then Keefe") == KEEFE
+
+
+def test_matches_keyword_by_keyword_lookup():
+    words = list(LOCATION_BUCKETS) + ["Room", "Gymnasium", "(213)", "the"]
+    for first in words:
+        for second in words:
+            location = f"{first} {second}"
+            assert resolve_location(location) == resolve_by_scanning(location)
+
+
+def test_results_are_memoized():
+    resolve_location.cache_clear()
+    resolve_location("Frost Library")
+    resolve_location("Frost Library")
+    assert resolve_location.cache_info().hits == 1
+
+
+@pytest.mark.django_db
+def test_lookup_location_persists_resolutions(django_assert_num_queries):
+    location = "Queer Resource Center (Keefe 213)"
+
+    assert lookup_location(location) == KEEFE
+    row = ResolvedLocation.objects.get(raw_location=location)
+    assert (row.name, row.latitude, row.longitude) == KEEFE
+    assert row.table_version == LOCATION_TABLE_VERSION
+
+    # Later lookups are served from memory
+    with django_assert_num_queries(0):
+        assert lookup_location(location) == KEEFE
+
+
+@pytest.mark.django_db
+def test_lookup_location_loads_persisted_rows_once(django_assert_num_queries):
+    ResolvedLocation.objects.create(
+        raw_location="Keefe 213",
+        name=KEEFE[0],
+        latitude=KEEFE[1],
+        longitude=KEEFE[2],
+        table_version=LOCATION_TABLE_VERSION,
+    )
+
+    with django_assert_num_queries(1):
+        assert lookup_location("Keefe 213") == KEEFE
+        assert lookup_location("Keefe 213") == KEEFE
+
+
+@pytest.mark.django_db
+def test_lookup_location_redoes_rows_from_an_old_table():
+    ResolvedLocation.objects.create(
+        raw_location="Keefe 213",
+        name="Old Name",
+        table_version="outdated",
+    )
+
+    assert lookup_location("Keefe 213") == KEEFE
+    assert ResolvedLocation.objects.get(raw_location="Keefe 213").name == (
+        KEEFE[0]
+    )
+
+
+def test_lookup_location_without_database():
+    with patch(
+        "access_amherst_algo.location_resolver.ResolvedLocation"
+    ) as mock_model:
+        mock_model.objects.filter.side_effect = Exception("Database error")
+        assert lookup_location("Keefe 213") == KEEFE
+
+
+def test_seeded_jitter_is_deterministic():
+    lat, lng = KEEFE[1], KEEFE[2]
+
+    first = jitter_coordinates(lat, lng, seed=510538770)
+    assert first == jitter_coordinates(lat, lng, seed="510538770")
+    assert first != jitter_coordinates(lat, lng, seed=510538771)
+    assert abs(first[0] - lat) <= JITTER_RANGE
+    assert abs(first[1] - lng) <= JITTER_RANGE
+
+
+def test_unseeded_jitter_stays_in_range():
+    lat, lng = jitter_coordinates(KEEFE[1], KEEFE[2])
+    assert abs(lat - KEEFE[1]) <= JITTER_RANGE
+    assert abs(lng - KEEFE[2]) <= JITTER_RANGE
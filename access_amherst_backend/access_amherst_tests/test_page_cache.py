@@ -0,0 +1,103 @@
+import os
+import pytest
+from unittest.mock import patch
+from access_amherst_algo.cache_paths import default_cache_path
+from access_amherst_algo.calendar_scraper.page_cache import PageCache
+
+URL = "https://www.amherst.edu/news/events/calendar?_page=0"
+BODY = b"<html><article>Queer Talk</article></html>"
+EVENTS = [{"title": "Queer Talk", "location": "Keefe 213"}]
+
+
+@pytest.fixture
+def cache(tmp_path):
+    return PageCache(str(tmp_path / "cache"))
+
+
+def test_empty_cache(cache):
+    assert cache.conditional_headers(URL) == {}
+    assert cache.load_body(URL) is None
+    assert cache.load_events(URL, BODY) is None
+
+
+def test_store_response_sets_validators(cache):
+    cache.store_response(
+        URL,
+        {"ETag": '"abc"', "Last-Modified": "Fri, 18 Oct 2024 20:00:00 GMT"},
+        BODY,
+    )
+
+    assert cache.conditional_headers(URL) == {
+        "If-None-Match": '"abc"',
+        "If-Modified-Since": "Fri, 18 Oct 2024 20:00:00 GMT",
+    }
+    assert cache.load_body(URL) == BODY
+
+
+def test_events_are_reused_only_for_identical_body(cache):
+    cache.store_response(URL, {"ETag": '"abc"'}, BODY)
+    cache.store_events(URL, BODY, EVENTS)
+
+    assert cache.load_events(URL, BODY) == EVENTS
+    assert cache.load_events(URL, BODY + b" ") is None
+    assert cache.load_events(URL + "1", BODY) is None
+
+
+def test_new_body_drops_stored_events(cache):
+    cache.store_events(URL, BODY, EVENTS)
+    cache.store_response(URL, {"ETag": '"abc"'}, BODY)
+    assert cache.load_events(URL, BODY) == EVENTS
+
+    cache.store_response(URL, {"ETag": '"def"'}, b"<html></html>")
+    assert cache.load_events(URL, b"<html></html>") is None
+    assert cache.load_body(URL) == b"<html></html>"
+
+
+def test_refresh_validators(cache):
+    cache.store_response(URL, {"ETag": '"abc"'}, BODY)
+    cache.refresh_validators(URL, {"ETag": '"def"'})
+
+    assert cache.conditional_headers(URL) == {"If-None-Match": '"def"'}
+    assert cache.load_body(URL) == BODY
+
+
+def test_corrupt_metadata_is_a_miss(cache):
+    cache.store_response(URL, {"ETag": '"abc"'}, BODY)
+    cache.store_events(URL, BODY, EVENTS)
+    for file_name in os.listdir(cache.directory):
+        if file_name.endswith(".json"):
+            with open(os.path.join(cache.directory, file_name), "w") as file:
+                file.write("{not json")
+
+    assert cache.conditional_headers(URL) == {}
+    assert cache.load_events(URL, BODY) is None
+
+
+def test_write_errors_are_logged(cache):
+    with patch(
+        "access_amherst_algo.calendar_scraper.page_cache._write_atomic",
+        side_effect=OSError("disk full"),
+    ):
+        cache.store_response(URL, {"ETag": '"abc"'}, BODY)
+        cache.store_events(URL, BODY, EVENTS)
+
+    assert cache.load_events(URL, BODY) is None
+    assert os.listdir(cache.directory) == []
+
+
+def test_default_directory_is_configurable(page_cache_dir):
+    assert PageCache().directory == str(page_cache_dir)
+    assert page_cache_dir.is_dir()
+
+
+def test_default_cache_path_is_outside_the_source_tree(monkeypatch, tmp_path):
+    monkeypatch.delenv("ACCESS_AMHERST_CACHE_DIR", raising=False)
+    monkeypatch.setenv("XDG_CACHE_HOME", str(tmp_path))
+    assert default_cache_path("page_cache") == str(
+        tmp_path / "access_amherst" / "page_cache"
+    )
+
+    monkeypatch.setenv("ACCESS_AMHERST_CACHE_DIR", str(tmp_path / "root"))
+    assert default_cache_path("page_cache") == str(
+        tmp_path / "root" / "page_cache"
+    )
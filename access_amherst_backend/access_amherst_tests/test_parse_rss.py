@@ -11,12 +11,17 @@ from access_amherst_algo.rss_scraper.parse_rss import (
     extract_event_details,
     save_to_db,
     save_event_to_db,
+    iter_events,
+    stream_to_db,
+    save_events_batch,
     categorize_location,
     get_lat_lng,
     add_random_offset,
-    is_similar_event,
     format_category,
+    parse_start_time,
+    SIMILARITY_THRESHOLD,
 )
+from access_amherst_algo.event_dedupe import BatchDeduplicator
 from access_amherst_algo.models import Event
 from datetime import datetime
 import os
@@ -307,6 +312,35 @@ def test_save_to_db(mock_clean_hub_data, mock_save_event, sample_cleaned_data):
     mock_save_event.assert_called_once_with(sample_cleaned_data[0])
 
 
+@pytest.mark.django_db
+@patch("access_amherst_algo.rss_scraper.parse_rss.save_event_to_db")
+@patch("access_amherst_algo.rss_scraper.clean_hub_data.clean_hub_data")
+def test_save_to_db_reuses_parsed_events(
+    mock_clean_hub_data, mock_save_event, sample_cleaned_data, event_list
+):
+    mock_clean_hub_data.return_value = sample_cleaned_data
+
+    save_to_db(event_list)
+
+    # The already-parsed events are cleaned without re-reading the RSS file
+    mock_clean_hub_data.assert_called_once_with(event_list, write_json=False)
+    mock_save_event.assert_called_once_with(sample_cleaned_data[0])
+
+
+@patch("access_amherst_algo.rss_scraper.parse_rss.create_events_list")
+@patch(
+    "access_amherst_algo.rss_scraper.parse_rss.open", new_callable=mock_open
+)
+@patch("access_amherst_algo.rss_scraper.parse_rss.json.dump")
+def test_save_json_reuses_parsed_events(
+    mock_json_dump, mock_open, mock_create_events_list, event_list
+):
+    save_json(event_list)
+
+    mock_create_events_list.assert_not_called()
+    mock_json_dump.assert_called_once_with(event_list, mock_open(), indent=4)
+
+
 # Database test with actual data saving
 @pytest.mark.django_db
 def test_save_event_creates_new_event(sample_cleaned_data):
@@ -328,6 +362,19 @@ def test_save_event_creates_new_event(sample_cleaned_data):
     assert event.author_email == "dmavani25@amherst.edu"
 
 
+@pytest.mark.django_db
+def test_resaving_event_keeps_coordinates(sample_cleaned_data):
+    sample_cleaned_data[0]["author_name"] = None
+    sample_cleaned_data[0]["author_email"] = None
+
+    save_event_to_db(dict(sample_cleaned_data[0]))
+    first = Event.objects.values().get(id=590_363_344)
+    save_event_to_db(dict(sample_cleaned_data[0]))
+    second = Event.objects.values().get(id=590_363_344)
+
+    assert first == second
+
+
 @pytest.mark.django_db
 def test_save_event_updates_existing_event(sample_cleaned_data):
     sample_cleaned_data[0]["author_name"] = "Amherst College Cricket Club"
@@ -378,9 +425,9 @@ def test_add_random_offset():
     assert abs(new_lng - lng) < 0.00015
 
 
-# Test is_similar_event for exact match and close title match
+# Test duplicate detection for exact match and close title match
 @pytest.mark.django_db
-def test_is_similar_event():
+def test_batch_deduplicator_finds_similar_hub_events():
     """Test similar event detection with same start time and similar title"""
     # Prepare test event data
     event_data = {
@@ -405,14 +452,20 @@ def test_is_similar_event():
     # Create similar event with slightly different title
     similar_data = event_data.copy()
     similar_data["title"] = "Regular HEMAC Meet"  # Similar title
-    assert is_similar_event(similar_data) == True  # Expecting a match
 
     # Create a similar event with a different start time
     different_time_data = event_data.copy()
     different_time_data["starttime"] = (
         "Sun, 20 Oct 2024 22:30:00 GMT"  # Different time
     )
-    assert is_similar_event(different_time_data) == False  # Expecting no match
+
+    incoming = [
+        (data["title"], parse_start_time(data))
+        for data in (similar_data, different_time_data)
+    ]
+    deduplicator = BatchDeduplicator(incoming, SIMILARITY_THRESHOLD)
+    assert deduplicator.is_duplicate(*incoming[0])  # Expecting a match
+    assert not deduplicator.is_duplicate(*incoming[1])  # Expecting no match
 
 
 # Test create_events_list for correct extraction and parsing
@@ -463,4 +516,169 @@ def test_format_category():
     assert format_category("studentLifeActivities") == "Student Life Activities"
     
     # Test with spaces already present
-    assert format_category("campus life") == "Campus Life"
\ No newline at end of file
+    assert format_category("campus life") == "Campus Life"
+
+
+@pytest.fixture
+def rss_file(tmp_path, xml_item_queer_talk, xml_item_cricket_club):
+    channel = "".join(
+        ET.tostring(item, encoding="unicode")
+        for item in [xml_item_queer_talk, xml_item_cricket_club]
+    )
+    rss_path = tmp_path / "hub.xml"
+    rss_path.write_text(
+        f'<?xml version="1.0" encoding="utf-8"?><rss version="2.0">'
+        f"<channel><title>Hub</title>{channel}</channel></rss>"
+    )
+    return str(rss_path)
+
+
+def test_iter_events_matches_full_parse(rss_file):
+    expected = [
+        extract_event_details(item)
+        for item in ET.parse(rss_file).getroot().findall(".//item")
+    ]
+    assert list(iter_events(rss_file)) == expected
+
+
+def test_iter_events_releases_parsed_items(rss_file):
+    seen_items = []
+
+    def record_item(item):
+        seen_items.append(item)
+        return {"title": item.find("title").text}
+
+    with patch(
+        "access_amherst_algo.rss_scraper.parse_rss.extract_event_details",
+        side_effect=record_item,
+    ):
+        titles = [event["title"] for event in iter_events(rss_file)]
+
+    assert titles == ["Queer Talk", "Amherst Cricket Club Practices"]
+    # Every item is cleared once the pipeline has moved past it
+    assert all(len(item) == 0 for item in seen_items)
+
+
+@patch("access_amherst_algo.rss_scraper.parse_rss.save_events_batch")
+@patch("access_amherst_algo.rss_scraper.parse_rss.iter_events")
+def test_stream_to_db_saves_in_batches(
+    mock_iter_events, mock_save_batch, sample_pre_cleaned_data
+):
+    event = sample_pre_cleaned_data[0]
+    cancelled = dict(event, title="Cricket (Cancelled)")
+    mock_iter_events.return_value = iter(
+        [dict(event) for _ in range(3)] + [cancelled, dict(event)]
+    )
+
+    mock_save_batch.return_value = {"changed": 1, "unchanged": 1}
+
+    counts = stream_to_db("hub.xml", batch_size=2)
+
+    mock_iter_events.assert_called_once_with("hub.xml")
+    assert counts["changed"] == 2
+    assert counts["unchanged"] == 2
+    assert [len(call.args[0]) for call in mock_save_batch.call_args_list] == [
+        2,
+        2,
+    ]
+    assert mock_save_batch.call_args_list[0].args[0][0]["id"] == 510428286
+
+
+@pytest.mark.django_db
+@patch("access_amherst_algo.rss_scraper.parse_rss.save_event_to_db")
+def test_save_events_batch_skips_similar_non_hub_events(
+    mock_save_event, sample_cleaned_data
+):
+    hub_event = sample_cleaned_data[0]
+    other_event = dict(hub_event, id=90_363_345)
+    similar_event = dict(hub_event, id=90_363_346, title="Regular HEMAC Meet")
+
+    save_events_batch([hub_event, other_event, similar_event])
+
+    assert [call.args[0] for call in mock_save_event.call_args_list] == [
+        hub_event,
+        other_event,
+    ]
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize(
+    "location,map_location,coordinates",
+    [
+        (
+            "Friedmann Room",
+            "Keefe Campus Center",
+            (42.37141504481807, -72.51479991450528),
+        ),
+        # Hub coordinates are those of the mapped building's name, which
+        # matches no keyword for these buildings
+        ("In front of Alumni Gym", "Alumni Gymnasium", (None, None)),
+        (
+            "Paino Lecture Hall",
+            "Beneski Museum of Natural History",
+            (None, None),
+        ),
+    ],
+)
+def test_save_event_to_db_coordinates(
+    sample_cleaned_data, location, map_location, coordinates
+):
+    event = dict(
+        sample_cleaned_data[0],
+        location=location,
+        author_name=None,
+        author_email=None,
+    )
+
+    save_event_to_db(event)
+
+    stored = Event.objects.get(id=590363344)
+    assert stored.map_location == map_location
+    if coordinates == (None, None):
+        assert (stored.latitude, stored.longitude) == coordinates
+    else:
+        assert stored.latitude == pytest.approx(coordinates[0], abs=0.00015)
+        assert stored.longitude == pytest.approx(coordinates[1], abs=0.00015)
+
+
+@pytest.mark.django_db
+def test_save_events_batch_replaces_other_source_copies(sample_cleaned_data):
+    hub_event = dict(
+        sample_cleaned_data[0], author_name=None, author_email=None
+    )
+    Event.objects.create(
+        id=700_000_001,
+        title=hub_event["title"] + "!",
+        start_time=parser.parse(hub_event["starttime"]),
+        categories="[]",
+    )
+
+    counts = save_events_batch([hub_event])
+
+    assert counts["changed"] == 1
+    assert counts["duplicate"] == 0
+    assert counts["cross_source"] == 1
+    assert list(Event.objects.values_list("id", flat=True)) == [590363344]
+
+
+@pytest.mark.django_db
+def test_save_events_batch_skips_unchanged_events(sample_cleaned_data):
+    event = dict(
+        sample_cleaned_data[0], author_name=None, author_email=None
+    )
+    assert save_events_batch([dict(event)])["changed"] == 1
+    stored = Event.objects.get(id=590363344)
+    assert stored.content_hash is not None
+
+    with patch(
+        "access_amherst_algo.rss_scraper.parse_rss.save_event_to_db"
+    ) as mock_save_event:
+        counts = save_events_batch([dict(event)])
+        mock_save_event.assert_not_called()
+    assert counts["unchanged"] == 1
+    assert counts["changed"] == 0
+
+    moved = dict(event, location="Frost Library")
+    counts = save_events_batch([moved])
+    assert counts["changed"] == 1
+    assert Event.objects.get(id=590363344).location == "Frost Library"
@@ -0,0 +1,92 @@
+"""
+Benchmark for parsing calendar listing pages.
+
+Compares `calendar_parser.parse_events`, which builds only the event
+articles, with the full-document parse `scrape_page` used to do, on the
+saved page fixture. Checks that both extract identical events and reports
+time and peak memory per page. Run from `access_amherst_backend/`:
+
+    python benchmarks/bench_calendar_parsing.py [page.html ...]
+"""
+
+import os
+import sys
+import timeit
+import tracemalloc
+
+from bs4 import BeautifulSoup
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+os.environ.setdefault(
+    "DJANGO_SETTINGS_MODULE", "access_amherst_backend.settings"
+)
+
+import django  # noqa: E402
+
+django.setup()
+
+from access_amherst_algo.calendar_scraper import calendar_parser  # noqa: E402
+
+REPEAT = 5
+NUMBER = 50
+FIXTURE = os.path.join(
+    ROOT, "access_amherst_tests", "fixtures", "calendar_page_sample.html"
+)
+
+
+def parse_full(html):
+    """The captcha check and extraction `scrape_page` used to do."""
+    soup = BeautifulSoup(html, "html.parser")
+    if "captcha" in soup.text.lower():
+        return []
+    return [
+        calendar_parser.extract_event(article)
+        for article in soup.find_all("article", class_="mm-calendar-event")
+    ]
+
+
+def parse_partial(html):
+    if calendar_parser.has_captcha(html):
+        return []
+    return calendar_parser.parse_events(html)
+
+
+def peak_memory(function, html):
+    tracemalloc.start()
+    function(html)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return peak
+
+
+def main(paths):
+    for path in paths:
+        with open(path, "rb") as file:
+            html = file.read()
+
+        events = parse_partial(html)
+        assert events == parse_full(html), f"{path}: extracted events differ"
+
+        timings = {}
+        for label, function in (
+            ("full", parse_full),
+            ("partial", parse_partial),
+        ):
+            seconds = min(
+                timeit.repeat(
+                    lambda: function(html), repeat=REPEAT, number=NUMBER
+                )
+            )
+            timings[label] = (
+                seconds / NUMBER * 1e3,
+                peak_memory(function, html) / 1024,
+            )
+
+        print(f"{os.path.basename(path)}: {len(events)} events, identical")
+        for label, (ms, kib) in timings.items():
+            print(f"  {label:<8}{ms:>8.2f} ms/page {kib:>8.0f} KiB peak")
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:] or [FIXTURE])
@@ -0,0 +1,83 @@
+"""
+Microbenchmark for the ingestion date parsers.
+
+Compares `access_amherst_algo.datetime_parsing` with the dateutil calls it
+replaces, on the formats each scraper produces. Run from
+`access_amherst_backend/`:
+
+    python benchmarks/bench_datetime_parsing.py
+"""
+
+import os
+import sys
+import timeit
+from datetime import datetime
+
+import pytz
+from dateutil import parser
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from access_amherst_algo import datetime_parsing  # noqa: E402
+
+REPEAT = 5
+NUMBER = 2000
+
+SAMPLES = {
+    "rss pubDate": "Fri, 18 Oct 2024 02:21:19 GMT",
+    "calendar ISO": "2024-11-07T15:00:00-05:00",
+    "email time": "18:00:00",
+}
+
+
+def dateutil_utc(value):
+    """The per-call parse-and-convert the savers used to do."""
+    parsed = parser.parse(value)
+    if parsed.tzinfo is None:
+        parsed = pytz.timezone("America/New_York").localize(parsed)
+    return parsed.astimezone(pytz.UTC)
+
+
+def best_of(statement):
+    return min(timeit.repeat(statement, repeat=REPEAT, number=NUMBER))
+
+
+def clear_caches():
+    datetime_parsing._parse.cache_clear()
+    datetime_parsing._parse_utc.cache_clear()
+    datetime_parsing.parse_time_of_day.cache_clear()
+
+
+def main():
+    print(f"{'format':<14}{'baseline':>12}{'uncached':>12}{'cached':>12}")
+    for label, value in SAMPLES.items():
+        if label == "email time":
+            baseline = best_of(
+                lambda: datetime.strptime(value, "%H:%M:%S").time()
+            )
+            fast = datetime_parsing.parse_time_of_day
+        else:
+            baseline = best_of(lambda: dateutil_utc(value))
+
+            def fast(value):
+                return datetime_parsing.parse_datetime_utc(
+                    value, "America/New_York"
+                )
+
+        def uncached():
+            clear_caches()
+            fast(value)
+
+        uncached_time = best_of(uncached)
+        cached_time = best_of(lambda: fast(value))
+        print(
+            f"{label:<14}"
+            + "".join(
+                f"{seconds / NUMBER * 1e6:>10.2f}us"
+                for seconds in (baseline, uncached_time, cached_time)
+            )
+        )
+
+
+if __name__ == "__main__":
+    main()
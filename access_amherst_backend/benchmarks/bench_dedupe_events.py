@@ -0,0 +1,82 @@
+"""
+Benchmark for the database-wide duplicate scan.
+
+Builds synthetic `(id, title, start_time, pub_date)` rows shaped like the
+events table, where about a third of the events were saved again by another
+source or under another id, and times `event_dedupe.find_duplicate_clusters`
+on them. This is the work the `dedupe_events` command does after reading
+the rows. Run from `access_amherst_backend/`:
+
+    python benchmarks/bench_dedupe_events.py [rows]
+"""
+
+import os
+import random
+import sys
+import time
+from datetime import datetime, timedelta, timezone
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+os.environ.setdefault(
+    "DJANGO_SETTINGS_MODULE", "access_amherst_backend.settings"
+)
+
+import django  # noqa: E402
+
+django.setup()
+
+from access_amherst_algo.event_dedupe import (  # noqa: E402
+    find_duplicate_clusters,
+)
+
+WORDS = (
+    "queer talk jazz ensemble concert guest lecture future club practice "
+    "cricket hemac meeting swing dance social poetry reading chemistry "
+    "seminar career fair workshop film screening yoga meditation art "
+    "exhibition volunteer drive debate team open mic study break"
+).split()
+BASES = (500_000_000, 600_000_000, 700_000_000)
+START = datetime(2024, 9, 1, tzinfo=timezone.utc)
+
+
+def synthetic_rows(count, seed=0):
+    rng = random.Random(seed)
+    rows = []
+    while len(rows) < count:
+        title = " ".join(rng.sample(WORDS, rng.randint(2, 5))).title()
+        start_time = START + timedelta(minutes=30 * rng.randrange(20_000))
+        pub_date = start_time - timedelta(days=rng.randint(1, 14))
+        rows.append(
+            (rng.choice(BASES) + len(rows), title, start_time, pub_date)
+        )
+        if rng.random() < 0.33:
+            # Same event from another source, reworded and an hour off
+            rows.append(
+                (
+                    rng.choice(BASES) + len(rows),
+                    title + "!",
+                    start_time + timedelta(hours=rng.choice((0, 1))),
+                    pub_date,
+                )
+            )
+    rows = rows[:count]
+    rows.sort(key=lambda row: (row[2], row[0]))
+    return rows
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+    rows = synthetic_rows(count)
+    started = time.perf_counter()
+    clusters = find_duplicate_clusters(rows)
+    elapsed = time.perf_counter() - started
+    duplicates = sum(len(cluster) - 1 for cluster in clusters)
+    print(
+        f"{count} rows: {len(clusters)} clusters, {duplicates} duplicates "
+        f"in {elapsed:.2f} s"
+    )
+
+
+if __name__ == "__main__":
+    main()